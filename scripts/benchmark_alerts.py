@@ -0,0 +1,65 @@
+"""
+Benchmark price alert matching: many active alerts against a replayed tick feed
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.price_alerts import AlertEngine, ABOVE, BELOW, PERCENT_MOVE
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--alerts', type=int, default=100_000, help='Active alerts')
+    parser.add_argument('--instruments', type=int, default=5_000, help='Instruments carrying alerts')
+    parser.add_argument('--ticks', type=int, default=500_000, help='Ticks to replay')
+    parser.add_argument('--rate', type=int, default=5_000, help='Required sustained ticks per second')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    keys = [f"NSE:SYM{i:05d}" for i in range(args.instruments)]
+    start = rng.uniform(100, 3000, args.instruments)
+
+    engine = AlertEngine()
+    owner = rng.integers(0, args.instruments, args.alerts)
+    kind = rng.choice([ABOVE, BELOW, PERCENT_MOVE], args.alerts)
+    distance = rng.uniform(0.01, 0.10, args.alerts)
+    started = time.perf_counter()
+    for i, k, d in zip(owner.tolist(), kind.tolist(), distance.tolist()):
+        if k == ABOVE:
+            engine.add(keys[i], ABOVE, start[i] * (1 + d))
+        elif k == BELOW:
+            engine.add(keys[i], BELOW, start[i] * (1 - d))
+        else:
+            engine.add(keys[i], PERCENT_MOVE, d * 100, reference=start[i])
+    print(f"🔔 Registered {len(engine):,} alerts on {args.instruments:,} instruments "
+          f"in {time.perf_counter() - started:.2f} s")
+
+    # Random-walk feed: each tick moves one instrument by ~0.2%
+    tick_owner = rng.integers(0, args.instruments, args.ticks)
+    moves = rng.normal(0, 0.002, args.ticks)
+    prices = start.copy()
+    feed = []
+    for i, m in zip(tick_owner.tolist(), moves.tolist()):
+        prices[i] *= 1 + m
+        feed.append((keys[i], prices[i]))
+
+    check = engine.check
+    fired = 0
+    started = time.perf_counter()
+    for key, ltp in feed:
+        fired += len(check(key, ltp))
+    elapsed = time.perf_counter() - started
+    rate = args.ticks / elapsed
+
+    print(f"⏱️ {args.ticks:,} ticks in {elapsed:.2f} s: {rate:,.0f} ticks/s, "
+          f"{elapsed / args.ticks * 1e6:.2f} µs/tick, {fired:,} alerts fired")
+    print("✅ Sustains" if rate >= args.rate else "❌ Below", f"the {args.rate:,} ticks/s target")
+
+if __name__ == "__main__":
+    main()
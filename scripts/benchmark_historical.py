@@ -0,0 +1,63 @@
+"""
+Benchmark windowed historical fetches against a simulated server with per-request latency
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.kite_mcp_client import MCPResponse
+from utils.historical import HISTORICAL_RATE_LIMIT, split_range, iter_historical
+from utils.rate_limiter import RateLimiter
+
+class SimulatedServer:
+    """get_historical_data with a fixed latency and NSE-hours minute candles"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def get_historical_data(self, instrument_token, from_date, to_date, interval="minute"):
+        self.calls += 1
+        time.sleep(self.latency)
+        index = pd.date_range(from_date, to_date, freq='min')
+        minutes = index.hour * 60 + index.minute
+        index = index[(index.dayofweek < 5) & (minutes >= 555) & (minutes <= 930)]
+        return MCPResponse(True, [[d.isoformat(), 100.0, 101.0, 99.0, 100.5, 1000] for d in index])
+
+def run(server, args, max_workers: int):
+    started = time.perf_counter()
+    first = None
+    bars = 0
+    # A fresh limiter per run, so one run doesn't start on the budget the last one spent
+    for chunk in iter_historical(server, 1, args.start, args.end, 'minute', max_workers=max_workers,
+                                 limiter=RateLimiter(HISTORICAL_RATE_LIMIT)):
+        first = first or time.perf_counter() - started
+        bars += len(chunk)
+    return first, time.perf_counter() - started, bars
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--start', default='2023-01-01', help='Range start')
+    parser.add_argument('--end', default='2023-12-31', help='Range end')
+    parser.add_argument('--latency', type=float, default=1.0, help='Simulated seconds per request')
+    parser.add_argument('--workers', type=int, default=3, help='Concurrent requests')
+    args = parser.parse_args()
+
+    windows = split_range(args.start, args.end, 'minute')
+    print(f"📅 {args.start} to {args.end} at 1 minute: {len(windows)} windows, "
+          f"{args.latency:g}s simulated latency each")
+
+    for workers in (1, args.workers):
+        server = SimulatedServer(args.latency)
+        first, total, bars = run(server, args, workers)
+        print(f"⏱️ {workers} worker(s): first chunk {first:.2f}s, all {bars:,} bars in {total:.2f}s "
+              f"({server.calls} requests)")
+
+if __name__ == "__main__":
+    main()
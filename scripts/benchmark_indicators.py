@@ -0,0 +1,68 @@
+"""
+Benchmark the technical indicator library on a long synthetic price series
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.indicators import (sma, ema, rsi, macd, bollinger_bands, atr, vwap,
+                              SMAState, EMAState, RSIState, MACDState, BollingerState,
+                              ATRState, VWAPState)
+
+def make_bars(n: int, seed: int = 42):
+    """Random-walk OHLCV bars with 375 one-minute bars per session"""
+    rng = np.random.default_rng(seed)
+    close = 2500 * np.exp(np.cumsum(rng.normal(0, 0.0005, n)))
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    volume = rng.integers(100, 10000, n).astype(float)
+    session = np.arange(n) // 375
+    return close + spread, close - spread, close, volume, session
+
+def timed(label: str, func, bars: int):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed * 1000:10.1f} ms  {bars / elapsed / 1e6:8.1f} M bars/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=10_000_000, help='Bars for the vectorized run')
+    parser.add_argument('--incremental-bars', type=int, default=200_000,
+                        help='Bars fed one at a time to the incremental states')
+    args = parser.parse_args()
+
+    print(f"📊 Vectorized indicators over {args.bars:,} bars")
+    high, low, close, volume, session = make_bars(args.bars)
+    timed("SMA(20)", lambda: sma(close, 20), args.bars)
+    timed("EMA(20)", lambda: ema(close, 20), args.bars)
+    timed("RSI(14)", lambda: rsi(close, 14), args.bars)
+    timed("MACD(12, 26, 9)", lambda: macd(close), args.bars)
+    timed("Bollinger(20, 2)", lambda: bollinger_bands(close), args.bars)
+    timed("ATR(14)", lambda: atr(high, low, close), args.bars)
+    timed("VWAP (per session)", lambda: vwap(high, low, close, volume, session), args.bars)
+
+    n = args.incremental_bars
+    print(f"\n⏱️ Incremental updates over {n:,} bars")
+    h, l, c, v, s = (a[:n].tolist() for a in (high, low, close, volume, session))
+
+    def feed(state, *columns):
+        update = state.update
+        for values in zip(*columns):
+            update(*values)
+
+    timed("SMAState", lambda: feed(SMAState(20), c), n)
+    timed("EMAState", lambda: feed(EMAState(20), c), n)
+    timed("RSIState", lambda: feed(RSIState(14), c), n)
+    timed("MACDState", lambda: feed(MACDState(), c), n)
+    timed("BollingerState", lambda: feed(BollingerState(), c), n)
+    timed("ATRState", lambda: feed(ATRState(14), h, l, c), n)
+    timed("VWAPState", lambda: feed(VWAPState(), h, l, c, v, s), n)
+
+if __name__ == "__main__":
+    main()
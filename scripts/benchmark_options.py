@@ -0,0 +1,81 @@
+"""
+Benchmark option analytics: parse, implied volatility, greeks and payoff for a large F&O book
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.options import (contracts_frame, analyze_legs, portfolio_greeks, payoff_curve,
+                           black_scholes_price, years_to_expiry, sample_option_positions,
+                           INDEX_UNDERLYINGS, RISK_FREE_RATE)
+
+def synthetic_book(legs: int, seed: int = 0):
+    """Positions across NIFTY and BANKNIFTY strikes and the sample book's expiry, priced from Black-Scholes"""
+    now = datetime.now()
+    sample = sample_option_positions(now)
+    code = sample['net'][0]['tradingsymbol'][len('NIFTY'):len('NIFTY') + 5]
+    spots = sample['spots']
+    rng = np.random.default_rng(seed)
+
+    names = rng.choice(['NIFTY', 'BANKNIFTY'], legs)
+    steps = np.where(names == 'NIFTY', 50, 100)
+    spot = np.array([spots[INDEX_UNDERLYINGS[n]] for n in names])
+    strikes = (np.round(spot * rng.uniform(0.85, 1.15, legs) / steps) * steps).astype(int)
+    calls = rng.random(legs) < 0.5
+    vols = rng.uniform(0.1, 0.3, legs)
+    symbols = [f"{n}{code}{k}{'CE' if c else 'PE'}" for n, k, c in zip(names, strikes, calls)]
+    expiry = contracts_frame([{'tradingsymbol': symbols[0], 'exchange': 'NFO', 'quantity': 1}])['Expiry']
+    T = years_to_expiry(expiry, now)[0]
+    prices = np.maximum(np.round(black_scholes_price(spot, strikes, T, RISK_FREE_RATE, vols, calls), 2), 0.05)
+
+    net = [{'tradingsymbol': s, 'exchange': 'NFO', 'quantity': int(q), 'average_price': float(p),
+            'last_price': float(p)} for s, q, p in zip(symbols, rng.choice([-75, 75, 150], legs), prices)]
+    return {'net': net}, spots
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--legs', type=int, default=5_000, help='Option legs in the book')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs (best is reported)')
+    parser.add_argument('--target', type=float, default=100.0, help='Target milliseconds for the full pass')
+    args = parser.parse_args()
+
+    positions, spots = synthetic_book(args.legs)
+    print(f"🧮 {args.legs:,} option legs on {len(spots)} underlyings")
+
+    timings = {'parse': [], 'iv + greeks': [], 'aggregate': [], 'payoff': []}
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        legs = contracts_frame(positions)
+        timings['parse'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        analyzed = analyze_legs(legs, spots)
+        timings['iv + greeks'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        totals = portfolio_greeks(analyzed)
+        timings['aggregate'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for underlying in spots:
+            payoff_curve(analyzed, underlying)
+        timings['payoff'].append(time.perf_counter() - started)
+
+    best = {stage: min(runs) * 1e3 for stage, runs in timings.items()}
+    for stage, ms in best.items():
+        print(f"⏱️ {stage:<12} {ms:8.1f} ms")
+    solved = analyzed['IV %'].notna().mean() * 100
+    print(f"📊 IV solved for {solved:.1f}% of legs; net delta ₹{totals.iloc[-1]['Delta ₹']:,.0f}")
+
+    total = sum(best.values())
+    print("✅ Within" if total <= args.target else "❌ Over", f"the {args.target:g} ms target ({total:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Benchmark trade-log replay (NAV, TWR, XIRR, attribution) on a large account
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.backtest import TRADING_DAYS, synthetic_close_matrix
+from utils.performance import replay_trades, synthetic_trades
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trades', type=int, default=100_000, help='Trades in the log')
+    parser.add_argument('--symbols', type=int, default=500, help='Instruments traded')
+    parser.add_argument('--years', type=int, default=10, help='Years of daily closes')
+    args = parser.parse_args()
+
+    closes = synthetic_close_matrix(args.symbols, args.years * TRADING_DAYS)
+    trades = synthetic_trades(closes, args.trades)
+    print(f"📊 Replaying {len(trades):,} trades over {len(closes):,} days x {args.symbols} symbols")
+
+    started = time.perf_counter()
+    report = replay_trades(trades, closes)
+    elapsed = time.perf_counter() - started
+
+    summary = report.summary()
+    print(f"  Replay                 {elapsed * 1000:10.1f} ms")
+    print(f"  Final NAV              {summary['nav']:14,.0f}")
+    print(f"  Time-weighted return   {summary['twr']:13.2f}%")
+    print(f"  XIRR                   {summary['xirr']:13.2f}%")
+
+if __name__ == "__main__":
+    main()
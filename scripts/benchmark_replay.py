@@ -0,0 +1,134 @@
+"""
+Replay a recorded MCP traffic log through KiteMCPClient and report end-to-end latency per tool
+
+Record real traffic by running the app with MCP_RECORD_PATH set, or pass --capture to record a
+synthetic trading day against the offline stub server first.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.kite_mcp_client import KiteMCPClient
+from utils.traffic_log import ReplayTransport, load_traffic
+from utils.stub_server import StubServer, StubConfig, KITE_RATE_LIMITS
+
+def capture_day(path: str, sessions: int, refreshes: int, scale: str):
+    """Record a trading day's call mix from `sessions` users against the stub server"""
+    config = StubConfig.preset(scale, latency_ms=25, jitter_ms=50, rate_limits=dict(KITE_RATE_LIMITS))
+    with StubServer(config) as server:
+        watchlist = [server.book.keys[row] for row in server.book.holding_rows[:40]]
+        token = int(server.book.token[server.book.holding_rows[0]])
+
+        def session(index: int):
+            client = KiteMCPClient(server.url, record_path=path)
+            client.get_profile()
+            client.get_holdings()
+            client.get_positions()
+            client.get_margins()
+            orders = trades = 0
+            for step in range(refreshes):
+                client.get_quotes(watchlist)
+                client.get_ltp(watchlist[:10])
+                response = client.get_orders(from_index=orders)
+                orders += len(response.data) if response.success and isinstance(response.data, list) else 0
+                response = client.get_trades(from_index=trades)
+                trades += len(response.data) if response.success and isinstance(response.data, list) else 0
+                if step % 5 == 0:
+                    client.get_historical_data(token, '2025-01-01 00:00:00', '2025-06-01 00:00:00', 'day')
+                if step % 10 == index % 10:
+                    client.search_instruments('INFY')
+                    client.place_order('regular', 'NSE', 'INFY', 'BUY', 1, 'CNC', 'MARKET')
+                time.sleep(0.2)
+
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+def replay(records, speed: float, pace: bool):
+    """Replay every recorded client's calls on its own thread; returns {tool: [seconds]} and wall time"""
+    transport = ReplayTransport(records, speed=speed)
+    streams = defaultdict(list)
+    for record in records:
+        streams[record.client].append(record)
+    origin = records[0].started
+    latencies = defaultdict(list)
+    lock = threading.Lock()
+    began = time.perf_counter()
+
+    def run(stream):
+        client = KiteMCPClient("replay://mcp", transport=transport)
+        for record in stream:
+            if pace and speed > 0:
+                wait = (record.started - origin) / speed - (time.perf_counter() - began)
+                if wait > 0:
+                    time.sleep(wait)
+            started = time.perf_counter()
+            client._make_request(record.tool, record.arguments)
+            with lock:
+                latencies[record.tool].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=run, args=(stream,)) for stream in streams.values()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - began, transport
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('log', help='Traffic log (.jsonl.gz) to replay')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Timing scale: 1 = recorded latency, 2 = twice as fast, 0 = no delay')
+    parser.add_argument('--no-pace', action='store_true', help='Ignore recorded gaps between calls')
+    parser.add_argument('--capture', action='store_true', help='First record a synthetic day from the stub server')
+    parser.add_argument('--sessions', type=int, default=4, help='Concurrent users when capturing')
+    parser.add_argument('--refreshes', type=int, default=20, help='Refresh cycles per user when capturing')
+    parser.add_argument('--scale', default='medium', help='Stub dataset preset when capturing')
+    parser.add_argument('--target', type=float, default=250.0, help='p95 end-to-end latency target in ms')
+    args = parser.parse_args()
+
+    if args.capture:
+        started = time.perf_counter()
+        capture_day(args.log, args.sessions, args.refreshes, args.scale)
+        print(f"🎙️ Captured {args.sessions} sessions x {args.refreshes} refreshes into {args.log} "
+              f"in {time.perf_counter() - started:.1f} s ({os.path.getsize(args.log) / 1e6:.1f} MB)")
+
+    records = load_traffic(args.log)
+    if not records:
+        print(f"❌ No records in {args.log}")
+        return
+    span = records[-1].started + records[-1].elapsed - records[0].started
+    clients = len({record.client for record in records})
+    print(f"📼 {len(records):,} calls from {clients} clients over {span:.1f} s")
+
+    latencies, wall, transport = replay(records, args.speed, not args.no_pace)
+    recorded = defaultdict(list)
+    for record in records:
+        recorded[record.tool].append(record.elapsed)
+
+    print(f"\n{'Tool':<22}{'Calls':>7}{'Rec p50':>10}{'Rec p95':>10}{'Replay p50':>12}{'Replay p95':>12}")
+    for tool in sorted(latencies):
+        rec = np.array(recorded[tool]) * 1e3
+        rep = np.array(latencies[tool]) * 1e3
+        print(f"{tool:<22}{len(rep):>7}{np.percentile(rec, 50):>10.1f}{np.percentile(rec, 95):>10.1f}"
+              f"{np.percentile(rep, 50):>12.1f}{np.percentile(rep, 95):>12.1f}")
+
+    overall = np.concatenate([np.array(values) for values in latencies.values()]) * 1e3
+    p95 = np.percentile(overall, 95)
+    print(f"\n⏱️ Replayed in {wall:.1f} s at speed {args.speed:g} "
+          f"({transport.hits:,} exact, {transport.fallbacks:,} by tool, {transport.misses:,} unmatched); "
+          f"p50 {np.percentile(overall, 50):.1f} ms, p95 {p95:.1f} ms, p99 {np.percentile(overall, 99):.1f} ms")
+    print("✅ Within" if p95 <= args.target else "❌ Over", f"the {args.target:g} ms p95 target")
+
+if __name__ == "__main__":
+    main()
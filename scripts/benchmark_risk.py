@@ -0,0 +1,76 @@
+"""
+Benchmark the local pre-trade risk checks: per-check and per-order latency over a large random basket
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.basket_orders import normalize_leg
+from utils.risk_checks import (RiskContext, RiskLimits, InstrumentSpec, PRE_TRADE_CHECKS,
+                               check_order, check_orders)
+
+def synthetic_context(symbols: int, seed: int = 0) -> RiskContext:
+    rng = np.random.default_rng(seed)
+    keys = [f"NSE:SYM{i:05d}" for i in range(symbols)]
+    ltp = np.round(rng.uniform(50, 5000, symbols), 1)
+    return RiskContext(
+        margins={'equity': 50_00_000.0},
+        positions={k: int(q) for k, q in zip(keys, rng.integers(-50, 50, symbols))},
+        holdings={k: int(q) for k, q in zip(keys, rng.integers(0, 200, symbols))},
+        ltp=dict(zip(keys, ltp.tolist())),
+        circuits={k: (p * 0.8, p * 1.2) for k, p in zip(keys, ltp.tolist())},
+        instruments={k: InstrumentSpec(lot_size=1, tick_size=0.05) for k in keys},
+        fetched_at=time.time(), symbols=set(keys)
+    )
+
+def synthetic_orders(context: RiskContext, count: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    keys = list(context.ltp)
+    picks = rng.integers(0, len(keys), count)
+    sides = rng.choice(['BUY', 'SELL'], count)
+    # Mostly sane prices with the odd fat finger
+    drift = np.where(rng.random(count) < 0.05, rng.uniform(1.3, 2.0, count), rng.uniform(0.97, 1.03, count))
+    return [normalize_leg({
+        'symbol': keys[i], 'transaction_type': side, 'quantity': int(rng.integers(1, 100)),
+        'order_type': 'LIMIT', 'product': 'CNC',
+        'price': round(context.ltp[keys[i]] * d / 0.05) * 0.05
+    }) for i, side, d in zip(picks, sides, drift)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=2_000, help='Instruments in the context')
+    parser.add_argument('--orders', type=int, default=20_000, help='Orders to check')
+    parser.add_argument('--target', type=float, default=50.0, help='Target microseconds per order')
+    args = parser.parse_args()
+
+    context = synthetic_context(args.symbols)
+    orders = synthetic_orders(context, args.orders)
+    limits = RiskLimits()
+    print(f"🛡️ {args.orders:,} orders against {args.symbols:,} instruments, {len(PRE_TRADE_CHECKS)} checks")
+
+    for check in PRE_TRADE_CHECKS:
+        started = time.perf_counter()
+        for order in orders:
+            check(order, context, limits)
+        elapsed = time.perf_counter() - started
+        print(f"⏱️ {check.__name__:<22} {elapsed / len(orders) * 1e6:6.2f} µs")
+
+    started = time.perf_counter()
+    results = [check_order(order, context, limits) for order in orders]
+    per_order = (time.perf_counter() - started) / len(orders) * 1e6
+    blocked = sum(not r.passed for r in results)
+    print(f"📋 Full pipeline {per_order:.2f} µs/order; {blocked:,} blocked locally")
+
+    started = time.perf_counter()
+    check_orders(orders, context.copy(), limits)
+    print(f"🧺 Sequential basket with margin booking: {(time.perf_counter() - started) * 1e3:.0f} ms")
+    print("✅ Within" if per_order <= args.target else "❌ Over", f"the {args.target:g} µs/order target")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Benchmark suite: client decode, portfolio metrics, historical data, table styling and full page runs
+against the offline stub server
+
+    python scripts/benchmark_suite.py run --save .benchmarks/baseline.json
+    python scripts/benchmark_suite.py run --compare .benchmarks/baseline.json
+    python scripts/benchmark_suite.py compare .benchmarks/baseline.json .benchmarks/latest.json
+
+Each benchmark is timed asv-style: one warm-up call, then `repeat` samples of `number` calls,
+with `number` grown until a sample takes at least --min-time. Results are median/min/max seconds
+per call, written as JSON; compare flags benchmarks whose median slowed by more than --threshold
+and whose samples no longer overlap the baseline's (min above its max), and exits non-zero when
+any did. A benchmark that raises is recorded under "failures" and also makes run and compare
+exit non-zero.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import statistics
+import warnings
+from datetime import datetime
+from typing import Callable, Dict, List, Any
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from utils.kite_mcp_client import KiteMCPClient
+from utils.traffic_log import TrafficRecord, replay_response
+from utils.pnl_engine import PnLEngine
+from utils.sectors import sector_diversification
+from utils.stub_server import StubServer, StubConfig, SCALE_PRESETS
+from utils.utils import (calculate_portfolio_metrics, get_risk_metrics, generate_historical_data,
+                         format_currency_array, format_percentage_array, format_indian_number,
+                         color_signed_columns)
+
+DEFAULT_OUTPUT = os.path.join(ROOT, '.benchmarks', 'latest.json')
+
+HOLDING_COUNTS = [10, 1_000, 100_000]
+
+PAGES = ['🏠 Dashboard', '📋 Orders', '📈 Market Data']
+
+BENCHMARKS: List[Dict[str, Any]] = []
+
+def benchmark(name: str, params: List[Any] = (None,), repeat: int = 5):
+    """Register a benchmark: the function does its setup for a param and returns the callable to time"""
+    def register(setup: Callable[[Any], Callable[[], Any]]):
+        BENCHMARKS.append({'name': name, 'params': list(params), 'setup': setup, 'repeat': repeat})
+        return setup
+    return register
+
+def synthetic_holdings(n: int) -> List[Dict[str, Any]]:
+    """Kite-shaped holding records (plus the demo current_value/investment fields)"""
+    rng = np.random.default_rng(n)
+    quantity = rng.integers(1, 500, n)
+    average = np.round(rng.uniform(50, 5_000, n), 2)
+    last = np.round(average * np.exp(rng.normal(0, 0.2, n)), 2)
+    close = np.round(last * np.exp(rng.normal(0, 0.01, n)), 2)
+    return [{'tradingsymbol': f"STOCK{i:06d}", 'exchange': 'NSE', 'instrument_token': 5_000_000 + i,
+             'quantity': q, 'average_price': a, 'last_price': l, 'close_price': c,
+             'current_value': q * l, 'investment': q * a, 'pnl': round(q * (l - a), 2)}
+            for i, (q, a, l, c) in enumerate(zip(quantity.tolist(), average.tolist(),
+                                                 last.tolist(), close.tolist()))]
+
+@benchmark("client.make_request_decode", params=[100, 1_000, 10_000])
+def bench_make_request(n: int):
+    # A transport answering with a prebuilt response isolates encode/decode from the network
+    text = json.dumps(json.dumps(synthetic_holdings(n)))
+    body = '{"jsonrpc":"2.0","id":null,"result":{"content":[{"type":"text","text":' + text + '}]}}'
+    record = TrafficRecord('bench', 0.0, 'get_holdings', {}, 0.0, 200, {}, body)
+    client = KiteMCPClient("bench://mcp", transport=lambda *args, **kwargs: replay_response(record))
+    return lambda: client.get_holdings()
+
+@benchmark("utils.calculate_portfolio_metrics", params=HOLDING_COUNTS)
+def bench_portfolio_metrics(n: int):
+    holdings = synthetic_holdings(n)
+    return lambda: calculate_portfolio_metrics(holdings)
+
+@benchmark("utils.get_risk_metrics", params=HOLDING_COUNTS)
+def bench_risk_metrics(n: int):
+    holdings = synthetic_holdings(n)
+    return lambda: get_risk_metrics(holdings, sector_diversification(holdings))
+
+@benchmark("utils.generate_historical_data", params=[30, 365, 2_000])
+def bench_historical(days: int):
+    return lambda: generate_historical_data('RELIANCE', days)
+
+@benchmark("table.holdings_styler", params=[100, 1_000, 10_000])
+def bench_holdings_styler(n: int):
+    # Same pipeline as the dashboard's holdings table, rendered to HTML
+    engine = PnLEngine.from_holdings(synthetic_holdings(n))
+
+    def render():
+        df = engine.frame()
+        display_df = df[['Symbol']].copy()
+        display_df['Quantity'] = format_indian_number(df['Quantity'])
+        display_df['Avg Price'] = format_currency_array(df['Avg Price'])
+        display_df['LTP'] = format_currency_array(df['LTP'])
+        display_df['Current Value'] = format_currency_array(df['Current Value'], decimals=0)
+        display_df['P&L'] = format_currency_array(df['P&L'], decimals=0)
+        display_df['P&L %'] = format_percentage_array(df['P&L %'], decimals=1)
+        return display_df.style.apply(color_signed_columns, axis=None, source=df,
+                                      columns=['P&L', 'P&L %']).to_html()
+    return render
+
+def _app_test():
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(os.path.join(ROOT, 'src', 'app.py'), default_timeout=120)
+
+@benchmark("app.cold_session", repeat=3)
+def bench_cold_session(_):
+    # A new session's first run: initialize_session_state plus the whole dashboard
+    return lambda: _app_test().run()
+
+@benchmark("app.page_rerun", params=PAGES, repeat=5)
+def bench_page_rerun(page: str):
+    at = _app_test().run()
+    at.sidebar.radio[0].set_value(page).run()
+    if at.exception:
+        raise RuntimeError(f"{page} raised: {at.exception[0].message}")
+    return lambda: at.run()
+
+def time_callable(fn: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, Any]:
+    """Seconds per call over `repeat` samples, each at least min_time long"""
+    fn()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return {'median': statistics.median(samples), 'min': min(samples), 'max': max(samples),
+            'stddev': statistics.pstdev(samples), 'number': number, 'repeat': len(samples)}
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import streamlit
+    return {'created': datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'machine': platform.node(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'streamlit': streamlit.__version__}
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+def run(args) -> Dict[str, Any]:
+    # Page runs must not read or write the user's saved session (or the key file
+    # beside it), watchlists or alerts
+    scratch = tempfile.mkdtemp(prefix="portfolio-bench-")
+    for name in ('SESSION_STATE_PATH', 'ACCOUNTS_PATH', 'WATCHLISTS_PATH', 'ALERTS_PATH'):
+        os.environ[name] = os.path.join(scratch, name.lower())
+    os.environ.pop('MCP_RECORD_PATH', None)
+    warnings.filterwarnings("ignore")
+    # Pages run authenticated against a seeded in-process stub, not whatever is on localhost
+    server = StubServer(StubConfig.preset(args.stub_scale)).start()
+    os.environ['MCP_SERVER_URL'] = server.url
+
+    results, failures = {}, {}
+    for bench in BENCHMARKS:
+        for param in bench['params']:
+            key = bench['name'] if param is None else f"{bench['name']}[{param}]"
+            if args.filter and args.filter not in key:
+                continue
+            repeat = 2 if args.quick else bench['repeat']
+            try:
+                result = time_callable(bench['setup'](param), repeat, args.min_time)
+            except Exception as e:
+                failures[key] = f"{type(e).__name__}: {e}"
+                print(f"❌ {key}: {failures[key]}")
+                continue
+            results[key] = result
+            print(f"⏱️ {key:<48} {format_time(result['median']):>11}  "
+                  f"(min {format_time(result['min'])}, {result['number']} x {result['repeat']})")
+    server.stop()
+    if failures:
+        print(f"❌ {len(failures)} benchmark(s) failed")
+    return {'environment': {**environment(), 'stub_scale': args.stub_scale}, 'results': results,
+            'failures': failures}
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Print a comparison table; returns the benchmarks that regressed beyond threshold or failed"""
+    regressions = []
+    base, new = baseline['results'], current['results']
+    failures = current.get('failures', {})
+    print(f"\n{'Benchmark':<50}{'Baseline':>12}{'Current':>12}{'Ratio':>8}")
+    for key in sorted(set(base) | set(new) | set(failures)):
+        if key not in base or key not in new:
+            current_time = format_time(new[key]['median']) if key in new else '-'
+            marker = ''
+            if key in failures:
+                current_time, marker = 'failed', ' ❌'
+            print(f"{key:<50}{format_time(base[key]['median']) if key in base else '-':>12}"
+                  f"{current_time:>12}{'':>8}{marker}")
+            continue
+        ratio = new[key]['median'] / base[key]['median']
+        marker = ''
+        if ratio > 1 + threshold and new[key]['min'] > base[key]['max']:
+            marker = ' ❌'
+            regressions.append(key)
+        elif ratio < 1 / (1 + threshold) and new[key]['max'] < base[key]['min']:
+            marker = ' 🚀'
+        print(f"{key:<50}{format_time(base[key]['median']):>12}{format_time(new[key]['median']):>12}"
+              f"{ratio:>7.2f}x{marker}")
+    print(f"\nBaseline {baseline['environment'].get('commit')} on {baseline['environment'].get('machine')}, "
+          f"current {current['environment'].get('commit')} on {current['environment'].get('machine')}")
+    if regressions:
+        print(f"❌ {len(regressions)} benchmark(s) more than {threshold:.0%} slower than the baseline")
+    else:
+        print(f"✅ No benchmark more than {threshold:.0%} slower than the baseline")
+    if failures:
+        print(f"❌ {len(failures)} benchmark(s) failed: {', '.join(sorted(failures))}")
+    return regressions + sorted(failures)
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+def save(data: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    print(f"💾 Results written to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the suite and write JSON results')
+    run_parser.add_argument('-k', dest='filter', help='Only benchmarks whose name contains this')
+    run_parser.add_argument('--save', default=DEFAULT_OUTPUT, help='Results file')
+    run_parser.add_argument('--compare', help='Baseline JSON to compare the results against')
+    run_parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown (0.10 = 10%%)')
+    run_parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per sample')
+    run_parser.add_argument('--quick', action='store_true', help='Two samples per benchmark')
+    run_parser.add_argument('--stub-scale', choices=list(SCALE_PRESETS), default='small',
+                            help='Stub server dataset behind the page benchmarks')
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        sys.exit(1 if compare(load(args.baseline), load(args.current), args.threshold) else 0)
+
+    results = run(args)
+    save(results, args.save)
+    if args.compare:
+        sys.exit(1 if compare(load(args.compare), results, args.threshold) else 0)
+    sys.exit(1 if results['failures'] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark the intraday tick buffer: a full session of batched quotes for many symbols
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.tick_buffer import TickBuffer, SESSION_OPEN_SECONDS, SESSION_SECONDS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=2_000, help='Watched symbols')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between quote batches')
+    parser.add_argument('--memory', type=float, default=64.0, help='Memory budget in MB')
+    args = parser.parse_args()
+
+    keys = [f"NSE:SYM{i:05d}" for i in range(args.symbols)]
+    buffer = TickBuffer(keys)
+    print(f"📦 {args.symbols:,} symbols x {buffer.capacity:,} slots: "
+          f"{buffer.nbytes / 1e6:.1f} MB allocated up front")
+
+    rng = np.random.default_rng(3)
+    prices = rng.uniform(100, 3000, args.symbols)
+    volumes = np.zeros(args.symbols)
+    stamps = np.arange(0, SESSION_SECONDS, args.interval) + buffer.origin + SESSION_OPEN_SECONDS
+
+    started = time.perf_counter()
+    for stamp in stamps:
+        prices *= np.exp(rng.normal(0, 0.0002, args.symbols))
+        volumes += rng.integers(0, 500, args.symbols)
+        buffer.update_many(keys, prices, volumes, timestamp=stamp)
+    elapsed = time.perf_counter() - started
+    ticks = len(stamps) * args.symbols
+
+    print(f"⏱️ {len(stamps):,} batches ({ticks:,} ticks) in {elapsed:.2f} s: "
+          f"{elapsed / len(stamps) * 1e3:.2f} ms/batch, {ticks / elapsed:,.0f} ticks/s")
+    started = time.perf_counter()
+    lines = buffer.sparklines()
+    print(f"📈 {len(lines):,} sparklines in {(time.perf_counter() - started) * 1e3:.0f} ms; "
+          f"buffer still {buffer.nbytes / 1e6:.1f} MB")
+    print("✅ Within" if buffer.nbytes / 1e6 <= args.memory else "❌ Over", f"the {args.memory:g} MB budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Concurrent-session load test: drive N simulated browser sessions through the app's pages against the
+offline stub server and report rerun latency, CPU and memory as N grows
+
+    python scripts/load_test.py --sessions 1,2,4,8,16 --reruns 12
+    python scripts/load_test.py --sessions 4 --think-time 2 --latency-ms 40 --json load.json
+
+The app runs under a real `streamlit run` server in its own process and the stub in another, so the
+CPU and RSS figures are the app server's alone. Each session speaks Streamlit's websocket protocol
+the way a browser tab does: it connects, runs the script once (the cold start), then switches pages
+with the sidebar radio, each rerun timed from the request until the server reports the script
+finished. Sessions start on different pages so every level mixes Dashboard, Orders and Market Data.
+
+CPU is the server's user+system time over the level, as cores busy and per rerun. RSS per session
+is the level's peak RSS above the idle server's (after one warm-up session loaded every page), over
+N; Python seldom hands memory back, so read it as an upper bound. CPU and RSS come from /proc and
+show as '-' where that isn't available.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import requests
+from websockets.asyncio.client import connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetStates
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PAGES = ['Dashboard', 'Orders', 'Market Data']
+
+# A run cut short by st.rerun() is followed by the run that actually renders the page
+RERUN_STATUSES = (ForwardMsg.FINISHED_EARLY_FOR_RERUN,)
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def process_usage(pid: int) -> Tuple[Optional[float], Optional[int]]:
+    """(CPU seconds, RSS bytes) of a process from /proc, or (None, None) off Linux"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the parenthesised command name; utime and stime are 14th and 15th overall
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/statm') as f:
+            resident = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None, None
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, resident * PAGE_SIZE
+
+def wait_for(url: str, process: subprocess.Popen, name: str, timeout: float = 120.0):
+    """Poll a URL until it answers 200, failing early if the process died"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with code {process.returncode}")
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{name} did not come up within {timeout:.0f} s")
+
+def start_stub(args, log) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    command = [sys.executable, os.path.join(ROOT, 'scripts', 'stub_server.py'), '--port', str(port),
+               '--scale', args.scale, '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms)]
+    process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+    wait_for(f'http://127.0.0.1:{port}/stats', process, 'Stub server')
+    return process, f'http://127.0.0.1:{port}/mcp'
+
+def start_app(server_url: str, scratch: str, log) -> Tuple[subprocess.Popen, int]:
+    port = free_port()
+    env = {**os.environ, 'MCP_SERVER_URL': server_url}
+    # Sessions must not read or write the user's saved session (or the key file
+    # beside it), watchlists or alerts
+    for name in ('SESSION_STATE_PATH', 'ACCOUNTS_PATH', 'WATCHLISTS_PATH', 'ALERTS_PATH'):
+        env[name] = os.path.join(scratch, name.lower())
+    env.pop('MCP_RECORD_PATH', None)
+    command = [sys.executable, '-m', 'streamlit', 'run', os.path.join(ROOT, 'src', 'app.py'),
+               '--server.headless', 'true', '--server.port', str(port), '--server.address', '127.0.0.1',
+               # The harness has no browser cookie to echo back
+               '--server.enableXsrfProtection', 'false',
+               '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false']
+    process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, env=env, cwd=ROOT)
+    wait_for(f'http://127.0.0.1:{port}/_stcore/health', process, 'Streamlit server')
+    return process, port
+
+class SimulatedSession:
+    """One browser tab: a websocket to the app and the sidebar radio it navigates with"""
+
+    def __init__(self, port: int, timeout: float):
+        self.url = f'ws://127.0.0.1:{port}/_stcore/stream'
+        self.timeout = timeout
+        self.socket = None
+        self.radio_id: Optional[str] = None
+        self.pages: Dict[str, str] = {}
+        self.errors = 0
+
+    async def __aenter__(self):
+        self.socket = await connect(self.url, subprotocols=['streamlit'], max_size=None,
+                                    open_timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.socket.close()
+
+    async def rerun(self, page: Optional[str] = None) -> float:
+        """Run the script (on `page` if given) and return the seconds until the server finished it"""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        if page is not None:
+            states = WidgetStates()
+            widget = states.widgets.add()
+            widget.id = self.radio_id
+            widget.string_value = self.pages[page]
+            msg.rerun_script.widget_states.CopyFrom(states)
+        started = time.perf_counter()
+        await self.socket.send(msg.SerializeToString())
+        await asyncio.wait_for(self._until_finished(), self.timeout)
+        return time.perf_counter() - started
+
+    async def _until_finished(self):
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.socket.recv())
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    self.errors += 1
+                elif element_type == 'radio' and self.radio_id is None:
+                    self.radio_id = element.radio.id
+                    self.pages = {option.split(' ', 1)[-1]: option for option in element.radio.options}
+            elif kind == 'script_finished' and forward.script_finished not in RERUN_STATUSES:
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.errors += 1
+                return
+
+async def drive_session(index: int, port: int, pages: List[str], reruns: int, think_time: float,
+                        timeout: float, result: Dict[str, Any]):
+    """Cold start, then `reruns` page switches cycling through pages from a per-session offset"""
+    try:
+        async with SimulatedSession(port, timeout) as session:
+            result['cold'].append(await session.rerun())
+            missing = [page for page in pages if page not in session.pages]
+            if missing:
+                raise RuntimeError(f"Pages not in the sidebar: {', '.join(missing)}")
+            for step in range(reruns):
+                page = pages[(index + step) % len(pages)]
+                result['pages'][page].append(await session.rerun(page))
+                if think_time > 0:
+                    await asyncio.sleep(think_time)
+            result['errors'] += session.errors
+    except Exception as e:
+        result['errors'] += 1
+        result['failures'].append(f"session {index}: {type(e).__name__}: {e}")
+
+async def sample_rss(pid: int, peak: List[int], stop: asyncio.Event):
+    while not stop.is_set():
+        rss = process_usage(pid)[1]
+        if rss is not None:
+            peak[0] = max(peak[0], rss)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.1)
+        except asyncio.TimeoutError:
+            pass
+
+async def run_level(sessions: int, app: subprocess.Popen, port: int, args, baseline_rss: Optional[int]):
+    """Run one concurrency level and summarise it"""
+    result = {'cold': [], 'pages': defaultdict(list), 'errors': 0, 'failures': []}
+    cpu_before, rss_before = process_usage(app.pid)
+    peak = [rss_before or 0]
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(app.pid, peak, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(drive_session(i, port, args.pages, args.reruns, args.think_time, args.timeout, result)
+                           for i in range(sessions)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await sampler
+    cpu_after, _ = process_usage(app.pid)
+
+    latencies = np.array([value for values in result['pages'].values() for value in values]) * 1e3
+    level = {'sessions': sessions, 'reruns': int(latencies.size), 'wall_s': wall,
+             'errors': result['errors'], 'failures': result['failures'][:5],
+             'cold_p50_ms': float(np.percentile(np.array(result['cold']) * 1e3, 50)) if result['cold'] else None,
+             'pages': {page: {'p50_ms': float(np.percentile(np.array(values) * 1e3, 50)),
+                              'p95_ms': float(np.percentile(np.array(values) * 1e3, 95)),
+                              'reruns': len(values)}
+                       for page, values in result['pages'].items()}}
+    for q in (50, 95, 99):
+        level[f'p{q}_ms'] = float(np.percentile(latencies, q)) if latencies.size else None
+    level['reruns_per_s'] = latencies.size / wall if wall > 0 else None
+    if cpu_before is not None and cpu_after is not None:
+        cpu = cpu_after - cpu_before
+        level['cpu_cores'] = cpu / wall
+        level['cpu_ms_per_rerun'] = cpu * 1e3 / max(latencies.size + len(result['cold']), 1)
+    if peak[0]:
+        level['rss_mb'] = peak[0] / 2**20
+        if baseline_rss is not None:
+            level['rss_mb_per_session'] = max(peak[0] - baseline_rss, 0) / 2**20 / sessions
+    return level
+
+def format_value(value: Optional[float], spec: str) -> str:
+    return '-' if value is None else format(value, spec)
+
+async def load_test(args, port: int, app: subprocess.Popen) -> List[Dict[str, Any]]:
+    # One session through every page first, so imports, caches and compiled
+    # code are in place before the idle baseline is taken
+    warmup = {'cold': [], 'pages': defaultdict(list), 'errors': 0, 'failures': []}
+    await drive_session(0, port, args.pages, len(args.pages), 0, args.timeout, warmup)
+    if warmup['failures']:
+        raise RuntimeError(warmup['failures'][0])
+    await asyncio.sleep(1.0)
+    baseline_rss = process_usage(app.pid)[1]
+    if baseline_rss:
+        print(f"🧊 Idle server after warm-up: {baseline_rss / 2**20:.0f} MB RSS")
+
+    print(f"\n{'Sessions':>8}{'Reruns':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Cold ms':>9}{'Rerun/s':>9}"
+          f"{'CPU cores':>10}{'CPU ms/run':>11}{'RSS MB':>8}{'MB/sess':>8}{'Errors':>8}")
+    levels = []
+    for sessions in args.sessions:
+        level = await run_level(sessions, app, port, args, baseline_rss)
+        levels.append(level)
+        print(f"{sessions:>8}{level['reruns']:>8}{format_value(level['p50_ms'], '.0f'):>9}"
+              f"{format_value(level['p95_ms'], '.0f'):>9}{format_value(level['p99_ms'], '.0f'):>9}"
+              f"{format_value(level['cold_p50_ms'], '.0f'):>9}{format_value(level['reruns_per_s'], '.1f'):>9}"
+              f"{format_value(level.get('cpu_cores'), '.2f'):>10}{format_value(level.get('cpu_ms_per_rerun'), '.0f'):>11}"
+              f"{format_value(level.get('rss_mb'), '.0f'):>8}{format_value(level.get('rss_mb_per_session'), '.1f'):>8}"
+              f"{level['errors']:>8}")
+        print('        ' + ' · '.join(f"{page} p50 {stats['p50_ms']:.0f} / p95 {stats['p95_ms']:.0f} ms"
+                                      for page, stats in level['pages'].items()))
+        for failure in level['failures']:
+            print(f"        ⚠️ {failure}")
+        if app.poll() is not None:
+            print(f"❌ Streamlit server exited with code {app.returncode}")
+            break
+        # Let disconnected sessions wind down before the next level
+        await asyncio.sleep(1.0)
+    return levels
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', default='1,2,4,8',
+                        help='Comma-separated concurrency levels, run in order')
+    parser.add_argument('--reruns', type=int, default=9, help='Page switches per session at each level')
+    parser.add_argument('--pages', default=','.join(PAGES), help='Comma-separated pages to cycle through')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Seconds a session waits between reruns (0 = back-to-back)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Seconds before a rerun counts as failed')
+    parser.add_argument('--server-url', help='Use this MCP server instead of starting the stub')
+    parser.add_argument('--scale', default='small', help='Stub dataset preset')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Stub delay added to every call')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Stub extra random delay per call')
+    parser.add_argument('--target', type=float, default=1000.0, help='p95 rerun latency target in ms')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--log', help='Server output goes here (default: a temporary file)')
+    args = parser.parse_args()
+    args.sessions = [int(n) for n in args.sessions.split(',') if n.strip()]
+    args.pages = [page.strip() for page in args.pages.split(',') if page.strip()]
+
+    scratch = tempfile.mkdtemp(prefix='portfolio-load-')
+    log_path = args.log or os.path.join(scratch, 'servers.log')
+    processes = []
+    with open(log_path, 'w') as log:
+        try:
+            server_url = args.server_url
+            if not server_url:
+                stub, server_url = start_stub(args, log)
+                processes.append(stub)
+                print(f"🧪 Stub server ({args.scale}) at {server_url}")
+            app, port = start_app(server_url, scratch, log)
+            processes.append(app)
+            print(f"🚀 Streamlit server pid {app.pid} on port {port} ({os.cpu_count()} CPUs); logs in {log_path}")
+            levels = asyncio.run(load_test(args, port, app))
+        except RuntimeError as e:
+            print(f"❌ {e} (see {log_path})")
+            sys.exit(1)
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpus': os.cpu_count(), 'scale': None if args.server_url else args.scale,
+                       'think_time': args.think_time, 'target_ms': args.target, 'levels': levels}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+    within = [level['sessions'] for level in levels
+              if level['p95_ms'] is not None and level['p95_ms'] <= args.target and not level['errors']]
+    if within:
+        print(f"\n✅ Within the {args.target:g} ms p95 target up to {max(within)} concurrent sessions")
+    else:
+        print(f"\n❌ Over the {args.target:g} ms p95 target at every level tried")
+
+if __name__ == "__main__":
+    main()
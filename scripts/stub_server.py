@@ -0,0 +1,55 @@
+"""
+Run the offline Kite MCP stub server: synthetic account data at scale with latency, error and 429 injection
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.stub_server import StubServer, StubConfig, SCALE_PRESETS, KITE_RATE_LIMITS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--scale', choices=list(SCALE_PRESETS), default='medium', help='Dataset size preset')
+    parser.add_argument('--holdings', type=int, help='Override the preset holdings count')
+    parser.add_argument('--positions', type=int, help='Override the preset positions count')
+    parser.add_argument('--orders', type=int, help="Override the preset size of today's order book")
+    parser.add_argument('--trades', type=int, help='Override the preset trade history length')
+    parser.add_argument('--instruments', type=int, help='Override the preset instrument universe size')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Fixed delay added to every call')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Extra uniform random delay per call')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls failing with 5xx')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of calls answered with 429')
+    parser.add_argument('--kite-limits', action='store_true',
+                        help="Enforce Kite's per-second limits per session (429 when exceeded)")
+    parser.add_argument('--require-login', action='store_true', help='Sessions must log in first')
+    parser.add_argument('--time-scale', type=float, default=1.0, help='Market seconds per wall-clock second')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    overrides = {name: getattr(args, name) for name in ('holdings', 'positions', 'orders', 'trades', 'instruments')
+                 if getattr(args, name) is not None}
+    config = StubConfig.preset(args.scale, seed=args.seed, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                               error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                               rate_limits=dict(KITE_RATE_LIMITS) if args.kite_limits else {},
+                               require_login=args.require_login, time_scale=args.time_scale, **overrides)
+
+    print(f"🏗️ Generating {config.holdings:,} holdings, {config.orders:,} orders, "
+          f"{config.trades:,} trades over {config.instruments:,} instruments...")
+    server = StubServer(config, args.host, args.port, verbose=args.verbose)
+    print(f"🧪 Kite MCP stub listening on {server.url}")
+    print(f"   export MCP_SERVER_URL={server.url}")
+    print(f"   ticks: {server.base_url}/ticks?instruments=NSE:INFY,NSE:TCS&interval=1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping")
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,16 @@
 Multi-page Streamlit application for Portfolio Management
 """
 
+import os
 import streamlit as st
 from pages.portfolio_dashboard import main as portfolio_main
-from pages.order_management import display_order_form, display_orders_table, display_trades_table
-from pages.market_data import display_market_overview, display_stock_chart, display_watchlist, display_sector_performance
+from pages.order_management import (display_order_form, display_basket_orders, display_orders_table,
+                                    display_trades_table, check_order_updates, display_risk_limits)
+from pages.accounts import display_accounts_page
+from pages.diagnostics import display_diagnostics, export_metrics
+from utils.session_store import SessionStore, persistence_enabled
+from utils.metrics import metrics
+from pages.market_data import display_market_overview, display_stock_chart, display_watchlist, display_sector_performance, display_backtest, display_price_alerts, check_price_alerts
 
 # Page configuration
 st.set_page_config(
@@ -21,10 +27,26 @@ def main():
     # Sidebar navigation
     st.sidebar.title("📊 Navigation")
     
-    page = st.sidebar.radio(
-        "Go to",
-        ["🏠 Dashboard", "📋 Orders", "📈 Market Data", "⚙️ Settings"]
-    )
+    pages = ["🏠 Dashboard", "📋 Orders", "📈 Market Data", "👥 Accounts", "⚙️ Settings"]
+    # Diagnostics stays out of the menu unless asked for with ?diagnostics=1
+    if st.query_params.get("diagnostics") == "1":
+        pages.append("🩺 Diagnostics")
+    
+    page = st.sidebar.radio("Go to", pages)
+    
+    with metrics.section(f"page.{page.split(' ', 1)[-1].lower()}"):
+        display_page(page)
+    export_metrics()
+
+def display_page(page: str):
+    """Render the selected page"""
+    
+    # The Orders page syncs (and notifies) on its own
+    if page != "📋 Orders":
+        with metrics.section("checks.order_updates"):
+            check_order_updates()
+    with metrics.section("checks.price_alerts"):
+        check_price_alerts()
     
     if page == "🏠 Dashboard":
         portfolio_main()
@@ -32,15 +54,18 @@ def main():
     elif page == "📋 Orders":
         st.title("📋 Order Management")
         
-        tab1, tab2, tab3 = st.tabs(["Place Order", "Order Book", "Trade History"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Place Order", "Basket Order", "Order Book", "Trade History"])
         
         with tab1:
             display_order_form()
         
         with tab2:
-            display_orders_table()
+            display_basket_orders()
         
         with tab3:
+            display_orders_table()
+        
+        with tab4:
             display_trades_table()
     
     elif page == "📈 Market Data":
@@ -58,6 +83,20 @@ def main():
             display_watchlist()
             st.markdown("---")
             display_sector_performance()
+        
+        st.markdown("---")
+        display_price_alerts()
+        
+        st.markdown("---")
+        display_backtest()
+    
+    elif page == "👥 Accounts":
+        st.title("👥 Multi-Account Portfolio")
+        display_accounts_page()
+    
+    elif page == "🩺 Diagnostics":
+        st.title("🩺 Diagnostics")
+        display_diagnostics()
     
     elif page == "⚙️ Settings":
         st.title("⚙️ Settings")
@@ -81,12 +120,31 @@ def main():
             st.text_input("API Secret", type="password", placeholder="Enter your Kite API secret")
             
             st.markdown("#### Alerts")
-            st.checkbox("Price Alerts")
-            st.checkbox("Order Notifications")
+            st.session_state.notify_alerts = st.checkbox(
+                "Price Alerts", value=st.session_state.get('notify_alerts', True)
+            )
+            st.session_state.notify_orders = st.checkbox(
+                "Order Notifications", value=st.session_state.get('notify_orders', False)
+            )
             st.checkbox("Portfolio Updates")
+            
+            st.markdown("#### 🛡️ Pre-Trade Risk Limits")
+            display_risk_limits()
         
         if st.button("💾 Save Settings"):
             st.success("Settings saved successfully!")
+        
+        st.markdown("#### 🔐 Saved Session")
+        store = st.session_state.get('session_store') or SessionStore(os.getenv('SESSION_STATE_PATH'),
+                                                                      enabled=persistence_enabled())
+        if not persistence_enabled():
+            st.caption("Set `PERSIST_SESSION=1` to keep your session across restarts "
+                       "(single-user local installs only)")
+        elif not store.available:
+            st.caption("Install `cryptography` to keep your session across restarts")
+        elif st.button("🗑️ Forget Saved Session"):
+            store.clear()
+            st.success("✅ Saved session removed")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,132 @@
+"""
+Accounts Module - Consolidated view across many MCP accounts
+"""
+
+import os
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from utils.accounts import (AccountConfig, DEFAULT_ACCOUNTS_PATH, DEFAULT_ACCOUNT_TIMEOUT,
+                            load_accounts, save_accounts, iter_account_results, consolidate_holdings,
+                            aggregate_exposure, account_summary, sample_account_results)
+from utils.sectors import default_sector_map, sector_exposure
+from utils.utils import format_currency_array, format_indian_number, color_signed_columns
+
+STATUS_ICONS = {'OK': '✅', 'TIMEOUT': '⏱️', 'ERROR': '❌'}
+
+def accounts_path() -> str:
+    return os.getenv('ACCOUNTS_PATH', DEFAULT_ACCOUNTS_PATH)
+
+def display_account_registry() -> list:
+    """Edit the registry of MCP endpoints; returns the saved accounts"""
+    accounts = load_accounts(accounts_path())
+    
+    with st.expander("🗂️ Account Registry", expanded=not accounts):
+        st.caption("Tokens are read from the named environment variable and never stored on disk")
+        registry = pd.DataFrame([vars(a) for a in accounts],
+                                columns=['name', 'server_url', 'token_env', 'timeout'])
+        edited = st.data_editor(
+            registry, num_rows="dynamic", use_container_width=True, key="account_registry",
+            column_config={
+                'name': st.column_config.TextColumn("Account", required=True),
+                'server_url': st.column_config.TextColumn("MCP Server URL", required=True),
+                'token_env': st.column_config.TextColumn("Token Env Var"),
+                'timeout': st.column_config.NumberColumn("Timeout (s)", min_value=1.0,
+                                                         default=DEFAULT_ACCOUNT_TIMEOUT)
+            }
+        )
+        if st.button("💾 Save Accounts"):
+            rows = edited.dropna(subset=['name', 'server_url'])
+            names = rows['name'].astype(str).str.strip()
+            if names.duplicated().any():
+                st.error("❌ Account names must be unique")
+            else:
+                accounts = [AccountConfig(name=name, server_url=str(row['server_url']).strip(),
+                                          token_env=(str(row['token_env']).strip() or None)
+                                          if pd.notna(row['token_env']) else None,
+                                          timeout=float(row['timeout']) if pd.notna(row['timeout'])
+                                          else DEFAULT_ACCOUNT_TIMEOUT)
+                            for name, (_, row) in zip(names, rows.iterrows())]
+                save_accounts(accounts, accounts_path())
+                st.success(f"✅ Saved {len(accounts)} accounts")
+    return accounts
+
+def refresh_accounts(accounts: list) -> list:
+    """Fetch every account in parallel, showing each one as it arrives"""
+    results = []
+    progress = st.progress(0.0, text="Fetching accounts...")
+    status = st.empty()
+    lines = []
+    for result in iter_account_results(accounts):
+        results.append(result)
+        state = 'OK' if result.success else ('TIMEOUT' if result.timed_out else 'ERROR')
+        lines.append(f"{STATUS_ICONS[state]} **{result.account}** · {result.elapsed_ms:,.0f} ms"
+                     + (f" · {result.error}" if result.error else ""))
+        status.markdown("  \n".join(lines))
+        progress.progress(len(results) / len(accounts), text=f"{len(results)}/{len(accounts)} accounts")
+    progress.empty()
+    
+    order = {account.name: i for i, account in enumerate(accounts)}
+    return sorted(results, key=lambda r: order.get(r.account, len(order)))
+
+def display_consolidated_view(results: list):
+    """Totals, per-account summary and aggregated exposure"""
+    holdings = consolidate_holdings(results)
+    summary = account_summary(results, holdings)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("💰 Total Value", format_currency_array([summary['Current Value'].sum()], decimals=0)[0])
+    col2.metric("🎯 Total P&L", format_currency_array([summary['P&L'].sum()], decimals=0)[0])
+    col3.metric("💵 Cash", format_currency_array([summary['Cash'].sum()], decimals=0)[0])
+    ok = int((summary['Status'] == 'OK').sum())
+    col4.metric("👥 Accounts", f"{ok}/{len(summary)}")
+    
+    st.markdown("#### 👥 By Account")
+    display_df = summary.assign(
+        Status=summary['Status'].map(lambda s: f"{STATUS_ICONS[s]} {s}"),
+        **{column: format_currency_array(summary[column], decimals=0)
+           for column in ['Current Value', 'Investment', 'P&L', 'Day Change', 'Cash']}
+    )
+    st.dataframe(display_df.style.apply(color_signed_columns, axis=None, source=summary,
+                                        columns=['P&L', 'Day Change']),
+                 use_container_width=True, hide_index=True)
+    
+    if holdings.empty:
+        st.info("No holdings returned")
+        return
+    
+    exposure = aggregate_exposure(holdings)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### 📊 Exposure by Instrument")
+        value_columns = [c for c in exposure.columns if c not in ('Symbol', 'Weight %')]
+        st.dataframe(exposure.assign(
+            **{c: format_indian_number(exposure[c]) for c in value_columns},
+            **{'Weight %': exposure['Weight %'].map('{:.1f}%'.format)}
+        ), use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("#### 🏭 Exposure by Sector")
+        by_sector = sector_exposure(holdings['Current Value'].fillna(0),
+                                    default_sector_map().classify(holdings['Instrument']))
+        fig = px.pie(by_sector, values='Value', names='Sector', hole=0.4)
+        fig.update_traces(textposition='inside', textinfo='percent+label')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    account_mix = holdings.groupby(['Symbol', 'Account'], observed=True)['Current Value'].sum().reset_index()
+    fig = px.bar(account_mix, x='Symbol', y='Current Value', color='Account',
+                 title="Holdings by Account")
+    st.plotly_chart(fig, use_container_width=True)
+
+def display_accounts_page():
+    """Multi-account consolidated portfolio"""
+    accounts = display_account_registry()
+    
+    if not accounts:
+        st.info("ℹ️ No accounts configured. Showing sample accounts; add MCP endpoints in the registry above.")
+        display_consolidated_view(sample_account_results())
+        return
+    
+    if st.button("🔄 Refresh All Accounts", type="primary") or 'account_results' not in st.session_state:
+        st.session_state.account_results = refresh_accounts(accounts)
+    
+    display_consolidated_view(st.session_state.account_results)
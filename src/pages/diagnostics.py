@@ -0,0 +1,84 @@
+"""
+Diagnostics Module - Where page time goes: MCP calls and render sections
+"""
+
+import os
+import streamlit as st
+import plotly.express as px
+from datetime import datetime
+from utils.metrics import metrics
+
+def metrics_path():
+    """Prometheus textfile target, if configured"""
+    return os.getenv('METRICS_PATH')
+
+def export_metrics(min_interval: float = 15.0):
+    """Refresh the Prometheus textfile (at most every `min_interval` seconds)"""
+    path = metrics_path()
+    if path:
+        try:
+            metrics.write_prometheus(path, min_interval=min_interval)
+        except OSError:
+            pass
+
+def display_tool_metrics():
+    """Per-tool call counts, latency and payload sizes"""
+    st.markdown("### 🔌 MCP Tool Calls")
+    tools = metrics.tool_frame()
+    if tools.empty:
+        st.info("No MCP calls recorded yet")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Calls", f"{tools['Calls'].sum():,}")
+    col2.metric("Errors", f"{tools['Errors'].sum():,}")
+    col3.metric("Time in MCP", f"{tools['Total s'].sum():.2f}s")
+
+    st.dataframe(tools.round(2), use_container_width=True, hide_index=True)
+
+    errors = metrics.error_frame()
+    if not errors.empty:
+        st.markdown("#### ❌ Errors by Class")
+        st.dataframe(errors, use_container_width=True, hide_index=True)
+
+def display_render_metrics():
+    """Render time per page section"""
+    st.markdown("### 🖼️ Render Sections")
+    sections = metrics.section_frame()
+    if sections.empty:
+        st.info("No renders recorded yet")
+        return
+
+    st.dataframe(sections.round(2), use_container_width=True, hide_index=True)
+    fig = px.bar(sections.sort_values('Total s'), x='Total s', y='Section', orientation='h',
+                 title="Cumulative Render Time")
+    fig.update_layout(height=max(300, 28 * len(sections)))
+    st.plotly_chart(fig, use_container_width=True)
+
+def display_diagnostics():
+    """Hidden diagnostics page (open the app with ?diagnostics=1)"""
+    started = datetime.fromtimestamp(metrics.started_at)
+    st.caption(f"Process-wide counters since {started.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    display_tool_metrics()
+    st.markdown("---")
+    display_render_metrics()
+
+    st.markdown("---")
+    st.markdown("### 📤 Prometheus Export")
+    text = metrics.to_prometheus()
+    path = metrics_path()
+    if path:
+        st.caption(f"Written to `{path}` for a textfile collector")
+    else:
+        st.caption("Set METRICS_PATH to write this for a Prometheus textfile collector")
+    with st.expander("Exposition text"):
+        st.code(text, language="text")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ Download metrics.prom", text, file_name="metrics.prom", mime="text/plain")
+    with col2:
+        if st.button("♻️ Reset Counters"):
+            metrics.reset()
+            st.rerun()
@@ -8,28 +8,67 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import numpy as np
+import os
+import zlib
+from utils.utils import (format_currency_array, format_indian_number,
+                         format_percentage_array, color_signed_columns, parse_instrument_token)
+from utils.indicators import sma, ema, rsi, macd, bollinger_bands, atr, vwap
+from utils.backtest import (TRADING_DAYS, backtest_strategy, sweep, fetch_close_matrix,
+                            synthetic_close_matrix)
+from utils.order_log import extract_records
+from utils.sectors import SectorAggregator, default_sector_map
+from utils.price_alerts import (AlertEngine, ABOVE, BELOW, PERCENT_MOVE, DEFAULT_ALERTS_PATH,
+                                shared_engine, user_alerts_path)
+from utils.market_overview import (MARKET_REFRESH_SECONDS, MarketSnapshot, get_market_snapshot,
+                                   sample_market_snapshot)
+from utils.historical import HistoricalDataError, iter_historical
+from utils.tick_buffer import TickBuffer, simulate_session, shared_buffer
+from utils.watchlists import (WatchlistStore, DEFAULT_WATCHLISTS_PATH, DEFAULT_WATCHLIST,
+                              DEFAULT_WATCHLIST_NAME, union_instruments, fetch_quotes, user_watchlists_path)
+from utils.pnl_engine import instrument_key
+
+PRICE_OVERLAYS = ["SMA 20", "EMA 20", "Bollinger Bands", "VWAP"]
+OSCILLATORS = ["None", "RSI 14", "MACD", "ATR 14"]
+
+# Label -> Kite interval
+CHART_INTERVALS = {"Day": "day", "60 Min": "60minute", "15 Min": "15minute",
+                   "5 Min": "5minute", "1 Min": "minute"}
+CHART_PERIODS = {"1M": 30, "3M": 91, "6M": 182, "1Y": 365, "3Y": 1095}
+
+# Seconds before a cached live chart is fetched again
+CHART_CACHE_SECONDS = 300
+
+# Previous closes behind the simulated watchlist session
+SAMPLE_WATCHLIST_CLOSES = {'NSE:RELIANCE': 2535.10, 'NSE:TCS': 3295.20, 'NSE:INFY': 1565.25,
+                           'NSE:HDFCBANK': 1704.80, 'NSE:ITC': 433.40, 'NSE:SBIN': 526.70}
+
+def current_snapshot() -> MarketSnapshot:
+    """Shared market snapshot, live when this session is connected"""
+    client = st.session_state.mcp_client if st.session_state.get('authenticated') else None
+    return get_market_snapshot(client)
 
 def display_market_overview():
     """Display market overview with indices"""
     st.markdown("### 📊 Market Overview")
     
-    col1, col2, col3, col4 = st.columns(4)
+    snapshot = current_snapshot()
+    indices = snapshot.indices
+    last = format_indian_number(indices['Last'], decimals=2, na_rep="-")
+    change = format_indian_number(indices['Change'], decimals=2, signed=True, na_rep="-")
+    change_percent = format_percentage_array(indices['Change %'], na_rep="-")
     
-    with col1:
-        st.metric("NIFTY 50", "21,456.80", "+245.60 (+1.16%)")
-    
-    with col2:
-        st.metric("SENSEX", "71,283.50", "+512.30 (+0.72%)")
-    
-    with col3:
-        st.metric("BANK NIFTY", "48,756.25", "+187.45 (+0.39%)")
+    for col, name, value, delta, percent in zip(st.columns(len(indices)), indices['Index'],
+                                                last, change, change_percent):
+        with col:
+            st.metric(name, value, f"{delta} ({percent})")
     
-    with col4:
-        st.metric("NIFTY IT", "32,145.60", "+428.90 (+1.35%)")
+    source = "Live" if snapshot.live else "Sample data"
+    st.caption(f"{source} · updated {snapshot.fetched_at.strftime('%H:%M:%S')} · "
+               f"refreshes every {MARKET_REFRESH_SECONDS}s")
 
-def create_sample_candlestick_data():
+def create_sample_candlestick_data(days: int = 120):
     """Create sample candlestick data"""
-    dates = pd.date_range(start='2024-01-01', end='2024-01-15', freq='D')
+    dates = pd.date_range(end='2024-01-15', periods=days, freq='D')
     np.random.seed(42)
     
     open_price = 2500
@@ -55,6 +94,82 @@ def create_sample_candlestick_data():
     
     return pd.DataFrame(prices)
 
+def add_indicator_traces(fig, df, overlays, oscillator, interval: str = "day"):
+    """Add price overlays (row 1) and an oscillator panel (row 3) computed over the full history"""
+    x = df['Date']
+    close = df['Close'].to_numpy()
+    
+    if "SMA 20" in overlays:
+        fig.add_trace(go.Scatter(x=x, y=sma(close, 20), name='SMA 20',
+                                 line=dict(color='orange', width=1)), row=1, col=1)
+    if "EMA 20" in overlays:
+        fig.add_trace(go.Scatter(x=x, y=ema(close, 20), name='EMA 20',
+                                 line=dict(color='purple', width=1)), row=1, col=1)
+    if "Bollinger Bands" in overlays:
+        upper, middle, lower = bollinger_bands(close, 20, 2.0)
+        fig.add_trace(go.Scatter(x=x, y=upper, name='BB Upper',
+                                 line=dict(color='gray', width=1, dash='dot')), row=1, col=1)
+        fig.add_trace(go.Scatter(x=x, y=lower, name='BB Lower', fill='tonexty',
+                                 fillcolor='rgba(128,128,128,0.1)',
+                                 line=dict(color='gray', width=1, dash='dot')), row=1, col=1)
+    if "VWAP" in overlays:
+        # Intraday VWAP starts over each trading day; on daily bars it runs over the whole range
+        session = df['Date'].dt.date if interval != "day" else None
+        fig.add_trace(go.Scatter(x=x, y=vwap(df['High'], df['Low'], close, df['Volume'], session=session),
+                                 name='VWAP', line=dict(color='teal', width=1)), row=1, col=1)
+    
+    if oscillator == "RSI 14":
+        fig.add_trace(go.Scatter(x=x, y=rsi(close, 14), name='RSI 14',
+                                 line=dict(color='darkblue', width=1)), row=3, col=1)
+        fig.add_hline(y=70, line_dash='dot', line_color='red', row=3, col=1)
+        fig.add_hline(y=30, line_dash='dot', line_color='green', row=3, col=1)
+    elif oscillator == "MACD":
+        line, signal, histogram = macd(close)
+        fig.add_trace(go.Bar(x=x, y=histogram, name='MACD Hist',
+                             marker_color=np.where(histogram >= 0, 'green', 'red')), row=3, col=1)
+        fig.add_trace(go.Scatter(x=x, y=line, name='MACD', line=dict(color='blue', width=1)), row=3, col=1)
+        fig.add_trace(go.Scatter(x=x, y=signal, name='Signal', line=dict(color='orange', width=1)), row=3, col=1)
+    elif oscillator == "ATR 14":
+        fig.add_trace(go.Scatter(x=x, y=atr(df['High'], df['Low'], close, 14), name='ATR 14',
+                                 line=dict(color='brown', width=1)), row=3, col=1)
+
+def load_chart_data(symbol: str, interval: str, days: int):
+    """
+    Candles from the MCP server, fetched window by window with progress;
+    None when not connected or nothing came back
+    """
+    client = st.session_state.get('mcp_client')
+    token = parse_instrument_token(f"NSE:{symbol}")
+    if not st.session_state.get('authenticated') or client is None or token is None:
+        return None
+    
+    cache = st.session_state.setdefault('chart_cache', {})
+    key = (token, interval, days)
+    cached = cache.get(key)
+    if cached is not None and (datetime.now() - cached[0]).total_seconds() < CHART_CACHE_SECONDS:
+        return cached[1]
+    
+    to_date = datetime.now()
+    from_date = to_date - timedelta(days=days)
+    chunks, bars = [], 0
+    progress = st.progress(0.0, text="Loading candles...")
+    try:
+        for chunk in iter_historical(client, token, from_date, to_date, interval):
+            chunks.append(chunk)
+            bars += len(chunk)
+            through = chunk['date'].iloc[-1]
+            progress.progress(min(max((through - from_date) / (to_date - from_date), 0.0), 1.0),
+                              text=f"Loaded {bars:,} candles through {through:%d %b %Y}")
+    except HistoricalDataError as e:
+        st.warning(f"⚠️ Partial history, a window failed: {e}")
+    progress.empty()
+    
+    if not chunks:
+        return None
+    df = pd.concat(chunks, ignore_index=True).rename(columns=str.capitalize)
+    cache[key] = (datetime.now(), df)
+    return df
+
 def display_stock_chart():
     """Display interactive stock chart"""
     st.markdown("### 📈 Stock Chart")
@@ -63,16 +178,35 @@ def display_stock_chart():
     selected_stock = st.selectbox("Select Stock", 
                                  ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ITC"])
     
-    # Create sample data
-    df = create_sample_candlestick_data()
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        overlays = st.multiselect("Overlays", PRICE_OVERLAYS, default=["SMA 20"])
+    with col2:
+        oscillator = st.selectbox("Indicator", OSCILLATORS)
+    
+    df = None
+    interval = "day"
+    if st.session_state.get('authenticated'):
+        col1, col2 = st.columns(2)
+        with col1:
+            interval = CHART_INTERVALS[st.selectbox("Interval", list(CHART_INTERVALS))]
+        with col2:
+            days = CHART_PERIODS[st.selectbox("Period", list(CHART_PERIODS), index=1)]
+        df = load_chart_data(selected_stock, interval, days)
+    
+    if df is None:
+        # Create sample data
+        df = create_sample_candlestick_data()
+        interval = "day"
     
     # Create candlestick chart
+    rows = 3 if oscillator != "None" else 2
     fig = make_subplots(
-        rows=2, cols=1,
+        rows=rows, cols=1,
         shared_xaxes=True,
-        vertical_spacing=0.1,
-        subplot_titles=(f'{selected_stock} Price Chart', 'Volume'),
-        row_width=[0.7, 0.3]
+        vertical_spacing=0.06,
+        subplot_titles=(f'{selected_stock} Price Chart', 'Volume', oscillator)[:rows],
+        row_width=[0.2, 0.2, 0.6] if rows == 3 else [0.7, 0.3]
     )
     
     # Add candlestick
@@ -88,6 +222,8 @@ def display_stock_chart():
         row=1, col=1
     )
     
+    add_indicator_traces(fig, df, overlays, oscillator, interval)
+    
     # Add volume bars
     fig.add_trace(
         go.Bar(
@@ -102,47 +238,219 @@ def display_stock_chart():
     fig.update_layout(
         title=f'{selected_stock} - Price and Volume',
         xaxis_rangeslider_visible=False,
-        height=600
+        height=600 if rows == 2 else 750
     )
     
     st.plotly_chart(fig, use_container_width=True)
 
-def display_watchlist():
-    """Display user watchlist"""
-    st.markdown("### 👀 Watchlist")
+def session_user_id():
+    """Kite user id of the logged-in session, None in demo mode"""
+    profile = st.session_state.get('profile_data')
+    if not st.session_state.get('authenticated') or not isinstance(profile, dict):
+        return None
+    return profile.get('user_id')
+
+def get_watchlist_store() -> WatchlistStore:
+    """The logged-in user's saved watchlists, loaded once per session and again when the user changes"""
+    path = user_watchlists_path(session_user_id(), os.getenv('WATCHLISTS_PATH', DEFAULT_WATCHLISTS_PATH))
+    store = st.session_state.get('watchlist_store')
+    if store is None or store.path != path:
+        store = st.session_state.watchlist_store = WatchlistStore.load(path)
+    return store
+
+def holding_instruments() -> list:
+    """EXCHANGE:SYMBOL for every holding in the session"""
+    return [instrument_key(h) for h in extract_records(st.session_state.get('holdings_data') or [])]
+
+def sample_closes(keys: list) -> dict:
+    """Previous closes for the simulated session: known sample levels, else a stable made-up price"""
+    snapshot = sample_market_snapshot()
+    known = dict(zip(snapshot.keys, snapshot.prev_close))
+    known.update(SAMPLE_WATCHLIST_CLOSES)
+    return {key: known.get(key, 100 + zlib.crc32(key.encode()) % 2900) for key in keys}
+
+def ticks_live() -> bool:
+    """Whether this session's watchlists run on live quotes rather than the simulated session"""
+    return bool(st.session_state.get('authenticated'))
+
+def get_tick_buffer(keys: list) -> TickBuffer:
+    """
+    The process-wide intraday tick buffer (one for live quotes, one for the
+    simulated session), tracking `keys` from now on
+    """
+    live = ticks_live()
+    buffer = shared_buffer('live' if live else 'simulated')
+    with buffer.lock:
+        new_keys = [key for key in keys if key not in buffer]
+        buffer.add(new_keys)
+        if new_keys and not live:
+            closes = sample_closes(new_keys)
+            simulate_session(buffer, closes, seed=buffer.origin + len(buffer))
+            buffer.prev_close.update(closes)
+    return buffer
+
+def refresh_watchlist_prices(buffer: TickBuffer, keys: list):
+    """
+    Append one tick for every instrument in `keys` from a single batched
+    quote pass (a random step when not connected)
+
+    `keys` is the de-duplicated union of all visible lists and holdings, so
+    a symbol shared by several lists is only requested once. The same
+    prices also update the P&L engine.
+    """
+    if ticks_live():
+        quotes = fetch_quotes(st.session_state.mcp_client, keys)
+        if not quotes:
+            return
+        rows = [quotes.get(key) or {} for key in keys]
+        prices = np.array([q.get('last_price', np.nan) for q in rows], dtype=float)
+        volumes = [q.get('volume', np.nan) for q in rows]
+        closes = {}
+        for key, quote in zip(keys, rows):
+            close = (quote.get('ohlc') or {}).get('close')
+            if close:
+                closes[key] = float(close)
+        with buffer.lock:
+            buffer.prev_close.update(closes)
+            buffer.update_many(keys, prices, volumes)
+        
+        engine = st.session_state.get('pnl_engine')
+        if engine is not None:
+            quoted = ~np.isnan(prices)
+            engine.update_many([k for k, q in zip(keys, quoted) if q], prices[quoted])
+    else:
+        rng = np.random.default_rng()
+        with buffer.lock:
+            stats = buffer.frame().set_index('Instrument').loc[keys]
+            prices = np.round(stats['Last'].to_numpy() * np.exp(rng.normal(0, 0.0008, len(keys))), 2)
+            buffer.update_many(keys, prices, stats['Day Volume'].to_numpy() + rng.integers(100, 5000, len(keys)))
+
+def display_watchlist_table(buffer: TickBuffer, keys: list):
+    """One watchlist's rows, read from the shared tick buffer"""
+    if not keys:
+        st.info("This watchlist is empty")
+        return
     
+    stats = buffer.frame().set_index('Instrument').loc[keys]
+    closes = buffer.prev_close
+    prev_close = np.array([closes.get(key, np.nan) for key in keys])
+    ltp = stats['Last'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_percent = (ltp / prev_close - 1) * 100
     watchlist_data = pd.DataFrame({
-        'Symbol': ['RELIANCE', 'TCS', 'INFY', 'HDFCBANK', 'ITC', 'SBIN'],
-        'LTP': [2580.30, 3420.50, 1650.75, 1720.40, 445.80, 545.60],
-        'Change': [45.20, 125.30, 85.50, 15.60, 12.40, 18.90],
-        'Change %': [1.78, 3.80, 5.46, 0.92, 2.86, 3.59],
-        'Volume': [1250000, 850000, 2100000, 1800000, 3200000, 4500000]
+        'Symbol': [key.split(':', 1)[-1] for key in keys],
+        'LTP': ltp,
+        'Change': ltp - prev_close,
+        'Change %': change_percent,
+        'High': stats['High'].to_numpy(),
+        'Low': stats['Low'].to_numpy(),
+        'VWAP': stats['VWAP'].to_numpy(),
+        'Volume': stats['Day Volume'].to_numpy()
     })
     
-    # Color coding for change
-    def color_change(val):
-        return 'color: green' if val > 0 else 'color: red'
-    
-    styled_watchlist = watchlist_data.style.applymap(
-        color_change, subset=['Change', 'Change %']
-    ).format({
-        'LTP': '₹{:.2f}',
-        'Change': '{:+.2f}',
-        'Change %': '{:+.2f}%',
-        'Volume': '{:,}'
-    })
+    # Format whole columns at once, coloring by the underlying numbers
+    display_data = watchlist_data.assign(
+        LTP=format_currency_array(watchlist_data['LTP'], na_rep="-"),
+        Change=format_indian_number(watchlist_data['Change'], decimals=2, signed=True, na_rep="-"),
+        High=format_indian_number(watchlist_data['High'], decimals=2, na_rep="-"),
+        Low=format_indian_number(watchlist_data['Low'], decimals=2, na_rep="-"),
+        VWAP=format_indian_number(watchlist_data['VWAP'], decimals=2, na_rep="-"),
+        Volume=format_indian_number(watchlist_data['Volume'], na_rep="-"),
+        **{'Change %': format_percentage_array(watchlist_data['Change %'], na_rep="-")},
+        Intraday=buffer.sparklines(keys)
+    )
+    styled_watchlist = display_data.style.apply(
+        color_signed_columns, axis=None, source=watchlist_data, columns=['Change', 'Change %']
+    )
     
-    st.dataframe(styled_watchlist, use_container_width=True)
+    st.dataframe(styled_watchlist, use_container_width=True,
+                 column_config={'Intraday': st.column_config.LineChartColumn("Intraday")})
+
+def manage_watchlists(store: WatchlistStore):
+    """Create, edit and delete watchlists; every change is saved immediately"""
+    with st.expander("✏️ Manage Watchlists"):
+        col1, col2 = st.columns(2)
+        with col1:
+            with st.form("create_watchlist", clear_on_submit=True):
+                name = st.text_input("New watchlist")
+                symbols = st.text_area("Symbols", placeholder="RELIANCE, NSE:TCS, BSE:INFY", height=68)
+                if st.form_submit_button("➕ Create"):
+                    try:
+                        store.create(name, symbols.replace('\n', ',').split(','))
+                        store.save()
+                        st.success(f"✅ Created {name}")
+                    except ValueError as e:
+                        st.error(f"❌ {e}")
+        
+        if not store.names():
+            return
+        with col2:
+            target = st.selectbox("Edit watchlist", store.names(), key="watchlist_edit_target")
+            with st.form("edit_watchlist", clear_on_submit=True):
+                to_add = st.text_input("Add symbols", placeholder="HDFCBANK, ITC")
+                to_remove = st.multiselect("Remove symbols", store.get(target))
+                if st.form_submit_button("💾 Update"):
+                    added = store.add(target, to_add.split(',')) if to_add.strip() else []
+                    removed = store.remove(target, to_remove)
+                    store.save()
+                    st.success(f"✅ {len(added)} added, {removed} removed")
+            if st.button(f"🗑️ Delete {target}"):
+                store.delete(target)
+                store.save()
+                st.rerun()
+
+def display_watchlist():
+    """Display the user's watchlists with intraday range, VWAP and sparklines"""
+    st.markdown("### 👀 Watchlist")
+    store = get_watchlist_store()
+    manage_watchlists(store)
+    
+    names = store.names()
+    if not names:
+        st.info("No watchlists yet. Create one above.")
+        return
+    visible = st.multiselect("Show watchlists", names, default=names[:1], key="visible_watchlists")
+    if not visible:
+        return
+    
+    # One de-duplicated quote pass for every visible list plus holdings
+    keys = union_instruments(*(store.get(name) for name in visible), holding_instruments())
+    buffer = get_tick_buffer(keys)
+    refresh_watchlist_prices(buffer, keys)
+    
+    tabs = st.tabs(visible) if len(visible) > 1 else [st.container()]
+    for tab, name in zip(tabs, visible):
+        with tab:
+            display_watchlist_table(buffer, store.get(name))
+    
+    source = "live quotes" if ticks_live() else "simulated session"
+    listed = sum(len(store.get(name)) for name in visible)
+    st.caption(f"{listed:,} rows across {len(visible)} list(s) from {len(keys):,} unique instruments · "
+               f"{source} · {buffer.nbytes / 1024:,.0f} KB shared tick buffer")
+
+def get_sector_aggregator(snapshot: MarketSnapshot) -> SectorAggregator:
+    """Equal-weighted sector indices over the snapshot's priced constituents, built once per session"""
+    # A constituent missing from the quote has NaN prices, which would poison its sector's sums
+    priced = np.isfinite(snapshot.ltp) & np.isfinite(snapshot.prev_close) & (snapshot.prev_close > 0)
+    keys, ltp = list(snapshot.keys[priced]), snapshot.ltp[priced]
+    aggregator = st.session_state.get('sector_aggregator')
+    if (aggregator is None or st.session_state.get('sector_aggregator_live') != snapshot.live
+            or aggregator.keys != keys):
+        aggregator = SectorAggregator.equal_weighted(default_sector_map(), keys, snapshot.prev_close[priced], ltp)
+        st.session_state.sector_aggregator = aggregator
+        st.session_state.sector_aggregator_live = snapshot.live
+    else:
+        # Only constituents whose price moved touch their sector's sums
+        moved = np.flatnonzero(ltp != aggregator.ltp)
+        aggregator.update_many([keys[i] for i in moved], ltp[moved])
+    return aggregator
 
 def display_sector_performance():
     """Display sector performance"""
     st.markdown("### 🏭 Sector Performance")
     
-    sectors_data = pd.DataFrame({
-        'Sector': ['IT', 'Banking', 'Pharma', 'Auto', 'FMCG', 'Metals', 'Energy', 'Realty'],
-        'Change %': [2.45, 1.23, -0.87, 3.12, 0.56, -1.45, 1.89, 4.23],
-        'Top Stock': ['TCS', 'HDFCBANK', 'SUNPHARMA', 'MARUTI', 'ITC', 'TATAPOWER', 'RELIANCE', 'DLF']
-    })
+    aggregator = get_sector_aggregator(current_snapshot())
+    sectors_data = aggregator.frame().sort_values('Change %')
     
     # Create horizontal bar chart
     fig = go.Figure()
@@ -156,7 +464,9 @@ def display_sector_performance():
         marker_color=colors,
         text=sectors_data['Change %'],
         texttemplate='%{text:.2f}%',
-        textposition='outside'
+        textposition='outside',
+        customdata=sectors_data['Top Stock'],
+        hovertemplate='%{y}: %{x:.2f}%<br>Top stock: %{customdata}<extra></extra>'
     ))
     
     fig.update_layout(
@@ -166,3 +476,224 @@ def display_sector_performance():
     )
     
     st.plotly_chart(fig, use_container_width=True)
+
+ALERT_CONDITIONS = {
+    ABOVE: "Price above",
+    BELOW: "Price below",
+    PERCENT_MOVE: "Moves by %"
+}
+
+def get_alert_engine() -> AlertEngine:
+    """
+    The logged-in user's alert engine, shared by all of that user's sessions
+
+    Demo sessions get a throwaway engine of their own that is never saved,
+    so they can't touch any user's alerts file.
+    """
+    user_id = session_user_id()
+    if user_id is None:
+        if 'demo_alert_engine' not in st.session_state:
+            st.session_state.demo_alert_engine = AlertEngine()
+        return st.session_state.demo_alert_engine
+    return shared_engine(user_alerts_path(user_id, os.getenv('ALERTS_PATH', DEFAULT_ALERTS_PATH)))
+
+def save_alerts(engine: AlertEngine):
+    """Persist a user's alerts; a demo session's (with no file) only last as long as the session"""
+    if engine.path is not None:
+        engine.save()
+
+def check_price_alerts():
+    """Match active alerts against the latest prices on any page and toast the ones that fire"""
+    if not st.session_state.get('notify_alerts', True):
+        return
+    engine = get_alert_engine()
+    client = st.session_state.get('mcp_client')
+    # Alerts are only matched against live quotes; sample prices must never fire them
+    if len(engine) == 0 or not st.session_state.get('authenticated') or client is None:
+        return
+    
+    snapshot = current_snapshot()
+    if not snapshot.live:
+        return
+    fired = engine.check_many(snapshot.keys, snapshot.ltp)
+    
+    # Instruments outside the snapshot universe need their own (batched) LTP call
+    covered = set(snapshot.keys)
+    extra = [key for key in engine.instruments() if key not in covered]
+    if extra:
+        response = client.get_ltp(extra)
+        if response.success and isinstance(response.data, dict):
+            quotes = [(key, quote.get('last_price')) for key, quote in response.data.items()
+                      if isinstance(quote, dict) and quote.get('last_price') is not None]
+            fired += engine.check_many([k for k, _ in quotes], [p for _, p in quotes])
+    
+    for alert in fired:
+        st.toast(f"🔔 {alert.describe()}" + (f" · {alert.note}" if alert.note else ""))
+    if fired:
+        save_alerts(engine)
+
+def display_price_alerts():
+    """Create, list and cancel price alerts"""
+    st.markdown("### 🔔 Price Alerts")
+    engine = get_alert_engine()
+    snapshot = current_snapshot()
+    
+    with st.form("add_alert", clear_on_submit=True):
+        col1, col2, col3, col4 = st.columns([2, 2, 1, 2])
+        with col1:
+            symbol = st.text_input("Symbol", placeholder="e.g., NSE:RELIANCE")
+        with col2:
+            condition = st.selectbox("Condition", list(ALERT_CONDITIONS), format_func=ALERT_CONDITIONS.get)
+        with col3:
+            value = st.number_input("Price / %", min_value=0.0, value=0.0, step=0.05)
+        with col4:
+            note = st.text_input("Note", placeholder="Optional")
+        submitted = st.form_submit_button("➕ Add Alert")
+    
+    if submitted:
+        instrument = symbol.strip().upper()
+        if instrument and ':' not in instrument:
+            instrument = f"NSE:{instrument}"
+        reference = None
+        if condition == PERCENT_MOVE:
+            # Percent moves are measured from the current live price
+            matches = np.flatnonzero(snapshot.keys == instrument) if snapshot.live else []
+            reference = float(snapshot.ltp[matches[0]]) if len(matches) else None
+        try:
+            if not instrument:
+                raise ValueError("Symbol is required")
+            alert = engine.add(instrument, condition, value, reference=reference, note=note)
+            save_alerts(engine)
+            st.success(f"✅ Alert added: {alert.describe()}")
+        except ValueError as e:
+            st.error(f"❌ {str(e)}")
+    
+    active = engine.active()
+    if active:
+        by_id = {a.alert_id: a for a in active}
+        st.dataframe(pd.DataFrame([{
+            'ID': a.alert_id,
+            'Alert': a.describe(),
+            'Note': a.note,
+            'Created': a.created_at
+        } for a in active]), use_container_width=True, hide_index=True)
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            to_cancel = st.selectbox("Cancel alert", list(by_id),
+                                     format_func=lambda i: f"#{i} {by_id[i].describe()}")
+        with col2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("🗑️ Cancel", use_container_width=True):
+                engine.remove(to_cancel)
+                save_alerts(engine)
+                st.rerun()
+    else:
+        st.info("No active alerts")
+    
+    triggered = list(engine.triggered)
+    if triggered:
+        with st.expander(f"Triggered ({len(triggered)})"):
+            st.dataframe(pd.DataFrame([{
+                'Alert': a.describe(),
+                'Note': a.note,
+                'Triggered': a.triggered_at
+            } for a in reversed(triggered)]), use_container_width=True, hide_index=True)
+
+STRATEGY_LABELS = {
+    'sma_crossover': "SMA Crossover",
+    'rsi_reversion': "RSI Mean Reversion",
+    'momentum': "Time-Series Momentum"
+}
+
+def load_backtest_prices(symbols, years: int) -> pd.DataFrame:
+    """Daily closes from get_historical_data when connected, synthetic otherwise"""
+    bars = years * TRADING_DAYS
+    if st.session_state.get('authenticated') and st.session_state.get('mcp_client'):
+        to_date = datetime.now()
+        from_date = to_date - timedelta(days=365 * years)
+        prices = fetch_close_matrix(st.session_state.mcp_client, list(symbols),
+                                    from_date.strftime('%Y-%m-%d'), to_date.strftime('%Y-%m-%d'))
+        if not prices.empty:
+            return prices
+        st.info("ℹ️ Historical data unavailable, using simulated prices")
+    return synthetic_close_matrix(list(symbols), bars)
+
+def display_backtest():
+    """Backtest a strategy over holdings or the watchlist, with an optional parameter sweep"""
+    st.markdown("### 🧪 Strategy Backtest")
+    
+    holding_symbols = [key.split(':', 1)[-1] for key in holding_instruments()]
+    store = get_watchlist_store()
+    universe = {name: [key.split(':', 1)[-1] for key in store.get(name)] for name in store.names()
+                if store.get(name)}
+    if holding_symbols:
+        universe["Holdings"] = holding_symbols
+    if not universe:
+        universe = {DEFAULT_WATCHLIST_NAME: [key.split(':', 1)[-1] for key in DEFAULT_WATCHLIST]}
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        universe_name = st.selectbox("Universe", list(universe))
+    with col2:
+        strategy = st.selectbox("Strategy", list(STRATEGY_LABELS), format_func=STRATEGY_LABELS.get)
+    with col3:
+        years = st.slider("Years", 1, 10, 5)
+    with col4:
+        cost_bps = st.number_input("Costs + slippage (bps)", min_value=0.0, value=8.0, step=1.0)
+    
+    if strategy == 'sma_crossover':
+        col1, col2 = st.columns(2)
+        params = {'fast': col1.number_input("Fast SMA", 2, 100, 20),
+                  'slow': col2.number_input("Slow SMA", 5, 300, 50)}
+        grid = {'fast': [5, 10, 20, 30, 50], 'slow': [50, 100, 150, 200]}
+    elif strategy == 'rsi_reversion':
+        col1, col2, col3 = st.columns(3)
+        params = {'period': col1.number_input("RSI Period", 2, 50, 14),
+                  'lower': col2.number_input("Buy below", 5, 50, 30),
+                  'upper': col3.number_input("Sell above", 50, 95, 70)}
+        grid = {'period': [7, 14, 21], 'lower': [20, 25, 30, 35], 'upper': [60, 65, 70, 75]}
+    else:
+        params = {'lookback': st.number_input("Lookback (days)", 5, 500, 120)}
+        grid = {'lookback': [20, 60, 120, 180, 250]}
+    
+    col1, col2 = st.columns(2)
+    run = col1.button("▶️ Run Backtest", use_container_width=True)
+    run_sweep = col2.button("🔁 Parameter Sweep", use_container_width=True)
+    if not (run or run_sweep):
+        return
+    
+    prices = load_backtest_prices(universe[universe_name], years)
+    
+    if run_sweep:
+        # Small grid: in-process is faster than starting worker processes
+        results = sweep(prices, strategy, grid, max_workers=1, cost_bps=cost_bps, slippage_bps=0.0)
+        if results.empty:
+            st.warning("⚠️ No valid parameter combinations")
+            return
+        st.dataframe(results.round(2), use_container_width=True)
+        params = {name: results.loc[0, name].item() for name in grid}
+        st.caption(f"Showing the best combination: {params}")
+    
+    try:
+        result = backtest_strategy(prices, strategy, params, cost_bps=cost_bps, slippage_bps=0.0)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+    summary = result.summary()
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("CAGR", format_percentage_array([summary['cagr']])[0])
+    col2.metric("Sharpe", f"{summary['sharpe']:.2f}")
+    col3.metric("Max Drawdown", format_percentage_array([summary['max_drawdown']])[0])
+    col4.metric("Volatility", f"{summary['volatility']:.2f}%")
+    col5.metric("Turnover / yr", f"{summary['turnover']:.0f}%")
+    
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        subplot_titles=('Equity Curve', 'Drawdown'), row_width=[0.3, 0.7])
+    fig.add_trace(go.Scatter(x=result.dates, y=result.equity, name='Equity',
+                             line=dict(color='blue')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=result.dates, y=result.drawdown * 100, name='Drawdown %',
+                             fill='tozeroy', line=dict(color='red')), row=2, col=1)
+    fig.update_layout(height=500, showlegend=False)
+    st.plotly_chart(fig, use_container_width=True)
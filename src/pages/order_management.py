@@ -5,10 +5,153 @@ Order Management Module - Handle order placement and management
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from typing import Dict, List
 from utils.kite_mcp_client import KiteMCPClient
+from utils.utils import format_currency_array
+from utils.order_log import OrderLog, TradeLog, EntryLog, SyncResult
+from utils.order_events import diff_orders
+from utils.basket_orders import (parse_basket_csv, validate_basket, place_basket,
+                                 basket_results_frame, normalize_leg, BASKET_COLUMNS)
+from utils.risk_checks import RiskContext, RiskLimits, RiskResult, check_order, load_risk_context
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Available margin assumed by the demo risk context
+DEMO_MARGIN = 5_00_000.0
+
+def get_entry_log(state_key: str, factory) -> EntryLog:
+    """Return the session's local order/trade log, creating it on first use"""
+    if state_key not in st.session_state:
+        st.session_state[state_key] = factory()
+    return st.session_state[state_key]
+
+def sync_entry_log(log: EntryLog) -> bool:
+    """Incrementally sync a log when connected; returns True if live data is available"""
+    client = st.session_state.get('mcp_client')
+    if not st.session_state.get('authenticated') or client is None:
+        return False
+    
+    result = log.sync(client)
+    if not result.success:
+        st.error(f"❌ Sync failed: {result.error}")
+    elif isinstance(log, OrderLog):
+        notify_order_events(result)
+    return len(log) > 0
+
+def notify_order_events(result: SyncResult):
+    """Toast fills, partial fills, rejections and cancellations found by a sync"""
+    # The first sync loads the day's history; only later transitions are news
+    if result.initial or not st.session_state.get('notify_orders', False):
+        return
+    
+    for event in diff_orders(result.changes):
+        st.toast(event.describe())
+
+def check_order_updates():
+    """Sync the order log in the background of any page so notifications keep flowing"""
+    client = st.session_state.get('mcp_client')
+    if not st.session_state.get('notify_orders', False):
+        return
+    if not st.session_state.get('authenticated') or client is None:
+        return
+    
+    result = get_entry_log('order_log', OrderLog).sync(client)
+    if result.success:
+        notify_order_events(result)
+
+def select_page(log: EntryLog, key: str) -> tuple[int, int]:
+    """Display paging controls for a log and return (page, page_size)"""
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=log.page_count(page_size),
+                               value=1, key=f"{key}_page")
+    with col3:
+        st.caption(f"{len(log)} entries synced · last update {log.last_timestamp or 'N/A'}")
+    return page, page_size
+
+def orders_to_frame(records: List[Dict]) -> pd.DataFrame:
+    """Convert one page of Kite order records to the order book display frame"""
+    return pd.DataFrame({
+        'Order ID': [r.get('order_id') for r in records],
+        'Symbol': [f"{r.get('exchange', '')}:{r.get('tradingsymbol', '')}" for r in records],
+        'Type': [r.get('transaction_type') for r in records],
+        'Quantity': [r.get('quantity', 0) for r in records],
+        'Price': [r.get('average_price') or r.get('price') or 0 for r in records],
+        'Status': [r.get('status') for r in records],
+        'Time': [r.get('order_timestamp') for r in records]
+    })
+
+def trades_to_frame(records: List[Dict]) -> pd.DataFrame:
+    """Convert one page of Kite trade records to the trade history display frame"""
+    df = pd.DataFrame({
+        'Trade ID': [r.get('trade_id') for r in records],
+        'Symbol': [f"{r.get('exchange', '')}:{r.get('tradingsymbol', '')}" for r in records],
+        'Type': [r.get('transaction_type') for r in records],
+        'Quantity': [r.get('quantity', 0) for r in records],
+        'Price': [r.get('average_price', 0) for r in records],
+        'Date': [r.get('fill_timestamp') for r in records]
+    })
+    df.insert(5, 'Value', df['Quantity'] * df['Price'])
+    return df
+
+def get_risk_limits() -> RiskLimits:
+    """Return the session's pre-trade limits, creating defaults on first use"""
+    if 'risk_limits' not in st.session_state:
+        st.session_state.risk_limits = RiskLimits()
+    return st.session_state.risk_limits
+
+def get_risk_context(symbols: List[str]) -> RiskContext:
+    """
+    Return a risk context covering the symbols, refetched once stale
+
+    In demo mode the sample holdings stand in for positions, with a fixed
+    margin balance.
+    """
+    client = st.session_state.get('mcp_client')
+    if not st.session_state.get('authenticated') or client is None:
+        engine = st.session_state.get('pnl_engine')
+        if engine is None:
+            return RiskContext(margins={'equity': DEMO_MARGIN})
+        return RiskContext(margins={'equity': DEMO_MARGIN},
+                           holdings=dict(zip(engine.keys, map(int, engine.quantity))),
+                           ltp=dict(zip(engine.keys, map(float, engine.ltp))))
+    
+    context = st.session_state.get('risk_context')
+    if context is None or context.is_stale() or not context.covers(symbols):
+        wanted = set(symbols) | (context.symbols if context is not None and not context.is_stale() else set())
+        context = load_risk_context(client, sorted(wanted), holdings=st.session_state.get('holdings_data'),
+                                    positions=st.session_state.get('positions_data'))
+        st.session_state.risk_context = context
+    return context
+
+def display_risk_result(result: RiskResult):
+    """Show why an order was blocked, or its estimated margin when it passed"""
+    if result.passed:
+        st.success(f"✅ Pre-trade checks passed · est. margin {format_currency_array([result.margin], decimals=0)[0]}")
+    else:
+        for reason in result.reasons:
+            st.error(f"❌ {reason}")
+
+def display_risk_limits():
+    """Display editable pre-trade risk limits (0 disables a limit)"""
+    limits = get_risk_limits()
+    limits.price_band_pct = st.number_input(
+        "Max distance from LTP (%)", min_value=0.0, value=limits.price_band_pct or 0.0, step=1.0
+    ) or None
+    limits.max_order_value = st.number_input(
+        "Max order value (₹)", min_value=0.0, value=limits.max_order_value or 0.0, step=50_000.0
+    ) or None
+    limits.max_position_value = st.number_input(
+        "Max position value (₹)", min_value=0.0, value=limits.max_position_value or 0.0, step=50_000.0
+    ) or None
+    limits.margin_buffer_pct = st.number_input(
+        "Margin buffer (%)", min_value=0.0, value=limits.margin_buffer_pct, step=1.0
+    )
 
 def display_order_form():
-    """Display order placement form"""
+    """Display order placement form; a checked order is placed only once confirmed"""
     st.markdown("### 📝 Place Order")
     
     with st.form("order_form"):
@@ -18,7 +161,10 @@ def display_order_form():
             symbol = st.text_input("Symbol", placeholder="e.g., NSE:INFY")
             transaction_type = st.selectbox("Transaction Type", ["BUY", "SELL"])
             quantity = st.number_input("Quantity", min_value=1, value=1)
-            price = st.number_input("Price", min_value=0.0, value=0.0, step=0.05)
+            price = st.number_input("Price", min_value=0.0, value=0.0, step=0.05,
+                                    help="Ignored for MARKET and SL-M orders")
+            trigger_price = st.number_input("Trigger Price", min_value=0.0, value=0.0, step=0.05,
+                                            help="Required for SL and SL-M orders")
         
         with col2:
             exchange = st.selectbox("Exchange", ["NSE", "BSE", "MCX", "NFO", "BFO"])
@@ -26,26 +172,132 @@ def display_order_form():
             product = st.selectbox("Product", ["CNC", "MIS", "NRML"])
             variety = st.selectbox("Variety", ["regular", "co", "amo"])
         
-        submitted = st.form_submit_button("🚀 Place Order", type="primary")
+        submitted = st.form_submit_button("🔍 Review Order", type="primary")
         
         if submitted:
+            order = normalize_leg({'symbol': symbol, 'exchange': exchange, 'transaction_type': transaction_type,
+                                   'quantity': quantity, 'order_type': order_type, 'product': product,
+                                   'price': price, 'trigger_price': trigger_price, 'variety': variety})
+            # Checked locally first: a blocked order never reaches place_order
+            result = check_order(order, get_risk_context([order['symbol']]), get_risk_limits())
+            display_risk_result(result)
+            st.session_state.pending_order = order if result.passed else None
+    
+    pending = st.session_state.get('pending_order')
+    if pending:
+        display_order_confirmation(pending)
+
+def describe_order(order: Dict) -> str:
+    """One-line summary of a normalized order"""
+    text = f"{order['transaction_type']} {order['quantity']} {order['symbol']} {order['order_type']}"
+    if order['price']:
+        text += f" @ ₹{order['price']:g}"
+    if order['trigger_price']:
+        text += f", trigger ₹{order['trigger_price']:g}"
+    return f"{text} ({order['product']}, {order['variety']})"
+
+def display_order_confirmation(order: Dict):
+    """Place the reviewed order only after an explicit confirmation"""
+    client = st.session_state.get('mcp_client')
+    if not st.session_state.get('authenticated') or client is None:
+        st.warning("⚠️ Order placement requires authentication. This is a demo.")
+        st.info(f"Demo Order: {describe_order(order)}")
+        st.session_state.pending_order = None
+        return
+    
+    st.warning(f"⚠️ Confirm order: {describe_order(order)}")
+    col1, col2 = st.columns(2)
+    with col1:
+        confirmed = st.button("✅ Confirm & Place", type="primary", key="confirm_order")
+    with col2:
+        if st.button("✖️ Cancel", key="cancel_order"):
+            st.session_state.pending_order = None
+            st.rerun()
+    if not confirmed:
+        return
+    
+    st.session_state.pending_order = None
+    exchange, tradingsymbol = order['symbol'].split(':', 1)
+    response = client.place_order(variety=order['variety'], exchange=exchange,
+                                  tradingsymbol=tradingsymbol,
+                                  transaction_type=order['transaction_type'],
+                                  quantity=order['quantity'], product=order['product'],
+                                  order_type=order['order_type'], price=order['price'],
+                                  trigger_price=order['trigger_price'])
+    if response.success:
+        # Margins and positions have moved; fetch them again for the next order
+        st.session_state.risk_context = None
+        st.success("✅ Order placed")
+    else:
+        st.error(f"❌ Order failed: {response.error}")
+
+def display_basket_orders():
+    """Display basket order upload, validation and concurrent submission"""
+    st.markdown("### 🧺 Basket Order")
+    st.caption(f"Upload a CSV with columns: {', '.join(BASKET_COLUMNS)}. "
+               "Symbols may be given as EXCHANGE:SYMBOL.")
+    
+    uploaded = st.file_uploader("Basket CSV", type=["csv"], key="basket_csv")
+    if uploaded is not None:
+        try:
+            legs = parse_basket_csv(uploaded.getvalue())
+        except Exception as e:
+            st.error(f"❌ Could not read basket: {str(e)}")
+            return
+    elif st.session_state.get('basket_legs'):
+        legs = st.session_state.basket_legs
+        st.info("Showing the trade list sent from the rebalancer.")
+    else:
+        return
+    
+    preview = pd.DataFrame(legs)
+    context = get_risk_context([leg['symbol'] for leg in legs if leg.get('symbol')])
+    errors = validate_basket(legs, context, get_risk_limits())
+    preview['Check'] = 'OK'
+    for index, message in errors:
+        preview.loc[index, 'Check'] = message
+    st.dataframe(preview, use_container_width=True)
+    
+    if errors:
+        st.error(f"❌ {len(errors)} of {len(legs)} legs are invalid. Fix them before submitting.")
+        return
+    
+    if st.button(f"🚀 Place {len(legs)} Orders", type="primary", key="place_basket"):
+        client = st.session_state.get('mcp_client')
+        if not st.session_state.get('authenticated') or client is None:
             st.warning("⚠️ Order placement requires authentication. This is a demo.")
-            st.info(f"Demo Order: {transaction_type} {quantity} shares of {symbol} at ₹{price}")
+            return
+        
+        with st.spinner(f"Submitting {len(legs)} orders..."):
+            results = place_basket(client, legs, context=context, limits=get_risk_limits())
+        st.session_state.risk_context = None
+        
+        placed = sum(r.success for r in results)
+        if placed == len(results):
+            st.success(f"✅ All {placed} orders placed")
+        else:
+            st.error(f"❌ {len(results) - placed} of {len(results)} orders failed")
+        st.dataframe(basket_results_frame(results), use_container_width=True)
 
 def display_orders_table():
     """Display orders table"""
     st.markdown("### 📋 Order Book")
     
-    # Sample orders data
-    orders_data = pd.DataFrame({
-        'Order ID': ['240115000123456', '240115000123457', '240115000123458'],
-        'Symbol': ['NSE:RELIANCE', 'NSE:TCS', 'NSE:INFY'],
-        'Type': ['BUY', 'SELL', 'BUY'],
-        'Quantity': [50, 25, 30],
-        'Price': [2580.30, 3420.50, 1650.75],
-        'Status': ['COMPLETE', 'PENDING', 'REJECTED'],
-        'Time': ['10:15:23', '11:30:45', '14:22:18']
-    })
+    log = get_entry_log('order_log', OrderLog)
+    if sync_entry_log(log):
+        page, page_size = select_page(log, 'orders')
+        orders_data = orders_to_frame(log.page(page, page_size))
+    else:
+        # Sample orders data
+        orders_data = pd.DataFrame({
+            'Order ID': ['240115000123456', '240115000123457', '240115000123458'],
+            'Symbol': ['NSE:RELIANCE', 'NSE:TCS', 'NSE:INFY'],
+            'Type': ['BUY', 'SELL', 'BUY'],
+            'Quantity': [50, 25, 30],
+            'Price': [2580.30, 3420.50, 1650.75],
+            'Status': ['COMPLETE', 'PENDING', 'REJECTED'],
+            'Time': ['10:15:23', '11:30:45', '14:22:18']
+        })
     
     # Style the status column
     def color_status(val):
@@ -57,9 +309,8 @@ def display_orders_table():
             return 'color: red'
         return ''
     
-    styled_orders = orders_data.style.applymap(color_status, subset=['Status']).format({
-        'Price': '₹{:.2f}'
-    })
+    orders_data['Price'] = format_currency_array(orders_data['Price'])
+    styled_orders = orders_data.style.applymap(color_status, subset=['Status'])
     
     st.dataframe(styled_orders, use_container_width=True)
 
@@ -67,20 +318,23 @@ def display_trades_table():
     """Display trades table"""
     st.markdown("### 💼 Trade History")
     
-    # Sample trades data
-    trades_data = pd.DataFrame({
-        'Trade ID': ['T240115001', 'T240115002', 'T240115003', 'T240115004'],
-        'Symbol': ['NSE:RELIANCE', 'NSE:TCS', 'NSE:INFY', 'NSE:SBIN'],
-        'Type': ['BUY', 'SELL', 'BUY', 'SELL'],
-        'Quantity': [50, 25, 30, 75],
-        'Price': [2580.30, 3420.50, 1650.75, 545.60],
-        'Value': [129015, 85512, 49522, 40920],
-        'Date': ['2024-01-15', '2024-01-15', '2024-01-14', '2024-01-14']
-    })
+    log = get_entry_log('trade_log', TradeLog)
+    if sync_entry_log(log):
+        page, page_size = select_page(log, 'trades')
+        trades_data = trades_to_frame(log.page(page, page_size))
+    else:
+        # Sample trades data
+        trades_data = pd.DataFrame({
+            'Trade ID': ['T240115001', 'T240115002', 'T240115003', 'T240115004'],
+            'Symbol': ['NSE:RELIANCE', 'NSE:TCS', 'NSE:INFY', 'NSE:SBIN'],
+            'Type': ['BUY', 'SELL', 'BUY', 'SELL'],
+            'Quantity': [50, 25, 30, 75],
+            'Price': [2580.30, 3420.50, 1650.75, 545.60],
+            'Value': [129015, 85512, 49522, 40920],
+            'Date': ['2024-01-15', '2024-01-15', '2024-01-14', '2024-01-14']
+        })
     
-    styled_trades = trades_data.style.format({
-        'Price': '₹{:.2f}',
-        'Value': '₹{:,.0f}'
-    })
+    trades_data['Price'] = format_currency_array(trades_data['Price'])
+    trades_data['Value'] = format_currency_array(trades_data['Value'], decimals=0)
     
-    st.dataframe(styled_trades, use_container_width=True)
+    st.dataframe(trades_data, use_container_width=True)
@@ -10,14 +10,46 @@ from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import time
 from dotenv import load_dotenv
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 
 # Load environment variables
 load_dotenv()
 
 # Import our MCP client
 from utils.kite_mcp_client import KiteMCPClient, MCPResponse
+from utils.utils import (format_currency_array, format_percentage_array, format_indian_number,
+                         color_signed_columns)
+from utils.rebalance import rebalance, round_percentages
+from utils.pnl_engine import PnLEngine
+from utils.order_log import extract_records, TradeLog
+from utils.backtest import fetch_close_matrix, synthetic_close_matrix
+from utils.sectors import default_sector_map, sector_exposure
+from utils.market_overview import get_market_snapshot
+from utils.performance import (PerformanceReport, replay_trades, synthetic_trades, trades_frame,
+                               performance_cache)
+from utils.session_store import (SessionStore, SessionSnapshot, SessionUnreachable, revalidate_session,
+                                 persistence_enabled)
+from utils.metrics import metrics
+from utils.optimizer import (OptimizationResult, background_optimization, cached_optimization, optimization_key,
+                             optimizer_cache, DEFAULT_LOOKBACK, TRADING_DAYS)
+from utils.options import (contracts_frame, analyze_legs, portfolio_greeks, payoff_curve,
+                           sample_option_positions)
+
+# Revalidates restored sessions off the script thread; shared by all sessions
+_revalidator = ThreadPoolExecutor(max_workers=2, thread_name_prefix="revalidate")
+
+# Seconds before a restored session the server couldn't be reached for is revalidated again
+REVALIDATE_RETRY_SECONDS = 15
+
+# Builds slow, rate-limited results (optimizer, performance report) off the script thread
+_background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="dashboard")
+
+# Seconds between checks on a background job the page is waiting for
+POLL_SECONDS = 1
 
 # Page configuration
 st.set_page_config(
@@ -65,7 +97,7 @@ def initialize_session_state():
     """Initialize session state variables"""
     if 'mcp_client' not in st.session_state:
         server_url = os.getenv('MCP_SERVER_URL', 'http://localhost:8080/mcp')
-        st.session_state.mcp_client = KiteMCPClient(server_url)
+        st.session_state.mcp_client = KiteMCPClient(server_url, record_path=os.getenv('MCP_RECORD_PATH'))
     
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
@@ -78,6 +110,57 @@ def initialize_session_state():
     
     if 'positions_data' not in st.session_state:
         st.session_state.positions_data = None
+    
+    if 'session_store' not in st.session_state:
+        st.session_state.session_store = SessionStore(os.getenv('SESSION_STATE_PATH'),
+                                                      enabled=persistence_enabled())
+        restore_session()
+
+def restore_session():
+    """Paint from the last saved session while a background fetch revalidates it"""
+    client = st.session_state.mcp_client
+    snapshot = st.session_state.session_store.load(client.server_url)
+    if snapshot is None:
+        return
+    
+    client.session_id = snapshot.session_id
+    st.session_state.authenticated = True
+    st.session_state.profile_data = snapshot.profile
+    st.session_state.holdings_data = snapshot.holdings
+    st.session_state.positions_data = snapshot.positions
+    st.session_state.restored_at = snapshot.saved_at
+    st.session_state.revalidation = _revalidator.submit(revalidate_session, client)
+
+def apply_revalidation(snapshot) -> bool:
+    """Swap in revalidated data; an invalid session is forgotten"""
+    if snapshot is None:
+        st.session_state.session_store.clear()
+        st.session_state.profile_data = None
+        st.session_state.holdings_data = None
+        st.session_state.positions_data = None
+        return False
+    
+    st.session_state.profile_data = snapshot.profile
+    if snapshot.holdings is not None:
+        st.session_state.holdings_data = snapshot.holdings
+    if snapshot.positions is not None:
+        st.session_state.positions_data = snapshot.positions
+    persist_session()
+    return True
+
+def persist_session():
+    """Save the session and latest portfolio, only when they have changed"""
+    client = st.session_state.mcp_client
+    state = (client.session_id, st.session_state.profile_data,
+             st.session_state.holdings_data, st.session_state.positions_data)
+    saved = st.session_state.get('persisted_state')
+    if saved is not None and all(a is b for a, b in zip(state, saved)):
+        return
+    st.session_state.session_store.save(SessionSnapshot(
+        server_url=client.server_url, session_id=client.session_id,
+        profile=state[1], holdings=state[2], positions=state[3]
+    ))
+    st.session_state.persisted_state = state
 
 def display_connection_status():
     """Display MCP server connection status"""
@@ -85,9 +168,35 @@ def display_connection_status():
     st.sidebar.markdown("### 🔗 Connection Status")
     
     try:
-        # Try to make a simple request to check connection
-        response = st.session_state.mcp_client.get_profile()
-        if response.success:
+        reconnect_at = st.session_state.get('reconnect_at')
+        if reconnect_at is not None and time.time() >= reconnect_at:
+            del st.session_state.reconnect_at
+            st.session_state.revalidation = _revalidator.submit(revalidate_session, st.session_state.mcp_client)
+        
+        revalidation = st.session_state.get('revalidation')
+        if revalidation is not None and revalidation.done() and isinstance(revalidation.exception(),
+                                                                           SessionUnreachable):
+            # The saved session may well still be valid; keep painting it and ask again later
+            del st.session_state.revalidation
+            st.session_state.reconnect_at = time.time() + REVALIDATE_RETRY_SECONDS
+            revalidation = None
+        
+        unreachable = 'reconnect_at' in st.session_state
+        if unreachable or (revalidation is not None and not revalidation.done()):
+            saved_at = datetime.fromtimestamp(st.session_state.restored_at)
+            st.sidebar.markdown('<span class="status-connected">🕒 Restored Session</span>', unsafe_allow_html=True)
+            st.sidebar.caption(("Server unreachable. " if unreachable else "") +
+                               f"Showing data saved at {saved_at.strftime('%H:%M')}, reconnecting...")
+            return True
+        
+        if revalidation is not None:
+            del st.session_state.revalidation
+            is_valid = apply_revalidation(revalidation.result())
+        else:
+            # Try to make a simple request to check connection
+            is_valid = st.session_state.mcp_client.get_profile().success
+        
+        if is_valid:
             st.sidebar.markdown('<span class="status-connected">✅ Connected & Authenticated</span>', unsafe_allow_html=True)
             st.session_state.authenticated = True
             return True
@@ -164,31 +273,38 @@ def load_portfolio_data():
             if response.success:
                 st.session_state.positions_data = response.data
 
-def display_portfolio_summary():
+def display_portfolio_summary(engine: PnLEngine):
     """Display portfolio summary metrics"""
     st.markdown("### 📊 Portfolio Summary")
     
-    # Sample data for demonstration
+    totals = engine.totals()
+    value, day_change, total_pnl = format_currency_array(
+        [totals['total_value'], totals['day_change'], totals['total_pnl']], decimals=0
+    )
+    day_percent, pnl_percent = format_percentage_array(
+        [totals['day_change_percent'], totals['total_pnl_percent']], decimals=1
+    )
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("💰 Total Value", "₹5,45,250", "12.5%")
+        st.metric("💰 Total Value", value, pnl_percent)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("📈 Day's P&L", "₹8,750", "1.6%")
+        st.metric("📈 Day's P&L", day_change, day_percent)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col3:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("🎯 Total P&L", "₹45,250", "9.1%")
+        st.metric("🎯 Total P&L", total_pnl, pnl_percent)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col4:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("📊 Holdings", "12", "2")
+        st.metric("📊 Holdings", len(engine))
         st.markdown('</div>', unsafe_allow_html=True)
 
 def create_sample_holdings_data():
@@ -198,43 +314,180 @@ def create_sample_holdings_data():
         'Quantity': [50, 25, 30, 40, 100, 75, 60, 35],
         'Avg Price': [2450.50, 3250.75, 1520.25, 1680.90, 425.60, 520.30, 845.20, 1750.80],
         'LTP': [2580.30, 3420.50, 1650.75, 1720.40, 445.80, 545.60, 880.90, 1820.30],
-        'P&L': [6490, 4244, 3915, 1580, 2020, 1898, 2142, 2431],
-        'P&L %': [5.3, 13.1, 8.6, 2.4, 4.7, 4.9, 4.2, 4.0]
+        'Prev Close': [2545.10, 3295.20, 1565.25, 1704.80, 433.40, 526.70, 871.35, 1798.10]
     })
 
-def display_holdings_table():
+def get_pnl_engine() -> PnLEngine:
+    """Return the session's P&L engine, rebuilt only when the holdings snapshot changes"""
+    holdings = st.session_state.get('holdings_data')
+    engine = st.session_state.get('pnl_engine')
+    if engine is not None and st.session_state.get('pnl_engine_source') is holdings:
+        return engine
+    
+    records = extract_records(holdings) if holdings else []
+    if records:
+        engine = PnLEngine.from_holdings(records)
+    else:
+        df = create_sample_holdings_data()
+        engine = PnLEngine('NSE:' + df['Symbol'], df['Quantity'], df['Avg Price'],
+                           df['Prev Close'], df['LTP'])
+    
+    st.session_state.pnl_engine = engine
+    st.session_state.pnl_engine_source = holdings
+    return engine
+
+def refresh_live_prices(engine: PnLEngine):
+    """Apply the latest LTPs to the P&L engine (only changed rows are touched)"""
+    if not st.session_state.get('authenticated') or len(engine) == 0:
+        return
+    
+    response = st.session_state.mcp_client.get_ltp(engine.keys)
+    if response.success and isinstance(response.data, dict):
+        quotes = [(key, quote.get('last_price')) for key, quote in response.data.items()
+                  if isinstance(quote, dict) and quote.get('last_price') is not None]
+        if quotes:
+            keys, prices = zip(*quotes)
+            engine.update_many(keys, prices)
+
+def display_holdings_table(engine: PnLEngine):
     """Display holdings in a table format"""
     st.markdown("### 🏠 Holdings")
     
-    # Use sample data for demonstration
-    df = create_sample_holdings_data()
-    
-    # Calculate current value
-    df['Current Value'] = df['Quantity'] * df['LTP']
-    df['Investment'] = df['Quantity'] * df['Avg Price']
+    # Current value, investment and P&L come from the engine in one vectorized pass
+    df = engine.frame()
     
-    # Format the dataframe for display
-    display_df = df[['Symbol', 'Quantity', 'Avg Price', 'LTP', 'Current Value', 'P&L', 'P&L %']].copy()
+    # Format the dataframe for display (whole columns at once, Indian grouping)
+    display_df = df[['Symbol']].copy()
+    display_df['Quantity'] = format_indian_number(df['Quantity'])
+    display_df['Avg Price'] = format_currency_array(df['Avg Price'])
+    display_df['LTP'] = format_currency_array(df['LTP'])
+    display_df['Current Value'] = format_currency_array(df['Current Value'], decimals=0)
+    display_df['P&L'] = format_currency_array(df['P&L'], decimals=0)
+    display_df['P&L %'] = format_percentage_array(df['P&L %'], decimals=1)
     
     # Style the dataframe
-    styled_df = display_df.style.format({
-        'Avg Price': '₹{:.2f}',
-        'LTP': '₹{:.2f}',
-        'Current Value': '₹{:,.0f}',
-        'P&L': '₹{:,.0f}',
-        'P&L %': '{:.1f}%'
-    }).applymap(
-        lambda x: 'color: green' if isinstance(x, (int, float)) and x > 0 
-        else 'color: red' if isinstance(x, (int, float)) and x < 0 
-        else '', subset=['P&L', 'P&L %']
+    styled_df = display_df.style.apply(
+        color_signed_columns, axis=None, source=df, columns=['P&L', 'P&L %']
     )
     
     st.dataframe(styled_df, use_container_width=True)
     
     return df
 
+def holding_tokens() -> Dict[str, int]:
+    """Instrument token per holding symbol, from the Kite holdings records"""
+    return {record['tradingsymbol']: int(record['instrument_token'])
+            for record in extract_records(st.session_state.get('holdings_data'))
+            if record.get('tradingsymbol') and record.get('instrument_token')}
+
+def resolved(value) -> Future:
+    """A future that is already done with `value`"""
+    future = Future()
+    future.set_result(value)
+    return future
+
+def get_optimization(symbols: List[str]) -> Optional[Future]:
+    """
+    Optimizer output for the holdings universe (sample closes in demo mode), cached per universe
+
+    A live run fetches a year of closes per holding, so it only starts once
+    asked for and then runs in the background; the last result stands in
+    while it is refreshed. None until asked for.
+    """
+    client = st.session_state.get('mcp_client')
+    if not st.session_state.get('authenticated') or client is None:
+        return resolved(cached_optimization(symbols, lambda: synthetic_close_matrix(symbols, bars=DEFAULT_LOOKBACK + 1),
+                                            DEFAULT_LOOKBACK, source="demo"))
+    
+    cached = optimizer_cache.peek(optimization_key(symbols, DEFAULT_LOOKBACK, source="live"))
+    if cached is None and not st.session_state.get('optimization_requested'):
+        return None
+    
+    to_date = datetime.now()
+    from_date = to_date - timedelta(days=int(DEFAULT_LOOKBACK * 365 / TRADING_DAYS) + 10)
+    tokens = holding_tokens()
+    future = background_optimization(
+        symbols,
+        lambda: fetch_close_matrix(client, symbols, from_date.strftime('%Y-%m-%d'), to_date.strftime('%Y-%m-%d'),
+                                   tokens=tokens),
+        _background, DEFAULT_LOOKBACK, source="live"
+    )
+    if not future.done():
+        rerun_when(future.done)
+        if cached is not None:
+            return resolved(cached)
+    return future
+
+def request_optimization():
+    """Button callback: start optimizing on this very rerun"""
+    st.session_state.optimization_requested = True
+
+def display_optimized_allocation(df, optimization: Optional[Future]):
+    """Pie of the chosen optimizer portfolio, with a hand-off to the rebalancer"""
+    st.markdown("#### 🎯 Optimized Allocation")
+    if optimization is None:
+        st.caption(f"Fetches a year of daily closes for {len(df)} holding(s) at Kite's historical-data rate limit")
+        st.button("🎯 Compute Optimal Weights", key="compute_optimization", on_click=request_optimization)
+        return
+    if not optimization.done():
+        st.info("⏳ Computing optimal weights in the background...")
+        return
+    if optimization.exception() is not None:
+        st.session_state.pop('optimization_requested', None)
+        st.error(f"❌ {optimization.exception()}")
+        return
+    result = optimization.result()
+    if result is None:
+        st.info("Not enough price history to optimize these holdings")
+        return
+    
+    method = st.radio("Portfolio", list(result.portfolios()), horizontal=True, key="optimizer_method",
+                      label_visibility="collapsed")
+    weights = result.portfolios()[method]
+    shown = weights > 1e-4
+    fig_pie = px.pie(values=weights[shown], names=np.asarray(result.symbols)[shown],
+                     title=f"{method} Weights")
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+    st.plotly_chart(fig_pie, use_container_width=True)
+    
+    stats = result.evaluate(weights)
+    st.caption(f"Expected return {stats['Return']:.1%} · volatility {stats['Volatility']:.1%} · "
+               f"Sharpe {stats['Sharpe']:.2f} · solved in {result.solve_ms:.0f} ms")
+    if st.button("⚖️ Use as Rebalance Targets", key="optimizer_to_rebalance"):
+        # The optimized holdings share out what they are worth today; holdings
+        # left out of the optimization are not in the map and keep their weight
+        values = df.set_index('Symbol')['Current Value']
+        share = values.reindex(result.symbols).fillna(0).sum() / values.sum() * 100 if values.sum() > 0 else 100.0
+        st.session_state.optimizer_targets = dict(zip(result.symbols, round_percentages(weights * share).tolist()))
+        st.session_state.optimizer_targets_version = st.session_state.get('optimizer_targets_version', 0) + 1
+        skipped = len(set(df['Symbol']) - set(result.symbols))
+        st.info("Targets loaded into Rebalance to Target Weights below."
+                + (f" {skipped} holding(s) without price history keep their current weight." if skipped else ""))
+
+def display_efficient_frontier(df, result: Optional[OptimizationResult]):
+    """Frontier curve with the current holdings and reference portfolios marked"""
+    st.markdown("#### 📉 Efficient Frontier")
+    if result is None:
+        return
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=result.frontier['Volatility'] * 100, y=result.frontier['Return'] * 100,
+                             mode='lines', name='Frontier'))
+    current = df.set_index('Symbol')['Current Value'].reindex(result.symbols).fillna(0).to_numpy()
+    portfolios = {'Current': current / current.sum() if current.sum() > 0 else current,
+                  **result.portfolios()}
+    for name, weights in portfolios.items():
+        stats = result.evaluate(weights)
+        fig.add_trace(go.Scatter(x=[stats['Volatility'] * 100], y=[stats['Return'] * 100],
+                                 mode='markers', name=name, marker=dict(size=11)))
+    fig.update_layout(title=f"Annualized, last {DEFAULT_LOOKBACK} trading days",
+                      xaxis_title="Volatility %", yaxis_title="Return %", height=400)
+    st.plotly_chart(fig, use_container_width=True)
+
 def create_portfolio_charts(df):
     """Create portfolio visualization charts"""
+    optimization = get_optimization(list(df['Symbol'])) if len(df) else resolved(None)
+    ready = optimization is not None and optimization.done() and optimization.exception() is None
     col1, col2 = st.columns(2)
     
     with col1:
@@ -249,6 +502,11 @@ def create_portfolio_charts(df):
         st.plotly_chart(fig_pie, use_container_width=True)
     
     with col2:
+        display_optimized_allocation(df, optimization)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
         st.markdown("#### 📊 P&L Analysis")
         fig_bar = px.bar(
             df,
@@ -260,42 +518,304 @@ def create_portfolio_charts(df):
         )
         fig_bar.update_layout(showlegend=False)
         st.plotly_chart(fig_bar, use_container_width=True)
+    
+    with col2:
+        display_efficient_frontier(df, optimization.result() if ready else None)
+
+def display_sector_exposure(engine: PnLEngine):
+    """Display holdings value by sector"""
+    sector_map = default_sector_map()
+    holdings = st.session_state.get('holdings_data')
+    if holdings:
+        sector_map.learn_from_records(extract_records(holdings))
+    
+    exposure = sector_exposure(engine.quantity * engine.ltp, sector_map.classify(engine.keys))
+    fig = px.bar(exposure, x='Weight %', y='Sector', orientation='h',
+                 title="Holdings by Sector", text='Weight %')
+    fig.update_traces(texttemplate='%{text:.1f}%')
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'}, height=300)
+    st.plotly_chart(fig, use_container_width=True)
+
+def session_user_id() -> Optional[str]:
+    """Kite user id of the logged-in session, None in demo mode"""
+    profile = st.session_state.get('profile_data')
+    if not st.session_state.get('authenticated') or not isinstance(profile, dict):
+        return None
+    return profile.get('user_id')
+
+def rerun_when(ready: Callable[[], bool]):
+    """Rerun the page once `ready()` holds, checking every POLL_SECONDS without holding the script thread"""
+    @st.fragment(run_every=POLL_SECONDS)
+    def poll():
+        if ready():
+            st.rerun()
+    poll()
+
+def build_performance_report(client: KiteMCPClient, symbols: List[str], quantities: List[float],
+                             tokens: Dict[str, int]) -> PerformanceReport:
+    """
+    Replay today's trade log against daily closes of the holdings and traded symbols
+
+    Runs on a background thread, so it only talks to the client and never
+    touches Streamlit state.
+    """
+    log = TradeLog()
+    log.sync(client)
+    trades = [log.entries[trade_id] for trade_id in log.ids if log.entries[trade_id].get('tradingsymbol')]
+    
+    today = datetime.now().strftime('%Y-%m-%d')
+    traded = {t['tradingsymbol'] for t in trades}
+    first_day = min((str(t.get('fill_timestamp') or t.get('exchange_timestamp') or '')[:10]
+                     for t in trades), default='') or today
+    closes = fetch_close_matrix(client, sorted(set(symbols) | traded), first_day, today, tokens=tokens)
+    
+    # Whatever the log doesn't explain was already held before its first trade
+    net_traded = trades_frame(trades).groupby('symbol')['quantity'].sum().to_dict()
+    opening = {symbol: max(qty - net_traded.get(symbol, 0), 0) for symbol, qty in zip(symbols, quantities)
+               if symbol in closes.columns}
+    return replay_trades(trades, closes, opening=opening, skip_missing=True)
+
+def get_performance_report(engine: PnLEngine) -> Optional[PerformanceReport]:
+    """
+    The performance report: sample trades in demo mode, else the live report
+
+    Fetching closes is slow and rate limited, so a live report is only built
+    once asked for, in the background, and kept process-wide per (user,
+    holdings, day). Returns None, after showing why, until one is ready.
+    """
+    symbols = [key.split(':', 1)[-1] for key in engine.keys]
+    client = st.session_state.get('mcp_client')
+    
+    if not st.session_state.get('authenticated') or client is None:
+        if 'demo_performance' not in st.session_state:
+            closes = synthetic_close_matrix(symbols, bars=250)
+            st.session_state.demo_performance = replay_trades(synthetic_trades(closes, 120), closes)
+        return st.session_state.demo_performance
+    
+    key = (session_user_id(), tuple(symbols), datetime.now().strftime('%Y-%m-%d'))
+    cached = performance_cache.peek(key)
+    if cached is None and st.session_state.get('performance_requested') != key:
+        st.caption(f"Replays today's trades against daily closes for {len(symbols)} holding(s), "
+                   f"fetched at Kite's historical-data rate limit")
+        if not st.button("📐 Build Report", key="build_performance"):
+            return None
+        st.session_state.performance_requested = key
+    
+    quantities, tokens = engine.quantity.tolist(), holding_tokens()
+    future = performance_cache.get_async(
+        key, lambda: build_performance_report(client, symbols, quantities, tokens), _background)
+    if not future.done():
+        rerun_when(future.done)
+        if cached is None:
+            st.info("⏳ Building the report in the background...")
+        else:
+            st.caption("Refreshing in the background...")
+        return cached
+    if future.exception() is not None:
+        st.session_state.pop('performance_requested', None)
+        st.error(f"❌ {future.exception()}")
+        return cached
+    return future.result()
+
+def display_performance(engine: PnLEngine):
+    """Display NAV, time/money-weighted returns and per-holding attribution"""
+    with st.expander("📐 Performance & Attribution"):
+        try:
+            report = get_performance_report(engine)
+        except ValueError as e:
+            st.error(f"❌ {str(e)}")
+            return
+        if report is None:
+            return
+        if report.nav.empty:
+            st.info("No price history available yet")
+            return
+        if report.skipped:
+            st.caption(f"No price history for {', '.join(report.skipped[:10])}; their trades are left out")
+        
+        summary = report.summary()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("NAV", format_currency_array([summary['nav']], decimals=0)[0])
+        col2.metric("P&L", format_currency_array([summary['total_pnl']], decimals=0)[0])
+        col3.metric("Time-Weighted Return", format_percentage_array([summary['twr']])[0])
+        col4.metric("XIRR", "-" if summary['xirr'] is None else format_percentage_array([summary['xirr']])[0])
+        
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+        fig.add_trace(go.Scatter(x=report.nav.index, y=report.nav, name='NAV'), secondary_y=False)
+        fig.add_trace(go.Scatter(x=report.nav.index, y=report.twr * 100, name='TWR %',
+                                 line=dict(dash='dot')), secondary_y=True)
+        fig.update_layout(title="NAV and Cumulative Time-Weighted Return", height=400)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        holdings = report.holdings
+        display_df = holdings[['Symbol']].assign(
+            Quantity=format_indian_number(holdings['Quantity']),
+            **{
+                'Market Value': format_currency_array(holdings['Market Value'], decimals=0),
+                'Net Invested': format_currency_array(holdings['Net Invested'], decimals=0),
+                'P&L': format_currency_array(holdings['P&L'], decimals=0),
+                'Contribution %': format_percentage_array(holdings['Contribution %'])
+            }
+        )
+        st.dataframe(display_df.style.apply(color_signed_columns, axis=None, source=holdings,
+                                            columns=['P&L', 'Contribution %']),
+                     use_container_width=True)
+        
+        st.markdown("#### 🏭 Sector Attribution")
+        sectors = default_sector_map().classify('NSE:' + holdings['Symbol'])
+        by_sector = report.sector_attribution(dict(zip(holdings['Symbol'], sectors.astype(str))))
+        st.dataframe(by_sector.assign(
+            **{
+                'Market Value': format_currency_array(by_sector['Market Value'], decimals=0),
+                'P&L': format_currency_array(by_sector['P&L'], decimals=0),
+                'Contribution %': format_percentage_array(by_sector['Contribution %'])
+            }
+        ), use_container_width=True)
+
+def load_option_legs():
+    """F&O legs from the loaded positions with underlying spots (sample book in demo mode)"""
+    if not st.session_state.get('authenticated'):
+        sample = sample_option_positions()
+        return contracts_frame(sample), sample['spots']
+    
+    legs = contracts_frame(st.session_state.get('positions_data') or {})
+    spots = {}
+    underlyings = sorted(set(legs['Underlying'].dropna()))
+    if underlyings:
+        response = st.session_state.mcp_client.get_ltp(underlyings)
+        if response.success and isinstance(response.data, dict):
+            spots = {key: quote.get('last_price') for key, quote in response.data.items()
+                     if isinstance(quote, dict) and quote.get('last_price') is not None}
+    return legs, spots
+
+def display_derivatives():
+    """Display per-leg IV and greeks, net greeks per underlying and the payoff curve"""
+    legs, spots = load_option_legs()
+    if legs.empty:
+        return
+    
+    with st.expander("🧮 F&O Positions & Greeks"):
+        analyzed = analyze_legs(legs, spots)
+        missing = sorted(set(analyzed.loc[analyzed['Spot'].isna(), 'Underlying']))
+        if missing:
+            st.warning(f"⚠️ No spot price for {', '.join(missing)}; their greeks are left blank")
+        
+        totals = portfolio_greeks(analyzed)
+        overall = totals.iloc[-1]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Delta Exposure", format_currency_array([overall['Delta ₹']], decimals=0)[0])
+        col2.metric("Theta / Day", format_currency_array([overall['Theta']], decimals=0)[0])
+        col3.metric("Vega / 1%", format_currency_array([overall['Vega']], decimals=0)[0])
+        col4.metric("Legs", int(overall['Legs']))
+        
+        st.dataframe(totals.round({'Delta': 1, 'Gamma': 4, 'Theta': 0, 'Vega': 0, 'Delta ₹': 0}),
+                     use_container_width=True, hide_index=True)
+        
+        display_df = analyzed[['Symbol', 'Kind', 'Strike', 'Quantity']].assign(
+            Expiry=analyzed['Expiry'].dt.strftime('%d %b %Y'),
+            LTP=format_currency_array(analyzed['LTP']),
+            **{'IV %': analyzed['IV %'].round(1)},
+            Delta=analyzed['Delta'].round(1),
+            Gamma=analyzed['Gamma'].round(4),
+            Theta=analyzed['Theta'].round(0),
+            Vega=analyzed['Vega'].round(0)
+        )
+        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        
+        priced = [u for u in totals['Underlying'] if u != 'TOTAL' and u not in missing]
+        if priced:
+            underlying = st.selectbox("Payoff for", priced, key="payoff_underlying")
+            curve = payoff_curve(analyzed, underlying)
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=curve['Spot'], y=curve['Expiry'], name='At Expiry'))
+            fig.add_trace(go.Scatter(x=curve['Spot'], y=curve['Today'], name='Today',
+                                     line=dict(dash='dot')))
+            fig.add_hline(y=0, line_color='gray')
+            fig.add_vline(x=spots[underlying], line_dash='dash', line_color='gray')
+            fig.update_layout(title=f"Payoff - {underlying}", xaxis_title="Underlying",
+                              yaxis_title="P&L (₹)", height=400)
+            st.plotly_chart(fig, use_container_width=True)
+
+def display_rebalancer(df):
+    """Display target-weight rebalancing with a trade list preview"""
+    with st.expander("⚖️ Rebalance to Target Weights"):
+        optimized = st.session_state.get('optimizer_targets')
+        if optimized and len(df):
+            # Holdings the optimizer did not cover stay at their current weight
+            current = df['Current Value'] / df['Current Value'].sum() * 100
+            target = df['Symbol'].map(optimized).fillna(np.floor(current * 100) / 100)
+        else:
+            target = round_percentages(np.full(len(df), 100.0 / len(df))) if len(df) else []
+        targets = pd.DataFrame({'Symbol': df['Symbol'], 'Target %': target})
+        # A new key per optimizer hand-off, so the editor picks up the new targets
+        edited = st.data_editor(targets, disabled=['Symbol'], use_container_width=True,
+                                key=f"rebalance_targets_{st.session_state.get('optimizer_targets_version', 0)}")
+        cash = st.number_input("Available Cash (₹)", min_value=0.0, value=0.0, step=1000.0,
+                               key="rebalance_cash")
+        
+        try:
+            plan = rebalance(df['Symbol'], df['Quantity'], df['LTP'],
+                             edited['Target %'].fillna(0).to_numpy() / 100, cash=cash)
+        except ValueError as e:
+            st.error(f"❌ {str(e)}")
+            return
+        
+        preview = plan.to_frame()
+        preview = preview[preview['Trade'] != 0]
+        if preview.empty:
+            st.success("✅ Holdings already match the targets")
+            return
+        
+        display_df = preview[['Symbol']].copy()
+        display_df['LTP'] = format_currency_array(preview['LTP'])
+        display_df['Trade'] = preview['Trade'].map('{:+d}'.format)
+        display_df['Trade Value'] = format_currency_array(preview['Trade Value'], decimals=0)
+        for column in ['Current %', 'Target %', 'Final %']:
+            display_df[column] = preview[column].map('{:.1f}%'.format)
+        st.dataframe(display_df.style.apply(
+            color_signed_columns, axis=None, source=preview, columns=['Trade', 'Trade Value']
+        ), use_container_width=True)
+        
+        turnover, cash_after = format_currency_array([plan.turnover, plan.cash_after], decimals=0)
+        st.caption(f"Turnover {turnover} · cash after trades {cash_after}")
+        if plan.cash_after < 0:
+            st.warning(f"⚠️ These trades need {format_currency_array([-plan.cash_after], decimals=0)[0]} "
+                       f"more cash than is available; add cash or lower the buy targets")
+        
+        if st.button("📋 Send to Basket Order", key="rebalance_to_basket"):
+            st.session_state.basket_legs = plan.to_legs()
+            st.info("Trade list sent. Review and submit it under Orders → Basket Order.")
+
+def display_movers_table(data: pd.DataFrame):
+    """Render a gainers/losers frame with formatted, colored columns"""
+    display_df = data.assign(
+        LTP=format_currency_array(data['LTP']),
+        **{'Change %': format_percentage_array(data['Change %'], decimals=1)}
+    )
+    styled = display_df.style.apply(
+        color_signed_columns, axis=None, source=data, columns=['Change %']
+    )
+    st.dataframe(styled, use_container_width=True)
 
 def display_market_movers():
     """Display top gainers and losers"""
     st.markdown("### 📈 Market Movers")
     
+    client = st.session_state.mcp_client if st.session_state.get('authenticated') else None
+    snapshot = get_market_snapshot(client)
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### 🟢 Top Gainers")
-        gainers_data = pd.DataFrame({
-            'Symbol': ['ADANIPORTS', 'POWERGRID', 'NTPC', 'COALINDIA'],
-            'LTP': [875.30, 245.60, 285.40, 395.20],
-            'Change %': [8.5, 6.2, 5.8, 4.9]
-        })
-        
-        styled_gainers = gainers_data.style.format({
-            'LTP': '₹{:.2f}',
-            'Change %': '+{:.1f}%'
-        }).applymap(lambda x: 'color: green', subset=['Change %'])
-        
-        st.dataframe(styled_gainers, use_container_width=True)
+        display_movers_table(snapshot.movers(5, gainers=True))
     
     with col2:
         st.markdown("#### 🔴 Top Losers")
-        losers_data = pd.DataFrame({
-            'Symbol': ['BAJFINANCE', 'MARUTI', 'ASIANPAINT', 'NESTLEIND'],
-            'LTP': [6250.80, 9845.60, 3285.40, 2195.20],
-            'Change %': [-3.2, -2.8, -2.1, -1.9]
-        })
-        
-        styled_losers = losers_data.style.format({
-            'LTP': '₹{:.2f}',
-            'Change %': '{:.1f}%'
-        }).applymap(lambda x: 'color: red', subset=['Change %'])
-        
-        st.dataframe(styled_losers, use_container_width=True)
+        display_movers_table(snapshot.movers(5, gainers=False))
+    
+    st.caption(f"NIFTY 50 constituents · {'live' if snapshot.live else 'sample data'} · "
+               f"updated {snapshot.fetched_at.strftime('%H:%M:%S')}")
 
 def display_quick_actions():
     """Display quick action buttons"""
@@ -317,6 +837,25 @@ def display_quick_actions():
     
     st.sidebar.markdown('</div>', unsafe_allow_html=True)
 
+def display_portfolio(engine: PnLEngine):
+    """Render the dashboard sections, timing each one"""
+    with metrics.section("dashboard.summary"):
+        display_portfolio_summary(engine)
+    with metrics.section("dashboard.holdings"):
+        df = display_holdings_table(engine)
+    with metrics.section("dashboard.charts"):
+        create_portfolio_charts(df)
+    with metrics.section("dashboard.sectors"):
+        display_sector_exposure(engine)
+    with metrics.section("dashboard.performance"):
+        display_performance(engine)
+    with metrics.section("dashboard.derivatives"):
+        display_derivatives()
+    with metrics.section("dashboard.rebalancer"):
+        display_rebalancer(df)
+    with metrics.section("dashboard.movers"):
+        display_market_movers()
+
 def main():
     """Main application function"""
     # Initialize session state
@@ -330,7 +869,8 @@ def main():
     st.sidebar.title("🎛️ Control Panel")
     
     # Display connection status
-    is_connected = display_connection_status()
+    with metrics.section("dashboard.connection"):
+        is_connected = display_connection_status()
     
     # Authentication section
     if not is_connected:
@@ -341,15 +881,16 @@ def main():
         # Show demo data
         st.markdown("### 🎯 Demo Portfolio (Sample Data)")
         st.info("This is sample data. Connect to your Kite account to see real portfolio data.")
-        display_portfolio_summary()
-        df = display_holdings_table()
-        create_portfolio_charts(df)
-        display_market_movers()
+        display_portfolio(get_pnl_engine())
         
     else:
         # Load data
-        load_profile_data()
-        load_portfolio_data()
+        with metrics.section("dashboard.load"):
+            load_profile_data()
+            load_portfolio_data()
+        
+        if 'revalidation' not in st.session_state and 'reconnect_at' not in st.session_state:
+            persist_session()
         
         # Display quick actions
         display_quick_actions()
@@ -359,10 +900,11 @@ def main():
             display_profile_info()
             st.markdown("---")
         
-        display_portfolio_summary()
-        df = display_holdings_table()
-        create_portfolio_charts(df)
-        display_market_movers()
+        engine = get_pnl_engine()
+        with metrics.section("dashboard.live_prices"):
+            refresh_live_prices(engine)
+        
+        display_portfolio(engine)
     
     # Footer
     st.markdown("---")
@@ -372,6 +914,14 @@ def main():
         <p><small>⚠️ This is a demo application. Always verify data before making trading decisions.</small></p>
     </div>
     """, unsafe_allow_html=True)
+    
+    # The page above was painted from the saved session; repaint once it is revalidated
+    revalidation = st.session_state.get('revalidation')
+    reconnect_at = st.session_state.get('reconnect_at')
+    if revalidation is not None:
+        rerun_when(revalidation.done)
+    elif reconnect_at is not None:
+        rerun_when(lambda: time.time() >= reconnect_at)
 
 if __name__ == "__main__":
     main()
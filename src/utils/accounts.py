@@ -0,0 +1,247 @@
+"""
+Accounts - Registry of MCP endpoints and parallel, deadline-bounded multi-account fetches
+"""
+
+import os
+import json
+import time
+from typing import Dict, List, Any, Optional, Iterator
+from dataclasses import dataclass, asdict, field
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+from utils.kite_mcp_client import KiteMCPClient
+from utils.order_log import extract_records
+from utils.pnl_engine import instrument_key
+from utils.utils import generate_sample_data
+
+DEFAULT_ACCOUNTS_PATH = os.path.join(os.path.expanduser("~"), ".portfolio_manager", "accounts.json")
+
+DEFAULT_ACCOUNT_TIMEOUT = 10.0
+
+HOLDING_COLUMNS = ['Account', 'Instrument', 'Symbol', 'Quantity', 'Avg Price', 'LTP', 'Prev Close',
+                   'Current Value', 'Investment', 'P&L', 'Day Change']
+
+@dataclass
+class AccountConfig:
+    """One MCP endpoint in the registry; secrets stay in the environment, never on disk"""
+    name: str
+    server_url: str
+    token_env: Optional[str] = None
+    timeout: float = DEFAULT_ACCOUNT_TIMEOUT
+
+    def client(self) -> KiteMCPClient:
+        """MCP client whose request timeout matches this account's deadline"""
+        headers = None
+        token = os.getenv(self.token_env) if self.token_env else None
+        if token:
+            headers = {'Authorization': f"Bearer {token}"}
+        return KiteMCPClient(self.server_url, timeout=self.timeout, headers=headers)
+
+@dataclass
+class AccountResult:
+    """Holdings, positions and margins fetched for one account"""
+    account: str
+    success: bool
+    holdings: List[Dict] = field(default_factory=list)
+    positions: List[Dict] = field(default_factory=list)
+    margins: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+    timed_out: bool = False
+
+def load_accounts(path: Optional[str] = None) -> List[AccountConfig]:
+    """Read the account registry; a missing or unreadable file gives no accounts"""
+    try:
+        with open(path or DEFAULT_ACCOUNTS_PATH) as f:
+            return [AccountConfig(**record) for record in json.load(f)]
+    except (OSError, ValueError, TypeError):
+        return []
+
+def save_accounts(accounts: List[AccountConfig], path: Optional[str] = None):
+    """Write the account registry"""
+    path = path or DEFAULT_ACCOUNTS_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump([asdict(a) for a in accounts], f, indent=1)
+
+def _fetch_account(account: str, client: KiteMCPClient) -> AccountResult:
+    """Holdings, positions and margins for one account, in sequence on one worker"""
+    started = time.perf_counter()
+    errors = []
+
+    holdings = client.get_holdings()
+    if not holdings.success:
+        # Endpoint is down or unauthorised; don't spend the deadline on the rest
+        return AccountResult(account=account, success=False, error=holdings.error,
+                             elapsed_ms=(time.perf_counter() - started) * 1000)
+    positions = client.get_positions()
+    if not positions.success:
+        errors.append(f"positions: {positions.error}")
+    margins = client.get_margins()
+    if not margins.success:
+        errors.append(f"margins: {margins.error}")
+
+    net_positions = positions.data.get('net', []) if isinstance(positions.data, dict) else positions.data
+    return AccountResult(
+        account=account,
+        success=True,
+        holdings=extract_records(holdings.data),
+        positions=extract_records(net_positions) if positions.success else [],
+        margins=margins.data if margins.success and isinstance(margins.data, dict) else {},
+        error="; ".join(errors) or None,
+        elapsed_ms=(time.perf_counter() - started) * 1000
+    )
+
+def iter_account_results(accounts: List[AccountConfig], clients: Optional[Dict[str, Any]] = None,
+                         max_workers: Optional[int] = None) -> Iterator[AccountResult]:
+    """
+    Fetch every account in parallel, yielding each result as soon as it is ready
+
+    Each account has its own deadline (AccountConfig.timeout, measured from
+    the start). An account that misses it is yielded as timed out and
+    abandoned, so one slow endpoint never holds back the others. Its worker
+    thread ends on its own when the client's request timeout expires.
+
+    Args:
+        accounts: Registry entries to fetch
+        clients: Optional pre-built clients by account name (defaults to AccountConfig.client())
+        max_workers: Thread count (defaults to one per account)
+    """
+    if not accounts:
+        return
+    clients = clients or {}
+    pool = ThreadPoolExecutor(max_workers=max_workers or len(accounts))
+    started = time.monotonic()
+    try:
+        futures = {}
+        for account in accounts:
+            client = clients.get(account.name) or account.client()
+            futures[pool.submit(_fetch_account, account.name, client)] = account
+        deadlines = {future: started + account.timeout for future, account in futures.items()}
+
+        pending = set(futures)
+        while pending:
+            next_deadline = min(deadlines[f] for f in pending)
+            done, pending = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                account = futures[future]
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield AccountResult(account=account.name, success=False, error=str(e),
+                                        elapsed_ms=(time.monotonic() - started) * 1000)
+
+            now = time.monotonic()
+            expired = {f for f in pending if deadlines[f] <= now}
+            for future in expired:
+                account = futures[future]
+                yield AccountResult(account=account.name, success=False, timed_out=True,
+                                    error=f"Timed out after {account.timeout:g}s",
+                                    elapsed_ms=account.timeout * 1000)
+            pending -= expired
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def fetch_accounts(accounts: List[AccountConfig], clients: Optional[Dict[str, Any]] = None,
+                   max_workers: Optional[int] = None) -> List[AccountResult]:
+    """All results from iter_account_results, in registry order"""
+    order = {account.name: i for i, account in enumerate(accounts)}
+    return sorted(iter_account_results(accounts, clients, max_workers), key=lambda r: order[r.account])
+
+def _column(records: List[Dict], *names: str) -> np.ndarray:
+    """One numeric field across records, trying alternative names (Kite vs sample data)"""
+    values = []
+    for record in records:
+        value = None
+        for name in names:
+            value = record.get(name)
+            if value is not None:
+                break
+        values.append(value)
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+def consolidate_holdings(results: List[AccountResult], include_positions: bool = True) -> pd.DataFrame:
+    """
+    Merge every account's holdings (and optionally net positions) into one
+    columnar frame with a categorical Account column
+    """
+    accounts, records = [], []
+    for result in results:
+        rows = result.holdings + (result.positions if include_positions else [])
+        records.extend(rows)
+        accounts.extend([result.account] * len(rows))
+    if not records:
+        return pd.DataFrame(columns=HOLDING_COLUMNS)
+
+    quantity = _column(records, 'quantity')
+    avg_price = _column(records, 'average_price', 'avg_price')
+    ltp = _column(records, 'last_price', 'ltp')
+    prev_close = _column(records, 'close_price', 'prev_close')
+    prev_close = np.where(np.isnan(prev_close) | (prev_close == 0), ltp, prev_close)
+    keys = [instrument_key(r) for r in records]
+
+    return pd.DataFrame({
+        'Account': pd.Categorical(accounts, categories=[r.account for r in results]),
+        'Instrument': keys,
+        'Symbol': [key.split(':', 1)[-1] for key in keys],
+        'Quantity': quantity,
+        'Avg Price': avg_price,
+        'LTP': ltp,
+        'Prev Close': prev_close,
+        'Current Value': quantity * ltp,
+        'Investment': quantity * avg_price,
+        'P&L': quantity * (ltp - avg_price),
+        'Day Change': quantity * (ltp - prev_close)
+    })
+
+def aggregate_exposure(holdings: pd.DataFrame) -> pd.DataFrame:
+    """Value per instrument with one column per account, plus total and weight"""
+    if holdings.empty:
+        return pd.DataFrame(columns=['Symbol', 'Total', 'Weight %'])
+    pivot = holdings.pivot_table(index='Symbol', columns='Account', values='Current Value',
+                                 aggfunc='sum', fill_value=0.0, observed=True)
+    pivot.columns = [str(c) for c in pivot.columns]
+    pivot['Total'] = pivot.sum(axis=1)
+    total = pivot['Total'].sum()
+    pivot['Weight %'] = pivot['Total'] / total * 100 if total else 0.0
+    return pivot.sort_values('Total', ascending=False).reset_index()
+
+def account_summary(results: List[AccountResult], holdings: pd.DataFrame) -> pd.DataFrame:
+    """Per-account totals, available cash and fetch status"""
+    totals = (holdings.groupby('Account', observed=False)[['Current Value', 'Investment', 'P&L', 'Day Change']]
+              .sum() if not holdings.empty else pd.DataFrame())
+
+    rows = []
+    for result in results:
+        equity = result.margins.get('equity', {}) if isinstance(result.margins, dict) else {}
+        row = totals.loc[result.account].to_dict() if result.account in totals.index else {}
+        rows.append({
+            'Account': result.account,
+            'Current Value': row.get('Current Value', 0.0),
+            'Investment': row.get('Investment', 0.0),
+            'P&L': row.get('P&L', 0.0),
+            'Day Change': row.get('Day Change', 0.0),
+            'Cash': float((equity.get('available') or {}).get('cash', equity.get('net', 0.0)) or 0.0),
+            'Status': 'OK' if result.success else ('TIMEOUT' if result.timed_out else 'ERROR'),
+            'Latency (ms)': round(result.elapsed_ms, 1),
+            'Error': result.error or ''
+        })
+    return pd.DataFrame(rows)
+
+def sample_account_results() -> List[AccountResult]:
+    """Demo accounts built from the sample holdings, one of them timing out"""
+    base = generate_sample_data()['holdings']
+    results = []
+    for name, scale, cash in [("Family Office", 4, 250000.0), ("Client A", 1, 42000.0), ("Client B", 2, 90500.0)]:
+        holdings = [{**h, 'quantity': h['quantity'] * scale} for h in base]
+        results.append(AccountResult(account=name, success=True, holdings=holdings,
+                                     margins={'equity': {'net': cash, 'available': {'cash': cash}}},
+                                     elapsed_ms=120.0 * scale))
+    results.append(AccountResult(account="Client C", success=False, timed_out=True,
+                                 error=f"Timed out after {DEFAULT_ACCOUNT_TIMEOUT:g}s",
+                                 elapsed_ms=DEFAULT_ACCOUNT_TIMEOUT * 1000))
+    return results
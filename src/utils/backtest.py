@@ -0,0 +1,304 @@
+"""
+Backtest - Vectorized signal -> position -> P&L simulation across many instruments
+"""
+
+import os
+import itertools
+from typing import Dict, List, Any, Optional, Callable, Union
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.indicators import sma, rsi
+from utils.historical import HISTORICAL_RATE_LIMIT, HistoricalDataError, client_limiter, fetch_historical
+from utils.timed_cache import TimedCache
+from utils.order_log import extract_records
+from utils.utils import parse_instrument_token
+
+TRADING_DAYS = 252
+
+# Instrument tokens only change with the daily instrument dump
+TOKEN_CACHE_SECONDS = 6 * 60 * 60
+
+# Tokens found via search_instruments, per EXCHANGE:SYMBOL, shared by every session
+token_cache = TimedCache(TOKEN_CACHE_SECONDS)
+
+PriceMatrix = Union[np.ndarray, pd.DataFrame]
+
+def sma_crossover(close: np.ndarray, fast: int = 20, slow: int = 50) -> np.ndarray:
+    """Long while the fast SMA is above the slow SMA, flat otherwise"""
+    if fast >= slow:
+        raise ValueError("fast must be shorter than slow")
+    with np.errstate(invalid='ignore'):
+        return (sma(close, fast) > sma(close, slow)).astype(float)
+
+def _hold_between(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """1 from each entry bar until the next exit bar, column by column"""
+    events = entries | exits
+    rows = np.arange(len(events)).reshape(-1, *([1] * (events.ndim - 1)))
+    last_event = np.maximum.accumulate(np.where(events, rows, -1), axis=0)
+    held = np.take_along_axis(entries, np.maximum(last_event, 0), axis=0)
+    return (held & (last_event >= 0)).astype(float)
+
+def rsi_reversion(close: np.ndarray, period: int = 14, lower: float = 30, upper: float = 70) -> np.ndarray:
+    """Buy when RSI drops below `lower`, exit once it rises above `upper`"""
+    if lower >= upper:
+        raise ValueError("lower must be below upper")
+    value = rsi(close, period)
+    with np.errstate(invalid='ignore'):
+        return _hold_between(value < lower, value > upper)
+
+def momentum(close: np.ndarray, lookback: int = 120) -> np.ndarray:
+    """Long while the trailing `lookback`-bar return is positive"""
+    signal = np.zeros(close.shape)
+    signal[lookback:] = close[lookback:] > close[:-lookback]
+    return signal
+
+STRATEGIES: Dict[str, Callable[..., np.ndarray]] = {
+    'sma_crossover': sma_crossover,
+    'rsi_reversion': rsi_reversion,
+    'momentum': momentum
+}
+
+@dataclass
+class BacktestResult:
+    """Equity curve and summary statistics of one backtest"""
+    equity: np.ndarray
+    returns: np.ndarray
+    drawdown: np.ndarray
+    turnover: np.ndarray
+    symbol_pnl: np.ndarray
+    symbols: List[str]
+    dates: Optional[pd.Index] = None
+    periods_per_year: int = TRADING_DAYS
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def years(self) -> float:
+        return max(len(self.returns) - 1, 1) / self.periods_per_year
+
+    def summary(self) -> Dict[str, float]:
+        """Total return, CAGR, volatility, Sharpe, max drawdown and turnover"""
+        total_return = self.equity[-1] / self.equity[0] - 1 if len(self.equity) else 0.0
+        std = self.returns[1:].std()
+        mean = self.returns[1:].mean() if len(self.returns) > 1 else 0.0
+        return {
+            'total_return': float(total_return * 100),
+            'cagr': float(((1 + total_return) ** (1 / self.years) - 1) * 100) if total_return > -1 else -100.0,
+            'volatility': float(std * np.sqrt(self.periods_per_year) * 100),
+            'sharpe': float(mean / std * np.sqrt(self.periods_per_year)) if std > 0 else 0.0,
+            'max_drawdown': float(self.drawdown.min() * 100) if len(self.drawdown) else 0.0,
+            'turnover': float(self.turnover.sum() / self.years * 100)
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """Equity, return and drawdown per bar"""
+        return pd.DataFrame({
+            'Equity': self.equity,
+            'Return': self.returns,
+            'Drawdown': self.drawdown,
+            'Turnover': self.turnover
+        }, index=self.dates)
+
+def _as_matrix(close: PriceMatrix):
+    """(values, symbols, dates) from a DataFrame or a (bars, instruments) array"""
+    if isinstance(close, pd.DataFrame):
+        return close.to_numpy(dtype=float), [str(c) for c in close.columns], close.index
+    values = np.asarray(close, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    return values, [str(i) for i in range(values.shape[1])], None
+
+def run_backtest(close: PriceMatrix, positions: np.ndarray, cost_bps: float = 3.0,
+                 slippage_bps: float = 5.0, initial_capital: float = 1_000_000.0,
+                 periods_per_year: int = TRADING_DAYS) -> BacktestResult:
+    """
+    Simulate target positions against close prices, all instruments at once
+
+    Each instrument gets an equal 1/N sleeve of capital. A position decided
+    at bar t's close is traded at that close and earns bar t+1's return, so
+    signals never see the price they are paid on. Sleeves are reset to target
+    every bar, and every change in weight pays cost_bps + slippage_bps.
+    Bars where an instrument has no price (NaN, e.g. before listing) are
+    held flat.
+
+    Args:
+        close: (bars, instruments) close prices, DataFrame or array
+        positions: Same-shape target positions, -1 (short) to 1 (long)
+        cost_bps: Brokerage and taxes per unit of traded value, in basis points
+        slippage_bps: Execution slippage per unit of traded value, in basis points
+        initial_capital: Starting equity
+        periods_per_year: Bars per year for annualising
+
+    Returns:
+        BacktestResult
+    """
+    prices, symbols, dates = _as_matrix(close)
+    positions = np.asarray(positions, dtype=float).reshape(prices.shape)
+    bars, instruments = prices.shape
+
+    tradable = ~np.isnan(prices)
+    weights = np.where(tradable, np.nan_to_num(positions), 0.0) / max(instruments, 1)
+
+    asset_returns = np.zeros(prices.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        asset_returns[1:] = prices[1:] / prices[:-1] - 1
+    asset_returns[~np.isfinite(asset_returns)] = 0.0
+
+    # Weight held over bar t is the one set at the close of bar t-1
+    held = np.zeros(prices.shape)
+    held[1:] = weights[:-1]
+    gross = held * asset_returns
+
+    trades = np.diff(weights, axis=0, prepend=0.0)
+    costs = np.abs(trades) * (cost_bps + slippage_bps) / 10000
+    net = gross - costs
+
+    returns = net.sum(axis=1)
+    equity = initial_capital * np.cumprod(1 + returns)
+    peak = np.maximum.accumulate(equity)
+    drawdown = equity / peak - 1
+
+    # Contribution per instrument in currency, ignoring compounding across sleeves
+    symbol_pnl = (net * np.concatenate(([initial_capital], equity[:-1]))[:, None]).sum(axis=0)
+
+    return BacktestResult(equity=equity, returns=returns, drawdown=drawdown,
+                          turnover=np.abs(trades).sum(axis=1), symbol_pnl=symbol_pnl,
+                          symbols=symbols, dates=dates, periods_per_year=periods_per_year)
+
+def backtest_strategy(close: PriceMatrix, strategy: str, params: Optional[Dict[str, Any]] = None,
+                      **kwargs) -> BacktestResult:
+    """Generate a registered strategy's positions and backtest them"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    params = params or {}
+    prices, _, _ = _as_matrix(close)
+    # Indicators run on forward-filled prices; run_backtest still skips the gaps
+    filled = pd.DataFrame(prices).ffill().to_numpy()
+    result = run_backtest(close, STRATEGIES[strategy](filled, **params), **kwargs)
+    result.params = dict(params)
+    return result
+
+# Price matrix shared by sweep workers, sent once per process rather than once per task
+_worker_close: Optional[PriceMatrix] = None
+
+def _init_worker(close: PriceMatrix):
+    global _worker_close
+    _worker_close = close
+
+def _sweep_one(task) -> Optional[Dict[str, Any]]:
+    strategy, params, kwargs = task
+    try:
+        result = backtest_strategy(_worker_close, strategy, params, **kwargs)
+    except ValueError:
+        return None
+    return {**params, **result.summary()}
+
+def parameter_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Every combination of the listed parameter values"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def sweep(close: PriceMatrix, strategy: str, grid: Dict[str, List[Any]],
+          max_workers: Optional[int] = None, **kwargs) -> pd.DataFrame:
+    """
+    Backtest every parameter combination, fanned out over a process pool
+
+    Combinations the strategy rejects (e.g. fast >= slow) are skipped.
+    max_workers=1 runs in-process, which suits small grids inside the app.
+
+    Returns:
+        One row per combination with its parameters and summary(), best Sharpe first
+    """
+    tasks = [(strategy, params, kwargs) for params in parameter_grid(grid)]
+
+    if max_workers == 1:
+        _init_worker(close)
+        rows = [_sweep_one(task) for task in tasks]
+    else:
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(close,)) as pool:
+            rows = list(pool.map(_sweep_one, tasks, chunksize=chunksize))
+
+    df = pd.DataFrame([row for row in rows if row is not None])
+    if df.empty:
+        return df
+    return df.sort_values('sharpe', ascending=False).reset_index(drop=True)
+
+def close_matrix(histories: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Align per-symbol candles (get_historical_data records or DataFrames with
+    'date' and 'close') into one date x symbol close matrix
+    """
+    columns = {}
+    for symbol, candles in histories.items():
+        df = candles if isinstance(candles, pd.DataFrame) else pd.DataFrame(candles)
+        if df.empty:
+            continue
+        columns[symbol] = pd.Series(df['close'].to_numpy(dtype=float),
+                                    index=pd.to_datetime(df['date']))
+    return pd.DataFrame(columns).sort_index()
+
+def lookup_token(client, symbol: str, exchange: str = "NSE") -> Optional[int]:
+    """Instrument token for a symbol: the bundled ones, else search_instruments (cached)"""
+    key = f"{exchange}:{symbol}"
+    token = parse_instrument_token(key)
+    if token is not None:
+        return token
+
+    def compute():
+        response = client.search_instruments(symbol)
+        if not response.success:
+            return None
+        for record in extract_records(response.data):
+            if (record.get('tradingsymbol') == symbol and record.get('exchange', exchange) == exchange
+                    and record.get('instrument_token')):
+                return int(record['instrument_token'])
+        # Cache "not listed" too, so unknown symbols are not searched on every call
+        return 0
+
+    return token_cache.get(key, compute) or None
+
+def fetch_close_matrix(client, symbols: List[str], from_date: str, to_date: str,
+                       exchange: str = "NSE", tokens: Optional[Dict[str, int]] = None,
+                       max_workers: int = HISTORICAL_RATE_LIMIT) -> pd.DataFrame:
+    """
+    Daily closes for symbols via get_historical_data; symbols without a token or data are left out
+
+    Tokens come from `tokens` (e.g. the instrument_token on holdings records)
+    and are otherwise looked up. Up to max_workers symbols are fetched at
+    once, all paced by the client's shared historical-data limiter.
+    """
+    limiter = client_limiter(client)
+
+    def fetch(symbol: str) -> Optional[pd.DataFrame]:
+        token = (tokens or {}).get(symbol) or lookup_token(client, symbol, exchange)
+        if token is None:
+            return None
+        try:
+            return fetch_historical(client, token, from_date, to_date, limiter=limiter, max_workers=1)
+        except HistoricalDataError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols))),
+                            thread_name_prefix="closes") as pool:
+        histories = dict(zip(symbols, pool.map(fetch, symbols)))
+    return close_matrix({symbol: history for symbol, history in histories.items() if history is not None})
+
+def synthetic_close_matrix(symbols: Union[int, List[str]], bars: int = 5 * TRADING_DAYS,
+                           seed: int = 42, start_price: float = 1000.0) -> pd.DataFrame:
+    """Independent random-walk closes for demo and benchmark runs"""
+    if isinstance(symbols, int):
+        symbols = [f"SYM{i:04d}" for i in range(symbols)]
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.0004, 0.0003, len(symbols))
+    vol = rng.uniform(0.01, 0.025, len(symbols))
+    log_returns = rng.standard_normal((bars, len(symbols))) * vol + drift
+    log_returns[0] = 0.0
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=bars)
+    return pd.DataFrame(start_price * np.exp(np.cumsum(log_returns, axis=0)),
+                        index=dates, columns=symbols)
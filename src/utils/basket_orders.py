@@ -0,0 +1,142 @@
+"""
+Basket Orders - Validate and submit many order legs concurrently within Kite's rate limit
+"""
+
+import io
+import time
+from typing import Dict, List, Any, Optional, Union
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.kite_mcp_client import KiteMCPClient
+from utils.rate_limiter import RateLimiter
+from utils.risk_checks import RiskContext, RiskLimits, check_orders
+
+# Kite Connect allows 10 order placements per second
+ORDER_RATE_LIMIT = 10
+
+BASKET_COLUMNS = ['symbol', 'transaction_type', 'quantity', 'order_type', 'product', 'price', 'trigger_price',
+                  'variety']
+
+@dataclass
+class LegResult:
+    """Outcome of submitting one basket leg"""
+    index: int
+    symbol: str
+    success: bool
+    order_id: Optional[str] = None
+    error: Optional[str] = None
+    latency_ms: float = 0.0
+
+def normalize_leg(leg: Dict[str, Any], default_exchange: str = "NSE") -> Dict[str, Any]:
+    """Fill defaults and coerce types for one leg (symbol as EXCHANGE:SYMBOL or bare)"""
+    leg = {k: v for k, v in leg.items() if not (isinstance(v, float) and pd.isna(v))}
+    symbol = str(leg.get('symbol', '')).strip().upper()
+    if symbol and ':' not in symbol:
+        symbol = f"{str(leg.get('exchange') or default_exchange).upper()}:{symbol}"
+
+    order_type = str(leg.get('order_type') or 'MARKET').strip().upper()
+    return {
+        'symbol': symbol,
+        'transaction_type': str(leg.get('transaction_type', '')).strip().upper(),
+        'quantity': int(leg.get('quantity') or 0),
+        'order_type': order_type,
+        'product': str(leg.get('product') or 'CNC').strip().upper(),
+        # Market and SL-M orders fill at the market; a price sent with them is an error
+        'price': 0.0 if order_type in ('MARKET', 'SL-M') else float(leg.get('price') or 0.0),
+        'trigger_price': float(leg.get('trigger_price') or 0.0),
+        'variety': str(leg.get('variety') or 'regular').strip().lower()
+    }
+
+def parse_basket_csv(source: Union[str, bytes, io.IOBase]) -> List[Dict[str, Any]]:
+    """Read basket legs from CSV text, bytes or a file-like object (e.g. an upload)"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    elif isinstance(source, str):
+        source = io.StringIO(source)
+
+    df = pd.read_csv(source)
+    df.columns = [str(c).strip().lower().replace(' ', '_') for c in df.columns]
+    return [normalize_leg(row) for row in df.to_dict('records')]
+
+def validate_basket(legs: List[Dict[str, Any]], context: Optional[RiskContext] = None,
+                    limits: Optional[RiskLimits] = None) -> List[tuple[int, str]]:
+    """
+    Validate every leg up front; returns (index, reason) for each invalid leg
+
+    Fields are always checked. With a risk context the legs also go through
+    the pre-trade checks in order, each booking its margin and position on
+    a copy of the context so the caller's copy is left as it was.
+    """
+    context = context.copy() if context is not None else RiskContext()
+    results = check_orders(legs, context, limits if limits is not None else RiskLimits(
+        price_band_pct=None, max_order_value=None, max_position_value=None))
+    return [(index, '; '.join(result.reasons)) for index, result in enumerate(results) if not result.passed]
+
+def _submit_leg(client: KiteMCPClient, limiter: RateLimiter, index: int, leg: Dict[str, Any]) -> LegResult:
+    """Place one leg once the rate limiter allows it, timing only the network call"""
+    exchange, tradingsymbol = leg['symbol'].split(':', 1)
+    limiter.acquire()
+
+    started = time.perf_counter()
+    try:
+        response = client.place_order(
+            variety=leg['variety'],
+            exchange=exchange,
+            tradingsymbol=tradingsymbol,
+            transaction_type=leg['transaction_type'],
+            quantity=leg['quantity'],
+            product=leg['product'],
+            order_type=leg['order_type'],
+            price=leg['price'],
+            trigger_price=leg.get('trigger_price', 0.0)
+        )
+    except Exception as e:
+        return LegResult(index=index, symbol=leg['symbol'], success=False, error=str(e),
+                         latency_ms=(time.perf_counter() - started) * 1000)
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    order_id = None
+    if response.success:
+        data = response.data
+        order_id = str(data.get('order_id')) if isinstance(data, dict) else str(data)
+    return LegResult(index=index, symbol=leg['symbol'], success=response.success,
+                     order_id=order_id, error=response.error, latency_ms=latency_ms)
+
+def place_basket(client: KiteMCPClient, legs: List[Dict[str, Any]],
+                 max_workers: int = ORDER_RATE_LIMIT,
+                 rate_limit: float = ORDER_RATE_LIMIT,
+                 context: Optional[RiskContext] = None,
+                 limits: Optional[RiskLimits] = None) -> List[LegResult]:
+    """
+    Validate all legs (and risk-check them when given a context), then submit them concurrently
+
+    Nothing is sent if any leg is invalid. Submissions run on a thread pool
+    and share one rate limiter, so N legs take about N / rate_limit seconds
+    instead of N sequential round trips.
+
+    Returns:
+        One LegResult per leg, in input order
+    """
+    errors = validate_basket(legs, context, limits)
+    if errors:
+        return [LegResult(index=i, symbol=legs[i].get('symbol', ''), success=False, error=msg)
+                for i, msg in errors]
+
+    limiter = RateLimiter(rate_limit)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(legs)))) as pool:
+        futures = [pool.submit(_submit_leg, client, limiter, i, leg) for i, leg in enumerate(legs)]
+        return [future.result() for future in futures]
+
+def basket_results_frame(results: List[LegResult]) -> pd.DataFrame:
+    """Tabulate leg results for display"""
+    return pd.DataFrame([{
+        'Leg': r.index + 1,
+        'Symbol': r.symbol,
+        'Status': 'PLACED' if r.success else 'FAILED',
+        'Order ID': r.order_id or '',
+        'Latency (ms)': round(r.latency_ms, 1),
+        'Error': r.error or ''
+    } for r in results])
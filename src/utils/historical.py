@@ -0,0 +1,172 @@
+"""
+Historical Data - Split long candle ranges into per-interval windows and fetch them concurrently
+"""
+
+import threading
+import weakref
+from typing import List, Any, Optional, Iterator, Tuple, Union
+from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.order_log import extract_records
+from utils.rate_limiter import RateLimiter
+
+# Kite Connect allows 3 historical-data requests per second
+HISTORICAL_RATE_LIMIT = 3
+
+# Longest range (in days) Kite serves in one request, per candle interval
+MAX_DAYS_PER_REQUEST = {
+    'minute': 60,
+    '3minute': 100,
+    '5minute': 100,
+    '10minute': 100,
+    '15minute': 200,
+    '30minute': 200,
+    '60minute': 400,
+    'day': 2000
+}
+
+CANDLE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+DateLike = Union[str, datetime, pd.Timestamp]
+
+# One historical-data limiter per client, so concurrent fetches share Kite's budget
+_client_limiters: "weakref.WeakKeyDictionary[Any, RateLimiter]" = weakref.WeakKeyDictionary()
+_client_limiters_lock = threading.Lock()
+
+class HistoricalDataError(Exception):
+    """A window of a historical range could not be fetched"""
+
+    def __init__(self, window: Tuple[datetime, datetime], error: str):
+        super().__init__(f"{window[0]:%Y-%m-%d} to {window[1]:%Y-%m-%d}: {error}")
+        self.window = window
+        self.error = error
+
+def client_limiter(client) -> RateLimiter:
+    """The historical-data rate limiter shared by every fetch made through `client`"""
+    with _client_limiters_lock:
+        limiter = _client_limiters.get(client)
+        if limiter is None:
+            limiter = _client_limiters[client] = RateLimiter(HISTORICAL_RATE_LIMIT)
+        return limiter
+
+def split_range(from_date: DateLike, to_date: DateLike, interval: str = "day") -> List[Tuple[datetime, datetime]]:
+    """
+    Cut [from_date, to_date] into consecutive windows Kite accepts for `interval`
+
+    Adjacent windows share their boundary instant, since both ends of a
+    request are inclusive; iter_historical drops the repeated candle.
+    """
+    if interval not in MAX_DAYS_PER_REQUEST:
+        raise ValueError(f"Invalid interval: {interval}")
+    start = pd.Timestamp(from_date).to_pydatetime()
+    end = pd.Timestamp(to_date).to_pydatetime()
+    if end < start:
+        return []
+
+    span = timedelta(days=MAX_DAYS_PER_REQUEST[interval])
+    windows = []
+    while True:
+        window_end = min(start + span, end)
+        windows.append((start, window_end))
+        if window_end >= end:
+            return windows
+        start = window_end
+
+def candles_frame(data: Any) -> pd.DataFrame:
+    """
+    Candles from a get_historical_data response as a frame sorted by date
+
+    Accepts records with CANDLE_COLUMNS keys or Kite's raw
+    [timestamp, open, high, low, close, volume] rows.
+    """
+    if isinstance(data, dict) and 'candles' in data:
+        data = data['candles']
+    if data and isinstance(data, list) and isinstance(data[0], (list, tuple)):
+        df = pd.DataFrame([row[:6] for row in data], columns=CANDLE_COLUMNS)
+    else:
+        df = pd.DataFrame(extract_records(data))
+    if df.empty:
+        return pd.DataFrame(columns=CANDLE_COLUMNS)
+
+    df['date'] = pd.to_datetime(df['date'])
+    if df['date'].dt.tz is not None:
+        # Kite stamps candles in IST; keep wall-clock times so windows compare naively
+        df['date'] = df['date'].dt.tz_localize(None)
+    return df.sort_values('date', kind='stable', ignore_index=True)
+
+def _fetch_window(client, limiter: RateLimiter, instrument_token: int,
+                  window: Tuple[datetime, datetime], interval: str) -> pd.DataFrame:
+    limiter.acquire()
+    response = client.get_historical_data(instrument_token, window[0].strftime(DATE_FORMAT),
+                                          window[1].strftime(DATE_FORMAT), interval)
+    if not response.success:
+        raise HistoricalDataError(window, response.error or "request failed")
+    return candles_frame(response.data)
+
+def iter_historical(client, instrument_token: int, from_date: DateLike, to_date: DateLike,
+                    interval: str = "day", max_workers: int = HISTORICAL_RATE_LIMIT,
+                    limiter: Optional[RateLimiter] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a long candle range as DataFrame chunks in date order
+
+    Windows are fetched concurrently, paced by the rate limiter, with at
+    most 2 x max_workers requests ahead of the consumer, so stopping early
+    stops fetching. Each chunk is yielded as soon as it and every earlier
+    window are in; candles repeated at window boundaries are dropped.
+
+    Args:
+        client: KiteMCPClient (or anything with get_historical_data)
+        instrument_token: Kite instrument token
+        from_date: Range start (inclusive)
+        to_date: Range end (inclusive)
+        interval: Candle interval, one of MAX_DAYS_PER_REQUEST
+        max_workers: Concurrent requests
+        limiter: Limiter to pace by (defaults to the client's shared one)
+
+    Raises:
+        HistoricalDataError: A window failed; chunks before it were already yielded
+    """
+    windows = split_range(from_date, to_date, interval)
+    if not windows:
+        return
+    limiter = limiter or client_limiter(client)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows))),
+                              thread_name_prefix="historical")
+    try:
+        pending = deque()
+        upcoming = iter(windows)
+        last_date = None
+        while True:
+            while len(pending) < 2 * max_workers:
+                window = next(upcoming, None)
+                if window is None:
+                    break
+                pending.append(pool.submit(_fetch_window, client, limiter, instrument_token,
+                                           window, interval))
+            if not pending:
+                return
+
+            chunk = pending.popleft().result()
+            if last_date is not None:
+                chunk = chunk[chunk['date'] > last_date]
+            if chunk.empty:
+                continue
+            last_date = chunk['date'].iloc[-1]
+            yield chunk.reset_index(drop=True)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def fetch_historical(client, instrument_token: int, from_date: DateLike, to_date: DateLike,
+                     interval: str = "day", **kwargs) -> pd.DataFrame:
+    """The whole range from iter_historical as one frame"""
+    chunks = list(iter_historical(client, instrument_token, from_date, to_date, interval, **kwargs))
+    if not chunks:
+        return pd.DataFrame(columns=CANDLE_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,294 @@
+"""
+Technical Indicators - Vectorized full-history and incremental (one bar at a time) versions
+
+Every vectorized function takes NumPy arrays (or pandas Series) and returns
+arrays of the same length, NaN where the indicator is not yet defined. sma,
+ema and rsi also accept 2-D arrays of shape (bars, instruments) and run down
+each column at once. Each has a matching *State class whose update() consumes
+one new bar with O(1) work and fixed-size state, producing the same values as
+the vectorized form.
+"""
+
+import math
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Largest exponent magnitude the blockwise EMA lets its scaling factors reach
+_EMA_MAX_EXPONENT = 600.0
+
+def _as_float(values) -> np.ndarray:
+    return np.asarray(values, dtype=float)
+
+def sma(values, period: int) -> np.ndarray:
+    """Simple moving average via a cumulative-sum difference"""
+    x = _as_float(values)
+    out = np.full(x.shape, np.nan)
+    if len(x) < period:
+        return out
+    csum = np.concatenate((np.zeros((1,) + x.shape[1:]), np.cumsum(x, axis=0)))
+    out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+def ema_alpha(values, alpha: float) -> np.ndarray:
+    """
+    Exponential moving average with smoothing factor alpha, seeded with the first value
+
+    The recursion y[t] = (1 - a) * y[t-1] + a * x[t] is solved in closed form
+    per block: y[t] = w^(t+1) * s + a * w^t * cumsum(x[k] * w^-k), with w = 1 - a
+    and s the carried state. Blocks are sized so w^-k cannot overflow, so the
+    Python loop runs once per block, not once per bar.
+    """
+    x = _as_float(values)
+    n = len(x)
+    out = np.empty(x.shape)
+    if n == 0:
+        return out
+
+    w = 1.0 - alpha
+    if w <= 0.0:
+        out[:] = x
+        return out
+
+    log_w = math.log(w)
+    block = max(1, min(n, int(_EMA_MAX_EXPONENT / -log_w)))
+    # Column vectors broadcast across instruments for 2-D input
+    exponents = np.arange(block, dtype=float).reshape((block,) + (1,) * (x.ndim - 1))
+    decay = np.exp(exponents * log_w)          # w^k
+    growth = np.exp(-exponents * log_w)        # w^-k
+
+    state = x[0]
+    for start in range(0, n, block):
+        chunk = x[start:start + block]
+        m = len(chunk)
+        scaled = np.cumsum(chunk * growth[:m], axis=0)
+        out[start:start + m] = decay[:m] * (w * state + alpha * scaled)
+        state = out[start + m - 1]
+    return out
+
+def ema(values, period: int) -> np.ndarray:
+    """Exponential moving average with the usual 2 / (period + 1) smoothing"""
+    return ema_alpha(values, 2.0 / (period + 1))
+
+def wilder(values, period: int) -> np.ndarray:
+    """
+    Wilder's smoothing (RSI, ATR): seeded with the simple average of the first
+    `period` values, then an EMA with alpha = 1 / period; NaN before the seed
+    """
+    x = _as_float(values)
+    out = np.full(x.shape, np.nan)
+    if len(x) < period:
+        return out
+    tail = x[period - 1:].copy()
+    tail[0] = x[:period].mean(axis=0)
+    out[period - 1:] = ema_alpha(tail, 1.0 / period)
+    return out
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    """Relative Strength Index"""
+    x = _as_float(close)
+    out = np.full(x.shape, np.nan)
+    if len(x) <= period:
+        return out
+    delta = np.diff(x, axis=0)
+    avg_gain = wilder(np.maximum(delta, 0.0), period)
+    avg_loss = wilder(np.maximum(-delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    out[1:] = value
+    out[:period] = np.nan
+    return out
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line and histogram"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+def bollinger_bands(close, period: int = 20, num_std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Upper, middle and lower Bollinger bands (population standard deviation)"""
+    x = _as_float(close)
+    middle = sma(x, period)
+    if len(x) < period:
+        return middle.copy(), middle, middle.copy()
+    # Centre on the first value before squaring to limit cancellation in E[x^2] - E[x]^2
+    shifted = x - x[0]
+    mean_sq = sma(shifted * shifted, period)
+    mean = middle - x[0]
+    std = np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+    return middle + num_std * std, middle, middle - num_std * std
+
+def true_range(high, low, close) -> np.ndarray:
+    """True range; the first bar uses high - low"""
+    h, l, c = _as_float(high), _as_float(low), _as_float(close)
+    prev_close = np.concatenate(([c[0]], c[:-1])) if len(c) else c
+    return np.maximum(h - l, np.maximum(np.abs(h - prev_close), np.abs(l - prev_close)))
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """Average True Range (Wilder)"""
+    return wilder(true_range(high, low, close), period)
+
+def vwap(high, low, close, volume, session=None) -> np.ndarray:
+    """
+    Volume weighted average price of the typical price, reset at each session
+
+    Args:
+        session: Optional per-bar session labels (e.g. trading date); the
+            running sums restart whenever the label changes
+    """
+    typical = (_as_float(high) + _as_float(low) + _as_float(close)) / 3.0
+    v = _as_float(volume)
+    cum_pv = np.cumsum(typical * v)
+    cum_v = np.cumsum(v)
+
+    if session is not None and len(v):
+        labels = np.asarray(session)
+        is_start = np.concatenate(([True], labels[1:] != labels[:-1]))
+        # Index of each bar's session start, then subtract what came before it
+        start_of = np.maximum.accumulate(np.where(is_start, np.arange(len(v)), 0))
+        base_pv = np.where(start_of > 0, cum_pv[start_of - 1], 0.0)
+        base_v = np.where(start_of > 0, cum_v[start_of - 1], 0.0)
+        cum_pv, cum_v = cum_pv - base_pv, cum_v - base_v
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(cum_v > 0, cum_pv / cum_v, np.nan)
+
+class SMAState:
+    """Incremental simple moving average over a fixed window"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+
+    def update(self, value: float) -> float:
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+        return self.total / self.period if len(self.window) == self.period else math.nan
+
+class EMAState:
+    """Incremental exponential moving average"""
+
+    def __init__(self, period: Optional[int] = None, alpha: Optional[float] = None):
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.value: Optional[float] = None
+
+    def update(self, value: float) -> float:
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+class WilderState:
+    """Incremental Wilder smoothing: the mean of the first `period` values, then alpha = 1 / period"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.count = 0
+        self.total = 0.0
+        self.value = math.nan
+
+    def update(self, value: float) -> float:
+        self.count += 1
+        if self.count < self.period:
+            self.total += value
+        elif self.count == self.period:
+            self.value = (self.total + value) / self.period
+        else:
+            self.value += (value - self.value) / self.period
+        return self.value
+
+class RSIState:
+    """Incremental RSI using Wilder smoothing"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.gain = WilderState(period)
+        self.loss = WilderState(period)
+        self.previous: Optional[float] = None
+        self.count = 0
+
+    def update(self, close: float) -> float:
+        self.count += 1
+        if self.previous is None:
+            self.previous = close
+            return math.nan
+        delta = close - self.previous
+        self.previous = close
+        gain = self.gain.update(max(delta, 0.0))
+        loss = self.loss.update(max(-delta, 0.0))
+        if self.count <= self.period:
+            return math.nan
+        return 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+
+class MACDState:
+    """Incremental MACD; update() returns (line, signal, histogram)"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast, self.slow, self.signal = EMAState(fast), EMAState(slow), EMAState(signal)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        line = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(line)
+        return line, signal, line - signal
+
+class BollingerState:
+    """Incremental Bollinger bands; update() returns (upper, middle, lower)"""
+
+    def __init__(self, period: int = 20, num_std: float = 2.0):
+        self.period, self.num_std = period, num_std
+        self.window = deque(maxlen=period)
+        self.origin: Optional[float] = None
+        self.total = self.total_sq = 0.0
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        if self.origin is None:
+            self.origin = close
+        shifted = close - self.origin
+        if len(self.window) == self.period:
+            oldest = self.window[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.window.append(shifted)
+        self.total += shifted
+        self.total_sq += shifted * shifted
+        if len(self.window) < self.period:
+            return math.nan, math.nan, math.nan
+
+        mean = self.total / self.period
+        std = math.sqrt(max(self.total_sq / self.period - mean * mean, 0.0))
+        middle = mean + self.origin
+        return middle + self.num_std * std, middle, middle - self.num_std * std
+
+class ATRState:
+    """Incremental Average True Range"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.smoother = WilderState(period)
+        self.previous_close: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> float:
+        prev = close if self.previous_close is None else self.previous_close
+        tr = max(high - low, abs(high - prev), abs(low - prev))
+        self.previous_close = close
+        return self.smoother.update(tr)
+
+class VWAPState:
+    """Incremental session VWAP; pass a session label to reset at session boundaries"""
+
+    def __init__(self):
+        self.session = None
+        self.total_pv = self.total_volume = 0.0
+
+    def update(self, high: float, low: float, close: float, volume: float, session=None) -> float:
+        if session != self.session:
+            self.session = session
+            self.total_pv = self.total_volume = 0.0
+        self.total_pv += (high + low + close) / 3.0 * volume
+        self.total_volume += volume
+        return self.total_pv / self.total_volume if self.total_volume > 0 else math.nan
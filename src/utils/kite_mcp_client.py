@@ -4,35 +4,57 @@ Kite MCP Client - A client library to interact with the Kite MCP Server
 
 import requests
 import json
+import time
+import uuid
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from dataclasses import dataclass
 
+from utils.metrics import metrics
+from utils.traffic_log import open_recorder
+
 logger = logging.getLogger(__name__)
 
+# Streamable-HTTP MCP session header
+SESSION_HEADER = "Mcp-Session-Id"
+
 @dataclass
 class MCPResponse:
     """Response from MCP server"""
     success: bool
-    data: Any
+    data: Any = None
     error: Optional[str] = None
+    # Kind of failure: 'rpc_error', 'http_<status>', 'invalid_json', ... or the transport exception's name
+    error_class: Optional[str] = None
 
 class KiteMCPClient:
     """Client to interact with Kite MCP Server"""
     
-    def __init__(self, server_url: str = "http://localhost:8080/mcp"):
+    def __init__(self, server_url: str = "http://localhost:8080/mcp", timeout: float = 30,
+                 headers: Optional[Dict[str, str]] = None, record_path: Optional[str] = None,
+                 transport: Optional[Callable[..., requests.Response]] = None):
         """
         Initialize the MCP client
         
         Args:
             server_url: URL of the MCP server
+            timeout: Per-request timeout in seconds
+            headers: Extra HTTP headers (e.g. Authorization for a hosted server)
+            record_path: Append every call with its timing to this traffic log (see utils.traffic_log)
+            transport: Stand-in for requests.post, e.g. a ReplayTransport serving a recording
         """
         self.server_url = server_url
         self.session_id = None
+        self.timeout = timeout
+        self.transport = transport or requests.post
+        self.recorder = open_recorder(record_path) if record_path else None
+        self.client_id = uuid.uuid4().hex[:8]
         self.headers = {
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
+        if headers:
+            self.headers.update(headers)
     
     def _make_request(self, tool_name: str, arguments: Dict[str, Any] = None) -> MCPResponse:
         """
@@ -56,37 +78,73 @@ class KiteMCPClient:
             }
         }
         
+        headers = self.headers
+        if self.session_id:
+            headers = {**headers, SESSION_HEADER: self.session_id}
+        body = json.dumps(payload).encode()
+        
+        wall_started = time.time()
+        started = time.perf_counter()
         try:
-            response = requests.post(
+            response = self.transport(
                 self.server_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30
+                headers=headers,
+                data=body,
+                timeout=self.timeout
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Extract content from MCP response
-                if 'result' in result and 'content' in result['result']:
-                    content = result['result']['content']
-                    if content and len(content) > 0:
-                        text_content = content[0].get('text', '')
-                        try:
-                            # Try to parse as JSON
-                            data = json.loads(text_content)
-                            return MCPResponse(success=True, data=data)
-                        except json.JSONDecodeError:
-                            # Return as text if not JSON
-                            return MCPResponse(success=True, data=text_content)
-                
-                return MCPResponse(success=False, error="Invalid response format")
-            else:
-                return MCPResponse(success=False, error=f"HTTP {response.status_code}: {response.text}")
-                
         except requests.RequestException as e:
+            elapsed = time.perf_counter() - started
+            metrics.record_call(tool_name, elapsed, len(body), error=type(e).__name__)
+            if self.recorder:
+                self.recorder.record_call(self.client_id, tool_name, arguments, wall_started, elapsed, error=str(e))
             logger.error(f"Request failed: {e}")
-            return MCPResponse(success=False, error=str(e))
+            return MCPResponse(success=False, error=str(e), error_class=type(e).__name__)
+        elapsed = time.perf_counter() - started
+        if self.recorder:
+            self.recorder.record_call(self.client_id, tool_name, arguments, wall_started, elapsed, response,
+                                      session_id=self.session_id)
+        
+        # The server issues a session id on first contact; echoing it back
+        # keeps the login attached to this client
+        self.session_id = response.headers.get(SESSION_HEADER, self.session_id)
+        
+        decode_started = time.perf_counter()
+        result, error_class = self._decode(response)
+        result.error_class = error_class
+        metrics.record_call(tool_name, elapsed, len(body), len(response.content),
+                            time.perf_counter() - decode_started, error=error_class)
+        return result
+    
+    @staticmethod
+    def _decode(response: requests.Response) -> Tuple[MCPResponse, Optional[str]]:
+        """Turn an HTTP response into an MCPResponse plus an error class for metrics"""
+        if response.status_code != 200:
+            return (MCPResponse(success=False, error=f"HTTP {response.status_code}: {response.text}"),
+                    f"http_{response.status_code}")
+        
+        try:
+            result = response.json()
+        except ValueError as e:
+            return MCPResponse(success=False, error=f"Invalid JSON: {e}"), "invalid_json"
+
+        # JSON-RPC level failure (unknown tool, bad arguments, expired session)
+        if isinstance(result, dict) and isinstance(result.get('error'), dict):
+            return MCPResponse(success=False, error=result['error'].get('message', 'Unknown error')), "rpc_error"
+
+        # Extract content from MCP response
+        if 'result' in result and 'content' in result['result']:
+            content = result['result']['content']
+            if content and len(content) > 0:
+                text_content = content[0].get('text', '')
+                try:
+                    # Try to parse as JSON
+                    data = json.loads(text_content)
+                    return MCPResponse(success=True, data=data), None
+                except json.JSONDecodeError:
+                    # Return as text if not JSON
+                    return MCPResponse(success=True, data=text_content), None
+        
+        return MCPResponse(success=False, error="Invalid response format"), "invalid_response"
     
     def login(self) -> MCPResponse:
         """Login to Kite Connect API"""
@@ -114,18 +172,22 @@ class KiteMCPClient:
         """Get account margins"""
         return self._make_request("get_margins")
     
-    def get_orders(self, limit: int = None) -> MCPResponse:
-        """Get all orders"""
+    def get_orders(self, limit: int = None, from_index: int = None) -> MCPResponse:
+        """Get all orders, optionally starting at a position in the order book"""
         args = {}
         if limit:
             args['limit'] = limit
+        if from_index:
+            args['from'] = from_index
         return self._make_request("get_orders", args)
     
-    def get_trades(self, limit: int = None) -> MCPResponse:
-        """Get trading history"""
+    def get_trades(self, limit: int = None, from_index: int = None) -> MCPResponse:
+        """Get trading history, optionally starting at a position in the trade book"""
         args = {}
         if limit:
             args['limit'] = limit
+        if from_index:
+            args['from'] = from_index
         return self._make_request("get_trades", args)
     
     def get_quotes(self, instruments: List[str]) -> MCPResponse:
@@ -153,11 +215,21 @@ class KiteMCPClient:
             "interval": interval
         })
     
+    def iter_historical_data(self, instrument_token: int, from_date: str, to_date: str,
+                             interval: str = "day", max_workers: int = 3):
+        """
+        Historical data for ranges longer than one request allows, as DataFrame
+        chunks in date order (see utils.historical.iter_historical)
+        """
+        from utils.historical import iter_historical
+        return iter_historical(self, instrument_token, from_date, to_date, interval,
+                               max_workers=max_workers)
+    
     def place_order(self, variety: str, exchange: str, tradingsymbol: str,
                    transaction_type: str, quantity: int, product: str,
-                   order_type: str, price: float = 0.0) -> MCPResponse:
-        """Place a new order"""
-        return self._make_request("place_order", {
+                   order_type: str, price: float = 0.0, trigger_price: float = 0.0) -> MCPResponse:
+        """Place a new order (trigger_price is required for SL and SL-M orders)"""
+        args = {
             "variety": variety,
             "exchange": exchange,
             "tradingsymbol": tradingsymbol,
@@ -166,4 +238,7 @@ class KiteMCPClient:
             "product": product,
             "order_type": order_type,
             "price": price
-        })
+        }
+        if trigger_price:
+            args['trigger_price'] = trigger_price
+        return self._make_request("place_order", args)
@@ -0,0 +1,139 @@
+"""
+Market Overview - Index levels and constituent movers from one batched quote fetch
+"""
+
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.kite_mcp_client import KiteMCPClient
+from utils.sectors import default_sector_map
+from utils.timed_cache import TimedCache
+
+MARKET_REFRESH_SECONDS = 30
+
+# Display name -> Kite instrument
+INDEX_INSTRUMENTS = {
+    'NIFTY 50': 'NSE:NIFTY 50',
+    'SENSEX': 'BSE:SENSEX',
+    'BANK NIFTY': 'NSE:NIFTY BANK',
+    'NIFTY IT': 'NSE:NIFTY IT'
+}
+
+# Previous closes used by the sample snapshot
+SAMPLE_INDEX_LEVELS = {
+    'NIFTY 50': 21211.20,
+    'SENSEX': 70771.20,
+    'BANK NIFTY': 48568.80,
+    'NIFTY IT': 31716.70
+}
+
+# One snapshot per refresh interval, shared by every session in the process
+market_cache = TimedCache(MARKET_REFRESH_SECONDS)
+
+def top_k(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """
+    Indices of the k largest (or smallest) values, best first
+
+    np.argpartition selects the k candidates in O(n); only those k are then
+    sorted. NaNs are never selected ahead of real values.
+    """
+    values = np.asarray(values, dtype=float)
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    keyed = np.where(np.isnan(values), np.inf, -values if largest else values)
+    candidates = np.argpartition(keyed, k - 1)[:k]
+    return candidates[np.argsort(keyed[candidates], kind='stable')]
+
+@dataclass
+class MarketSnapshot:
+    """Index levels and constituent prices captured at one moment"""
+    indices: pd.DataFrame
+    keys: np.ndarray
+    ltp: np.ndarray
+    prev_close: np.ndarray
+    fetched_at: datetime
+    live: bool
+
+    @property
+    def change_percent(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.prev_close > 0, (self.ltp / self.prev_close - 1) * 100, np.nan)
+
+    def movers(self, k: int = 5, gainers: bool = True) -> pd.DataFrame:
+        """Top-k gainers (or losers) among the constituents"""
+        change = self.change_percent
+        picked = top_k(change, k, largest=gainers)
+        picked = picked[change[picked] > 0] if gainers else picked[change[picked] < 0]
+        return pd.DataFrame({
+            'Symbol': [key.split(':', 1)[-1] for key in self.keys[picked]],
+            'LTP': self.ltp[picked],
+            'Change %': change[picked]
+        })
+
+def _quote_prices(quote: Optional[Dict]) -> tuple:
+    """(last price, previous close) from one get_quotes entry"""
+    if not isinstance(quote, dict):
+        return np.nan, np.nan
+    last = quote.get('last_price')
+    close = (quote.get('ohlc') or {}).get('close')
+    return (np.nan if last is None else float(last)), (np.nan if not close else float(close))
+
+def _index_frame(levels: Dict[str, tuple]) -> pd.DataFrame:
+    names = list(levels)
+    last = np.array([levels[n][0] for n in names], dtype=float)
+    prev = np.array([levels[n][1] for n in names], dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_percent = np.where(prev > 0, (last / prev - 1) * 100, np.nan)
+    return pd.DataFrame({'Index': names, 'Last': last, 'Change': last - prev,
+                         'Change %': change_percent})
+
+def fetch_market_snapshot(client: KiteMCPClient, constituents: Optional[List[str]] = None) -> Optional[MarketSnapshot]:
+    """Quote the indices and constituents in a single get_quotes call; None on failure"""
+    keys = list(constituents if constituents is not None else default_sector_map().keys)
+    response = client.get_quotes(list(INDEX_INSTRUMENTS.values()) + keys)
+    if not response.success or not isinstance(response.data, dict):
+        return None
+
+    quotes = response.data
+    default_sector_map().learn_tokens({k: int(q['instrument_token']) for k, q in quotes.items()
+                                       if isinstance(q, dict) and q.get('instrument_token')})
+    prices = np.array([_quote_prices(quotes.get(key)) for key in keys], dtype=float).reshape(-1, 2)
+    return MarketSnapshot(
+        indices=_index_frame({name: _quote_prices(quotes.get(instrument))
+                              for name, instrument in INDEX_INSTRUMENTS.items()}),
+        keys=np.asarray(keys, dtype=object),
+        ltp=prices[:, 0],
+        prev_close=prices[:, 1],
+        fetched_at=datetime.now(),
+        live=True
+    )
+
+def sample_market_snapshot(seed: int = 0, constituents: Optional[List[str]] = None) -> MarketSnapshot:
+    """Random market day for demo mode; previous closes are fixed, `seed` moves the prices"""
+    keys = list(constituents if constituents is not None else default_sector_map().keys)
+    prev_close = np.round(np.random.default_rng(0).uniform(200, 3000, len(keys)), 2)
+    rng = np.random.default_rng(seed)
+    ltp = np.round(prev_close * (1 + rng.normal(0.003, 0.015, len(keys))), 2)
+    levels = {name: (round(prev * (1 + rng.normal(0.004, 0.006)), 2), prev)
+              for name, prev in SAMPLE_INDEX_LEVELS.items()}
+    return MarketSnapshot(indices=_index_frame(levels), keys=np.asarray(keys, dtype=object),
+                          ltp=ltp, prev_close=prev_close, fetched_at=datetime.now(), live=False)
+
+def get_market_snapshot(client: Optional[KiteMCPClient] = None) -> MarketSnapshot:
+    """
+    Current snapshot from the shared cache
+
+    Any connected session may perform the refresh; every other session reuses
+    it until the next tick of the shared timer. Without a connection, or if
+    the fetch fails, the sample snapshot is served instead.
+    """
+    if client is not None:
+        snapshot = market_cache.get('live', lambda: fetch_market_snapshot(client))
+        if snapshot is not None:
+            return snapshot
+    return market_cache.get('sample', lambda: sample_market_snapshot(seed=market_cache.bucket()))
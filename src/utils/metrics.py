@@ -0,0 +1,261 @@
+"""
+Metrics - Per-tool MCP call and per-section render instrumentation with Prometheus export
+"""
+
+import os
+import time
+import bisect
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Upper bounds (seconds) shared by the latency and render histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "portfolio"
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (not thread-safe on its own)"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'last', 'max')
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.last = value
+        if value > self.max:
+            self.max = value
+
+    def cumulative(self) -> List[int]:
+        total, out = 0, []
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate by linear interpolation inside the bucket, as histogram_quantile
+        does, capped at the largest value actually observed
+        """
+        if not self.count:
+            return float('nan')
+        rank = q * self.count
+        cumulative = self.cumulative()
+        i = bisect.bisect_left(cumulative, rank)
+        if i >= len(self.bounds):
+            return self.max
+        lower = self.bounds[i - 1] if i > 0 else 0.0
+        below = cumulative[i - 1] if i > 0 else 0
+        in_bucket = self.counts[i]
+        estimate = lower + (self.bounds[i] - lower) * ((rank - below) / in_bucket if in_bucket else 0.0)
+        return min(estimate, self.max)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else float('nan')
+
+class _ToolStats:
+    __slots__ = ('latency', 'bytes_out', 'bytes_in', 'decode_seconds', 'errors')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.decode_seconds = 0.0
+        self.errors: Dict[str, int] = {}
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_le(bound: float) -> str:
+    return f"{bound:g}"
+
+class MetricsRegistry:
+    """
+    Process-wide counters for MCP tool calls and page render sections
+
+    Recording is a dict lookup and a few additions under one lock, cheap
+    enough for every request and every rerun.
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, _ToolStats] = {}
+        self._sections: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._written_at = 0.0
+
+    def record_call(self, tool: str, seconds: float, bytes_out: int = 0, bytes_in: int = 0,
+                    decode_seconds: float = 0.0, error: Optional[str] = None):
+        """
+        Record one MCP tool call
+
+        Args:
+            tool: MCP tool name
+            seconds: Wall time of the HTTP round trip
+            bytes_out: Request body size
+            bytes_in: Response body size
+            decode_seconds: Time spent parsing the response
+            error: Error class if the call failed (exception name, http_<status>, ...)
+        """
+        with self._lock:
+            stats = self._tools.get(tool)
+            if stats is None:
+                stats = self._tools[tool] = _ToolStats()
+            stats.latency.observe(seconds)
+            stats.bytes_out += bytes_out
+            stats.bytes_in += bytes_in
+            stats.decode_seconds += decode_seconds
+            if error:
+                stats.errors[error] = stats.errors.get(error, 0) + 1
+
+    def record_render(self, section: str, seconds: float):
+        with self._lock:
+            histogram = self._sections.get(section)
+            if histogram is None:
+                histogram = self._sections[section] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def section(self, name: str):
+        """Time a block of page rendering"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_render(name, time.perf_counter() - started)
+
+    def reset(self):
+        with self._lock:
+            self._tools.clear()
+            self._sections.clear()
+            self.started_at = time.time()
+
+    def tool_frame(self) -> pd.DataFrame:
+        """One row per tool: calls, errors, latency quantiles, payload sizes, decode time"""
+        with self._lock:
+            rows = [{
+                'Tool': tool,
+                'Calls': s.latency.count,
+                'Errors': sum(s.errors.values()),
+                'Mean ms': s.latency.mean * 1000,
+                'p50 ms': s.latency.quantile(0.5) * 1000,
+                'p95 ms': s.latency.quantile(0.95) * 1000,
+                'p99 ms': s.latency.quantile(0.99) * 1000,
+                'Total s': s.latency.sum,
+                'KB Out': s.bytes_out / 1024,
+                'KB In': s.bytes_in / 1024,
+                'Decode ms': s.decode_seconds * 1000,
+            } for tool, s in self._tools.items()]
+        frame = pd.DataFrame(rows, columns=['Tool', 'Calls', 'Errors', 'Mean ms', 'p50 ms', 'p95 ms',
+                                            'p99 ms', 'Total s', 'KB Out', 'KB In', 'Decode ms'])
+        return frame.sort_values('Total s', ascending=False, ignore_index=True)
+
+    def error_frame(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [{'Tool': tool, 'Error': error, 'Count': count}
+                    for tool, s in self._tools.items() for error, count in s.errors.items()]
+        return pd.DataFrame(rows, columns=['Tool', 'Error', 'Count'])
+
+    def section_frame(self) -> pd.DataFrame:
+        """
+        One row per render section
+
+        Sections are named group.part (page.dashboard, dashboard.charts, ...);
+        each share is of its own group's time, since pages contain sections.
+        """
+        with self._lock:
+            rows = [{
+                'Section': name,
+                'Renders': h.count,
+                'Last ms': h.last * 1000,
+                'Mean ms': h.mean * 1000,
+                'p95 ms': h.quantile(0.95) * 1000,
+                'Total s': h.sum,
+            } for name, h in self._sections.items()]
+        frame = pd.DataFrame(rows, columns=['Section', 'Renders', 'Last ms', 'Mean ms', 'p95 ms', 'Total s'])
+        group = frame['Section'].str.split('.', n=1).str[0]
+        group_total = frame.groupby(group)['Total s'].transform('sum')
+        frame['Share %'] = (frame['Total s'] / group_total.where(group_total > 0) * 100).fillna(0.0)
+        return frame.sort_values('Total s', ascending=False, ignore_index=True)
+
+    def to_prometheus(self) -> str:
+        """Text exposition format (version 0.0.4)"""
+        p = METRIC_PREFIX
+        lines = []
+
+        def histogram(name: str, label: str, series: Dict[str, Histogram], help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in series.items():
+                labels = f'{label}="{_escape(key)}"'
+                for bound, count in zip(h.bounds + (float('inf'),), h.cumulative()):
+                    le = "+Inf" if bound == float('inf') else _format_le(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+        def counter(name: str, help_text: str, values: Dict[str, float]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in values.items():
+                lines.append(f"{name}{{{labels}}} {value:g}")
+
+        with self._lock:
+            tools = self._tools
+            histogram(f"{p}_mcp_request_seconds", "tool", {t: s.latency for t, s in tools.items()},
+                      "MCP tool call round-trip time")
+            counter(f"{p}_mcp_request_bytes_total", "MCP request body bytes",
+                    {f'tool="{_escape(t)}"': s.bytes_out for t, s in tools.items()})
+            counter(f"{p}_mcp_response_bytes_total", "MCP response body bytes",
+                    {f'tool="{_escape(t)}"': s.bytes_in for t, s in tools.items()})
+            counter(f"{p}_mcp_decode_seconds_total", "Time spent decoding MCP responses",
+                    {f'tool="{_escape(t)}"': s.decode_seconds for t, s in tools.items()})
+            counter(f"{p}_mcp_errors_total", "Failed MCP tool calls by error class",
+                    {f'tool="{_escape(t)}",error="{_escape(e)}"': n
+                     for t, s in tools.items() for e, n in s.errors.items()})
+            histogram(f"{p}_render_seconds", "section", dict(self._sections),
+                      "Streamlit page section render time")
+            lines.append(f"# HELP {p}_metrics_start_time_seconds When these counters were last reset")
+            lines.append(f"# TYPE {p}_metrics_start_time_seconds gauge")
+            lines.append(f"{p}_metrics_start_time_seconds {self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, min_interval: float = 0.0) -> bool:
+        """
+        Atomically write the exposition text for a textfile collector
+
+        Skipped (returns False) if the last write was under `min_interval` seconds ago.
+        """
+        now = time.time()
+        if now - self._written_at < min_interval:
+            return False
+        self._written_at = now
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
+
+# Shared by every client and session in the process
+metrics = MetricsRegistry()
@@ -0,0 +1,311 @@
+"""
+Optimizer - Long-only efficient frontier, minimum-variance and risk-parity weights from historical returns
+"""
+
+import time
+from concurrent.futures import Executor, Future
+from typing import Dict, List, Any, Callable, Optional, Sequence, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.timed_cache import TimedCache
+
+TRADING_DAYS = 252
+
+DEFAULT_LOOKBACK = TRADING_DAYS
+FRONTIER_POINTS = 30
+
+RISK_FREE_RATE = 0.065
+
+# Daily closes only change once a day; an hour keeps intraday reruns free
+OPTIMIZER_CACHE_SECONDS = 3600
+
+# Solutions per (universe, lookback, ...) key, shared by every session in the process
+optimizer_cache = TimedCache(OPTIMIZER_CACHE_SECONDS)
+
+def shrink_covariance(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Ledoit-Wolf covariance shrunk towards a scaled identity
+
+    With a year of daily returns and hundreds of assets the sample covariance
+    is (near) singular; shrinking keeps every solver well conditioned.
+
+    Returns:
+        (covariance, shrinkage intensity in [0, 1])
+    """
+    x = returns - returns.mean(axis=0)
+    t, n = x.shape
+    sample = x.T @ x / t
+    mu = np.trace(sample) / n
+    target = mu * np.eye(n)
+    d2 = np.sum((sample - target) ** 2)
+    # Average squared distance of each observation's outer product from the sample covariance
+    b2 = (np.sum((x ** 2).T @ (x ** 2)) / t - np.sum(sample ** 2)) / t
+    intensity = float(min(max(b2 / d2, 0.0), 1.0)) if d2 > 0 else 1.0
+    return intensity * target + (1 - intensity) * sample, intensity
+
+def project_simplex(v: np.ndarray, cap: Optional[float] = None) -> np.ndarray:
+    """
+    Euclidean projection onto {w >= 0, sum(w) = 1, w <= cap}
+
+    Exact in O(n log n): sum(clip(v - tau, 0, cap)) is piecewise linear in
+    tau, so its breakpoints are sorted once and the crossing of 1 is
+    interpolated.
+    """
+    n = len(v)
+    if cap is not None and cap * n < 1 - 1e-12:
+        raise ValueError(f"A {cap:.0%} cap cannot hold {n} assets fully invested")
+    if cap is None or cap >= 1:
+        u = np.sort(v)[::-1]
+        cumulative = np.cumsum(u) - 1
+        k = np.nonzero(u - cumulative / np.arange(1, n + 1) > 0)[0][-1]
+        return np.maximum(v - cumulative[k] / (k + 1), 0.0)
+
+    sv = np.sort(v)
+    prefix = np.concatenate([[0.0], np.cumsum(sv)])
+    taus = np.sort(np.concatenate([v - cap, v]))
+    full_from = np.searchsorted(sv, taus + cap, 'left')
+    partial_from = np.searchsorted(sv, taus, 'right')
+    totals = cap * (n - full_from) + (prefix[full_from] - prefix[partial_from]) \
+        - (full_from - partial_from) * taus
+    # totals falls as tau rises; find the segment where it crosses 1
+    k = np.searchsorted(-totals, -1.0, 'left')
+    if k == 0:
+        tau = taus[0]
+    else:
+        lo, hi = taus[k - 1], taus[min(k, len(taus) - 1)]
+        f_lo, f_hi = totals[k - 1], totals[min(k, len(taus) - 1)]
+        tau = lo if f_lo == f_hi else lo + (f_lo - 1) * (hi - lo) / (f_lo - f_hi)
+    return np.clip(v - tau, 0.0, cap)
+
+def _solve_active_set(cov: np.ndarray, mu: np.ndarray, risk_aversion: float, w: np.ndarray,
+                      cap: Optional[float] = None, tol: float = 1e-10) -> Optional[np.ndarray]:
+    """
+    Exact optimum for the active set of `w` (which weights sit at zero or at the cap), if it is the right one
+
+    With the active set fixed the problem is an equality-constrained QP,
+    solved with one linear system; the result is returned only when it
+    satisfies every KKT condition, otherwise None.
+    """
+    capped = np.zeros(len(w), dtype=bool) if cap is None or cap >= 1 else w >= cap
+    free = (w > 0) & ~capped
+    if not free.any():
+        return None
+    fixed = cap * capped.sum() if capped.any() else 0.0
+    linear = mu[free] - (risk_aversion * cap * cov[np.ix_(free, capped)].sum(axis=1) if capped.any() else 0.0)
+    try:
+        a, b = np.linalg.solve(cov[np.ix_(free, free)], np.column_stack([np.ones(free.sum()), linear])).T
+    except np.linalg.LinAlgError:
+        return None
+    # Budget multiplier that makes the free weights sum to what the capped ones leave
+    nu = (b.sum() - risk_aversion * (1 - fixed)) / a.sum()
+    candidate = np.where(capped, cap if cap is not None else 0.0, 0.0)
+    candidate[free] = (b - nu * a) / risk_aversion
+    if np.any(candidate[free] < -tol) or (cap is not None and np.any(candidate[free] > cap + tol)):
+        return None
+    reduced = risk_aversion * (cov @ candidate) - mu + nu
+    at_zero = ~free & ~capped
+    scale = tol * max(1.0, float(np.abs(mu).max()))
+    if np.any(reduced[at_zero] < -scale) or np.any(reduced[capped] > scale):
+        return None
+    return np.clip(candidate, 0.0, cap)
+
+def solve_mean_variance(cov: np.ndarray, mu: np.ndarray, risk_aversion: float,
+                        cap: Optional[float] = None, start: Optional[np.ndarray] = None,
+                        lipschitz: Optional[float] = None, tol: float = 1e-8,
+                        max_iter: int = 5000, check_every: int = 10) -> Tuple[np.ndarray, int]:
+    """
+    Maximize mu'w - risk_aversion/2 w'cov w over the (capped) simplex
+
+    Accelerated projected gradient (FISTA with adaptive restart) to find
+    which weights are zero or capped, then an exact solve on that active
+    set, tried every `check_every` iterations and accepted once it passes
+    the optimality conditions. A warm `start` from a neighbouring problem
+    (the previous frontier point) usually has the right active set already
+    and finishes without iterating.
+
+    Returns:
+        (weights, iterations)
+    """
+    n = len(mu)
+    if start is not None:
+        exact = _solve_active_set(cov, mu, risk_aversion, project_simplex(start, cap), cap)
+        if exact is not None:
+            return exact, 0
+    if lipschitz is None:
+        lipschitz = float(np.linalg.eigvalsh(cov)[-1])
+    step = 1.0 / (risk_aversion * lipschitz)
+    w = project_simplex(np.full(n, 1.0 / n) if start is None else start, cap)
+    y, momentum = w, 1.0
+    for iteration in range(1, max_iter + 1):
+        gradient = risk_aversion * (cov @ y) - mu
+        w_next = project_simplex(y - step * gradient, cap)
+        if np.max(np.abs(w_next - w)) < tol:
+            return w_next, iteration
+        if iteration % check_every == 0:
+            exact = _solve_active_set(cov, mu, risk_aversion, w_next, cap)
+            if exact is not None:
+                return exact, iteration
+        # Restart the momentum whenever it points uphill
+        if np.dot(gradient, w_next - w) > 0:
+            momentum = 1.0
+        next_momentum = (1 + np.sqrt(1 + 4 * momentum * momentum)) / 2
+        y = w_next + (momentum - 1) / next_momentum * (w_next - w)
+        w, momentum = w_next, next_momentum
+    return w, max_iter
+
+def risk_parity(cov: np.ndarray, budget: Optional[np.ndarray] = None,
+                tol: float = 1e-10, max_iter: int = 100) -> Tuple[np.ndarray, int]:
+    """
+    Weights whose risk contributions match `budget` (equal by default)
+
+    Newton's method on the convex form min 1/2 y'cov y - budget'log(y),
+    whose solution normalized to sum to one is the risk-parity portfolio.
+
+    Returns:
+        (weights, iterations)
+    """
+    n = len(cov)
+    budget = np.full(n, 1.0 / n) if budget is None else np.asarray(budget, dtype=float) / np.sum(budget)
+    y = 1.0 / np.sqrt(np.diag(cov))
+    y *= np.sqrt(1.0 / (y @ cov @ y))
+    objective = lambda z: 0.5 * z @ cov @ z - budget @ np.log(z)
+    for iteration in range(1, max_iter + 1):
+        gradient = cov @ y - budget / y
+        hessian = cov + np.diag(budget / (y * y))
+        direction = np.linalg.solve(hessian, gradient)
+        decrement = gradient @ direction
+        if decrement / 2 < tol:
+            break
+        # Backtrack to stay positive and keep descending
+        scale = 1.0
+        negative = direction > 0
+        if negative.any():
+            scale = min(1.0, 0.99 * np.min(y[negative] / direction[negative]))
+        current = objective(y)
+        while objective(y - scale * direction) > current - 0.25 * scale * decrement and scale > 1e-10:
+            scale *= 0.5
+        y = y - scale * direction
+    return y / y.sum(), iteration
+
+@dataclass
+class OptimizationResult:
+    """Frontier and reference portfolios for one universe and lookback"""
+    symbols: List[str]
+    mu: np.ndarray
+    cov: np.ndarray
+    frontier: pd.DataFrame
+    frontier_weights: np.ndarray
+    min_variance: np.ndarray
+    risk_parity: np.ndarray
+    max_sharpe: np.ndarray
+    shrinkage: float
+    iterations: int
+    solve_ms: float
+
+    def evaluate(self, weights: np.ndarray, risk_free: float = RISK_FREE_RATE) -> Dict[str, float]:
+        """Annualized return, volatility and Sharpe of a weight vector over `symbols`"""
+        weights = np.asarray(weights, dtype=float)
+        ret = float(weights @ self.mu)
+        vol = float(np.sqrt(max(weights @ self.cov @ weights, 0.0)))
+        return {'Return': ret, 'Volatility': vol, 'Sharpe': (ret - risk_free) / vol if vol > 0 else np.nan}
+
+    def portfolios(self) -> Dict[str, np.ndarray]:
+        return {'Minimum Variance': self.min_variance, 'Risk Parity': self.risk_parity,
+                'Max Sharpe': self.max_sharpe}
+
+    def weights_frame(self) -> pd.DataFrame:
+        """Weight % per symbol for each reference portfolio"""
+        return pd.DataFrame({'Symbol': self.symbols,
+                             **{name: weights * 100 for name, weights in self.portfolios().items()}})
+
+def estimate_inputs(closes: pd.DataFrame, lookback: int = DEFAULT_LOOKBACK) -> Tuple[List[str], np.ndarray, np.ndarray, float]:
+    """
+    Annualized mean returns and shrunk covariance from the last `lookback` daily returns
+
+    Symbols with gaps in the window are dropped.
+    """
+    window = closes.iloc[-(lookback + 1):].dropna(axis=1)
+    returns = np.log(window).diff().iloc[1:].to_numpy()
+    if returns.shape[0] < 2 or returns.shape[1] == 0:
+        raise ValueError("Not enough price history to optimize")
+    cov, intensity = shrink_covariance(returns)
+    return list(window.columns), returns.mean(axis=0) * TRADING_DAYS, cov * TRADING_DAYS, intensity
+
+def optimize_portfolio(closes: pd.DataFrame, lookback: int = DEFAULT_LOOKBACK, points: int = FRONTIER_POINTS,
+                       cap: Optional[float] = None, risk_free: float = RISK_FREE_RATE) -> OptimizationResult:
+    """
+    Efficient frontier plus minimum-variance, risk-parity and max-Sharpe weights
+
+    The frontier is traced from the minimum-variance end towards maximum
+    return by lowering risk aversion, each solve warm-started from the
+    previous one. Max Sharpe is the best frontier point.
+
+    Args:
+        closes: Date x symbol daily closes
+        lookback: Trading days of returns to use
+        points: Frontier points
+        cap: Optional maximum weight per asset
+    """
+    started = time.perf_counter()
+    symbols, mu, cov, intensity = estimate_inputs(closes, lookback)
+    lipschitz = float(np.linalg.eigvalsh(cov)[-1])
+
+    min_var, iterations = solve_mean_variance(cov, np.zeros(len(mu)), 1.0, cap, lipschitz=lipschitz)
+    # From nearly minimum variance down to nearly maximum return: risk aversion is
+    # scaled by how much return is on offer per unit of minimum variance
+    variance = max(float(min_var @ cov @ min_var), 1e-12)
+    scale = max(float(np.ptp(mu)), 1e-6) / variance
+    aversions = scale * np.logspace(2, -3, points)
+    weights = np.empty((points, len(mu)))
+    start = min_var
+    for i, aversion in enumerate(aversions):
+        start, used = solve_mean_variance(cov, mu, aversion, cap, start=start, lipschitz=lipschitz)
+        weights[i] = start
+        iterations += used
+
+    rets = weights @ mu
+    vols = np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', weights, cov, weights), 0.0))
+    sharpe = np.where(vols > 0, (rets - risk_free) / vols, -np.inf)
+    rp, rp_iterations = risk_parity(cov)
+    frontier = pd.DataFrame({'Return': rets, 'Volatility': vols, 'Sharpe': sharpe})
+
+    return OptimizationResult(
+        symbols=symbols, mu=mu, cov=cov, frontier=frontier, frontier_weights=weights,
+        min_variance=min_var, risk_parity=rp, max_sharpe=weights[int(np.argmax(sharpe))],
+        shrinkage=intensity, iterations=iterations + rp_iterations,
+        solve_ms=(time.perf_counter() - started) * 1000
+    )
+
+def optimization_key(universe: Sequence[str], lookback: int = DEFAULT_LOOKBACK, source: str = "live",
+                     **options: Any) -> Tuple:
+    """optimizer_cache key the result for these arguments is kept under"""
+    return (tuple(sorted(universe)), lookback, source, tuple(sorted(options.items())))
+
+def _optimize_loaded(load_closes: Callable[[], pd.DataFrame], lookback: int,
+                     options: Dict[str, Any]) -> Optional[OptimizationResult]:
+    try:
+        return optimize_portfolio(load_closes(), lookback, **options)
+    except ValueError:
+        return None
+
+def cached_optimization(universe: Sequence[str], load_closes: Callable[[], pd.DataFrame],
+                        lookback: int = DEFAULT_LOOKBACK, source: str = "live",
+                        **options: Any) -> Optional[OptimizationResult]:
+    """
+    optimize_portfolio on closes from `load_closes`, cached per (universe, lookback, source, options)
+
+    Loading the closes is usually the slow part, so it happens inside the
+    cache too. Returns None when there is too little history.
+    """
+    return optimizer_cache.get(optimization_key(universe, lookback, source, **options),
+                               lambda: _optimize_loaded(load_closes, lookback, options))
+
+def background_optimization(universe: Sequence[str], load_closes: Callable[[], pd.DataFrame],
+                            executor: Executor, lookback: int = DEFAULT_LOOKBACK, source: str = "live",
+                            **options: Any) -> Future:
+    """cached_optimization run on `executor`; callers in the same cache interval share one future"""
+    return optimizer_cache.get_async(optimization_key(universe, lookback, source, **options),
+                                     lambda: _optimize_loaded(load_closes, lookback, options), executor)
@@ -0,0 +1,388 @@
+"""
+Options - Contract parsing, vectorized implied volatility, Black-Scholes greeks and payoff curves
+"""
+
+import re
+from typing import Dict, Any, Optional
+from datetime import datetime, date, timedelta
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from utils.order_log import extract_records
+
+RISK_FREE_RATE = 0.065
+
+# Options stop trading at 15:30 IST on expiry day
+EXPIRY_CLOSE = (15, 30)
+
+DAYS_PER_YEAR = 365.0
+
+# Monthly expiry weekday per exchange (Mon=0): NSE moved to Tuesday, BSE expires Thursday
+MONTHLY_EXPIRY_WEEKDAY = {'NFO': 1, 'BFO': 3}
+
+# Index names in F&O symbols -> the instrument quoting the underlying
+INDEX_UNDERLYINGS = {
+    'NIFTY': 'NSE:NIFTY 50',
+    'BANKNIFTY': 'NSE:NIFTY BANK',
+    'FINNIFTY': 'NSE:NIFTY FIN SERVICE',
+    'MIDCPNIFTY': 'NSE:NIFTY MID SELECT',
+    'NIFTYNXT50': 'NSE:NIFTY NEXT 50',
+    'SENSEX': 'BSE:SENSEX',
+    'BANKEX': 'BSE:BANKEX',
+    'SENSEX50': 'BSE:SENSEX50'
+}
+
+CALL = "CE"
+PUT = "PE"
+FUTURE = "FUT"
+
+_MONTHS = {name.upper(): i for i, name in enumerate(calendar.month_abbr) if name}
+# Weekly contracts encode the month as 1-9, O, N, D
+_WEEKLY_MONTHS = {**{str(i): i for i in range(1, 10)}, 'O': 10, 'N': 11, 'D': 12}
+
+# NAME YY MON STRIKE CE|PE  (monthly),  NAME YY M DD STRIKE CE|PE  (weekly),  NAME YY MON FUT
+_CONTRACT_PATTERN = (
+    r'^(?P<name>[A-Z0-9&\-]+?)(?P<yy>\d{2})'
+    r'(?:(?P<mon>JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)|(?P<wm>[1-9OND])(?P<dd>\d{2}))'
+    r'(?:(?P<strike>\d+(?:\.\d+)?)(?P<kind>CE|PE)|(?P<fut>FUT))$'
+)
+
+_CONTRACT = re.compile(_CONTRACT_PATTERN)
+
+def option_strike(tradingsymbol: str) -> Optional[float]:
+    """Strike of one option trading symbol, None for anything else"""
+    match = _CONTRACT.match(tradingsymbol.upper())
+    return float(match['strike']) if match and match['strike'] else None
+
+def _last_weekday(year: int, month: int, weekday: int) -> date:
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def front_month_expiry(now: Optional[datetime] = None, exchange: str = "NFO") -> date:
+    """Nearest monthly expiry still to come (next month's once this month's has passed)"""
+    now = now or datetime.now()
+    weekday = MONTHLY_EXPIRY_WEEKDAY[exchange]
+    expiry = _last_weekday(now.year, now.month, weekday)
+    if expiry <= now.date():
+        year, month = (now.year + 1, 1) if now.month == 12 else (now.year, now.month + 1)
+        expiry = _last_weekday(year, month, weekday)
+    return expiry
+
+def underlying_instrument(name: str, exchange: str = "NFO") -> str:
+    """Instrument that quotes an F&O underlying (indices by name, stocks on the cash segment)"""
+    if name in INDEX_UNDERLYINGS:
+        return INDEX_UNDERLYINGS[name]
+    return f"{'BSE' if exchange == 'BFO' else 'NSE'}:{name}"
+
+def parse_contracts(symbols: pd.Series, exchanges: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Contract metadata from Kite F&O trading symbols
+
+    Each distinct (symbol, exchange) pair is parsed once with a single regex
+    pass and the result broadcast back to every row. Monthly expiries are
+    the exchange's last expiry weekday of the month; holiday shifts are not
+    known from the symbol, so prefer the instrument master's `expiry` when
+    positions carry it (contracts_frame does).
+
+    Returns:
+        Frame aligned to `symbols` with Name, Kind (CE/PE/FUT, NaN for non-F&O),
+        Strike, Expiry and Underlying
+    """
+    symbols = pd.Series(symbols, dtype=object).astype(str).str.upper().reset_index(drop=True)
+    exchanges = (pd.Series('NFO', index=symbols.index, dtype=object) if exchanges is None
+                 else pd.Series(exchanges, dtype=object).reset_index(drop=True).fillna('NFO'))
+    rows, unique = pd.factorize(exchanges.astype(str) + ' ' + symbols)
+    unique_exchanges = unique.str.split(' ', n=1).str[0]
+    parts = pd.Series(unique.str.split(' ', n=1).str[1]).str.extract(_CONTRACT_PATTERN)
+
+    expiry = []
+    for yy, mon, wm, dd, exchange in zip(parts['yy'], parts['mon'], parts['wm'], parts['dd'], unique_exchanges):
+        if not isinstance(yy, str):
+            expiry.append(pd.NaT)
+        elif isinstance(mon, str):
+            expiry.append(_last_weekday(2000 + int(yy), _MONTHS[mon], MONTHLY_EXPIRY_WEEKDAY.get(exchange, 1)))
+        else:
+            try:
+                expiry.append(date(2000 + int(yy), _WEEKLY_MONTHS[wm], int(dd)))
+            except ValueError:
+                expiry.append(pd.NaT)
+
+    names = parts['name']
+    parsed = pd.DataFrame({
+        'Name': names,
+        'Kind': parts['kind'].where(parts['kind'].notna(), parts['fut']),
+        'Strike': pd.to_numeric(parts['strike'], errors='coerce'),
+        'Expiry': pd.to_datetime(pd.Series(expiry, dtype=object)),
+        'Underlying': [underlying_instrument(n, e) if isinstance(n, str) else None
+                       for n, e in zip(names, unique_exchanges)]
+    })
+    return parsed.iloc[rows].reset_index(drop=True)
+
+def contracts_frame(positions: Any) -> pd.DataFrame:
+    """
+    F&O legs from get_positions data (or any position records) with parsed contract fields
+
+    Non-F&O rows and closed positions (zero quantity) are dropped.
+    """
+    if isinstance(positions, dict):
+        positions = positions.get('data', positions)
+    records = extract_records(positions.get('net', []) if isinstance(positions, dict) else positions)
+    if not records:
+        return pd.DataFrame(columns=['Symbol', 'Exchange', 'Name', 'Kind', 'Strike', 'Expiry', 'Underlying',
+                                     'Quantity', 'Avg Price', 'LTP'])
+    df = pd.DataFrame(records)
+    symbols = df.get('tradingsymbol', df.get('symbol', pd.Series('', index=df.index)))
+    exchanges = df.get('exchange', pd.Series('NFO', index=df.index))
+    contracts = parse_contracts(symbols, exchanges)
+
+    # The instrument master's fields, when present, beat what the symbol implies
+    if 'expiry' in df:
+        contracts['Expiry'] = pd.to_datetime(df['expiry'], errors='coerce').fillna(contracts['Expiry'])
+    if 'strike' in df:
+        contracts['Strike'] = pd.to_numeric(df['strike'], errors='coerce').where(
+            lambda s: s > 0, contracts['Strike'])
+
+    def numeric(column: str, default: float) -> np.ndarray:
+        values = pd.to_numeric(df[column], errors='coerce') if column in df else pd.Series(np.nan, index=df.index)
+        return values.fillna(default).to_numpy(dtype=float)
+
+    legs = pd.DataFrame({
+        'Symbol': symbols.values,
+        'Exchange': exchanges.values,
+        **{column: contracts[column].values for column in contracts},
+        # Kite quantities are in units; multiplier is 1 except for lot-quoted segments
+        'Quantity': numeric('quantity', 0) * numeric('multiplier', 1),
+        'Avg Price': numeric('average_price', np.nan),
+        'LTP': numeric('last_price', np.nan)
+    })
+    return legs[legs['Kind'].notna() & (legs['Quantity'] != 0)].reset_index(drop=True)
+
+def _erfc(x: np.ndarray) -> np.ndarray:
+    """Complementary error function (Chebyshev fit, fractional error < 1.2e-7)"""
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = (-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277)))))))))
+    r = t * np.exp(poly)
+    return np.where(x >= 0, r, 2.0 - r)
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    return 0.5 * _erfc(-np.asarray(x, dtype=float) / np.sqrt(2.0))
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+def _d1_d2(S, K, T, r, sigma):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol_sqrt_t = sigma * np.sqrt(T)
+        d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / vol_sqrt_t
+    return d1, d1 - vol_sqrt_t
+
+def black_scholes_price(S, K, T, r, sigma, is_call) -> np.ndarray:
+    """European option value; broadcasts over all arguments"""
+    S, K, T, sigma = (np.asarray(a, dtype=float) for a in (S, K, T, sigma))
+    d1, d2 = _d1_d2(S, K, T, r, sigma)
+    discount = np.exp(-r * T)
+    call = S * norm_cdf(d1) - K * discount * norm_cdf(d2)
+    put = K * discount * norm_cdf(-d2) - S * norm_cdf(-d1)
+    value = np.where(is_call, call, put)
+    # At or past expiry (or zero vol) the option is worth its intrinsic value
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    return np.where((T > 0) & (sigma > 0), value, intrinsic)
+
+def implied_volatility(price, S, K, T, r, is_call, tol: float = 1e-6, max_iter: int = 50,
+                       low: float = 1e-4, high: float = 5.0) -> np.ndarray:
+    """
+    Implied volatility for every contract at once
+
+    Safeguarded Newton: each iteration takes a Newton step on all unsolved
+    contracts and falls back to bisecting the [low, high] bracket wherever
+    the step leaves it or vega is too small to trust. Prices outside the
+    no-arbitrage bounds, or expired contracts, give NaN.
+    """
+    price, S, K, T = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, S, K, T)))
+    is_call = np.broadcast_to(is_call, price.shape)
+    discount = np.exp(-r * T)
+    lower_bound = np.where(is_call, np.maximum(S - K * discount, 0.0), np.maximum(K * discount - S, 0.0))
+    upper_bound = np.where(is_call, S, K * discount)
+    valid = (T > 0) & (price > lower_bound) & (price < upper_bound) & (S > 0) & (K > 0)
+
+    lo = np.full(price.shape, low)
+    hi = np.full(price.shape, high)
+    # Brenner-Subrahmanyam start, clipped into the bracket
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.clip(np.sqrt(2 * np.pi / T) * price / S, low * 10, high / 2)
+    sigma = np.where(valid, sigma, 0.2)
+    active = valid.copy()
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        idx = np.nonzero(active)[0] if price.ndim == 1 else np.nonzero(active.ravel())[0]
+        s, k, t, p, c = (a.ravel()[idx] for a in (S, K, T, price, is_call))
+        sig = sigma.ravel()[idx]
+        diff = black_scholes_price(s, k, t, r, sig, c) - p
+        d1, _ = _d1_d2(s, k, t, r, sig)
+        vega = s * norm_pdf(d1) * np.sqrt(t)
+
+        # Tighten the bracket using the sign of the pricing error
+        lo_flat, hi_flat = lo.ravel(), hi.ravel()
+        lo_flat[idx] = np.where(diff < 0, sig, lo_flat[idx])
+        hi_flat[idx] = np.where(diff > 0, sig, hi_flat[idx])
+
+        # Converged contracts keep the volatility that priced them
+        done = np.abs(diff) < tol * np.maximum(1.0, p)
+        active.ravel()[idx[done]] = False
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = sig - diff / vega
+        bisect = 0.5 * (lo_flat[idx] + hi_flat[idx])
+        use_newton = (vega > 1e-8) & (step > lo_flat[idx]) & (step < hi_flat[idx])
+        sigma.ravel()[idx] = np.where(done, sig, np.where(use_newton, step, bisect))
+
+    return np.where(valid, sigma, np.nan)
+
+def greeks(S, K, T, r, sigma, is_call) -> Dict[str, np.ndarray]:
+    """
+    Black-Scholes greeks per unit of the option
+
+    Returns delta, gamma, theta (per calendar day) and vega (per 1 vol
+    point). Expired or volatility-less contracts get intrinsic delta and
+    zero for the rest.
+    """
+    S, K, T, sigma = (np.asarray(a, dtype=float) for a in (S, K, T, sigma))
+    live = (T > 0) & (sigma > 0)
+    d1, d2 = _d1_d2(S, K, T, r, sigma)
+    pdf = norm_pdf(d1)
+    discount = np.exp(-r * T)
+    sqrt_t = np.sqrt(np.maximum(T, 0.0))
+
+    delta = np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = pdf / (S * sigma * sqrt_t)
+        decay = -S * pdf * sigma / (2 * sqrt_t)
+    theta = np.where(is_call, decay - r * K * discount * norm_cdf(d2),
+                     decay + r * K * discount * norm_cdf(-d2)) / DAYS_PER_YEAR
+    vega = S * pdf * sqrt_t / 100
+
+    expired_delta = np.where(is_call, (S > K).astype(float), -(S < K).astype(float))
+    return {
+        'delta': np.where(live, delta, expired_delta),
+        'gamma': np.where(live, gamma, 0.0),
+        'theta': np.where(live, theta, 0.0),
+        'vega': np.where(live, vega, 0.0)
+    }
+
+def years_to_expiry(expiry: pd.Series, now: Optional[datetime] = None) -> np.ndarray:
+    """Year fraction until 15:30 on each expiry date (negative once expired)"""
+    now = pd.Timestamp(now or datetime.now())
+    close = pd.to_datetime(expiry) + pd.Timedelta(hours=EXPIRY_CLOSE[0], minutes=EXPIRY_CLOSE[1])
+    return ((close - now).dt.total_seconds() / (DAYS_PER_YEAR * 86400)).to_numpy(dtype=float)
+
+def analyze_legs(legs: pd.DataFrame, spots: Dict[str, float], now: Optional[datetime] = None,
+                 r: float = RISK_FREE_RATE) -> pd.DataFrame:
+    """
+    Per-leg IV and position greeks (unit greeks x signed quantity)
+
+    Futures carry delta 1 per unit and no other greeks. Legs whose underlying
+    has no spot price get NaN analytics.
+    """
+    legs = legs.copy()
+    spot = legs['Underlying'].map(spots).to_numpy(dtype=float)
+    T = years_to_expiry(legs['Expiry'], now)
+    is_option = legs['Kind'].isin([CALL, PUT]).to_numpy()
+    is_call = (legs['Kind'] == CALL).to_numpy()
+    strike = legs['Strike'].to_numpy(dtype=float)
+    ltp = legs['LTP'].to_numpy(dtype=float)
+    quantity = legs['Quantity'].to_numpy(dtype=float)
+
+    iv = np.full(len(legs), np.nan)
+    if is_option.any():
+        iv[is_option] = implied_volatility(ltp[is_option], spot[is_option], strike[is_option],
+                                           T[is_option], r, is_call[is_option])
+    unit = greeks(spot, np.where(is_option, strike, spot), T, r, np.nan_to_num(iv), is_call)
+
+    legs['Spot'] = spot
+    legs['Days'] = np.maximum(T, 0) * DAYS_PER_YEAR
+    legs['IV %'] = iv * 100
+    legs['Delta'] = np.where(is_option, unit['delta'], 1.0) * quantity * np.where(np.isnan(spot), np.nan, 1.0)
+    for name in ('gamma', 'theta', 'vega'):
+        legs[name.capitalize()] = np.where(is_option, unit[name], 0.0) * quantity
+    legs['Delta ₹'] = legs['Delta'] * spot
+    return legs
+
+def portfolio_greeks(analyzed: pd.DataFrame) -> pd.DataFrame:
+    """Net greeks per underlying, plus a TOTAL row for the rupee-denominated ones"""
+    if analyzed.empty:
+        return pd.DataFrame(columns=['Underlying', 'Legs', 'Delta', 'Gamma', 'Theta', 'Vega', 'Delta ₹'])
+    grouped = analyzed.groupby('Underlying', sort=True).agg(
+        Legs=('Symbol', 'size'), Delta=('Delta', 'sum'), Gamma=('Gamma', 'sum'),
+        Theta=('Theta', 'sum'), Vega=('Vega', 'sum'), **{'Delta ₹': ('Delta ₹', 'sum')}
+    ).reset_index()
+    total = {'Underlying': 'TOTAL', 'Legs': grouped['Legs'].sum(), 'Delta': np.nan, 'Gamma': np.nan,
+             'Theta': grouped['Theta'].sum(), 'Vega': grouped['Vega'].sum(),
+             'Delta ₹': grouped['Delta ₹'].sum()}
+    return pd.concat([grouped, pd.DataFrame([total])], ignore_index=True)
+
+def payoff_curve(analyzed: pd.DataFrame, underlying: str, width: float = 0.15, points: int = 201,
+                 now: Optional[datetime] = None, r: float = RISK_FREE_RATE) -> pd.DataFrame:
+    """
+    P&L across underlying prices for one underlying's legs
+
+    'Expiry' settles every leg at intrinsic value; 'Today' revalues options
+    at their current implied volatility. Both are one (points x legs) array
+    operation.
+    """
+    legs = analyzed[analyzed['Underlying'] == underlying]
+    spot = float(legs['Spot'].iloc[0]) if len(legs) else np.nan
+    grid = np.linspace(spot * (1 - width), spot * (1 + width), points)[:, None]
+
+    # Same contract held in several rows (e.g. across accounts) is priced once
+    contracts = legs.assign(Cost=legs['Avg Price'] * legs['Quantity']).groupby('Symbol', sort=False).agg(
+        Kind=('Kind', 'first'), Strike=('Strike', 'first'), Expiry=('Expiry', 'first'),
+        IV=('IV %', 'first'), Quantity=('Quantity', 'sum'), Cost=('Cost', 'sum'))
+    strike = contracts['Strike'].to_numpy(dtype=float)
+    quantity = contracts['Quantity'].to_numpy(dtype=float)
+    cost = contracts['Cost'].sum()
+    is_option = contracts['Kind'].isin([CALL, PUT]).to_numpy()
+    is_call = (contracts['Kind'] == CALL).to_numpy()
+    sigma = np.nan_to_num(contracts['IV'].to_numpy(dtype=float) / 100)
+    T = np.maximum(years_to_expiry(contracts['Expiry'], now), 0.0)
+
+    intrinsic = np.where(is_call, np.maximum(grid - strike, 0.0), np.maximum(strike - grid, 0.0))
+    at_expiry = np.where(is_option, intrinsic, grid)
+    today = np.where(is_option, black_scholes_price(grid, strike, T, r, sigma, is_call), grid)
+    return pd.DataFrame({
+        'Spot': grid[:, 0],
+        'Expiry': at_expiry @ quantity - cost,
+        'Today': today @ quantity - cost
+    })
+
+def sample_option_positions(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Demo F&O book: a NIFTY iron condor, a BANKNIFTY long straddle and a
+    NIFTY future, priced from Black-Scholes so the IVs come back sensible
+    """
+    now = now or datetime.now()
+    spots = {'NSE:NIFTY 50': 24350.0, 'NSE:NIFTY BANK': 52180.0}
+    expiry = front_month_expiry(now)
+    code = f"{expiry:%y}{calendar.month_abbr[expiry.month].upper()}"
+
+    # (name, strike, kind, quantity, iv, entry premium as a fraction of fair value)
+    book = [('NIFTY', 23800, PUT, 75, 0.16, 1.10), ('NIFTY', 24000, PUT, -75, 0.15, 1.05),
+            ('NIFTY', 24700, CALL, -75, 0.13, 1.08), ('NIFTY', 24900, CALL, 75, 0.13, 1.12),
+            ('BANKNIFTY', 52200, CALL, 35, 0.17, 0.95), ('BANKNIFTY', 52200, PUT, 35, 0.17, 0.92)]
+    T = years_to_expiry(pd.Series([pd.Timestamp(expiry)]), now)[0]
+    net = []
+    for name, strike, kind, quantity, vol, entry in book:
+        spot = spots[INDEX_UNDERLYINGS[name]]
+        ltp = round(float(black_scholes_price(spot, strike, T, RISK_FREE_RATE, vol, kind == CALL)), 2)
+        net.append({'tradingsymbol': f"{name}{code}{strike}{kind}", 'exchange': 'NFO',
+                    'quantity': quantity, 'average_price': round(ltp * entry, 2), 'last_price': ltp})
+    net.append({'tradingsymbol': f"NIFTY{code}FUT", 'exchange': 'NFO', 'quantity': 75,
+                'average_price': 24290.0, 'last_price': 24395.0})
+    return {'net': net, 'spots': spots}
@@ -0,0 +1,86 @@
+"""
+Order Events - Turn order book changes into typed fill/rejection/cancellation events
+"""
+
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+# Event types
+FILLED = 'FILLED'
+PARTIALLY_FILLED = 'PARTIALLY_FILLED'
+REJECTED = 'REJECTED'
+CANCELLED = 'CANCELLED'
+
+EVENT_ICONS = {
+    FILLED: '✅',
+    PARTIALLY_FILLED: '🟡',
+    REJECTED: '❌',
+    CANCELLED: '🚫'
+}
+
+@dataclass
+class OrderEvent:
+    """A notable change in one order's state"""
+    event_type: str
+    order_id: str
+    symbol: str
+    transaction_type: str
+    quantity: int
+    filled_quantity: int
+    price: float
+    message: str = ''
+
+    def describe(self) -> str:
+        """Short human readable text for notifications"""
+        icon = EVENT_ICONS.get(self.event_type, 'ℹ️')
+        if self.event_type == PARTIALLY_FILLED:
+            detail = f"{self.filled_quantity}/{self.quantity} filled"
+        elif self.event_type == FILLED:
+            detail = f"{self.quantity} filled at ₹{self.price:.2f}"
+        else:
+            detail = self.message or self.event_type.lower()
+        return f"{icon} {self.transaction_type} {self.symbol}: {detail}"
+
+def classify_change(previous: Optional[Dict], current: Dict) -> Optional[str]:
+    """Return the event type for one order transition, or None if it is not notable"""
+    status = current.get('status')
+    previous_status = previous.get('status') if previous else None
+
+    if status != previous_status:
+        if status == 'COMPLETE':
+            return FILLED
+        if status == 'REJECTED':
+            return REJECTED
+        if status == 'CANCELLED':
+            return CANCELLED
+
+    filled = current.get('filled_quantity') or 0
+    previous_filled = (previous.get('filled_quantity') or 0) if previous else 0
+    if status not in ('COMPLETE', 'REJECTED', 'CANCELLED') and filled > previous_filled:
+        return PARTIALLY_FILLED
+
+    return None
+
+def diff_orders(changes: List[Tuple[Optional[Dict], Dict]]) -> List[OrderEvent]:
+    """
+    Build events from (previous, current) order pairs
+
+    Only orders whose record actually changed are passed in (see
+    EntryLog.merge), so this is O(changed) regardless of order book size.
+    """
+    events = []
+    for previous, current in changes:
+        event_type = classify_change(previous, current)
+        if event_type is None:
+            continue
+        events.append(OrderEvent(
+            event_type=event_type,
+            order_id=str(current.get('order_id')),
+            symbol=f"{current.get('exchange', '')}:{current.get('tradingsymbol', '')}",
+            transaction_type=current.get('transaction_type', ''),
+            quantity=current.get('quantity') or 0,
+            filled_quantity=current.get('filled_quantity') or 0,
+            price=current.get('average_price') or current.get('price') or 0.0,
+            message=current.get('status_message') or ''
+        ))
+    return events
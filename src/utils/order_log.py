@@ -0,0 +1,151 @@
+"""
+Order Log - Local order book and trade history, synced incrementally from the MCP server
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, field
+
+from utils.kite_mcp_client import KiteMCPClient, MCPResponse
+
+# Order statuses after which Kite never changes an order again
+TERMINAL_STATUSES = {'COMPLETE', 'REJECTED', 'CANCELLED'}
+
+def extract_records(data: Any) -> List[Dict]:
+    """Pull the list of records out of a (possibly paginated) MCP payload"""
+    if isinstance(data, dict):
+        data = data.get('data', [])
+    return data if isinstance(data, list) else []
+
+@dataclass
+class SyncResult:
+    """Outcome of one incremental sync"""
+    success: bool
+    fetched: int = 0
+    added: int = 0
+    updated: int = 0
+    error: Optional[str] = None
+    initial: bool = False
+    changes: List[Tuple[Optional[Dict], Dict]] = field(default_factory=list)
+
+class EntryLog(ABC):
+    """Local log of orders or trades keyed by id, kept in server (arrival) order"""
+
+    def __init__(self, key: str, timestamp_fields: List[str]):
+        """
+        Args:
+            key: Field that uniquely identifies an entry (order_id / trade_id)
+            timestamp_fields: Fields carrying the entry's update time (newest one is tracked)
+        """
+        self.key = key
+        self.timestamp_fields = timestamp_fields
+        self.entries: Dict[str, Dict] = {}
+        self.ids: List[str] = []
+        self.last_timestamp: Optional[str] = None
+        self.changes: List[Tuple[Optional[Dict], Dict]] = []
+        # Set by the first successful sync, even when the server had no entries yet
+        self.synced = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _timestamp(self, record: Dict) -> str:
+        """Latest known update time of a record ('' when the server sends none)"""
+        return max((str(record.get(field) or '') for field in self.timestamp_fields), default='')
+
+    def merge(self, records: List[Dict]) -> tuple[int, int]:
+        """
+        Merge fetched records into the log
+
+        New ids are appended and known ids replaced in place, so a status
+        change never moves an entry; re-fetched unchanged entries are skipped.
+        (previous, current) pairs for everything that did change are kept in
+        self.changes until the next merge.
+
+        Returns:
+            (added, updated) counts
+        """
+        added = updated = 0
+        self.changes = []
+        for record in records:
+            entry_id = record.get(self.key)
+            if entry_id is None:
+                continue
+            entry_id = str(entry_id)
+            timestamp = self._timestamp(record)
+
+            existing = self.entries.get(entry_id)
+            if existing is None:
+                self.ids.append(entry_id)
+                added += 1
+            elif record == existing:
+                continue
+            else:
+                updated += 1
+
+            self.changes.append((existing, record))
+            self.entries[entry_id] = record
+            if timestamp and (self.last_timestamp is None or timestamp > self.last_timestamp):
+                self.last_timestamp = timestamp
+
+        return added, updated
+
+    def sync_offset(self) -> int:
+        """Position in the server's list from which entries may still be new or changed"""
+        return len(self.ids)
+
+    @abstractmethod
+    def _fetch(self, client: KiteMCPClient, from_index: int) -> MCPResponse:
+        """Request the server's entries starting at from_index"""
+
+    def sync(self, client: KiteMCPClient) -> SyncResult:
+        """Fetch only entries at or after sync_offset() and merge them"""
+        response = self._fetch(client, self.sync_offset())
+        if not response.success:
+            return SyncResult(success=False, error=response.error)
+
+        initial = not self.synced
+        records = extract_records(response.data)
+        added, updated = self.merge(records)
+        self.synced = True
+        return SyncResult(success=True, fetched=len(records), added=added, updated=updated,
+                          initial=initial, changes=self.changes)
+
+    def page(self, page: int = 1, page_size: int = 50) -> List[Dict]:
+        """Return one page of entries, newest first, without touching the rest of the log"""
+        end = len(self.ids) - (page - 1) * page_size
+        start = max(end - page_size, 0)
+        if end <= 0:
+            return []
+        return [self.entries[entry_id] for entry_id in reversed(self.ids[start:end])]
+
+    def page_count(self, page_size: int = 50) -> int:
+        """Number of pages needed to show the whole log"""
+        return max(1, -(-len(self.ids) // page_size))
+
+class OrderLog(EntryLog):
+    """Order book log; only orders from the first still-open one onward are re-fetched"""
+
+    def __init__(self):
+        super().__init__('order_id', ['order_timestamp', 'exchange_update_timestamp'])
+        self._first_open = 0
+
+    def sync_offset(self) -> int:
+        # Everything before the first non-terminal order is final. The pointer
+        # only moves forward, so the scan is amortized O(1) per sync.
+        while (self._first_open < len(self.ids) and
+               self.entries[self.ids[self._first_open]].get('status') in TERMINAL_STATUSES):
+            self._first_open += 1
+        return self._first_open
+
+    def _fetch(self, client: KiteMCPClient, from_index: int) -> MCPResponse:
+        return client.get_orders(from_index=from_index)
+
+class TradeLog(EntryLog):
+    """Trade history log; trades are immutable so only unseen positions are fetched"""
+
+    def __init__(self):
+        super().__init__('trade_id', ['fill_timestamp', 'exchange_timestamp'])
+
+    def _fetch(self, client: KiteMCPClient, from_index: int) -> MCPResponse:
+        return client.get_trades(from_index=from_index)
@@ -0,0 +1,248 @@
+"""
+Performance - Replay a trade log against daily closes for NAV, TWR, XIRR and attribution
+"""
+
+from typing import Dict, List, Any, Optional, Sequence
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from utils.timed_cache import TimedCache
+
+# Fills during the day show up in the report within this many seconds
+PERFORMANCE_CACHE_SECONDS = 15 * 60
+
+# Live reports per (user, holdings, day), shared by every session in the process
+performance_cache = TimedCache(PERFORMANCE_CACHE_SECONDS)
+
+TIMESTAMP_FIELDS = ['fill_timestamp', 'exchange_timestamp', 'order_timestamp', 'trade_date', 'date']
+PRICE_FIELDS = ['average_price', 'price']
+
+@dataclass
+class PerformanceReport:
+    """Daily NAV and returns reconstructed from trades, with attribution"""
+    nav: pd.Series
+    net_flows: pd.Series
+    daily_returns: pd.Series
+    holdings: pd.DataFrame
+    xirr: Optional[float]
+    # Symbols whose trades were left out for lack of closes (skip_missing=True)
+    skipped: List[str] = field(default_factory=list)
+
+    @property
+    def twr(self) -> pd.Series:
+        """Cumulative time-weighted return"""
+        return (1 + self.daily_returns).cumprod() - 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Headline figures: NAV, total P&L, TWR and XIRR (percent)"""
+        return {
+            'nav': float(self.nav.iloc[-1]) if len(self.nav) else 0.0,
+            'total_pnl': float(self.holdings['P&L'].sum()) if len(self.holdings) else 0.0,
+            'twr': float(self.twr.iloc[-1] * 100) if len(self.nav) else 0.0,
+            'xirr': None if self.xirr is None else self.xirr * 100
+        }
+
+    def sector_attribution(self, sectors: Dict[str, str]) -> pd.DataFrame:
+        """Roll holding attribution up to sectors; unmapped symbols are 'Other'"""
+        sector = self.holdings['Symbol'].map(sectors).fillna('Other')
+        grouped = self.holdings.groupby(sector, sort=False)[['Market Value', 'P&L', 'Contribution %']].sum()
+        return grouped.rename_axis('Sector').sort_values('Contribution %', ascending=False).reset_index()
+
+def _first_column(df: pd.DataFrame, names: Sequence[str]) -> pd.Series:
+    for name in names:
+        if name in df.columns:
+            return df[name]
+    raise ValueError(f"Trades need one of: {', '.join(names)}")
+
+def trades_frame(trades: List[Dict]) -> pd.DataFrame:
+    """Normalize Kite trade records to date / symbol / signed quantity / price columns"""
+    df = pd.DataFrame(trades)
+    if df.empty:
+        return pd.DataFrame(columns=['date', 'symbol', 'quantity', 'price'])
+    side = np.where(df['transaction_type'].astype(str).str.upper().to_numpy() == 'SELL', -1.0, 1.0)
+    return pd.DataFrame({
+        'date': pd.to_datetime(_first_column(df, TIMESTAMP_FIELDS)).dt.normalize(),
+        'symbol': _first_column(df, ['tradingsymbol', 'symbol']).astype(str),
+        'quantity': side * _first_column(df, ['quantity', 'filled_quantity']).to_numpy(dtype=float),
+        'price': _first_column(df, PRICE_FIELDS).to_numpy(dtype=float)
+    })
+
+def xirr(dates: Sequence, amounts: Sequence[float], guess: float = 0.1) -> Optional[float]:
+    """
+    Annualized money-weighted return of dated cash flows (negative = invested)
+
+    Newton's method on the whole flow vector at once, falling back to
+    bisection when Newton leaves the valid range. None if the flows never
+    change sign.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    if len(amounts) == 0 or amounts.min() >= 0 or amounts.max() <= 0:
+        return None
+    days = pd.to_datetime(pd.Series(dates)).to_numpy()
+    years = (days - days.min()) / np.timedelta64(1, 'D') / 365.0
+
+    def npv(rate: float) -> float:
+        return float((amounts / (1 + rate) ** years).sum())
+
+    rate = guess
+    for _ in range(50):
+        growth = (1 + rate) ** years
+        value = (amounts / growth).sum()
+        slope = (-years * amounts / (growth * (1 + rate))).sum()
+        if slope == 0:
+            break
+        step = value / slope
+        rate -= step
+        if rate <= -0.9999 or not np.isfinite(rate):
+            break
+        if abs(step) < 1e-10:
+            return float(rate)
+
+    low, high = -0.9999, 10.0
+    if npv(low) * npv(high) > 0:
+        return None
+    for _ in range(200):
+        mid = (low + high) / 2
+        if npv(low) * npv(mid) <= 0:
+            high = mid
+        else:
+            low = mid
+    return float((low + high) / 2)
+
+def replay_trades(trades: List[Dict], closes: pd.DataFrame,
+                  opening: Optional[Dict[str, float]] = None, skip_missing: bool = False) -> PerformanceReport:
+    """
+    Rebuild daily NAV and returns by replaying trades against closing prices
+
+    Trades are bucketed into a (days, symbols) quantity matrix with one
+    bincount, and positions are its cumulative sum, so the cost is a few
+    array passes however many trades there are. Trades dated on a
+    non-trading day count on the next available close.
+
+    Daily returns use the day's P&L over the capital at risk that day:
+    yesterday's NAV plus today's purchases. This keeps the return defined
+    when a position is opened from zero or sold out completely.
+
+    Args:
+        trades: Kite trade records (or dicts with date/symbol/quantity/price)
+        closes: Date x symbol close prices, e.g. utils.backtest.close_matrix
+        opening: Quantities held before the first trade, bought at the first close
+        skip_missing: Leave out trades in symbols without closes (listed in
+            the report's `skipped`) instead of raising ValueError
+
+    Returns:
+        PerformanceReport
+    """
+    tf = trades_frame(trades)
+    dates = closes.index
+    prices = closes.ffill().to_numpy(dtype=float)
+    symbols = list(closes.columns)
+    n_days, n_symbols = prices.shape
+
+    column = pd.Index(symbols).get_indexer(tf['symbol'])
+    skipped = []
+    if (column < 0).any():
+        missing = sorted(set(tf['symbol'][column < 0]))
+        if not skip_missing:
+            raise ValueError(f"No closes for: {', '.join(missing[:10])}")
+        skipped = missing
+        tf = tf[column >= 0]
+        column = column[column >= 0]
+    if n_days == 0:
+        empty = pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+        return PerformanceReport(nav=empty.rename('NAV'), net_flows=empty.rename('Net Flow'),
+                                 daily_returns=empty.rename('Return'),
+                                 holdings=pd.DataFrame(columns=['Symbol', 'Quantity', 'Market Value', 'Net Invested',
+                                                                'P&L', 'Contribution %']),
+                                 xirr=None, skipped=skipped)
+    row = np.searchsorted(dates.to_numpy(), tf['date'].to_numpy(), side='left')
+    in_range = row < n_days
+    row, column = row[in_range], column[in_range]
+    quantity = tf['quantity'].to_numpy()[in_range]
+    value = quantity * tf['price'].to_numpy()[in_range]
+
+    cell = row * n_symbols + column
+    size = n_days * n_symbols
+    traded = np.bincount(cell, weights=quantity, minlength=size).reshape(n_days, n_symbols)
+    flows = np.bincount(cell, weights=value, minlength=size).reshape(n_days, n_symbols)
+    bought = np.bincount(cell, weights=np.maximum(value, 0.0), minlength=size).reshape(n_days, n_symbols)
+
+    if opening:
+        opening_qty = np.array([opening.get(s, 0.0) for s in symbols], dtype=float)
+        traded[0] += opening_qty
+        flows[0] += opening_qty * np.nan_to_num(prices[0])
+        bought[0] += opening_qty * np.nan_to_num(prices[0])
+
+    position = np.cumsum(traded, axis=0)
+    market_value = np.nan_to_num(position * prices)
+    previous_value = np.vstack((np.zeros((1, n_symbols)), market_value[:-1]))
+    pnl = market_value - previous_value - flows
+
+    nav = market_value.sum(axis=1)
+    capital = previous_value.sum(axis=1) + bought.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily_returns = np.where(capital > 0, pnl.sum(axis=1) / capital, 0.0)
+        contribution = np.where(capital[:, None] > 0, pnl / capital[:, None], 0.0).sum(axis=0)
+
+    # Investor's view: purchases are outflows, sales inflows, closing NAV is redeemed at the end
+    net_flow = flows.sum(axis=1)
+    active = np.flatnonzero(net_flow)
+    money_weighted = None
+    if len(active):
+        flow_dates = list(dates[active]) + [dates[-1]]
+        amounts = np.concatenate((-net_flow[active], [nav[-1]]))
+        money_weighted = xirr(flow_dates, amounts)
+
+    holdings = pd.DataFrame({
+        'Symbol': symbols,
+        'Quantity': position[-1],
+        'Market Value': market_value[-1],
+        'Net Invested': flows.sum(axis=0),
+        'P&L': pnl.sum(axis=0),
+        'Contribution %': contribution * 100
+    })
+    holdings = holdings[(holdings['Quantity'] != 0) | (holdings['P&L'] != 0)]
+
+    return PerformanceReport(
+        nav=pd.Series(nav, index=dates, name='NAV'),
+        net_flows=pd.Series(net_flow, index=dates, name='Net Flow'),
+        daily_returns=pd.Series(daily_returns, index=dates, name='Return'),
+        holdings=holdings.sort_values('Contribution %', ascending=False).reset_index(drop=True),
+        xirr=money_weighted,
+        skipped=skipped
+    )
+
+def synthetic_trades(closes: pd.DataFrame, count: int = 200, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    Random round-trip trades at the closes of `closes`, for demos and benchmarks
+
+    Every sell closes an earlier buy of the same size, so positions never go short.
+    """
+    rng = np.random.default_rng(seed)
+    n_days, n_symbols = closes.shape
+    buys = max(1, count * 2 // 3)
+    symbol = rng.integers(0, n_symbols, buys)
+    buy_day = rng.integers(0, n_days, buys)
+    quantity = rng.integers(1, 50, buys)
+
+    exits = rng.random(buys) < (count - buys) / buys
+    sell_day = buy_day + rng.integers(1, max(2, n_days // 4), buys)
+    exits &= sell_day < n_days
+
+    day = np.concatenate((buy_day, sell_day[exits]))
+    sym = np.concatenate((symbol, symbol[exits]))
+    prices = closes.ffill().bfill().to_numpy()[day, sym]
+    order = np.argsort(day, kind='stable')
+
+    frame = pd.DataFrame({
+        'trade_id': np.arange(len(day)).astype(str),
+        'tradingsymbol': np.asarray(closes.columns)[sym],
+        'exchange': 'NSE',
+        'transaction_type': np.where(np.arange(len(day)) < buys, 'BUY', 'SELL'),
+        'quantity': np.concatenate((quantity, quantity[exits])),
+        'average_price': np.round(prices, 2),
+        'fill_timestamp': closes.index[day].strftime('%Y-%m-%d 15:00:00')
+    }).iloc[order]
+    return frame.to_dict('records')
@@ -0,0 +1,189 @@
+"""
+P&L Engine - Incremental, tick-driven P&L for holdings and positions
+"""
+
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+def _field(record: Dict, *names: str, default: Any = 0) -> Any:
+    """First present, non-null field among several alternative names"""
+    for name in names:
+        value = record.get(name)
+        if value is not None:
+            return value
+    return default
+
+def instrument_key(record: Dict, default_exchange: str = "NSE") -> str:
+    """EXCHANGE:SYMBOL key for a Kite holding/position (or sample-data) record"""
+    symbol = str(_field(record, 'tradingsymbol', 'symbol', default=''))
+    if ':' in symbol:
+        return symbol
+    return f"{_field(record, 'exchange', default=default_exchange)}:{symbol}"
+
+class PnLEngine:
+    """
+    Per-instrument quantity / average price / previous close / LTP arrays with
+    running portfolio totals
+
+    A price tick touches one row and adjusts each running total by the change
+    in that row's contribution, so the cost per tick is O(1) regardless of
+    portfolio size. Totals are recomputed from the arrays every
+    `resync_interval` ticks to keep floating point drift bounded.
+    """
+
+    def __init__(self, keys: Sequence[str], quantities: Sequence[float], avg_prices: Sequence[float],
+                 prev_closes: Sequence[float], ltps: Optional[Sequence[float]] = None,
+                 realized: Optional[Sequence[float]] = None, resync_interval: int = 100000):
+        self.keys = list(keys)
+        self.index: Dict[str, int] = {key: i for i, key in enumerate(self.keys)}
+        self.quantity = np.asarray(quantities, dtype=float).copy()
+        self.avg_price = np.asarray(avg_prices, dtype=float).copy()
+        self.prev_close = np.asarray(prev_closes, dtype=float).copy()
+        self.ltp = (self.prev_close.copy() if ltps is None else np.asarray(ltps, dtype=float).copy())
+        self.realized = (np.zeros(len(self.keys)) if realized is None
+                         else np.asarray(realized, dtype=float).copy())
+        # Value the day's change is measured from: overnight qty at previous
+        # close plus today's fills at their fill price. A sell lowers both this
+        # and the current value by the same amount, so the change it locked in stays.
+        self.day_base = self.quantity * self.prev_close
+        self.resync_interval = resync_interval
+        self.resync()
+
+    @classmethod
+    def from_holdings(cls, records: List[Dict], **kwargs) -> 'PnLEngine':
+        """Build from Kite holdings/positions (or the sample-data dicts)"""
+        ltps = [float(_field(r, 'last_price', 'ltp')) for r in records]
+        return cls(
+            keys=[instrument_key(r) for r in records],
+            quantities=[float(_field(r, 'quantity')) for r in records],
+            avg_prices=[float(_field(r, 'average_price', 'avg_price')) for r in records],
+            prev_closes=[float(_field(r, 'close_price', 'prev_close', default=ltp) or ltp)
+                         for r, ltp in zip(records, ltps)],
+            ltps=ltps,
+            realized=[float(_field(r, 'realised', 'realized')) for r in records],
+            **kwargs
+        )
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def resync(self):
+        """Recompute every running total from the arrays"""
+        self.total_value = float(self.quantity @ self.ltp)
+        self.total_investment = float(self.quantity @ self.avg_price)
+        self.total_day_base = float(self.day_base.sum())
+        self.total_realized = float(self.realized.sum())
+        self._ticks = 0
+
+    def _count_ticks(self, n: int):
+        self._ticks += n
+        if self._ticks >= self.resync_interval:
+            self.resync()
+
+    def update(self, key: str, ltp: float) -> bool:
+        """Apply one LTP tick; returns False for instruments not in the portfolio"""
+        i = self.index.get(key)
+        if i is None:
+            return False
+        self.total_value += float(self.quantity[i] * (ltp - self.ltp[i]))
+        self.ltp[i] = ltp
+        self._count_ticks(1)
+        return True
+
+    def update_many(self, keys: Sequence[str], ltps: Sequence[float]) -> int:
+        """Apply a batch of ticks (last tick wins per instrument); returns rows changed"""
+        index = self.index
+        rows = np.fromiter((index.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+        prices = np.asarray(ltps, dtype=float)
+        known = rows >= 0
+        rows, prices = rows[known], prices[known]
+        if len(rows) == 0:
+            return 0
+
+        # Keep the last tick per row
+        reversed_rows = rows[::-1]
+        unique_rows, last = np.unique(reversed_rows, return_index=True)
+        new_prices = prices[::-1][last]
+
+        self.total_value += float(self.quantity[unique_rows] @ (new_prices - self.ltp[unique_rows]))
+        self.ltp[unique_rows] = new_prices
+        self._count_ticks(len(unique_rows))
+        return len(unique_rows)
+
+    def apply_fill(self, key: str, quantity: float, price: float):
+        """
+        Apply a trade (positive quantity buys, negative sells) using average cost
+
+        Reducing a position books realized P&L against the average price;
+        adding to it re-averages. New instruments are appended.
+        """
+        i = self.index.get(key)
+        if i is None:
+            i = self._append(key, price)
+
+        held, avg = self.quantity[i], self.avg_price[i]
+        new_qty = held + quantity
+
+        if held == 0 or np.sign(quantity) == np.sign(held):
+            new_avg = (held * avg + quantity * price) / new_qty
+        else:
+            closed = min(abs(quantity), abs(held)) * np.sign(held)
+            self.realized[i] += closed * (price - avg)
+            self.total_realized += float(closed * (price - avg))
+            # Flipping through zero opens the remainder at the fill price
+            new_avg = avg if np.sign(new_qty) == np.sign(held) else price
+            if new_qty == 0:
+                new_avg = 0.0
+
+        self.total_value += float(quantity * self.ltp[i])
+        self.total_investment += float(new_qty * new_avg - held * avg)
+        self.day_base[i] += quantity * price
+        self.total_day_base += quantity * price
+        self.quantity[i], self.avg_price[i] = new_qty, new_avg
+
+    def _append(self, key: str, price: float) -> int:
+        """Add an empty row for a newly traded instrument"""
+        self.index[key] = len(self.keys)
+        self.keys.append(key)
+        self.quantity = np.append(self.quantity, 0.0)
+        self.avg_price = np.append(self.avg_price, 0.0)
+        self.prev_close = np.append(self.prev_close, price)
+        self.ltp = np.append(self.ltp, price)
+        self.realized = np.append(self.realized, 0.0)
+        self.day_base = np.append(self.day_base, 0.0)
+        return len(self.keys) - 1
+
+    def totals(self) -> Dict[str, float]:
+        """Portfolio totals in the same shape as calculate_portfolio_metrics"""
+        unrealized = self.total_value - self.total_investment
+        day_change = self.total_value - self.total_day_base
+        return {
+            'total_value': self.total_value,
+            'total_investment': self.total_investment,
+            'total_pnl': unrealized,
+            'total_pnl_percent': unrealized / self.total_investment * 100 if self.total_investment > 0 else 0,
+            'realized_pnl': self.total_realized,
+            'day_change': day_change,
+            'day_change_percent': day_change / self.total_day_base * 100 if self.total_day_base > 0 else 0
+        }
+
+    def frame(self) -> pd.DataFrame:
+        """Per-instrument P&L table, computed in one vectorized pass"""
+        current_value = self.quantity * self.ltp
+        investment = self.quantity * self.avg_price
+        pnl = current_value - investment
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pnl_percent = np.where(investment != 0, pnl / np.abs(investment) * 100, 0.0)
+        return pd.DataFrame({
+            'Symbol': [key.split(':', 1)[-1] for key in self.keys],
+            'Quantity': self.quantity,
+            'Avg Price': self.avg_price,
+            'LTP': self.ltp,
+            'Current Value': current_value,
+            'Investment': investment,
+            'P&L': pnl,
+            'P&L %': pnl_percent,
+            'Day Change': current_value - self.day_base
+        })
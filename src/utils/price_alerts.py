@@ -0,0 +1,271 @@
+"""
+Price Alerts - Above/below/percent-move triggers matched per tick by binary search
+"""
+
+import os
+import re
+import json
+import bisect
+import tempfile
+import threading
+from typing import Dict, List, Optional, Sequence
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+
+ABOVE = "above"
+BELOW = "below"
+PERCENT_MOVE = "percent"
+
+CONDITIONS = [ABOVE, BELOW, PERCENT_MOVE]
+
+DEFAULT_ALERTS_PATH = os.path.join(os.path.expanduser("~"), ".portfolio_manager", "alerts.json")
+
+# Triggered alerts kept (and persisted) for the history view
+TRIGGERED_HISTORY = 200
+
+def user_alerts_path(user_id: Optional[str], path: Optional[str] = None) -> str:
+    """
+    The alerts file for one user: alerts.json becomes alerts.<user_id>.json
+    next to it. Without a user id the shared file itself is used.
+    """
+    path = path or DEFAULT_ALERTS_PATH
+    user_id = re.sub(r'[^A-Za-z0-9_-]', '_', str(user_id or '').strip())
+    if not user_id:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{user_id}{ext or '.json'}"
+
+@dataclass
+class Alert:
+    """One price trigger on one instrument; fires once, then is retired"""
+    alert_id: int
+    instrument: str
+    condition: str
+    value: float
+    reference: Optional[float] = None
+    note: str = ""
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec='seconds'))
+    triggered_at: Optional[str] = None
+    triggered_price: Optional[float] = None
+
+    def thresholds(self) -> List[tuple]:
+        """(side, price) levels that fire this alert"""
+        if self.condition == ABOVE:
+            return [(ABOVE, self.value)]
+        if self.condition == BELOW:
+            return [(BELOW, self.value)]
+        move = abs(self.value) / 100
+        return [(ABOVE, self.reference * (1 + move)), (BELOW, self.reference * (1 - move))]
+
+    def describe(self) -> str:
+        symbol = self.instrument.split(':', 1)[-1]
+        if self.condition == PERCENT_MOVE:
+            text = f"{symbol} moved {self.value:g}% from {self.reference:,.2f}"
+        else:
+            text = f"{symbol} {self.condition} {self.value:,.2f}"
+        if self.triggered_price is not None:
+            text += f" (LTP {self.triggered_price:,.2f})"
+        return text
+
+class _ThresholdBook:
+    """Sorted above/below threshold arrays for one instrument"""
+
+    __slots__ = ('above_prices', 'above_ids', 'below_prices', 'below_ids')
+
+    def __init__(self):
+        self.above_prices: List[float] = []
+        self.above_ids: List[int] = []
+        self.below_prices: List[float] = []
+        self.below_ids: List[int] = []
+
+    def insert(self, side: str, price: float, alert_id: int):
+        prices, ids = ((self.above_prices, self.above_ids) if side == ABOVE
+                       else (self.below_prices, self.below_ids))
+        position = bisect.bisect_right(prices, price)
+        prices.insert(position, price)
+        ids.insert(position, alert_id)
+
+    def pop_crossed(self, ltp: float) -> List[int]:
+        """Remove and return ids whose threshold the price has reached"""
+        crossed = []
+        # Above-alerts fire for thresholds <= ltp: a prefix of the ascending array
+        if self.above_prices and self.above_prices[0] <= ltp:
+            count = bisect.bisect_right(self.above_prices, ltp)
+            crossed.extend(self.above_ids[:count])
+            del self.above_prices[:count], self.above_ids[:count]
+        # Below-alerts fire for thresholds >= ltp: a suffix
+        if self.below_prices and self.below_prices[-1] >= ltp:
+            start = bisect.bisect_left(self.below_prices, ltp)
+            crossed.extend(self.below_ids[start:])
+            del self.below_prices[start:], self.below_ids[start:]
+        return crossed
+
+    def __len__(self) -> int:
+        return len(self.above_ids) + len(self.below_ids)
+
+class AlertEngine:
+    """
+    Active alerts indexed by instrument into sorted threshold arrays
+
+    Checking a tick is one dict lookup plus, only when a boundary is
+    crossed, a binary search, so the cost does not grow with the number of
+    alerts registered. Percent-move alerts become one level above and one
+    below their reference price; whichever fires first retires the alert,
+    and the other level is dropped lazily when reached. Removed alerts are
+    skipped the same way.
+
+    Every method takes the engine's lock, so one engine can serve all the
+    sessions in a process (see shared_engine).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.alerts: Dict[int, Alert] = {}
+        self.triggered: List[Alert] = []
+        self._books: Dict[str, _ThresholdBook] = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.alerts)
+
+    def _index(self, alert: Alert):
+        book = self._books.get(alert.instrument)
+        if book is None:
+            book = self._books[alert.instrument] = _ThresholdBook()
+        for side, price in alert.thresholds():
+            book.insert(side, price, alert.alert_id)
+
+    def add(self, instrument: str, condition: str, value: float,
+            reference: Optional[float] = None, note: str = "") -> Alert:
+        """
+        Register an alert
+
+        Args:
+            instrument: EXCHANGE:SYMBOL
+            condition: ABOVE, BELOW or PERCENT_MOVE
+            value: Price level, or percent for PERCENT_MOVE
+            reference: Price the percent move is measured from (PERCENT_MOVE only)
+            note: Free text shown with the notification
+        """
+        with self._lock:
+            if condition not in CONDITIONS:
+                raise ValueError(f"Invalid condition: {condition}")
+            if value <= 0:
+                raise ValueError("Alert value must be positive")
+            if condition == PERCENT_MOVE and not reference:
+                raise ValueError("Percent-move alerts need a reference price")
+
+            alert = Alert(alert_id=self._next_id, instrument=instrument, condition=condition,
+                          value=float(value), reference=None if reference is None else float(reference),
+                          note=note)
+            self._next_id += 1
+            self.alerts[alert.alert_id] = alert
+            self._index(alert)
+            return alert
+
+    def remove(self, alert_id: int) -> bool:
+        """Cancel an active alert; its thresholds are skipped when reached"""
+        with self._lock:
+            return self.alerts.pop(alert_id, None) is not None
+
+    def check(self, instrument: str, ltp: float) -> List[Alert]:
+        """Match one tick; returns the alerts it fired (now retired)"""
+        with self._lock:
+            book = self._books.get(instrument)
+            if book is None:
+                return []
+            crossed = book.pop_crossed(ltp)
+            if not crossed:
+                return []
+
+            fired = []
+            stamp = None
+            for alert_id in crossed:
+                alert = self.alerts.pop(alert_id, None)
+                if alert is None:
+                    continue
+                stamp = stamp or datetime.now().isoformat(timespec='seconds')
+                alert.triggered_at, alert.triggered_price = stamp, float(ltp)
+                fired.append(alert)
+            if not book:
+                del self._books[instrument]
+            if fired:
+                self.triggered.extend(fired)
+                del self.triggered[:-TRIGGERED_HISTORY]
+            return fired
+
+    def check_many(self, instruments: Sequence[str], ltps: Sequence[float]) -> List[Alert]:
+        """Match a batch of ticks, skipping instruments without alerts"""
+        with self._lock:
+            books = self._books
+            fired = []
+            for instrument, ltp in zip(instruments, ltps):
+                if instrument in books:
+                    fired.extend(self.check(instrument, ltp))
+            return fired
+
+    def instruments(self) -> List[str]:
+        """Instruments with at least one active alert"""
+        with self._lock:
+            return sorted({alert.instrument for alert in self.alerts.values()})
+
+    def active(self) -> List[Alert]:
+        with self._lock:
+            return sorted(self.alerts.values(), key=lambda a: a.alert_id)
+
+    def save(self, path: Optional[str] = None):
+        """Write active and recently triggered alerts atomically as JSON"""
+        with self._lock:
+            path = path or self.path or DEFAULT_ALERTS_PATH
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            payload = {
+                'next_id': self._next_id,
+                'active': [asdict(a) for a in self.active()],
+                'triggered': [asdict(a) for a in self.triggered]
+            }
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(payload, f, indent=1)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'AlertEngine':
+        """Read alerts saved by save(); a missing or unreadable file gives an empty engine"""
+        path = path or DEFAULT_ALERTS_PATH
+        engine = cls(path)
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return engine
+
+        for record in payload.get('active', []):
+            alert = Alert(**record)
+            engine.alerts[alert.alert_id] = alert
+            engine._index(alert)
+        engine.triggered = [Alert(**record) for record in payload.get('triggered', [])]
+        engine._next_id = max([payload.get('next_id', 1)] + [a + 1 for a in engine.alerts])
+        return engine
+
+_engines: Dict[str, AlertEngine] = {}
+_engines_lock = threading.Lock()
+
+def shared_engine(path: Optional[str] = None) -> AlertEngine:
+    """
+    The process-wide engine for an alerts file, loaded on first use
+
+    Sessions share it rather than each loading its own copy, so one
+    session's save never overwrites alerts another added or fired.
+    """
+    path = os.path.abspath(os.path.expanduser(path or DEFAULT_ALERTS_PATH))
+    with _engines_lock:
+        engine = _engines.get(path)
+        if engine is None:
+            engine = _engines[path] = AlertEngine.load(path)
+        return engine
@@ -0,0 +1,50 @@
+"""
+Rate Limiter - Thread-safe token bucket for pacing calls to the Kite APIs
+"""
+
+import time
+import threading
+
+class RateLimiter:
+    """Token bucket allowing `rate` calls per second with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = None):
+        """
+        Args:
+            rate: Sustained calls per second
+            burst: Calls allowed back to back when the bucket is full (defaults to rate)
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it"""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Block until a call is allowed"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available now (for callers that reject rather than wait)"""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
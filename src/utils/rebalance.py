@@ -0,0 +1,160 @@
+"""
+Rebalance - Turn current holdings and target weights into a minimal integer trade list
+"""
+
+from typing import Dict, List, Any, Optional, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+@dataclass
+class RebalancePlan:
+    """Trade list that moves holdings towards target weights"""
+    symbols: np.ndarray
+    ltp: np.ndarray
+    current_quantity: np.ndarray
+    trade_quantity: np.ndarray
+    target_weights: np.ndarray
+    total_value: float
+    cash_before: float
+    cash_after: float
+
+    @property
+    def final_quantity(self) -> np.ndarray:
+        return self.current_quantity + self.trade_quantity
+
+    @property
+    def turnover(self) -> float:
+        """Traded value, buys plus sells"""
+        return float(np.abs(self.trade_quantity * self.ltp).sum())
+
+    def to_frame(self) -> pd.DataFrame:
+        """Per-instrument view of the plan, traded rows first"""
+        current_value = self.current_quantity * self.ltp
+        final_value = self.final_quantity * self.ltp
+        total = self.total_value if self.total_value > 0 else 1.0
+        df = pd.DataFrame({
+            'Symbol': self.symbols,
+            'LTP': self.ltp,
+            'Quantity': self.current_quantity,
+            'Trade': self.trade_quantity,
+            'Trade Value': self.trade_quantity * self.ltp,
+            'Current %': current_value / total * 100,
+            'Target %': self.target_weights * 100,
+            'Final %': final_value / total * 100
+        })
+        return df.iloc[np.argsort(self.trade_quantity == 0, kind='stable')].reset_index(drop=True)
+
+    def to_legs(self, exchange: str = "NSE", product: str = "CNC",
+                order_type: str = "MARKET") -> List[Dict[str, Any]]:
+        """Basket legs (see utils.basket_orders) for every non-zero trade, sells first"""
+        traded = np.flatnonzero(self.trade_quantity)
+        # Sells release the cash that the buys need
+        traded = traded[np.argsort(self.trade_quantity[traded] > 0, kind='stable')]
+        return [{
+            'symbol': symbol if ':' in symbol else f"{exchange}:{symbol}",
+            'transaction_type': 'BUY' if qty > 0 else 'SELL',
+            'quantity': int(abs(qty)),
+            'order_type': order_type,
+            'product': product,
+            'price': 0.0,
+            'variety': 'regular'
+        } for symbol, qty in zip(self.symbols[traded].tolist(), self.trade_quantity[traded].tolist())]
+
+def round_percentages(percentages: Sequence[float], decimals: int = 2, total: float = 100.0) -> np.ndarray:
+    """
+    Round percentages to `decimals` places without their sum exceeding `total`
+
+    Largest-remainder rounding: everything is floored, then the units lost
+    go one each to the largest fractional parts, so weights that added up
+    to `total` still do after rounding (plain rounding can overshoot it).
+    """
+    scale = 10 ** decimals
+    scaled = np.asarray(percentages, dtype=float) * scale
+    units = np.floor(scaled + 1e-9)
+    short = int(min(round(total * scale), np.floor(scaled.sum() + 1e-6)) - units.sum())
+    if short > 0:
+        units[np.argsort(-(scaled - units), kind='stable')[:short]] += 1
+    return units / scale
+
+def _take_until(costs: np.ndarray, order: np.ndarray, budget: float, cover: bool) -> np.ndarray:
+    """
+    Pick a prefix of `order` by cumulative cost
+
+    cover=False: largest prefix whose cost stays within budget (spending cash)
+    cover=True: shortest prefix whose cost reaches budget (raising cash)
+    """
+    cumulative = np.cumsum(costs[order])
+    if cover:
+        count = int(np.searchsorted(cumulative, budget, side='left')) + 1
+    else:
+        count = int(np.searchsorted(cumulative, budget, side='right'))
+    return order[:min(count, len(order))]
+
+def rebalance(symbols: Sequence[str], quantities: Sequence[float], ltps: Sequence[float],
+              target_weights: Sequence[float], lot_sizes: Optional[Sequence[int]] = None,
+              cash: float = 0.0, cash_buffer: float = 0.0) -> RebalancePlan:
+    """
+    Compute the minimal-turnover integer trade list reaching target weights
+
+    Continuous trades are first truncated towards zero to whole lots, so no
+    instrument overshoots its target. A single residual pass then spends
+    leftover cash on the most underweight instruments, one lot each, or,
+    if the truncated sells left cash short, sells one more lot of the most
+    overweight ones. Both passes are sorts plus cumulative sums over the
+    whole universe.
+
+    Args:
+        symbols: Instrument symbols
+        quantities: Current quantities held
+        ltps: Last traded prices
+        target_weights: Target fraction of total value per instrument (sum <= 1;
+            the remainder stays in cash)
+        lot_sizes: Tradable lot size per instrument (1 for equities)
+        cash: Available cash
+        cash_buffer: Cash that must remain unspent
+
+    Returns:
+        RebalancePlan
+    """
+    symbols = np.asarray(symbols, dtype=object)
+    quantity = np.asarray(quantities, dtype=np.int64)
+    ltp = np.asarray(ltps, dtype=float)
+    weights = np.asarray(target_weights, dtype=float)
+    lots = np.ones(len(symbols), dtype=np.int64) if lot_sizes is None else np.asarray(lot_sizes, dtype=np.int64)
+
+    if not (len(quantity) == len(ltp) == len(weights) == len(lots) == len(symbols)):
+        raise ValueError("symbols, quantities, ltps, target_weights and lot_sizes must have equal length")
+    if weights.sum() > 1 + 1e-9 or (weights < 0).any():
+        raise ValueError("Target weights must be non-negative and sum to at most 1")
+    if (ltp <= 0).any() or (lots <= 0).any():
+        raise ValueError("Prices and lot sizes must be positive")
+
+    total_value = float(quantity @ ltp + cash)
+    target_value = weights * total_value
+    lot_value = lots * ltp
+
+    # Greedy rounding: whole lots, towards zero
+    trade = np.trunc((target_value / ltp - quantity) / lots).astype(np.int64) * lots
+    remaining_cash = cash - float(trade @ ltp) - cash_buffer
+
+    # Residual pass on the per-instrument gap left by truncation
+    gap = target_value - (quantity + trade) * ltp
+    if remaining_cash < 0:
+        # Raise cash: one more lot sold from the most overweight holdings
+        sellable = np.flatnonzero(quantity + trade >= lots)
+        order = sellable[np.argsort(gap[sellable], kind='stable')]
+        chosen = _take_until(lot_value, order, -remaining_cash, cover=True)
+        trade[chosen] -= lots[chosen]
+    else:
+        # Spend cash: one more lot for underweights where it reduces tracking error
+        buyable = np.flatnonzero(gap >= lot_value / 2)
+        order = buyable[np.argsort(-gap[buyable], kind='stable')]
+        chosen = _take_until(lot_value, order, remaining_cash, cover=False)
+        trade[chosen] += lots[chosen]
+
+    cash_after = cash - float(trade @ ltp)
+    return RebalancePlan(symbols=symbols, ltp=ltp, current_quantity=quantity,
+                         trade_quantity=trade, target_weights=weights, total_value=total_value,
+                         cash_before=cash, cash_after=cash_after)
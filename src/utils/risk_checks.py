@@ -0,0 +1,325 @@
+"""
+Risk Checks - Local pre-trade checks against cached margins, positions, quotes and instrument metadata
+"""
+
+import re
+import time
+from typing import Dict, List, Any, Callable, Iterable, Optional
+from dataclasses import dataclass, field, replace
+
+from utils.kite_mcp_client import KiteMCPClient
+from utils.order_log import extract_records
+from utils.timed_cache import TimedCache
+from utils.utils import validate_order_params, format_currency
+from utils.watchlists import fetch_quotes
+from utils.options import option_strike
+
+# Margins, positions and quotes older than this are refetched before checking
+RISK_CONTEXT_TTL = 30
+
+# Lot and tick sizes only change with the daily instrument dump
+INSTRUMENT_CACHE_SECONDS = 24 * 3600
+
+# Share of order value blocked as margin, by product. CNC is fully funded;
+# MIS and NRML are rough intraday/overnight leverage estimates (the exact
+# SPAN figure needs Kite's order-margins call), and bought options always
+# need the full premium.
+MARGIN_RATES = {'CNC': 1.0, 'MIS': 0.2, 'NRML': 0.15}
+
+# Writing an option blocks SPAN plus exposure margin on the underlying's
+# notional (strike x quantity), not on the premium received; around 10%
+# covers index options, stock options usually need more
+SHORT_OPTION_MARGIN_RATE = 0.10
+
+COMMODITY_EXCHANGES = {'MCX', 'CDS', 'BCD'}
+DERIVATIVE_EXCHANGES = {'NFO', 'BFO', 'MCX', 'CDS', 'BCD'}
+
+_OPTION_SYMBOL = re.compile(r'\d(CE|PE)$')
+
+# Lot/tick metadata per instrument, shared by every session in the process
+instrument_cache = TimedCache(INSTRUMENT_CACHE_SECONDS)
+
+@dataclass
+class RiskLimits:
+    """User-set limits; None disables a check"""
+    price_band_pct: Optional[float] = 10.0
+    max_order_value: Optional[float] = 10_00_000.0
+    max_position_value: Optional[float] = 25_00_000.0
+    margin_buffer_pct: float = 5.0
+
+@dataclass
+class InstrumentSpec:
+    """Trading constraints for one instrument"""
+    lot_size: int = 1
+    tick_size: Optional[float] = None
+    strike: Optional[float] = None
+
+@dataclass
+class RiskContext:
+    """
+    Everything the checks read, keyed by EXCHANGE:SYMBOL
+
+    Built from one round of cached API calls; `reserve` books each accepted
+    order against it so later legs of a basket see the margin and position
+    the earlier ones will use.
+    """
+    margins: Dict[str, float] = field(default_factory=dict)
+    positions: Dict[str, int] = field(default_factory=dict)
+    # None when holdings could not be loaded, which skips the delivery-sell check
+    holdings: Optional[Dict[str, int]] = None
+    ltp: Dict[str, float] = field(default_factory=dict)
+    circuits: Dict[str, tuple] = field(default_factory=dict)
+    instruments: Dict[str, InstrumentSpec] = field(default_factory=dict)
+    fetched_at: float = 0.0
+    symbols: set = field(default_factory=set)
+
+    def is_stale(self, ttl: float = RISK_CONTEXT_TTL) -> bool:
+        return time.time() - self.fetched_at > ttl
+
+    def covers(self, symbols: Iterable[str]) -> bool:
+        return set(symbols) <= self.symbols
+
+    def copy(self) -> 'RiskContext':
+        """Copy whose reservations leave this context untouched"""
+        return replace(self, margins=dict(self.margins), positions=dict(self.positions))
+
+    def segment(self, exchange: str) -> str:
+        return 'commodity' if exchange in COMMODITY_EXCHANGES else 'equity'
+
+    def reserve(self, order: Dict[str, Any], margin: float):
+        """Book an accepted order's margin and position change"""
+        exchange = order['symbol'].split(':', 1)[0]
+        segment = self.segment(exchange)
+        if segment in self.margins:
+            self.margins[segment] -= margin
+        signed = order['quantity'] if order['transaction_type'] == 'BUY' else -order['quantity']
+        self.positions[order['symbol']] = self.positions.get(order['symbol'], 0) + signed
+
+@dataclass
+class RiskResult:
+    """Outcome of the pre-trade pipeline for one order"""
+    passed: bool
+    reasons: List[str] = field(default_factory=list)
+    margin: float = 0.0
+
+def order_price(order: Dict[str, Any], context: RiskContext) -> Optional[float]:
+    """Limit price, or the LTP for market orders"""
+    if order.get('order_type') in ('LIMIT', 'SL') and order.get('price'):
+        return float(order['price'])
+    return context.ltp.get(order['symbol'])
+
+def required_margin(order: Dict[str, Any], price: float, spec: Optional[InstrumentSpec] = None,
+                    held: int = 0) -> float:
+    """
+    Estimated margin blocked by an order (see MARGIN_RATES)
+
+    Option sells are charged on the underlying's notional at the strike
+    (from `spec`, else parsed from the symbol), for the part of the
+    quantity that is not closing a long position of `held` contracts.
+    """
+    exchange, tradingsymbol = order['symbol'].split(':', 1)
+    value = order['quantity'] * price
+    if order['transaction_type'] == 'SELL' and exchange not in DERIVATIVE_EXCHANGES:
+        # Delivery sells are covered by holdings; intraday shorts need MIS margin
+        return 0.0 if order.get('product') == 'CNC' else value * MARGIN_RATES['MIS']
+    if _OPTION_SYMBOL.search(tradingsymbol):
+        if order['transaction_type'] == 'BUY':
+            return value
+        written = max(order['quantity'] - max(held, 0), 0)
+        strike = spec.strike if spec is not None and spec.strike else option_strike(tradingsymbol)
+        if strike:
+            return written * strike * SHORT_OPTION_MARGIN_RATE
+        return written * price * MARGIN_RATES.get(order.get('product'), 1.0)
+    return value * MARGIN_RATES.get(order.get('product'), 1.0)
+
+def order_margin(order: Dict[str, Any], context: RiskContext, price: float) -> float:
+    """required_margin with the instrument spec and open position the context holds"""
+    return required_margin(order, price, context.instruments.get(order['symbol']),
+                           context.positions.get(order['symbol'], 0))
+
+def check_fields(order, context, limits) -> Optional[str]:
+    is_valid, message = validate_order_params(order)
+    if not is_valid:
+        return message
+    if order['transaction_type'] not in ('BUY', 'SELL'):
+        return f"Invalid transaction type: {order['transaction_type']}"
+    return None
+
+def check_lot_size(order, context, limits) -> Optional[str]:
+    spec = context.instruments.get(order['symbol'])
+    if spec and spec.lot_size > 1 and order['quantity'] % spec.lot_size:
+        return f"Quantity {order['quantity']} is not a multiple of the lot size {spec.lot_size}"
+    return None
+
+def check_tick_size(order, context, limits) -> Optional[str]:
+    spec = context.instruments.get(order['symbol'])
+    price = order.get('price') or 0.0
+    if spec and spec.tick_size and price > 0:
+        steps = price / spec.tick_size
+        if abs(steps - round(steps)) > 1e-6:
+            return f"Price {price:g} is not a multiple of the tick size {spec.tick_size:g}"
+    return None
+
+def check_price_band(order, context, limits) -> Optional[str]:
+    price = order.get('price') or 0.0
+    if price <= 0:
+        return None
+    low, high = context.circuits.get(order['symbol'], (None, None))
+    if low and high and not low <= price <= high:
+        return f"Price {price:g} is outside the circuit limits {low:g}-{high:g}"
+    ltp = context.ltp.get(order['symbol'])
+    if limits.price_band_pct is not None and ltp:
+        deviation = abs(price / ltp - 1) * 100
+        if deviation > limits.price_band_pct:
+            return f"Price {price:g} is {deviation:.1f}% from LTP {ltp:g} (band {limits.price_band_pct:g}%)"
+    return None
+
+def check_order_value(order, context, limits) -> Optional[str]:
+    price = order_price(order, context)
+    if limits.max_order_value is None or not price:
+        return None
+    value = order['quantity'] * price
+    if value > limits.max_order_value:
+        return f"Order value {format_currency(value)} exceeds the {format_currency(limits.max_order_value)} limit"
+    return None
+
+def check_position_limit(order, context, limits) -> Optional[str]:
+    price = order_price(order, context)
+    if limits.max_position_value is None or not price:
+        return None
+    signed = order['quantity'] if order['transaction_type'] == 'BUY' else -order['quantity']
+    held = context.positions.get(order['symbol'], 0) + (context.holdings or {}).get(order['symbol'], 0)
+    after = abs(held + signed) * price
+    if after > limits.max_position_value and after > abs(held) * price:
+        return f"Position would grow to {format_currency(after)}, above the {format_currency(limits.max_position_value)} limit"
+    return None
+
+def check_holdings(order, context, limits) -> Optional[str]:
+    if order['transaction_type'] != 'SELL' or order.get('product') != 'CNC' or context.holdings is None:
+        return None
+    if order['symbol'].split(':', 1)[0] in DERIVATIVE_EXCHANGES:
+        return None
+    # Today's net position counts too: buys can be resold, earlier sells used up holdings
+    available = max(context.holdings.get(order['symbol'], 0) + context.positions.get(order['symbol'], 0), 0)
+    if order['quantity'] > available:
+        return f"Selling {order['quantity']} but only {available} held for delivery"
+    return None
+
+def check_margin(order, context, limits) -> Optional[str]:
+    price = order_price(order, context)
+    segment = context.segment(order['symbol'].split(':', 1)[0])
+    if not price or segment not in context.margins:
+        return None
+    needed = order_margin(order, context, price) * (1 + limits.margin_buffer_pct / 100)
+    available = context.margins[segment]
+    if needed > available:
+        return f"Needs about {format_currency(needed)} margin, {format_currency(max(available, 0))} available"
+    return None
+
+# Run in order; field validation first so later checks can rely on the order's shape
+PRE_TRADE_CHECKS: List[Callable[[Dict[str, Any], RiskContext, RiskLimits], Optional[str]]] = [
+    check_fields, check_lot_size, check_tick_size, check_price_band,
+    check_order_value, check_position_limit, check_holdings, check_margin
+]
+
+def check_order(order: Dict[str, Any], context: RiskContext, limits: Optional[RiskLimits] = None,
+                reserve: bool = False) -> RiskResult:
+    """
+    Run every pre-trade check on one normalized order (see basket_orders.normalize_leg)
+
+    All failing checks are reported, except that nothing else runs when the
+    fields themselves are invalid. With reserve=True a passing order is
+    booked against the context.
+    """
+    limits = limits or RiskLimits()
+    reason = check_fields(order, context, limits)
+    if reason:
+        return RiskResult(False, [reason])
+    reasons = [reason for check in PRE_TRADE_CHECKS[1:] if (reason := check(order, context, limits))]
+    price = order_price(order, context)
+    margin = order_margin(order, context, price) if price else 0.0
+    if not reasons and reserve:
+        context.reserve(order, margin)
+    return RiskResult(not reasons, reasons, margin)
+
+def check_orders(orders: Iterable[Dict[str, Any]], context: RiskContext,
+                 limits: Optional[RiskLimits] = None) -> List[RiskResult]:
+    """Check orders in sequence, each seeing the margin and positions booked by the ones before"""
+    return [check_order(order, context, limits, reserve=True) for order in orders]
+
+def _net_quantities(records: List[Dict], quantity_fields: tuple) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for record in records:
+        key = f"{record.get('exchange', 'NSE')}:{record.get('tradingsymbol', '')}"
+        totals[key] = totals.get(key, 0) + sum(int(record.get(name) or 0) for name in quantity_fields)
+    return totals
+
+def parse_margins(data: Any) -> Dict[str, float]:
+    """Available margin per segment from get_margins data"""
+    if isinstance(data, dict) and isinstance(data.get('data'), dict):
+        data = data['data']
+    margins = {}
+    for segment in ('equity', 'commodity'):
+        entry = data.get(segment) if isinstance(data, dict) else None
+        if isinstance(entry, dict) and entry.get('net') is not None:
+            margins[segment] = float(entry['net'])
+    return margins
+
+def lookup_instrument(client: KiteMCPClient, symbol: str) -> Optional[InstrumentSpec]:
+    """Lot and tick size for EXCHANGE:SYMBOL via search_instruments (cached for the day)"""
+    exchange, tradingsymbol = symbol.split(':', 1)
+
+    def compute():
+        response = client.search_instruments(tradingsymbol)
+        if not response.success:
+            return None
+        for record in extract_records(response.data):
+            if record.get('tradingsymbol') == tradingsymbol and record.get('exchange', exchange) == exchange:
+                return InstrumentSpec(lot_size=int(record.get('lot_size') or 1),
+                                      tick_size=float(record['tick_size']) if record.get('tick_size') else None,
+                                      strike=float(record['strike']) if record.get('strike') else None)
+        return None
+
+    return instrument_cache.get(symbol, compute)
+
+def load_risk_context(client: KiteMCPClient, symbols: Iterable[str],
+                      holdings: Any = None, positions: Any = None) -> RiskContext:
+    """
+    Fetch what the checks need for a set of symbols
+
+    Pass already loaded holdings/positions data to skip those calls. Any
+    call that fails leaves its part empty, which disables the checks
+    depending on it rather than blocking orders.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    context = RiskContext(fetched_at=time.time(), symbols=set(symbols))
+
+    response = client.get_margins()
+    if response.success:
+        context.margins = parse_margins(response.data)
+
+    if positions is None:
+        response = client.get_positions()
+        positions = response.data if response.success else None
+    if isinstance(positions, dict):
+        positions = positions.get('data', positions)
+    net = positions.get('net', []) if isinstance(positions, dict) else positions
+    context.positions = _net_quantities(extract_records(net), ('quantity',))
+
+    if holdings is None:
+        response = client.get_holdings()
+        holdings = response.data if response.success else None
+    if holdings is not None:
+        context.holdings = _net_quantities(extract_records(holdings), ('quantity', 't1_quantity'))
+
+    for key, quote in fetch_quotes(client, symbols).items():
+        if quote.get('last_price'):
+            context.ltp[key] = float(quote['last_price'])
+        if quote.get('lower_circuit_limit') and quote.get('upper_circuit_limit'):
+            context.circuits[key] = (float(quote['lower_circuit_limit']), float(quote['upper_circuit_limit']))
+
+    for symbol in symbols:
+        spec = lookup_instrument(client, symbol)
+        if spec is not None:
+            context.instruments[symbol] = spec
+    return context
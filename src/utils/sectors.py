@@ -0,0 +1,279 @@
+"""
+Sectors - Instrument -> sector/industry classification and incremental sector aggregation
+"""
+
+import threading
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.pnl_engine import instrument_key
+
+UNCLASSIFIED = "Other"
+
+# NIFTY 50 constituents (plus a few sector leaders): symbol, sector, industry.
+# Instrument tokens for the symbols below are learned from Kite records
+# (holdings, quotes, instrument dumps all carry instrument_token); the ones
+# already used elsewhere in the app are seeded in SECTOR_TOKENS.
+SECTOR_TABLE = [
+    ('RELIANCE', 'Energy', 'Refineries & Petrochemicals'),
+    ('ONGC', 'Energy', 'Oil Exploration & Production'),
+    ('BPCL', 'Energy', 'Refineries & Marketing'),
+    ('COALINDIA', 'Energy', 'Coal'),
+    ('TCS', 'IT', 'IT Services'),
+    ('INFY', 'IT', 'IT Services'),
+    ('HCLTECH', 'IT', 'IT Services'),
+    ('WIPRO', 'IT', 'IT Services'),
+    ('TECHM', 'IT', 'IT Services'),
+    ('LTIM', 'IT', 'IT Services'),
+    ('HDFCBANK', 'Banking', 'Private Sector Bank'),
+    ('ICICIBANK', 'Banking', 'Private Sector Bank'),
+    ('KOTAKBANK', 'Banking', 'Private Sector Bank'),
+    ('AXISBANK', 'Banking', 'Private Sector Bank'),
+    ('INDUSINDBK', 'Banking', 'Private Sector Bank'),
+    ('SBIN', 'Banking', 'Public Sector Bank'),
+    ('BAJFINANCE', 'Financial Services', 'Non Banking Financial Company'),
+    ('BAJAJFINSV', 'Financial Services', 'Holding Company'),
+    ('SHRIRAMFIN', 'Financial Services', 'Non Banking Financial Company'),
+    ('HDFCLIFE', 'Financial Services', 'Life Insurance'),
+    ('SBILIFE', 'Financial Services', 'Life Insurance'),
+    ('ITC', 'FMCG', 'Diversified FMCG'),
+    ('HINDUNILVR', 'FMCG', 'Diversified FMCG'),
+    ('NESTLEIND', 'FMCG', 'Packaged Foods'),
+    ('BRITANNIA', 'FMCG', 'Packaged Foods'),
+    ('TATACONSUM', 'FMCG', 'Tea & Coffee'),
+    ('MARUTI', 'Auto', 'Passenger Cars & Utility Vehicles'),
+    ('M&M', 'Auto', 'Passenger Cars & Utility Vehicles'),
+    ('TATAMOTORS', 'Auto', 'Passenger Cars & Utility Vehicles'),
+    ('BAJAJ-AUTO', 'Auto', '2/3 Wheelers'),
+    ('EICHERMOT', 'Auto', '2/3 Wheelers'),
+    ('HEROMOTOCO', 'Auto', '2/3 Wheelers'),
+    ('SUNPHARMA', 'Pharma', 'Pharmaceuticals'),
+    ('DRREDDY', 'Pharma', 'Pharmaceuticals'),
+    ('CIPLA', 'Pharma', 'Pharmaceuticals'),
+    ('DIVISLAB', 'Pharma', 'Pharmaceuticals'),
+    ('APOLLOHOSP', 'Healthcare', 'Hospital'),
+    ('TATASTEEL', 'Metals', 'Iron & Steel'),
+    ('JSWSTEEL', 'Metals', 'Iron & Steel'),
+    ('HINDALCO', 'Metals', 'Aluminium'),
+    ('ADANIENT', 'Metals', 'Trading & Mining'),
+    ('NTPC', 'Power', 'Power Generation'),
+    ('POWERGRID', 'Power', 'Power Transmission'),
+    ('TATAPOWER', 'Power', 'Integrated Power Utilities'),
+    ('BHARTIARTL', 'Telecom', 'Telecom Services'),
+    ('LT', 'Infrastructure', 'Civil Construction'),
+    ('ADANIPORTS', 'Infrastructure', 'Port & Port Services'),
+    ('ULTRACEMCO', 'Cement', 'Cement & Cement Products'),
+    ('GRASIM', 'Cement', 'Cement & Cement Products'),
+    ('ASIANPAINT', 'Consumer Durables', 'Paints'),
+    ('TITAN', 'Consumer Durables', 'Gems, Jewellery & Watches'),
+    ('DLF', 'Realty', 'Residential & Commercial Projects')
+]
+
+SECTOR_TOKENS = {
+    'NSE:RELIANCE': 738561,
+    'NSE:TCS': 2953217,
+    'NSE:INFY': 408065,
+    'NSE:HDFCBANK': 341249,
+    'NSE:ITC': 424961
+}
+
+class SectorMap:
+    """
+    Instrument classification held as categorical arrays
+
+    Rows are instruments; sector and industry are pandas Categoricals, so
+    classifying any batch of instruments is an index lookup returning
+    integer codes that group by directly. Lookups go by instrument token
+    first (sorted token array + searchsorted) and fall back to EXCHANGE:SYMBOL.
+
+    The default map is shared by every session, so learn_tokens() runs under
+    a lock and swaps in the new token arrays as one (values, rows) pair that
+    readers take without locking.
+    """
+
+    def __init__(self, keys: Sequence[str], sectors: Sequence[str], industries: Sequence[str],
+                 tokens: Optional[Dict[str, int]] = None):
+        self.keys = pd.Index(keys)
+        categories = sorted(set(sectors)) + [UNCLASSIFIED]
+        self.sector = pd.Categorical(sectors, categories=categories)
+        self.industry = pd.Categorical(industries)
+        self._tokens = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self._lock = threading.Lock()
+        if tokens:
+            self.learn_tokens(tokens)
+
+    @classmethod
+    def default(cls, exchange: str = "NSE") -> 'SectorMap':
+        """Classification built from the bundled SECTOR_TABLE"""
+        keys = [f"{exchange}:{symbol}" for symbol, _, _ in SECTOR_TABLE]
+        return cls(keys, [s for _, s, _ in SECTOR_TABLE], [i for _, _, i in SECTOR_TABLE],
+                   tokens=SECTOR_TOKENS)
+
+    @property
+    def categories(self) -> pd.Index:
+        return self.sector.categories
+
+    def learn_tokens(self, tokens: Dict[str, int]):
+        """Register instrument tokens for known EXCHANGE:SYMBOL keys"""
+        rows = self.keys.get_indexer(list(tokens))
+        values = np.fromiter(tokens.values(), dtype=np.int64, count=len(tokens))
+        known = rows >= 0
+        with self._lock:
+            token_values, token_rows = self._tokens
+            all_values = np.concatenate((token_values, values[known]))
+            all_rows = np.concatenate((token_rows, rows[known]))
+            # Later registrations win for a repeated token
+            all_values, first = np.unique(all_values[::-1], return_index=True)
+            self._tokens = (all_values, all_rows[::-1][first])
+
+    def learn_from_records(self, records: List[Dict]):
+        """Pick up instrument tokens from Kite holdings/positions/instrument records"""
+        self.learn_tokens({instrument_key(r): int(r['instrument_token'])
+                           for r in records if r.get('instrument_token')})
+
+    def rows(self, keys: Optional[Sequence[str]] = None,
+             tokens: Optional[Sequence[Any]] = None) -> np.ndarray:
+        """Row of each instrument in the map, -1 if unknown; tokens take precedence over keys"""
+        n = len(keys) if keys is not None else len(tokens)
+        rows = np.full(n, -1, dtype=np.int64)
+        token_values, token_rows = self._tokens
+        if tokens is not None and len(token_values):
+            values = pd.to_numeric(pd.Series(tokens), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+            position = np.minimum(np.searchsorted(token_values, values), len(token_values) - 1)
+            found = token_values[position] == values
+            rows[found] = token_rows[position[found]]
+        if keys is not None:
+            missing = rows < 0
+            rows[missing] = self.keys.get_indexer(pd.Index(keys)[missing])
+        return rows
+
+    def classify(self, keys: Optional[Sequence[str]] = None,
+                 tokens: Optional[Sequence[Any]] = None) -> pd.Categorical:
+        """Sector of each instrument as a Categorical sharing this map's categories"""
+        rows = self.rows(keys, tokens)
+        codes = np.where(rows >= 0, self.sector.codes[np.maximum(rows, 0)],
+                         len(self.categories) - 1)
+        return pd.Categorical.from_codes(codes, categories=self.categories)
+
+    def constituents(self) -> pd.DataFrame:
+        """Every mapped instrument with its sector and industry"""
+        return pd.DataFrame({'Instrument': self.keys, 'Sector': self.sector, 'Industry': self.industry})
+
+_default_map: Optional[SectorMap] = None
+_default_map_lock = threading.Lock()
+
+def default_sector_map() -> SectorMap:
+    """Process-wide SectorMap.default(), built on first use"""
+    global _default_map
+    with _default_map_lock:
+        if _default_map is None:
+            _default_map = SectorMap.default()
+        return _default_map
+
+def sector_diversification(holdings_data: List[Dict]) -> Dict[str, float]:
+    """Weight % per sector of Kite holding records, by current value"""
+    sectors = default_sector_map().classify([instrument_key(h) for h in holdings_data],
+                                            tokens=[h.get('instrument_token') for h in holdings_data])
+    exposure = sector_exposure([h.get('current_value', 0) for h in holdings_data], sectors)
+    return dict(zip(exposure['Sector'], exposure['Weight %'].round(2)))
+
+def sector_exposure(values: Sequence[float], sectors: pd.Categorical) -> pd.DataFrame:
+    """Value and weight per sector in one grouped pass (empty sectors dropped)"""
+    values = np.asarray(values, dtype=float)
+    totals = np.bincount(sectors.codes, weights=values, minlength=len(sectors.categories))
+    grand_total = totals.sum()
+    df = pd.DataFrame({
+        'Sector': sectors.categories,
+        'Value': totals,
+        'Weight %': totals / grand_total * 100 if grand_total else 0.0
+    })
+    return df[df['Value'] != 0].sort_values('Value', ascending=False).reset_index(drop=True)
+
+class SectorAggregator:
+    """
+    Running per-sector value and previous-close base for a set of instruments
+
+    Each instrument contributes quantity * price to its sector. Price ticks
+    adjust only their sector's running sums, so refreshing sector performance
+    costs O(changed instruments) rather than a regroup of the whole universe.
+    Use share quantities for portfolio exposure, or 1 / prev_close for an
+    equal-weighted sector index.
+    """
+
+    def __init__(self, keys: Sequence[str], sectors: pd.Categorical, quantities: Sequence[float],
+                 prev_closes: Sequence[float], ltps: Optional[Sequence[float]] = None):
+        self.keys = list(keys)
+        self.index: Dict[str, int] = {key: i for i, key in enumerate(self.keys)}
+        self.categories = sectors.categories
+        self.codes = np.asarray(sectors.codes, dtype=np.int64)
+        self.quantity = np.asarray(quantities, dtype=float)
+        self.prev_close = np.asarray(prev_closes, dtype=float)
+        self.ltp = self.prev_close.copy() if ltps is None else np.asarray(ltps, dtype=float).copy()
+        self.resync()
+
+    @classmethod
+    def equal_weighted(cls, sector_map: SectorMap, keys: Sequence[str], prev_closes: Sequence[float],
+                       ltps: Optional[Sequence[float]] = None) -> 'SectorAggregator':
+        """Sector indices where every constituent carries the same weight"""
+        prev_closes = np.asarray(prev_closes, dtype=float)
+        with np.errstate(divide='ignore'):
+            quantities = np.where(prev_closes > 0, 1.0 / prev_closes, 0.0)
+        return cls(keys, sector_map.classify(keys), quantities, prev_closes, ltps)
+
+    def resync(self):
+        """Recompute the per-sector sums from scratch"""
+        size = len(self.categories)
+        self.value = np.bincount(self.codes, weights=self.quantity * self.ltp, minlength=size)
+        self.base = np.bincount(self.codes, weights=self.quantity * self.prev_close, minlength=size)
+        self.count = np.bincount(self.codes, minlength=size)
+
+    def update(self, key: str, ltp: float) -> bool:
+        """Apply one LTP tick; returns False for instruments not tracked"""
+        i = self.index.get(key)
+        if i is None:
+            return False
+        self.value[self.codes[i]] += self.quantity[i] * (ltp - self.ltp[i])
+        self.ltp[i] = ltp
+        return True
+
+    def update_many(self, keys: Sequence[str], ltps: Sequence[float]) -> int:
+        """Apply a batch of ticks (last tick wins per instrument, NaN prices skipped); returns rows changed"""
+        rows = np.fromiter((self.index.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+        prices = np.asarray(ltps, dtype=float)
+        known = (rows >= 0) & np.isfinite(prices)
+        rows, prices = rows[known][::-1], prices[known][::-1]
+        rows, last = np.unique(rows, return_index=True)
+        prices = prices[last]
+        if len(rows) == 0:
+            return 0
+        delta = self.quantity[rows] * (prices - self.ltp[rows])
+        np.add.at(self.value, self.codes[rows], delta)
+        self.ltp[rows] = prices
+        return len(rows)
+
+    def frame(self) -> pd.DataFrame:
+        """Per-sector value, weight, change % and best performer"""
+        populated = self.count > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.where(self.base > 0, (self.value / self.base - 1) * 100, 0.0)
+            stock_change = np.where(self.prev_close > 0, self.ltp / self.prev_close - 1, -np.inf)
+
+        # Best performer per sector: sort by (sector, change) and take each group's last row
+        order = np.lexsort((stock_change, self.codes))
+        last_of_group = np.r_[self.codes[order][1:] != self.codes[order][:-1], True]
+        top = np.full(len(self.categories), '', dtype=object)
+        top[self.codes[order][last_of_group]] = [self.keys[i].split(':', 1)[-1]
+                                                 for i in order[last_of_group]]
+
+        total = self.value.sum()
+        df = pd.DataFrame({
+            'Sector': self.categories,
+            'Value': self.value,
+            'Weight %': self.value / total * 100 if total else 0.0,
+            'Change %': change,
+            'Top Stock': top,
+            'Stocks': self.count
+        })
+        return df[populated].sort_values('Change %', ascending=False).reset_index(drop=True)
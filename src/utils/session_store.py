@@ -0,0 +1,180 @@
+"""
+Session Store - Encrypted on-disk snapshot of the MCP session, profile and portfolio
+"""
+
+import os
+import json
+import time
+import tempfile
+from typing import Dict, Any, Optional
+from dataclasses import dataclass, asdict, field
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # optional: without it nothing is persisted
+    Fernet = None
+    InvalidToken = ValueError
+
+from utils.kite_mcp_client import KiteMCPClient
+
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".portfolio_manager")
+DEFAULT_STATE_PATH = os.path.join(STATE_DIR, "session.bin")
+KEY_FILENAME = "session.key"
+
+# A Fernet key in this variable takes precedence over the key file
+STATE_KEY_ENV = "PORTFOLIO_STATE_KEY"
+
+# A snapshot holds a live Kite session id and there is one per machine, so
+# it is only kept when this is set, on a single user's local install
+PERSIST_ENV = "PERSIST_SESSION"
+
+# Kite access tokens expire daily, so older snapshots are not worth painting
+STATE_MAX_AGE = 12 * 60 * 60
+
+# Failures meaning the server rejected the session itself; anything else
+# (timeouts, refused connections, 5xx, 429) says nothing about the session
+AUTH_ERROR_CLASSES = frozenset({'rpc_error', 'http_401', 'http_403'})
+
+class SessionUnreachable(Exception):
+    """The server could not be asked whether a saved session is still valid"""
+
+@dataclass
+class SessionSnapshot:
+    """Everything needed to paint the dashboard before the server answers"""
+    server_url: str
+    session_id: Optional[str] = None
+    profile: Optional[Dict[str, Any]] = None
+    holdings: Any = None
+    positions: Any = None
+    saved_at: float = field(default_factory=time.time)
+
+    def age_seconds(self) -> float:
+        return time.time() - self.saved_at
+
+def persistence_enabled() -> bool:
+    """Whether PERSIST_SESSION opts this install into saving sessions"""
+    return os.getenv(PERSIST_ENV, "").strip().lower() in ("1", "true", "yes")
+
+class SessionStore:
+    """
+    Fernet-encrypted session snapshot
+
+    The key comes from PORTFOLIO_STATE_KEY or, failing that, a key file
+    created next to the snapshot with owner-only permissions. Without the
+    optional `cryptography` package, or with enabled=False, the store is
+    unavailable: save() is a no-op and load() returns None, so nothing is
+    ever written in plain text.
+    """
+
+    def __init__(self, path: Optional[str] = None, key_path: Optional[str] = None, enabled: bool = True):
+        self.path = path or DEFAULT_STATE_PATH
+        self.key_path = key_path or os.path.join(os.path.dirname(os.path.abspath(self.path)), KEY_FILENAME)
+        self.enabled = enabled
+        self._fernet = None
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and Fernet is not None
+
+    def _cipher(self):
+        if self._fernet is None:
+            key = os.getenv(STATE_KEY_ENV)
+            if not key:
+                key = self._read_or_create_key()
+            self._fernet = Fernet(key)
+        return self._fernet
+
+    def _read_or_create_key(self) -> bytes:
+        try:
+            with open(self.key_path, 'rb') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            pass
+        directory = os.path.dirname(self.key_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        key = Fernet.generate_key()
+        # Write the key in full under a temporary (owner-only) name, then
+        # link it into place: a session racing us either wins the link or
+        # reads a complete key, never a half-written one
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(key)
+            os.link(tmp_path, self.key_path)
+        except FileExistsError:
+            with open(self.key_path, 'rb') as f:
+                return f.read().strip()
+        finally:
+            os.remove(tmp_path)
+        return key
+
+    def save(self, snapshot: SessionSnapshot) -> bool:
+        """Encrypt and atomically replace the snapshot; False if the store is unavailable"""
+        if not self.available:
+            return False
+        token = self._cipher().encrypt(json.dumps(asdict(snapshot)).encode())
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(token)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
+
+    def load(self, server_url: Optional[str] = None, max_age: float = STATE_MAX_AGE) -> Optional[SessionSnapshot]:
+        """
+        The saved snapshot, or None if missing, unreadable, expired or for another server
+
+        A snapshot that fails to decrypt (e.g. the key changed) is treated as missing.
+        """
+        if not self.available:
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                token = f.read()
+            snapshot = SessionSnapshot(**json.loads(self._cipher().decrypt(token)))
+        except (OSError, ValueError, TypeError, InvalidToken):
+            return None
+        if server_url is not None and snapshot.server_url != server_url:
+            return None
+        if snapshot.age_seconds() > max_age:
+            return None
+        return snapshot
+
+    def clear(self):
+        """Forget the saved session (the key is kept)"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def revalidate_session(client: KiteMCPClient) -> Optional[SessionSnapshot]:
+    """
+    Fetch profile, holdings and positions afresh; None if the session is no longer valid
+
+    Runs off the script thread, so it only talks to the client and never
+    touches Streamlit state.
+
+    Raises:
+        SessionUnreachable: The profile call failed for a reason other than
+            the session being rejected, so its validity is still unknown
+    """
+    profile = client.get_profile()
+    if not profile.success:
+        if profile.error_class in AUTH_ERROR_CLASSES:
+            return None
+        raise SessionUnreachable(profile.error or "request failed")
+    holdings = client.get_holdings()
+    positions = client.get_positions()
+    return SessionSnapshot(
+        server_url=client.server_url,
+        session_id=client.session_id,
+        profile=profile.data,
+        holdings=holdings.data if holdings.success else None,
+        positions=positions.data if positions.success else None
+    )
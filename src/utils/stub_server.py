@@ -0,0 +1,1032 @@
+"""
+Stub Server - Offline Kite MCP stand-in with synthetic data at any scale, fault injection and tick streaming
+"""
+
+import json
+import time
+import uuid
+import random
+import calendar
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+import requests
+
+from utils.historical import MAX_DAYS_PER_REQUEST
+from utils.kite_mcp_client import SESSION_HEADER
+from utils.market_overview import INDEX_INSTRUMENTS, SAMPLE_INDEX_LEVELS
+from utils.options import black_scholes_price, front_month_expiry, years_to_expiry, RISK_FREE_RATE
+from utils.rate_limiter import RateLimiter
+from utils.sectors import SECTOR_TABLE, SECTOR_TOKENS
+
+# Kite's instrument tokens for the indices the app quotes
+INDEX_TOKENS = {
+    'NSE:NIFTY 50': 256265,
+    'BSE:SENSEX': 265,
+    'NSE:NIFTY BANK': 260105,
+    'NSE:NIFTY IT': 259849
+}
+
+# Index option chains: name -> (underlying, lot size, strike step)
+OPTION_CHAINS = {
+    'NIFTY': ('NSE:NIFTY 50', 75, 50),
+    'BANKNIFTY': ('NSE:NIFTY BANK', 35, 100)
+}
+STRIKES_PER_SIDE = 10
+OPTION_VOLATILITY = 0.15
+
+# Kite Connect's per-second limits: quotes 1/s, historical 3/s, everything else 10/s
+KITE_RATE_LIMITS = {'get_quotes': 1, 'get_ltp': 1, 'get_historical_data': 3, '*': 10}
+
+SCALE_PRESETS = {
+    'small': dict(holdings=20, positions=10, orders=200, trades=1_000, instruments=500),
+    'medium': dict(holdings=1_000, positions=100, orders=5_000, trades=20_000, instruments=5_000),
+    'large': dict(holdings=10_000, positions=500, orders=20_000, trades=100_000, instruments=20_000)
+}
+
+# Trading session 09:15-15:30 IST
+SESSION_OPEN = (9, 15)
+SESSION_MINUTES = 375
+TRADING_SECONDS_PER_YEAR = 252 * SESSION_MINUTES * 60
+
+# Daily candle paths are generated from this business day onward
+HISTORY_EPOCH = np.datetime64('2010-01-01', 'D')
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+CANDLE_OFFSET = "+0530"
+
+class ToolError(Exception):
+    """A tool call the real server would refuse (bad arguments, not logged in)"""
+
+@dataclass
+class StubConfig:
+    """Scale, timing and fault-injection settings for the stub server"""
+    holdings: int = 200
+    positions: int = 50
+    orders: int = 1_000
+    trades: int = 5_000
+    instruments: int = 2_000
+    seed: int = 7
+    # Added to every response: latency_ms plus up to jitter_ms of uniform noise
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Fraction of calls answered with a 5xx (a quarter of them as truncated JSON instead)
+    error_rate: float = 0.0
+    # Fraction of calls answered with 429, on top of any rate_limits
+    throttle_rate: float = 0.0
+    # Per-session calls per second by tool ('*' for the rest); over the limit gets a 429
+    rate_limits: Dict[str, float] = field(default_factory=dict)
+    # New sessions must call login and open the returned link before other tools work
+    require_login: bool = False
+    # Annualised volatility of the live random walk, and market seconds per wall-clock second
+    volatility: float = 0.25
+    time_scale: float = 1.0
+    cash: float = 1_000_000.0
+
+    @classmethod
+    def preset(cls, scale: str, **overrides) -> 'StubConfig':
+        return cls(**{**SCALE_PRESETS[scale], **overrides})
+
+def _tick_round(values: np.ndarray, tick: float = 0.05) -> np.ndarray:
+    return np.round(np.round(np.asarray(values, dtype=float) / tick) * tick, 2)
+
+def _business_day(index) -> np.ndarray:
+    return np.busday_offset(HISTORY_EPOCH, index, roll='forward')
+
+def _business_index(day) -> np.ndarray:
+    return np.busday_count(HISTORY_EPOCH, np.asarray(day, dtype='datetime64[D]'))
+
+def daily_candles(token: int, prev_close: float, horizon: int, anchor: int) -> Dict[str, np.ndarray]:
+    """
+    Deterministic daily OHLCV for an instrument from HISTORY_EPOCH to `horizon`
+
+    The path is seeded by the token alone, so every request (and every
+    window of a split request) sees the same history, and it is scaled so
+    the close on business day `anchor` equals prev_close, tying history to
+    the live quotes.
+    """
+    rng = np.random.default_rng(token)
+    log_close = np.cumsum(rng.normal(0.0003, 0.017, horizon))
+    close = prev_close * np.exp(log_close - log_close[anchor])
+    open_ = np.concatenate([close[:1], close[:-1]]) * np.exp(rng.normal(0, 0.004, horizon))
+    wicks = np.abs(rng.normal(0, 0.007, (2, horizon)))
+    volume = rng.integers(10_000, 5_000_000) * rng.lognormal(0, 0.4, horizon)
+    return {
+        'open': open_,
+        'high': np.maximum(open_, close) * np.exp(wicks[0]),
+        'low': np.minimum(open_, close) * np.exp(-wicks[1]),
+        'close': close,
+        'volume': volume.astype(np.int64)
+    }
+
+def _intraday_bars(token: int, day: int, daily: Dict[str, np.ndarray], minutes: int) -> Dict[str, np.ndarray]:
+    """One session of `minutes`-wide bars: a Brownian bridge from the day's open to its close"""
+    rng = np.random.default_rng([token, day])
+    open_, close = daily['open'][day], daily['close'][day]
+    walk = np.concatenate([[0.0], np.cumsum(rng.normal(0, 0.017 / np.sqrt(SESSION_MINUTES), SESSION_MINUTES - 1))])
+    walk -= np.linspace(0, 1, SESSION_MINUTES) * (walk[-1] - np.log(close / open_))
+    path = open_ * np.exp(walk)
+    # U-shaped volume profile: busy open and close, quiet midday
+    profile = 1 + 2 * ((np.arange(SESSION_MINUTES) - SESSION_MINUTES / 2) / (SESSION_MINUTES / 2)) ** 2
+    minute_volume = daily['volume'][day] * profile / profile.sum()
+
+    starts = np.arange(0, SESSION_MINUTES, minutes)
+    ends = np.append(starts[1:], SESSION_MINUTES) - 1
+    wick = 1 + np.abs(rng.normal(0, 0.0005, (2, len(starts))))
+    return {
+        'offset': starts,
+        'open': path[starts],
+        'high': np.maximum.reduceat(path, starts) * wick[0],
+        'low': np.minimum.reduceat(path, starts) / wick[1],
+        'close': path[ends],
+        'volume': np.add.reduceat(minute_volume, starts).astype(np.int64)
+    }
+
+class SyntheticMarket:
+    """
+    Live prices for the whole universe as one geometric random walk
+
+    The walk is advanced lazily by elapsed wall-clock time (scaled by
+    time_scale) whenever prices are read, so it costs nothing between
+    requests and any number of readers see one consistent market.
+    Prices stay inside +/-20% circuit bands around the previous close.
+    """
+
+    def __init__(self, prev_close: np.ndarray, volatility: float, seed: int,
+                 time_scale: float = 1.0, clock=time.time):
+        self.rng = np.random.default_rng(seed)
+        self.prev_close = prev_close
+        self.volatility = volatility
+        self.time_scale = time_scale
+        self.clock = clock
+        self.lower_circuit = _tick_round(prev_close * 0.8)
+        self.upper_circuit = _tick_round(prev_close * 1.2)
+        self.ltp = np.clip(prev_close * np.exp(self.rng.normal(0, 0.01, len(prev_close))),
+                           self.lower_circuit, self.upper_circuit)
+        self.open = self.ltp.copy()
+        self.high = self.ltp.copy()
+        self.low = self.ltp.copy()
+        self.volume = self.rng.integers(1_000, 100_000, len(prev_close)).astype(float)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def advance(self):
+        with self._lock:
+            now = self.clock()
+            elapsed = (now - self._updated) * self.time_scale
+            if elapsed <= 0:
+                return
+            self._updated = now
+            sigma = self.volatility * np.sqrt(elapsed / TRADING_SECONDS_PER_YEAR)
+            self.ltp = np.clip(self.ltp * np.exp(self.rng.normal(0, sigma, len(self.ltp))),
+                               self.lower_circuit, self.upper_circuit)
+            np.maximum(self.high, self.ltp, out=self.high)
+            np.minimum(self.low, self.ltp, out=self.low)
+            self.volume += self.rng.poisson(min(elapsed, 60.0) * 50, len(self.ltp))
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Current prices after advancing to now (arrays are copies)"""
+        self.advance()
+        with self._lock:
+            return {'ltp': self.ltp.copy(), 'open': self.open.copy(), 'high': self.high.copy(),
+                    'low': self.low.copy(), 'volume': self.volume.copy()}
+
+class StubBook:
+    """
+    Synthetic account and market behind the stub server
+
+    Holds the instrument universe (indices, NIFTY 50 names, generated
+    stocks and NIFTY/BANKNIFTY option chains), a holdings and positions
+    book, today's order book, a trade history reaching back a year and
+    the live market. Everything is generated from config.seed, so two
+    servers with the same config serve the same account.
+    """
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.now = datetime.now()
+        self._lock = threading.RLock()
+        self.version = 0
+        rng = np.random.default_rng(config.seed)
+
+        self._build_universe(rng)
+        self.anchor = int(_business_index(np.datetime64(self.now.date(), 'D'))) - 1
+        self.horizon = self.anchor + 2
+        self.market = SyntheticMarket(self.prev_close, config.volatility, config.seed + 1, config.time_scale)
+        self._build_holdings(rng)
+        self._build_positions(rng)
+        self._build_orders(rng)
+        self._build_trades(rng)
+        self.margin_used = 0.0
+
+    # ------------------------------------------------------------------ universe
+
+    def _build_universe(self, rng: np.random.Generator):
+        indices = list(INDEX_INSTRUMENTS.items())
+        names = [symbol for symbol, _, _ in SECTOR_TABLE]
+        generated = max(self.config.instruments, self.config.holdings + 100) - len(names)
+        names += [f"STOCK{i:05d}" for i in range(max(generated, 0))]
+
+        exchanges = [key.split(':')[0] for _, key in indices] + ['NSE'] * len(names)
+        symbols = [key.split(':', 1)[1] for _, key in indices] + names
+        tokens = [INDEX_TOKENS[key] for _, key in indices]
+        tokens += [SECTOR_TOKENS.get(f"NSE:{name}", 5_000_000 + 8 * i) for i, name in enumerate(names)]
+        prev_close = [SAMPLE_INDEX_LEVELS[label] for label, _ in indices]
+        prev_close += list(_tick_round(np.exp(rng.uniform(np.log(50), np.log(8_000), len(names)))))
+        self.first_stock = len(indices)
+
+        kinds = ['INDEX'] * len(indices) + ['EQ'] * len(names)
+        chain_names = list(symbols)
+        lots = [0] * len(indices) + [1] * len(names)
+        underlying = [-1] * len(exchanges)
+        strikes = [0.0] * len(exchanges)
+        expiry = front_month_expiry(self.now)
+        code = f"{expiry:%y}{calendar.month_abbr[expiry.month].upper()}"
+        for name, (index_key, lot, step) in OPTION_CHAINS.items():
+            row = symbols.index(index_key.split(':', 1)[1])
+            atm = round(prev_close[row] / step) * step
+            for strike in range(atm - STRIKES_PER_SIDE * step, atm + (STRIKES_PER_SIDE + 1) * step, step):
+                for kind in ('CE', 'PE'):
+                    exchanges.append('NFO')
+                    symbols.append(f"{name}{code}{strike}{kind}")
+                    chain_names.append(name)
+                    tokens.append(10_000_000 + len(tokens))
+                    kinds.append(kind)
+                    lots.append(lot)
+                    underlying.append(row)
+                    strikes.append(float(strike))
+                    prev_close.append(0.0)
+
+        self.exchange = np.array(exchanges, dtype=object)
+        self.symbol = np.array(symbols, dtype=object)
+        self.name = np.array(chain_names, dtype=object)
+        self.keys = [f"{e}:{s}" for e, s in zip(exchanges, symbols)]
+        self.row = {key: i for i, key in enumerate(self.keys)}
+        self.token = np.array(tokens, dtype=np.int64)
+        self.token_row = {int(t): i for i, t in enumerate(tokens)}
+        self.kind = np.array(kinds, dtype=object)
+        self.lot_size = np.array(lots, dtype=np.int64)
+        self.underlying = np.array(underlying, dtype=np.int64)
+        self.strike = np.array(strikes)
+        self.expiry = expiry
+        self.is_option = self.underlying >= 0
+
+        # Option closes are fair value at yesterday's spot with a day more to run
+        prev_close = np.array(prev_close)
+        self.option_T = years_to_expiry(pd.Series([pd.Timestamp(expiry)] * int(self.is_option.sum())), self.now)
+        prev_close[self.is_option] = self._option_prices(prev_close, self.option_T + 1 / 365)
+        self.prev_close = prev_close
+
+    def _option_prices(self, prices: np.ndarray, T: np.ndarray) -> np.ndarray:
+        spot = prices[self.underlying[self.is_option]]
+        strike = self.strike[self.is_option]
+        # Mild smile so implied vols vary across the chain
+        sigma = OPTION_VOLATILITY + 0.5 * np.abs(np.log(strike / spot))
+        value = black_scholes_price(spot, strike, np.maximum(T, 1e-6), RISK_FREE_RATE, sigma,
+                                    self.kind[self.is_option] == 'CE')
+        return np.maximum(_tick_round(value), 0.05)
+
+    def prices(self) -> Dict[str, np.ndarray]:
+        """Live market for every instrument, options repriced off their underlying"""
+        snapshot = self.market.snapshot()
+        if self.is_option.any():
+            snapshot['ltp'][self.is_option] = self._option_prices(snapshot['ltp'], self.option_T)
+        snapshot['ltp'] = _tick_round(snapshot['ltp'])
+        return snapshot
+
+    @staticmethod
+    def isin(row: int) -> str:
+        return f"INE{row:06d}01{row % 10}"
+
+    def instrument(self, row: int) -> Dict[str, Any]:
+        option = bool(self.is_option[row])
+        return {
+            'instrument_token': int(self.token[row]),
+            'exchange_token': int(self.token[row]) // 256,
+            'tradingsymbol': self.symbol[row],
+            'name': self.name[row],
+            'last_price': 0.0,
+            'expiry': self.expiry.isoformat() if option else '',
+            'strike': float(self.strike[row]),
+            'tick_size': 0.05,
+            'lot_size': int(self.lot_size[row]),
+            'instrument_type': self.kind[row],
+            'segment': 'NFO-OPT' if option else ('INDICES' if self.kind[row] == 'INDEX' else self.exchange[row]),
+            'exchange': self.exchange[row]
+        }
+
+    # ------------------------------------------------------------------ account
+
+    def _build_holdings(self, rng: np.random.Generator):
+        stocks = np.arange(self.first_stock, self.first_stock + int((self.kind == 'EQ').sum()))
+        count = min(self.config.holdings, len(stocks))
+        self.holding_rows = np.sort(rng.choice(stocks, count, replace=False))
+        self.holding_qty = rng.integers(1, 500, count)
+        self.holding_avg = np.round(self.prev_close[self.holding_rows] * np.exp(rng.normal(0, 0.2, count)), 2)
+
+    def _build_positions(self, rng: np.random.Generator):
+        options = np.flatnonzero(self.is_option)
+        n_options = min(len(options), self.config.positions // 5)
+        n_equity = max(self.config.positions - n_options, 0)
+        equity = rng.choice(np.arange(self.first_stock, self.first_stock + int((self.kind == 'EQ').sum())),
+                            n_equity, replace=False)
+        rows = np.concatenate([equity, rng.choice(options, n_options, replace=False)]).astype(np.int64)
+        lots = np.maximum(self.lot_size[rows], 1)
+        self.position_rows = rows
+        self.position_qty = lots * rng.integers(1, 10, len(rows)) * rng.choice([-1, 1], len(rows))
+        self.position_avg = _tick_round(self.prev_close[rows] * np.exp(rng.normal(0, 0.01, len(rows))))
+        self.position_product = np.where(self.is_option[rows], 'NRML', 'MIS')
+
+    def _order(self, order_id: str, row: int, side: str, quantity: int, order_type: str,
+               product: str, price: float, status: str, stamp: datetime) -> Dict[str, Any]:
+        filled = quantity if status == 'COMPLETE' else 0
+        timestamp = stamp.strftime(TIMESTAMP_FORMAT)
+        return {
+            'order_id': order_id,
+            'exchange_order_id': None if status == 'REJECTED' else f"1{order_id[-15:]}",
+            'parent_order_id': None,
+            'status': status,
+            'status_message': "Insufficient funds" if status == 'REJECTED' else None,
+            'variety': 'regular',
+            'exchange': self.exchange[row],
+            'tradingsymbol': self.symbol[row],
+            'instrument_token': int(self.token[row]),
+            'order_type': order_type,
+            'transaction_type': side,
+            'validity': 'DAY',
+            'product': product,
+            'quantity': int(quantity),
+            'disclosed_quantity': 0,
+            'price': float(price) if order_type == 'LIMIT' else 0.0,
+            'trigger_price': 0.0,
+            'average_price': float(price) if filled else 0.0,
+            'filled_quantity': int(filled),
+            'pending_quantity': int(quantity - filled) if status == 'OPEN' else 0,
+            'cancelled_quantity': int(quantity) if status == 'CANCELLED' else 0,
+            'order_timestamp': timestamp,
+            'exchange_timestamp': None if status == 'REJECTED' else timestamp,
+            'exchange_update_timestamp': timestamp,
+            'tag': None
+        }
+
+    def _trade(self, trade_id: str, order: Dict[str, Any], price: float, stamp: str) -> Dict[str, Any]:
+        return {
+            'trade_id': trade_id,
+            'order_id': order['order_id'],
+            'exchange_order_id': order['exchange_order_id'],
+            'exchange': order['exchange'],
+            'tradingsymbol': order['tradingsymbol'],
+            'instrument_token': order['instrument_token'],
+            'product': order['product'],
+            'transaction_type': order['transaction_type'],
+            'quantity': order['quantity'],
+            'average_price': float(price),
+            'fill_timestamp': stamp,
+            'exchange_timestamp': stamp
+        }
+
+    def _build_orders(self, rng: np.random.Generator):
+        n = self.config.orders
+        self.order_prefix = self.now.strftime('%y%m%d')
+        session_start = self.now.replace(hour=SESSION_OPEN[0], minute=SESSION_OPEN[1], second=0, microsecond=0)
+        pool = np.concatenate([self.holding_rows, self.position_rows[~self.is_option[self.position_rows]]])
+        rows = rng.choice(pool, n) if len(pool) else np.zeros(n, dtype=np.int64)
+        sides = rng.choice(['BUY', 'SELL'], n)
+        limit = rng.random(n) < 0.6
+        quantity = rng.integers(1, 200, n)
+        offsets = np.sort(rng.uniform(0, SESSION_MINUTES * 60 * 0.9, n))
+        # Resting orders sit at the tail of the book, priced just away from the market
+        n_open = min(20, n // 10)
+        status = rng.choice(['COMPLETE', 'CANCELLED', 'REJECTED'], n, p=[0.8, 0.12, 0.08])
+        status[n - n_open:] = 'OPEN'
+        limit[n - n_open:] = True
+        away = np.where(sides == 'BUY', 0.995, 1.005)
+        price = _tick_round(self.prev_close[rows] * np.where(status == 'OPEN', away, np.exp(rng.normal(0, 0.005, n))))
+
+        self.orders: List[Dict[str, Any]] = []
+        self.open_orders: List[int] = []
+        self.today_fills: List[Dict[str, Any]] = []
+        for i in range(n):
+            order = self._order(f"{self.order_prefix}{i:09d}", int(rows[i]), sides[i], int(quantity[i]),
+                                'LIMIT' if limit[i] else 'MARKET', 'CNC', price[i], status[i],
+                                session_start + timedelta(seconds=float(offsets[i])))
+            self.orders.append(order)
+            if status[i] == 'OPEN':
+                self.open_orders.append(i)
+            elif status[i] == 'COMPLETE':
+                self.today_fills.append(self._trade(f"T{self.order_prefix}{i:09d}", order, price[i],
+                                                    order['exchange_update_timestamp']))
+
+    def _build_trades(self, rng: np.random.Generator):
+        """Trade history over the last year on held names, priced off each name's daily candles"""
+        n = max(self.config.trades - len(self.today_fills), 0)
+        traded = self.holding_rows[:1_000] if len(self.holding_rows) else np.arange(self.first_stock, self.first_stock + 1)
+        rows = rng.choice(traded, n)
+        days = np.sort(rng.integers(self.anchor - 250, self.anchor + 1, n))
+        seconds = rng.integers(0, SESSION_MINUTES * 60, n)
+        prices = np.empty(n)
+        order = np.argsort(rows, kind='stable')
+        names, starts = np.unique(rows[order], return_index=True)
+        for row, group in zip(names, np.split(order, starts[1:])):
+            daily = daily_candles(int(self.token[row]), self.prev_close[row], self.horizon, self.anchor)
+            prices[group] = daily['close'][days[group]]
+        prices = _tick_round(prices)
+        stamps = (_business_day(days).astype('datetime64[s]') + np.timedelta64(9 * 3600 + 15 * 60, 's')
+                  + seconds.astype('timedelta64[s]'))
+        stamps = pd.DatetimeIndex(np.sort(stamps)).strftime(TIMESTAMP_FORMAT)
+        sides = rng.choice(['BUY', 'SELL'], n, p=[0.6, 0.4])
+        quantity = rng.integers(1, 100, n)
+
+        self.trades = [{
+            'trade_id': f"H{i:09d}",
+            'order_id': f"H{i:014d}",
+            'exchange_order_id': f"2{i:015d}",
+            'exchange': self.exchange[row],
+            'tradingsymbol': self.symbol[row],
+            'instrument_token': int(self.token[row]),
+            'product': 'CNC',
+            'transaction_type': side,
+            'quantity': int(qty),
+            'average_price': float(price),
+            'fill_timestamp': stamp,
+            'exchange_timestamp': stamp
+        } for i, (row, side, qty, price, stamp) in enumerate(zip(rows, sides, quantity, prices, stamps))]
+        self.trades.extend(self.today_fills)
+
+    def _match_open_orders(self, ltp: np.ndarray):
+        """Fill resting LIMIT orders the market has crossed"""
+        if not self.open_orders:
+            return
+        with self._lock:
+            still_open = []
+            stamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+            for index in self.open_orders:
+                order = self.orders[index]
+                last = ltp[self.row[f"{order['exchange']}:{order['tradingsymbol']}"]]
+                crossed = last <= order['price'] if order['transaction_type'] == 'BUY' else last >= order['price']
+                if not crossed:
+                    still_open.append(index)
+                    continue
+                self.orders[index] = order = {**order, 'status': 'COMPLETE', 'filled_quantity': order['quantity'],
+                                              'pending_quantity': 0, 'average_price': order['price'],
+                                              'exchange_update_timestamp': stamp}
+                self.trades.append(self._trade(f"T{order['order_id']}", order, order['price'], stamp))
+            if len(still_open) != len(self.open_orders):
+                self.open_orders = still_open
+                self.version += 1
+
+    # ------------------------------------------------------------------ tools
+
+    @staticmethod
+    def _page(records: List[Dict], arguments: Dict[str, Any]) -> Any:
+        """Whole list, or Kite MCP's paginated envelope when from/limit are given"""
+        start = int(arguments.get('from') or 0)
+        limit = arguments.get('limit')
+        if not start and not limit:
+            return records
+        end = len(records) if not limit else start + int(limit)
+        return {'data': records[start:end],
+                'pagination': {'from': start, 'limit': int(limit or 0), 'total': len(records),
+                               'has_more': end < len(records)}}
+
+    def get_profile(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        return {'user_id': 'ST0001', 'user_name': 'Stub Trader', 'user_shortname': 'Stub',
+                'email': 'stub.trader@example.com', 'user_type': 'individual', 'broker': 'ZERODHA',
+                'exchanges': ['NSE', 'BSE', 'NFO', 'BFO'], 'products': ['CNC', 'NRML', 'MIS'],
+                'order_types': ['MARKET', 'LIMIT', 'SL', 'SL-M']}
+
+    def get_holdings(self, arguments: Dict[str, Any]) -> Any:
+        rows = self.holding_rows
+        market = self.prices()
+        ltp = market['ltp'][rows]
+        close = self.prev_close[rows]
+        pnl = np.round((ltp - self.holding_avg) * self.holding_qty, 2)
+        day_change = np.round(ltp - close, 2)
+        day_change_pct = np.round(day_change / close * 100, 4)
+        records = [{
+            'tradingsymbol': self.symbol[row], 'exchange': self.exchange[row],
+            'instrument_token': int(self.token[row]), 'isin': self.isin(row),
+            'product': 'CNC', 'quantity': qty, 't1_quantity': 0, 'average_price': avg,
+            'last_price': last, 'close_price': prev, 'pnl': p,
+            'day_change': change, 'day_change_percentage': change_pct
+        } for row, qty, avg, last, prev, p, change, change_pct in zip(
+            rows.tolist(), self.holding_qty.tolist(), self.holding_avg.tolist(), ltp.tolist(),
+            close.tolist(), pnl.tolist(), day_change.tolist(), day_change_pct.tolist())]
+        return self._page(records, arguments)
+
+    def get_positions(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        rows = self.position_rows
+        ltp = self.prices()['ltp'][rows]
+        qty = self.position_qty
+        pnl = np.round((ltp - self.position_avg) * qty, 2)
+        net = []
+        for row, q, avg, last, prev, p, product in zip(rows.tolist(), qty.tolist(), self.position_avg.tolist(),
+                                                        ltp.tolist(), self.prev_close[rows].tolist(),
+                                                        pnl.tolist(), self.position_product.tolist()):
+            bought, sold = max(q, 0), max(-q, 0)
+            net.append({
+                'tradingsymbol': self.symbol[row], 'exchange': self.exchange[row],
+                'instrument_token': int(self.token[row]), 'product': product,
+                'quantity': q, 'overnight_quantity': 0, 'multiplier': 1,
+                'average_price': avg, 'close_price': prev, 'last_price': last,
+                'value': round(-q * avg, 2), 'pnl': p, 'm2m': p, 'unrealised': p, 'realised': 0.0,
+                'buy_quantity': bought, 'buy_price': avg if bought else 0.0,
+                'sell_quantity': sold, 'sell_price': avg if sold else 0.0
+            })
+        return {'net': net, 'day': [p for p in net if p['product'] == 'MIS']}
+
+    def get_margins(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        exposure = float(np.abs(self.position_qty * self.position_avg).sum()) * 0.2
+        with self._lock:
+            used = exposure + self.margin_used
+        cash = self.config.cash
+
+        def segment(cash_balance: float, debits: float) -> Dict[str, Any]:
+            return {'enabled': True, 'net': round(cash_balance - debits, 2),
+                    'available': {'adhoc_margin': 0.0, 'cash': cash_balance, 'opening_balance': cash_balance,
+                                  'live_balance': round(cash_balance - debits, 2), 'collateral': 0.0,
+                                  'intraday_payin': 0.0},
+                    'utilised': {'debits': round(debits, 2), 'exposure': round(debits, 2), 'm2m_realised': 0.0,
+                                 'm2m_unrealised': 0.0, 'option_premium': 0.0, 'payout': 0.0, 'span': 0.0,
+                                 'holding_sales': 0.0, 'turnover': 0.0}}
+
+        return {'equity': segment(cash, used), 'commodity': segment(0.0, 0.0)}
+
+    def get_orders(self, arguments: Dict[str, Any]) -> Any:
+        self._match_open_orders(self.prices()['ltp'])
+        with self._lock:
+            return self._page(list(self.orders), arguments)
+
+    def get_trades(self, arguments: Dict[str, Any]) -> Any:
+        self._match_open_orders(self.prices()['ltp'])
+        with self._lock:
+            return self._page(list(self.trades), arguments)
+
+    def _known_rows(self, arguments: Dict[str, Any]) -> List[Tuple[str, int]]:
+        instruments = arguments.get('instruments') or []
+        if isinstance(instruments, str):
+            instruments = [instruments]
+        # Unknown instruments are left out of the response, as Kite does
+        return [(key, self.row[key]) for key in dict.fromkeys(map(str, instruments)) if key in self.row]
+
+    def get_ltp(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        ltp = self.prices()['ltp']
+        return {key: {'instrument_token': int(self.token[row]), 'last_price': float(ltp[row])}
+                for key, row in self._known_rows(arguments)}
+
+    def get_quotes(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        market = self.prices()
+        stamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        quotes = {}
+        for key, row in self._known_rows(arguments):
+            last = float(market['ltp'][row])
+            prev = float(self.prev_close[row])
+            index = self.kind[row] == 'INDEX'
+            levels = np.arange(1, 6) * 0.05
+            quotes[key] = {
+                'instrument_token': int(self.token[row]),
+                'timestamp': stamp,
+                'last_trade_time': stamp,
+                'last_price': last,
+                'last_quantity': 0 if index else 10,
+                'buy_quantity': 0 if index else int(market['volume'][row] // 20),
+                'sell_quantity': 0 if index else int(market['volume'][row] // 25),
+                'volume': 0 if index else int(market['volume'][row]),
+                'average_price': 0.0 if index else round((last + prev) / 2, 2),
+                'oi': 0,
+                'net_change': round(last - prev, 2),
+                'lower_circuit_limit': 0.0 if index else float(self.market.lower_circuit[row]),
+                'upper_circuit_limit': 0.0 if index else float(self.market.upper_circuit[row]),
+                'ohlc': {'open': float(_tick_round(market['open'][row])), 'high': float(_tick_round(market['high'][row])),
+                         'low': float(_tick_round(market['low'][row])), 'close': prev},
+                'depth': {
+                    'buy': [{'price': round(last - step, 2), 'quantity': 0 if index else 100 * i, 'orders': i}
+                            for i, step in enumerate(levels, 1)],
+                    'sell': [{'price': round(last + step, 2), 'quantity': 0 if index else 100 * i, 'orders': i}
+                             for i, step in enumerate(levels, 1)]
+                }
+            }
+        return quotes
+
+    def search_instruments(self, arguments: Dict[str, Any]) -> Any:
+        query = str(arguments.get('query', '')).strip().upper()
+        if not query:
+            raise ToolError("query is required")
+        filter_on = arguments.get('filter_on') or 'tradingsymbol'
+        if filter_on == 'id':
+            rows = [self.token_row[int(query)]] if query.isdigit() and int(query) in self.token_row else []
+        elif filter_on == 'underlying':
+            rows = [i for i in np.flatnonzero(self.is_option) if self.symbol[i].startswith(query)]
+        elif filter_on == 'isin':
+            rows = [i for i in range(self.first_stock, len(self.symbol))
+                    if self.kind[i] == 'EQ' and self.isin(i) == query]
+        elif filter_on in ('tradingsymbol', 'name'):
+            values = self.symbol if filter_on == 'tradingsymbol' else self.name
+            rows = [i for i, value in enumerate(values) if query in value]
+        else:
+            raise ToolError(f"invalid filter_on: {filter_on}")
+        return self._page([self.instrument(int(row)) for row in rows], arguments)
+
+    def get_historical_data(self, arguments: Dict[str, Any]) -> List[Dict[str, Any]]:
+        interval = arguments.get('interval', 'day')
+        if interval not in MAX_DAYS_PER_REQUEST:
+            raise ToolError(f"invalid interval: {interval}")
+        try:
+            token = int(arguments['instrument_token'])
+            start = pd.Timestamp(arguments['from_date']).to_pydatetime()
+            end = pd.Timestamp(arguments['to_date']).to_pydatetime()
+        except (KeyError, TypeError, ValueError) as e:
+            raise ToolError(f"invalid arguments: {e}")
+        if (end - start).days > MAX_DAYS_PER_REQUEST[interval]:
+            raise ToolError(f"interval exceeds max limit: {MAX_DAYS_PER_REQUEST[interval]} days")
+
+        row = self.token_row.get(token)
+        prev_close = float(self.prev_close[row]) if row is not None else 50.0 + token % 4_950
+        daily = daily_candles(token, prev_close, self.horizon, self.anchor)
+        first = max(int(_business_index(np.datetime64(start.date(), 'D'))), 0)
+        last_day = self.anchor if interval == 'day' else self.anchor + 1
+        last = min(int(_business_index(np.datetime64(end.date(), 'D') + 1)) - 1, last_day)
+        days = np.arange(first, last + 1)
+        if not len(days):
+            return []
+        dates = _business_day(days)
+
+        if interval == 'day':
+            candles = {name: daily[name][days] for name in ('open', 'high', 'low', 'close', 'volume')}
+            stamps = pd.DatetimeIndex(dates)
+        else:
+            minutes = 1 if interval == 'minute' else int(interval[:-len('minute')])
+            bars = [_intraday_bars(token, int(day), daily, minutes) for day in days]
+            offsets = np.concatenate([b['offset'] for b in bars])
+            base = np.repeat(dates.astype('datetime64[m]'), [len(b['offset']) for b in bars])
+            stamps = pd.DatetimeIndex(base + np.timedelta64(SESSION_OPEN[0] * 60 + SESSION_OPEN[1], 'm')
+                                      + offsets.astype('timedelta64[m]'))
+            candles = {name: np.concatenate([b[name] for b in bars])
+                       for name in ('open', 'high', 'low', 'close', 'volume')}
+            # Today's session only up to the current minute
+            keep = (stamps >= start) & (stamps <= min(end, datetime.now()))
+            stamps = stamps[keep]
+            candles = {name: values[keep] for name, values in candles.items()}
+
+        labels = stamps.strftime('%Y-%m-%dT%H:%M:%S' + CANDLE_OFFSET)
+        return [{'date': date, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+                for date, o, h, l, c, v in zip(labels, *(np.round(candles[name], 2).tolist()
+                                                          for name in ('open', 'high', 'low', 'close')),
+                                               candles['volume'].tolist())]
+
+    def place_order(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        key = f"{arguments.get('exchange')}:{arguments.get('tradingsymbol')}"
+        row = self.row.get(key)
+        if row is None or self.kind[row] == 'INDEX':
+            raise ToolError(f"Invalid instrument: {key}")
+        side = arguments.get('transaction_type')
+        order_type = arguments.get('order_type', 'MARKET')
+        if side not in ('BUY', 'SELL') or order_type not in ('MARKET', 'LIMIT'):
+            raise ToolError(f"Unsupported order: {side} {order_type}")
+        quantity = int(arguments.get('quantity') or 0)
+        lot = int(self.lot_size[row])
+        if quantity <= 0 or quantity % lot:
+            raise ToolError(f"Quantity should be a multiple of the lot size ({lot})")
+        ltp = self.prices()['ltp']
+        price = float(arguments.get('price') or 0.0)
+        if order_type == 'LIMIT':
+            if price <= 0 or abs(round(price / 0.05) * 0.05 - price) > 1e-6:
+                raise ToolError("Price must be a positive multiple of the tick size (0.05)")
+            if not self.market.lower_circuit[row] <= price <= self.market.upper_circuit[row] and not self.is_option[row]:
+                raise ToolError("Price is outside the circuit limits")
+
+        with self._lock:
+            index = len(self.orders)
+            fill = float(ltp[row]) if order_type == 'MARKET' else price
+            order = self._order(f"{self.order_prefix}{index:09d}", row, side, quantity, order_type,
+                                arguments.get('product', 'CNC'), fill,
+                                'COMPLETE' if order_type == 'MARKET' else 'OPEN', datetime.now())
+            order['variety'] = arguments.get('variety', 'regular')
+            self.orders.append(order)
+            if order_type == 'MARKET':
+                self.trades.append(self._trade(f"T{order['order_id']}", order, fill,
+                                               order['exchange_update_timestamp']))
+            else:
+                self.open_orders.append(index)
+            if side == 'BUY':
+                self.margin_used += quantity * fill
+            self.version += 1
+        return {'order_id': order['order_id']}
+
+# Tools served straight from the book (login is handled per session by the server)
+BOOK_TOOLS = ('get_profile', 'get_holdings', 'get_positions', 'get_margins', 'get_orders', 'get_trades',
+              'get_quotes', 'get_ltp', 'search_instruments', 'get_historical_data', 'place_order')
+
+# Responses that only change when the book does; their encoded bodies are reused
+CACHED_TOOLS = ('get_profile', 'get_orders', 'get_trades', 'search_instruments')
+
+class _Session:
+    def __init__(self, authenticated: bool):
+        self.authenticated = authenticated
+        self.limiters: Dict[str, RateLimiter] = {}
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "KiteMCPStub/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.stub.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json',
+              headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+        status, body, headers = self.server.stub.handle(raw, self.headers.get(SESSION_HEADER))
+        self._send(status, body, headers=headers)
+
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if url.path.endswith('/ticks'):
+            self._stream_ticks(query)
+        elif url.path.endswith('/login'):
+            ok = stub.complete_login(query.get('session_id', ''))
+            self._send(200 if ok else 404, ("<h3>Login successful. You can close this tab.</h3>" if ok
+                                            else "<h3>Unknown session</h3>").encode(), 'text/html')
+        elif url.path.endswith('/stats'):
+            self._send(200, json.dumps(stub.stats()).encode())
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def _stream_ticks(self, query: Dict[str, str]):
+        """Server-sent events: one batch of ticks for the requested instruments per interval"""
+        book = self.server.stub.book
+        keys = [key for key in query.get('instruments', '').split(',') if key in book.row]
+        if not keys:
+            keys = [book.keys[row] for row in book.holding_rows[:50]]
+        rows = np.array([book.row[key] for key in keys], dtype=np.int64)
+        interval = max(float(query.get('interval', 1.0)), 0.01)
+        count = int(query.get('count', 0))
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        sent = 0
+        try:
+            while not self.server.stub.stopping.is_set() and (not count or sent < count):
+                market = book.prices()
+                event = {'timestamp': datetime.now().strftime(TIMESTAMP_FORMAT), 'ticks': [
+                    {'instrument': key, 'instrument_token': int(book.token[row]),
+                     'last_price': float(last), 'volume_traded': int(volume)}
+                    for key, row, last, volume in zip(keys, rows.tolist(), market['ltp'][rows].tolist(),
+                                                      market['volume'][rows].tolist())]}
+                self.wfile.write(f"data: {json.dumps(event, separators=(',', ':'))}\n\n".encode())
+                self.wfile.flush()
+                sent += 1
+                if not count or sent < count:
+                    time.sleep(interval)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+class StubServer:
+    """
+    Local MCP-compatible server answering every tool KiteMCPClient calls
+
+    Speaks the same streamable-HTTP JSON-RPC the client sends (POST to
+    /mcp, Mcp-Session-Id issued on first contact), serves a StubBook,
+    and injects latency, 5xx errors and 429s as configured. Tool errors
+    come back as JSON-RPC errors, so the client reports them as failed.
+
+    GET endpoints next to /mcp:
+        /ticks?instruments=NSE:INFY,NSE:TCS&interval=0.5&count=10  server-sent tick events
+        /login?session_id=...                                        completes a stub login
+        /stats                                                        call/status counters
+
+    Use it in-process (with StubServer(config) as server: ... server.url)
+    or from scripts/stub_server.py.
+    """
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0,
+                 verbose: bool = False):
+        self.config = config or StubConfig()
+        self.book = StubBook(self.config)
+        self.verbose = verbose
+        self.stopping = threading.Event()
+        self._sessions: Dict[str, _Session] = {}
+        self._encoded: Dict[Tuple[str, str], bytes] = {}
+        self._encoded_version = -1
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._calls: Dict[str, int] = {}
+        self._statuses: Dict[str, int] = {}
+        self._bytes_out = 0
+        self._thread: Optional[threading.Thread] = None
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        """MCP endpoint to give KiteMCPClient (or MCP_SERVER_URL)"""
+        return f"{self.base_url}/mcp"
+
+    def start(self) -> 'StubServer':
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="kite-mcp-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> 'StubServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------ sessions
+
+    def _session(self, session_id: Optional[str]) -> Tuple[str, _Session]:
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session_id = uuid.uuid4().hex
+                session = self._sessions[session_id] = _Session(not self.config.require_login)
+            return session_id, session
+
+    def complete_login(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return False
+            session.authenticated = True
+            return True
+
+    def _rate_limited(self, session: _Session, tool: str) -> bool:
+        limits = self.config.rate_limits
+        rate = limits.get(tool, limits.get('*'))
+        if not rate:
+            return False
+        with self._lock:
+            limiter = session.limiters.get(tool)
+            if limiter is None:
+                limiter = session.limiters[tool] = RateLimiter(rate)
+        return not limiter.try_acquire()
+
+    # ------------------------------------------------------------------ requests
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'calls': dict(self._calls), 'statuses': dict(self._statuses),
+                    'bytes_out': self._bytes_out, 'sessions': len(self._sessions)}
+
+    def _count(self, tool: str, status: int, size: int):
+        with self._lock:
+            self._calls[tool] = self._calls.get(tool, 0) + 1
+            self._statuses[str(status)] = self._statuses.get(str(status), 0) + 1
+            self._bytes_out += size
+
+    def _draw(self) -> Tuple[float, float]:
+        """Injected delay in seconds and a uniform draw deciding faults"""
+        with self._lock:
+            jitter = self._random.random()
+            fault = self._random.random()
+        return (self.config.latency_ms + self.config.jitter_ms * jitter) / 1000, fault
+
+    def _result(self, request_id: Any, tool: str, arguments: Dict[str, Any]) -> bytes:
+        cache_key = None
+        if tool in CACHED_TOOLS:
+            cache_key = (tool, json.dumps(arguments, sort_keys=True, default=str))
+            with self._lock:
+                if self._encoded_version != self.book.version or len(self._encoded) > 1_024:
+                    self._encoded, self._encoded_version = {}, self.book.version
+                body = self._encoded.get(cache_key)
+            if body is not None:
+                return body.replace(b'"id":null', f'"id":{json.dumps(request_id)}'.encode(), 1)
+
+        version = self.book.version
+        text = json.dumps(getattr(self.book, tool)(arguments), separators=(',', ':'))
+        body = json.dumps({'jsonrpc': '2.0', 'id': None,
+                           'result': {'content': [{'type': 'text', 'text': text}]}},
+                          separators=(',', ':')).encode()
+        if cache_key is not None and version == self.book.version:
+            with self._lock:
+                if self._encoded_version == version:
+                    self._encoded[cache_key] = body
+        return body.replace(b'"id":null', f'"id":{json.dumps(request_id)}'.encode(), 1)
+
+    @staticmethod
+    def _rpc(request_id: Any, result: Any = None, error: Optional[str] = None, code: int = -32000) -> bytes:
+        payload = {'jsonrpc': '2.0', 'id': request_id}
+        if error is not None:
+            payload['error'] = {'code': code, 'message': error}
+        else:
+            payload['result'] = result
+        return json.dumps(payload, separators=(',', ':')).encode()
+
+    def handle(self, raw: bytes, session_id: Optional[str]) -> Tuple[int, bytes, Dict[str, str]]:
+        """Answer one POSTed JSON-RPC message: (status, body, headers)"""
+        session_id, session = self._session(session_id)
+        headers = {SESSION_HEADER: session_id}
+        try:
+            message = json.loads(raw or b'{}')
+        except ValueError:
+            return 400, self._rpc(None, error="Parse error", code=-32700), headers
+        request_id = message.get('id')
+        method = message.get('method')
+        params = message.get('params') or {}
+
+        if method == 'initialize':
+            return 200, self._rpc(request_id, {'protocolVersion': '2025-03-26',
+                                               'serverInfo': {'name': 'kite-mcp-stub', 'version': '1.0'},
+                                               'capabilities': {'tools': {}}}), headers
+        if method == 'tools/list':
+            return 200, self._rpc(request_id, {'tools': [{'name': name, 'inputSchema': {'type': 'object'}}
+                                                         for name in ('login',) + BOOK_TOOLS]}), headers
+        if method != 'tools/call':
+            return (202, b'', headers) if request_id is None else (
+                200, self._rpc(request_id, error=f"Method not found: {method}", code=-32601), headers)
+
+        tool = params.get('name', '')
+        arguments = params.get('arguments') or {}
+        delay, fault = self._draw()
+        started = time.perf_counter()
+        status = 200
+        if self._rate_limited(session, tool) or fault < self.config.throttle_rate:
+            status, body = 429, b'{"error": "Too many requests"}'
+            headers['Retry-After'] = '1'
+        elif fault < self.config.throttle_rate + self.config.error_rate:
+            status = (500, 502, 503, 200)[int((fault - self.config.throttle_rate) / self.config.error_rate * 4) % 4]
+            # The 200 share is a truncated body, exercising the client's invalid-JSON path
+            body = b'{"jsonrpc":"2.0","result":{"content":[{"type":"te' if status == 200 else b'Server error'
+        elif tool == 'login':
+            link = f"{self.base_url}/login?session_id={session_id}"
+            text = json.dumps(f"[Login to Kite]({link})") if not session.authenticated else \
+                json.dumps("Already logged in")
+            body = self._rpc(request_id, {'content': [{'type': 'text', 'text': text}]})
+        elif tool not in BOOK_TOOLS:
+            body = self._rpc(request_id, error=f"Unknown tool: {tool}", code=-32602)
+        elif not session.authenticated:
+            body = self._rpc(request_id, error="Not logged in. Call the login tool first.", code=-32001)
+        else:
+            try:
+                body = self._result(request_id, tool, arguments)
+            except ToolError as e:
+                body = self._rpc(request_id, error=str(e), code=-32602)
+
+        remaining = delay - (time.perf_counter() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+        self._count(tool, status, len(body))
+        return status, body, headers
+
+def stream_ticks(server_url: str, instruments: Optional[List[str]] = None, interval: float = 1.0,
+                 count: int = 0, timeout: float = 30) -> Iterator[Dict[str, Any]]:
+    """
+    Tick events from a stub server's /ticks stream
+
+    Args:
+        server_url: The server's MCP URL (as given to KiteMCPClient)
+        instruments: EXCHANGE:SYMBOL keys (the first 50 holdings when empty)
+        interval: Seconds between events
+        count: Events to receive (0 streams until the caller stops iterating)
+
+    Yields:
+        {'timestamp': ..., 'ticks': [{'instrument', 'instrument_token', 'last_price', 'volume_traded'}]}
+    """
+    base = server_url.rsplit('/', 1)[0]
+    params = {'instruments': ','.join(instruments or []), 'interval': interval, 'count': count}
+    with requests.get(f"{base}/ticks", params=params, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if line and line.startswith('data: '):
+                yield json.loads(line[len('data: '):])
@@ -0,0 +1,311 @@
+"""
+Tick Buffer - Intraday ticks for many instruments in preallocated NumPy ring buffers
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# NSE cash session, 09:15 to 15:30
+SESSION_OPEN_SECONDS = 9 * 3600 + 15 * 60
+SESSION_SECONDS = 375 * 60
+
+# Ticks within one resolution bucket share a slot (last price wins, volume adds up)
+DEFAULT_RESOLUTION = 15
+
+# One slot per bucket for a whole session: 1,500 slots, 18 KB per instrument
+DEFAULT_CAPACITY = -(-SESSION_SECONDS // DEFAULT_RESOLUTION)
+
+SPARKLINE_POINTS = 60
+
+# Bytes per slot: int32 time + float32 price + float32 volume
+SLOT_BYTES = 12
+
+def day_origin(timestamp: float) -> int:
+    """Epoch seconds of local midnight for the day containing `timestamp`"""
+    day = datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+    return int(day.timestamp())
+
+class TickBuffer:
+    """
+    Intraday ticks per instrument in fixed (instrument x slot) arrays
+
+    Memory is allocated once: instruments x capacity x 12 bytes, about
+    36 MB for 2,000 instruments at the defaults, however many ticks
+    arrive. Ticks falling in the same `resolution`-second bucket update
+    one slot in place, so a full session fits without wrapping; beyond
+    capacity the oldest slots are overwritten. Times are stored as int32
+    seconds since the day's midnight.
+
+    High, low and VWAP are running aggregates over every tick seen, so they
+    are exact regardless of bucketing. Volume is taken as Kite's cumulative
+    day volume; the first reading for an instrument only sets the baseline,
+    so VWAP covers the ticks this buffer has observed.
+
+    The app keeps one buffer per process for live and one for simulated
+    ticks (see shared_buffer), so the memory above is paid once rather than
+    per session. Reads and writes take `lock`.
+    """
+
+    def __init__(self, keys: Sequence[str] = (), capacity: int = DEFAULT_CAPACITY,
+                 resolution: int = DEFAULT_RESOLUTION, origin: Optional[int] = None):
+        self.capacity = int(capacity)
+        self.resolution = int(resolution)
+        self.origin = day_origin(time.time()) if origin is None else int(origin)
+        self.keys: List[str] = []
+        self._index: Dict[str, int] = {}
+        # Previous close per instrument, where the feed provides one
+        self.prev_close: Dict[str, float] = {}
+        self.lock = threading.RLock()
+        self._allocate(0)
+        self.add(keys)
+
+    def _allocate(self, n: int):
+        cap = self.capacity
+        self.times = np.zeros((n, cap), dtype=np.int32)
+        self.prices = np.full((n, cap), np.nan, dtype=np.float32)
+        self.volumes = np.zeros((n, cap), dtype=np.float32)
+        self.head = np.zeros(n, dtype=np.int64)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.last_bucket = np.full(n, -1, dtype=np.int64)
+        self.first = np.full(n, np.nan)
+        self.last = np.full(n, np.nan)
+        self.high = np.full(n, -np.inf)
+        self.low = np.full(n, np.inf)
+        self.pv = np.zeros(n)
+        self.volume = np.zeros(n)
+        self.cum_volume = np.full(n, np.nan)
+        self.ticks = np.zeros(n, dtype=np.int64)
+
+    def add(self, keys: Sequence[str]) -> int:
+        """Start tracking more instruments (existing ones are ignored); returns how many were added"""
+        with self.lock:
+            new = [k for k in dict.fromkeys(keys) if k not in self._index]
+            if not new:
+                return 0
+            old = len(self.keys)
+            grown = TickBuffer.__new__(TickBuffer)
+            grown.capacity = self.capacity
+            grown._allocate(len(new))
+            for name in ('times', 'prices', 'volumes', 'head', 'count', 'last_bucket', 'first', 'last',
+                         'high', 'low', 'pv', 'volume', 'cum_volume', 'ticks'):
+                setattr(self, name, np.concatenate([getattr(self, name), getattr(grown, name)]))
+            for offset, key in enumerate(new):
+                self._index[key] = old + offset
+            self.keys.extend(new)
+            return len(new)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.times, self.prices, self.volumes, self.head, self.count,
+                                      self.last_bucket, self.first, self.last, self.high, self.low,
+                                      self.pv, self.volume, self.cum_volume, self.ticks))
+
+    @staticmethod
+    def memory_estimate(instruments: int, capacity: int = DEFAULT_CAPACITY) -> int:
+        """Bytes the slot arrays need for this many instruments"""
+        return instruments * capacity * SLOT_BYTES
+
+    def is_current(self, timestamp: Optional[float] = None) -> bool:
+        """False once the day has rolled over and the buffer should be replaced"""
+        return day_origin(time.time() if timestamp is None else timestamp) == self.origin
+
+    def update(self, key: str, price: float, volume: Optional[float] = None,
+               timestamp: Optional[float] = None) -> bool:
+        """
+        Record one tick
+
+        Args:
+            key: EXCHANGE:SYMBOL
+            price: Last traded price
+            volume: Cumulative day volume, if known
+            timestamp: Epoch seconds (defaults to now)
+        """
+        with self.lock:
+            i = self._index.get(key)
+            if i is None or not price == price:
+                return False
+            offset = int((time.time() if timestamp is None else timestamp) - self.origin)
+            bucket = offset // self.resolution
+
+            if bucket == self.last_bucket[i]:
+                slot = (self.head[i] - 1) % self.capacity
+            else:
+                slot = self.head[i]
+                self.head[i] = (slot + 1) % self.capacity
+                if self.count[i] < self.capacity:
+                    self.count[i] += 1
+                self.last_bucket[i] = bucket
+                self.times[i, slot] = offset
+                self.volumes[i, slot] = 0.0
+            self.prices[i, slot] = price
+
+            if volume is not None:
+                previous = self.cum_volume[i]
+                if previous == previous and volume >= previous:
+                    traded = volume - previous
+                    self.volumes[i, slot] += traded
+                    self.pv[i] += price * traded
+                    self.volume[i] += traded
+                self.cum_volume[i] = volume
+
+            if not self.ticks[i]:
+                self.first[i] = price
+            self.last[i] = price
+            if price > self.high[i]:
+                self.high[i] = price
+            if price < self.low[i]:
+                self.low[i] = price
+            self.ticks[i] += 1
+            return True
+
+    def update_many(self, keys: Sequence[str], prices: Sequence[float],
+                    volumes: Optional[Sequence[float]] = None, timestamp: Optional[float] = None) -> int:
+        """
+        Record one tick for each of many instruments (e.g. a batched quote)
+
+        Vectorized when every key appears once, which is the case for a
+        quote batch; repeated keys fall back to per-tick updates so their
+        order is respected. Unknown keys and NaN prices are skipped.
+        Returns the number of ticks recorded.
+        """
+        with self.lock:
+            index = np.fromiter((self._index.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+            prices = np.asarray(prices, dtype=float)
+            volumes = None if volumes is None else np.asarray(volumes, dtype=float)
+            keep = (index >= 0) & ~np.isnan(prices)
+            idx, price = index[keep], prices[keep]
+            if not len(idx):
+                return 0
+            if len(np.unique(idx)) != len(idx):
+                vols = volumes[keep] if volumes is not None else [None] * len(idx)
+                return sum(self.update(self.keys[i], p, None if v is None or v != v else v, timestamp)
+                           for i, p, v in zip(idx.tolist(), price.tolist(), list(vols)))
+
+            offset = int((time.time() if timestamp is None else timestamp) - self.origin)
+            bucket = offset // self.resolution
+            new = self.last_bucket[idx] != bucket
+            slots = np.where(new, self.head[idx], (self.head[idx] - 1) % self.capacity)
+            opened, opened_slots = idx[new], slots[new]
+            self.head[opened] = (opened_slots + 1) % self.capacity
+            self.count[opened] = np.minimum(self.count[opened] + 1, self.capacity)
+            self.last_bucket[opened] = bucket
+            self.times[opened, opened_slots] = offset
+            self.volumes[opened, opened_slots] = 0.0
+            self.prices[idx, slots] = price
+
+            if volumes is not None:
+                volume = volumes[keep]
+                previous = self.cum_volume[idx]
+                traded = np.where(~np.isnan(previous) & (volume >= previous), volume - previous, 0.0)
+                traded = np.nan_to_num(traded)
+                self.volumes[idx, slots] += traded
+                self.pv[idx] += price * traded
+                self.volume[idx] += traded
+                self.cum_volume[idx] = np.where(np.isnan(volume), previous, volume)
+
+            first_tick = self.ticks[idx] == 0
+            self.first[idx[first_tick]] = price[first_tick]
+            self.last[idx] = price
+            self.high[idx] = np.maximum(self.high[idx], price)
+            self.low[idx] = np.minimum(self.low[idx], price)
+            self.ticks[idx] += 1
+            return len(idx)
+
+    def _order(self, i: int) -> np.ndarray:
+        """Slot indices for instrument i, oldest first"""
+        count = self.count[i]
+        return (self.head[i] - count + np.arange(count)) % self.capacity
+
+    def series(self, key: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(local datetime64 timestamps, prices) for one instrument, oldest first"""
+        with self.lock:
+            i = self._index[key]
+            order = self._order(i)
+            midnight = np.datetime64(datetime.fromtimestamp(self.origin), 's')
+            return midnight + self.times[i, order].astype('timedelta64[s]'), self.prices[i, order].astype(float)
+
+    def sparklines(self, keys: Optional[Sequence[str]] = None, points: int = SPARKLINE_POINTS) -> List[List[float]]:
+        """Up to `points` evenly spaced prices per instrument, oldest first"""
+        with self.lock:
+            lines = []
+            for key in (self.keys if keys is None else keys):
+                i = self._index.get(key)
+                if i is None or not self.count[i]:
+                    lines.append([])
+                    continue
+                order = self._order(i)
+                if len(order) > points:
+                    order = order[np.linspace(0, len(order) - 1, points).round().astype(np.int64)]
+                lines.append(self.prices[i, order].astype(float).tolist())
+            return lines
+
+    def vwap(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.volume > 0, self.pv / self.volume, np.nan)
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Per-instrument intraday stats: first/last price, high, low, VWAP,
+        volume traded while watched, latest cumulative day volume, ticks
+        """
+        with self.lock:
+            seen = self.ticks > 0
+            return pd.DataFrame({
+                'Instrument': self.keys,
+                'First': self.first,
+                'Last': self.last,
+                'High': np.where(seen, self.high, np.nan),
+                'Low': np.where(seen, self.low, np.nan),
+                'VWAP': self.vwap(),
+                'Volume': self.volume,
+                'Day Volume': self.cum_volume,
+                'Ticks': self.ticks
+            })
+
+_shared: Dict[str, TickBuffer] = {}
+_shared_lock = threading.Lock()
+
+def shared_buffer(name: str) -> TickBuffer:
+    """The process-wide buffer called `name` (e.g. live or simulated), replaced when the day rolls over"""
+    with _shared_lock:
+        buffer = _shared.get(name)
+        if buffer is None or not buffer.is_current():
+            buffer = _shared[name] = TickBuffer()
+        return buffer
+
+def simulate_session(buffer: TickBuffer, base_prices: Dict[str, float], until: Optional[float] = None,
+                     seed: int = 0, volatility: float = 0.0008) -> int:
+    """
+    Fill a buffer with a random-walk session from the open up to `until` (default now)
+
+    One tick per bucket per instrument, for demo mode. Returns the ticks written.
+    """
+    until = time.time() if until is None else until
+    start = buffer.origin + SESSION_OPEN_SECONDS
+    end = min(until, start + SESSION_SECONDS)
+    if end <= start:
+        # Before the open: fill the previous day's full session, so ticks
+        # recorded from now on still come after it
+        start -= 24 * 3600
+        end = start + SESSION_SECONDS
+    stamps = np.arange(start, end, buffer.resolution, dtype=float)
+
+    keys = [k for k in base_prices if k in buffer]
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, volatility, (len(stamps), len(keys)))
+    prices = np.asarray([base_prices[k] for k in keys]) * np.exp(np.cumsum(steps, axis=0))
+    volumes = np.cumsum(rng.integers(100, 5000, (len(stamps), len(keys))), axis=0).astype(float)
+    for stamp, row, volume in zip(stamps, np.round(prices, 2), volumes):
+        buffer.update_many(keys, row, volume, timestamp=stamp)
+    return len(stamps) * len(keys)
@@ -0,0 +1,99 @@
+"""
+Timed Cache - Process-wide values recomputed once per shared refresh interval
+"""
+
+import time
+import threading
+from concurrent.futures import Executor, Future
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+
+class TimedCache:
+    """
+    Values shared by every session in the process, refreshed on a common timer
+
+    Time is cut into fixed buckets of `interval` seconds aligned to the
+    clock, so all sessions see refreshes at the same moments rather than
+    each on its own schedule. The first caller in a new bucket computes the
+    value; concurrent callers for the same key wait for that computation
+    instead of repeating it. A compute that returns None is not cached.
+    """
+
+    def __init__(self, interval: float, clock: Callable[[], float] = time.time):
+        self.interval = interval
+        self.clock = clock
+        self._entries: Dict[Hashable, Tuple[int, Any]] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._pending: Dict[Hashable, Tuple[int, Future]] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self) -> int:
+        """Index of the current refresh interval"""
+        return int(self.clock() // self.interval)
+
+    def _fresh(self, key: Hashable, bucket: int) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == bucket:
+            return True, entry[1]
+        return False, None
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the value for this interval, computing it at most once"""
+        bucket = self.bucket()
+        with self._lock:
+            hit, value = self._fresh(key, bucket)
+            if hit:
+                return value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another caller may have refreshed it while we waited
+            with self._lock:
+                hit, value = self._fresh(key, bucket)
+            if hit:
+                return value
+            value = compute()
+            if value is not None:
+                with self._lock:
+                    self._entries[key] = (bucket, value)
+            return value
+
+    def get_async(self, key: Hashable, compute: Callable[[], Any], executor: Executor) -> Future:
+        """
+        Future for this interval's value, computed on `executor` instead of the caller's thread
+
+        Every caller in the same interval gets the same future, so the value
+        is computed at most once; one that failed is retried on the next call.
+        """
+        bucket = self.bucket()
+        with self._lock:
+            hit, value = self._fresh(key, bucket)
+            if hit:
+                future = Future()
+                future.set_result(value)
+                return future
+            pending = self._pending.get(key)
+            if (pending is not None and pending[0] == bucket and
+                    not (pending[1].done() and pending[1].exception() is not None)):
+                return pending[1]
+            future = executor.submit(self.get, key, compute)
+            self._pending[key] = (bucket, future)
+            return future
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Last cached value for a key, fresh or not, without computing"""
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def seconds_until_refresh(self) -> float:
+        now = self.clock()
+        return self.interval - (now % self.interval)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything, so the next get() recomputes"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._pending.clear()
+            else:
+                self._entries.pop(key, None)
+                self._pending.pop(key, None)
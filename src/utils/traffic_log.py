@@ -0,0 +1,257 @@
+"""
+Traffic Log - Record MCP request/response traffic to a compressed append-only log and replay it
+"""
+
+import os
+import re
+import json
+import gzip
+import zlib
+import time
+import atexit
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Response headers worth keeping (session id so replays re-attach, Retry-After for 429s)
+RECORDED_HEADERS = ('Mcp-Session-Id', 'Retry-After', 'Content-Type')
+
+# Headers that are credentials; a placeholder value is all a replay needs
+REDACTED_HEADERS = ('Mcp-Session-Id',)
+
+# Fields identifying the account holder, blanked wherever they appear in a response
+REDACTED_FIELDS = frozenset({'user_id', 'user_name', 'user_shortname', 'email', 'avatar_url',
+                             'placed_by', 'phone', 'pan', 'bank_account'})
+
+# Query parameters that are credentials, such as the session_id on the login link
+REDACTED_PARAMS = ('session_id',)
+
+REDACTED = "REDACTED"
+
+_PARAM_PATTERN = re.compile(r'\b((?:%s)=)[^&\s"\'\\)]+' % '|'.join(REDACTED_PARAMS))
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: REDACTED if key in REDACTED_FIELDS and item is not None else _redact(item)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+def redact_text(text: str, secrets: Iterable[Optional[str]] = ()) -> str:
+    """Blank REDACTED_PARAMS query values and every occurrence of `secrets` in free text"""
+    text = _PARAM_PATTERN.sub(lambda match: match.group(1) + REDACTED, text)
+    for secret in secrets:
+        if secret:
+            text = text.replace(secret, REDACTED)
+    return text
+
+def redact_body(body: str, secrets: Iterable[Optional[str]] = ()) -> str:
+    """
+    Blank personal fields and credentials in a JSON-RPC response body
+
+    The tool result is JSON text inside the content items, so that is
+    decoded and redacted too. Whatever is left, JSON or not, then goes
+    through redact_text, which catches login links and session ids in
+    plain text.
+    """
+    secrets = list(secrets)
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return redact_text(body, secrets)
+    result = payload.get('result') if isinstance(payload, dict) else None
+    for item in (result.get('content') or []) if isinstance(result, dict) else []:
+        if isinstance(item, dict) and isinstance(item.get('text'), str):
+            try:
+                item['text'] = json.dumps(_redact(json.loads(item['text'])), separators=(',', ':'))
+            except ValueError:
+                pass
+    return redact_text(json.dumps(_redact(payload), separators=(',', ':')), secrets)
+
+@dataclass
+class TrafficRecord:
+    """One MCP call as the client saw it"""
+    client: str
+    started: float
+    tool: str
+    arguments: Dict[str, Any]
+    elapsed: float
+    status: Optional[int] = None
+    headers: Optional[Dict[str, str]] = None
+    body: Optional[str] = None
+    error: Optional[str] = None
+
+class TrafficRecorder:
+    """
+    Appends TrafficRecords as JSON lines to a gzip file
+
+    Each recorder adds one gzip member to the file, so successive runs
+    append without rewriting what is there. A file must have one writer at
+    a time: two processes appending at once interleave their gzip members
+    and corrupt the log, so give each process its own path (within a
+    process, open_recorder() shares one recorder per path). Every record
+    ends with a sync flush: a crash loses at most the record being written,
+    and read_traffic() stops cleanly at a truncated tail.
+
+    The session id header, the REDACTED_FIELDS in response bodies and any
+    session id or session_id parameter in body text are replaced before
+    writing. Holdings, positions and orders are kept as
+    they are, since replays depend on them, so treat a log like the
+    account data it holds.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = gzip.open(path, 'ab')
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def record(self, record: TrafficRecord):
+        line = (json.dumps(asdict(record), separators=(',', ':'), default=str) + '\n').encode()
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush(zlib.Z_SYNC_FLUSH)
+            self.records += 1
+
+    def record_call(self, client: str, tool: str, arguments: Dict[str, Any], started: float, elapsed: float,
+                    response: Optional[requests.Response] = None, error: Optional[str] = None,
+                    session_id: Optional[str] = None):
+        """
+        Record a call from its requests.Response (or the exception text when it never got one)
+
+        `session_id` is the client's current session; it and any session
+        id the response hands out are blanked wherever they appear.
+        """
+        if response is None:
+            self.record(TrafficRecord(client, started, tool, arguments, elapsed, error=error))
+            return
+        headers = {name: REDACTED if name in REDACTED_HEADERS else response.headers[name]
+                   for name in RECORDED_HEADERS if name in response.headers}
+        secrets = [session_id] + [response.headers.get(name) for name in REDACTED_HEADERS]
+        self.record(TrafficRecord(client, started, tool, arguments, elapsed, response.status_code,
+                                  headers, redact_body(response.text, secrets)))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+_recorders: Dict[str, TrafficRecorder] = {}
+_recorders_lock = threading.Lock()
+
+def open_recorder(path: str) -> TrafficRecorder:
+    """The process-wide recorder for a path, so every client (and session) appends to one stream"""
+    path = os.path.abspath(os.path.expanduser(path))
+    with _recorders_lock:
+        recorder = _recorders.get(path)
+        if recorder is None:
+            recorder = _recorders[path] = TrafficRecorder(path)
+            atexit.register(recorder.close)
+        return recorder
+
+def read_traffic(path: str) -> Iterator[TrafficRecord]:
+    """Records in the order they were written; a truncated final record is skipped"""
+    with gzip.open(path, 'rb') as f:
+        while True:
+            try:
+                line = f.readline()
+            except (EOFError, zlib.error, gzip.BadGzipFile):
+                return
+            if not line:
+                return
+            try:
+                yield TrafficRecord(**json.loads(line))
+            except (ValueError, TypeError):
+                return
+
+def load_traffic(path: str) -> List[TrafficRecord]:
+    """Whole log sorted by start time (clients write concurrently, so file order can interleave)"""
+    return sorted(read_traffic(path), key=lambda record: record.started)
+
+def _argument_key(arguments: Dict[str, Any]) -> str:
+    return json.dumps(arguments, sort_keys=True, separators=(',', ':'), default=str)
+
+def replay_response(record: TrafficRecord, url: str = "") -> requests.Response:
+    """Rebuild the requests.Response a record captured"""
+    response = requests.Response()
+    response.status_code = record.status
+    response.headers = CaseInsensitiveDict(record.headers or {})
+    response._content = (record.body or '').encode('utf-8')
+    response.encoding = 'utf-8'
+    response.url = url
+    return response
+
+class ReplayTransport:
+    """
+    Drop-in for requests.post that answers from a recording
+
+    Calls are matched to records by tool and exact arguments, in recorded
+    order; a call whose arguments were never seen (a date range that moved
+    with the clock, say) takes the next record for the same tool. Queues
+    wrap around, so a replay can run longer than the recording. Each
+    answer is delayed by the recorded latency divided by `speed`
+    (speed=0 answers immediately). Calls that originally failed in
+    transport raise requests.ConnectionError again.
+    """
+
+    def __init__(self, records: List[TrafficRecord], speed: float = 1.0):
+        self.speed = speed
+        self._exact: Dict[Tuple[str, str], deque] = {}
+        self._by_tool: Dict[str, deque] = {}
+        for record in records:
+            self._exact.setdefault((record.tool, _argument_key(record.arguments)), deque()).append(record)
+            self._by_tool.setdefault(record.tool, deque()).append(record)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+        self.misses = 0
+
+    def _next(self, tool: str, arguments: Dict[str, Any]) -> Optional[TrafficRecord]:
+        with self._lock:
+            queue = self._exact.get((tool, _argument_key(arguments)))
+            if queue:
+                self.hits += 1
+            else:
+                queue = self._by_tool.get(tool)
+                if not queue:
+                    self.misses += 1
+                    return None
+                self.fallbacks += 1
+            record = queue.popleft()
+            queue.append(record)
+            return record
+
+    def __call__(self, url: str, headers: Optional[Dict[str, str]] = None, data: bytes = b'',
+                 timeout: Optional[float] = None) -> requests.Response:
+        try:
+            params = json.loads(data).get('params', {})
+        except (ValueError, AttributeError):
+            params = {}
+        record = self._next(params.get('name', ''), params.get('arguments') or {})
+        if record is None:
+            response = requests.Response()
+            response.status_code = 404
+            response._content = f"No recorded response for {params.get('name')}".encode()
+            response.encoding = 'utf-8'
+            return response
+
+        if self.speed > 0:
+            delay = record.elapsed / self.speed
+            if timeout is not None and delay > timeout:
+                time.sleep(timeout)
+                raise requests.Timeout(f"Replayed call took {record.elapsed:.1f}s (timeout {timeout}s)")
+            time.sleep(delay)
+        if record.status is None:
+            raise requests.ConnectionError(record.error or "Recorded transport failure")
+        return replay_response(record, url)
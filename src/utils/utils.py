@@ -5,7 +5,12 @@ Utility functions for the portfolio management application
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
+
+ArrayLike = Union[pd.Series, np.ndarray, List[float]]
+
+# Compact Indian units, largest first: (threshold, suffix)
+INDIAN_UNITS = [(10000000, "Cr"), (100000, "L"), (1000, "K")]
 
 def format_currency(amount: float, currency: str = "₹") -> str:
     """Format amount as currency"""
@@ -23,6 +28,136 @@ def format_percentage(value: float) -> str:
     sign = "+" if value > 0 else ""
     return f"{sign}{value:.2f}%"
 
+def _like_input(values: ArrayLike, formatted: np.ndarray) -> ArrayLike:
+    """Return formatted strings as a Series when the input was a Series"""
+    if isinstance(values, pd.Series):
+        return pd.Series(formatted, index=values.index, name=values.name)
+    return formatted
+
+def _comma_count(digits: np.ndarray) -> np.ndarray:
+    """Number of Indian-style separators needed for integers of the given length"""
+    return np.maximum((digits - 2) // 2, 0)
+
+def _format_fixed(arr: np.ndarray, decimals: int, grouping: bool) -> np.ndarray:
+    """Format finite floats as fixed-point strings, optionally with Indian grouping
+
+    Characters are written into a (rows x width) byte matrix one digit position
+    at a time, so every loop below runs at most ~20 times regardless of the
+    number of values. No per-value Python string formatting is involved.
+    """
+    arr = np.asarray(arr, dtype=float)
+    n = arr.shape[0]
+    if n == 0:
+        return np.array([], dtype=str)
+
+    scale = 10 ** decimals
+    scaled = np.round(np.abs(arr) * scale).astype(np.int64)
+    integer = scaled // scale
+    negative = (arr < 0) & (scaled > 0)
+
+    # Integer digit count per value (at least one digit, for zero)
+    max_digits = len(str(int(integer.max())))
+    int_len = np.ones(n, dtype=np.int64)
+    for k in range(1, max_digits):
+        int_len += integer >= 10 ** k
+
+    commas = _comma_count if grouping else (lambda d: np.zeros_like(d))
+    int_width = max_digits + int(commas(np.array(max_digits)))
+    frac_width = decimals + 1 if decimals > 0 else 0
+    width = int_width + frac_width
+
+    # Right-aligned template: separators everywhere, then digits on top
+    template = np.full((n, width), ord(","), dtype=np.uint8)
+    remaining = integer.copy()
+    for k in range(max_digits):
+        col = int_width - 1 - k - int(commas(np.array(k + 1)))
+        template[:, col] = remaining % 10 + 48
+        remaining //= 10
+    if decimals > 0:
+        template[:, int_width] = ord(".")
+        fraction = scaled % scale
+        for k in range(decimals):
+            template[:, width - 1 - k] = fraction % 10 + 48
+            fraction //= 10
+
+    # Left-justify: rows sharing a length are shifted together
+    lengths = int_len + commas(int_len) + frac_width
+    out = np.zeros((n, width + 1), dtype=np.uint8)
+    for length in np.unique(lengths):
+        rows = lengths == length
+        signed = rows & negative
+        unsigned = rows & ~negative
+        out[unsigned, :length] = template[unsigned, width - length:]
+        out[signed, 1:length + 1] = template[signed, width - length:]
+    out[negative, 0] = ord("-")
+
+    return out.view(f"S{width + 1}").ravel().astype(str)
+
+def format_indian_number(values: ArrayLike, decimals: int = 0, signed: bool = False,
+                         na_rep: str = "") -> ArrayLike:
+    """Format a column of numbers with Indian digit grouping (12,34,56,789.00)"""
+    arr = np.asarray(values, dtype=float)
+    finite = np.isfinite(arr)
+    arr = np.where(finite, arr, 0)
+    out = _format_fixed(arr, decimals, grouping=True)
+    if signed:
+        # Sign of the rounded value, so -0.001 shows as "0" rather than "+0"
+        out = np.char.add(np.where(np.round(arr * 10 ** decimals) > 0, "+", ""), out)
+    return _like_input(values, np.where(finite, out, na_rep))
+
+def format_currency_array(values: ArrayLike, currency: str = "₹", decimals: int = 2,
+                          compact: bool = False, na_rep: str = "") -> ArrayLike:
+    """Vectorized format_currency with Indian grouping and optional Cr/L/K units"""
+    arr = np.asarray(values, dtype=float)
+    finite = np.isfinite(arr)
+    arr = np.where(finite, arr, 0)
+    suffix = np.full(arr.shape, "")
+
+    if compact:
+        # Move up a unit when the value, rounded in the unit below, reaches the
+        # threshold, so 99,99,999.999 is 1.00Cr rather than 100.00L
+        scale = 10 ** decimals
+        magnitude = np.abs(arr)
+        divisor = np.ones(arr.shape)
+        below = 1
+        for threshold, unit in reversed(INDIAN_UNITS):
+            hit = np.round(magnitude / below * scale) >= threshold // below * scale
+            divisor = np.where(hit, threshold, divisor)
+            suffix = np.where(hit, unit, suffix)
+            below = threshold
+        arr = arr / divisor
+
+    numbers = _format_fixed(np.abs(arr), decimals, grouping=True)
+    negative = (arr < 0) & (np.round(np.abs(arr) * 10 ** decimals) > 0)
+    out = np.char.add(np.char.add(np.where(negative, "-" + currency, currency), numbers), suffix)
+    return _like_input(values, np.where(finite, out, na_rep))
+
+def format_percentage_array(values: ArrayLike, decimals: int = 2, na_rep: str = "") -> ArrayLike:
+    """Vectorized format_percentage: signed, fixed decimals, trailing %"""
+    arr = np.asarray(values, dtype=float)
+    finite = np.isfinite(arr)
+    arr = np.where(finite, arr, 0)
+    out = _format_fixed(arr, decimals, grouping=False)
+    positive = np.round(arr * 10 ** decimals) > 0
+    out = np.char.add(np.char.add(np.where(positive, "+", ""), out), "%")
+    return _like_input(values, np.where(finite, out, na_rep))
+
+def get_color_styles(values: ArrayLike) -> np.ndarray:
+    """Vectorized get_color_for_value returning CSS color declarations"""
+    arr = np.asarray(values, dtype=float)
+    return np.select([arr > 0, arr < 0], ['color: green', 'color: red'], default='')
+
+def color_signed_columns(data: pd.DataFrame, source: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Styler.apply(axis=None) helper: color columns by the sign of numeric source values
+
+    Lets tables display pre-formatted string columns while still coloring by
+    the underlying numbers, in one vectorized pass per column.
+    """
+    styles = pd.DataFrame('', index=data.index, columns=data.columns)
+    for column in columns:
+        styles[column] = get_color_styles(source[column])
+    return styles
+
 def calculate_portfolio_metrics(holdings_data: List[Dict]) -> Dict[str, float]:
     """Calculate portfolio summary metrics"""
     if not holdings_data:
@@ -40,9 +175,14 @@ def calculate_portfolio_metrics(holdings_data: List[Dict]) -> Dict[str, float]:
     total_pnl = total_value - total_investment
     total_pnl_percent = (total_pnl / total_investment * 100) if total_investment > 0 else 0
     
-    # Mock day change calculation
-    day_change = total_value * 0.015  # Assume 1.5% day change
-    day_change_percent = 1.5
+    # Day change against the previous close, for holdings that report one
+    quantity = np.array([h.get('quantity', 0) for h in holdings_data], dtype=float)
+    ltp = np.array([h.get('last_price', h.get('ltp', 0)) for h in holdings_data], dtype=float)
+    close = np.array([h.get('close_price') or h.get('last_price', h.get('ltp', 0))
+                      for h in holdings_data], dtype=float)
+    day_change = float(quantity @ (ltp - close))
+    previous_value = float(quantity @ close)
+    day_change_percent = (day_change / previous_value * 100) if previous_value > 0 else 0
     
     return {
         'total_value': total_value,
@@ -142,8 +282,12 @@ def validate_order_params(params: Dict[str, Any]) -> tuple[bool, str]:
         return False, "Quantity must be greater than 0"
     
     # Validate price for limit orders
-    if params.get('order_type') == 'LIMIT' and params.get('price', 0) <= 0:
-        return False, "Price must be greater than 0 for limit orders"
+    if params.get('order_type') in ('LIMIT', 'SL') and params.get('price', 0) <= 0:
+        return False, f"Price must be greater than 0 for {params['order_type']} orders"
+    
+    # Stop-loss orders need the price that triggers them
+    if params.get('order_type') in ('SL', 'SL-M') and params.get('trigger_price', 0) <= 0:
+        return False, f"Trigger price must be greater than 0 for {params['order_type']} orders"
     
     return True, "Valid"
 
@@ -210,8 +354,9 @@ def generate_historical_data(symbol: str, days: int = 30) -> pd.DataFrame:
     
     return pd.DataFrame(prices)
 
-def get_risk_metrics(holdings_data: List[Dict]) -> Dict[str, Any]:
-    """Calculate portfolio risk metrics"""
+def get_risk_metrics(holdings_data: List[Dict],
+                     sector_weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Calculate portfolio risk metrics; sector_weights (from sectors.sector_diversification) is passed through"""
     if not holdings_data:
         return {}
     
@@ -220,10 +365,6 @@ def get_risk_metrics(holdings_data: List[Dict]) -> Dict[str, Any]:
     max_holding = max(h.get('current_value', 0) for h in holdings_data)
     concentration_ratio = (max_holding / total_value) * 100 if total_value > 0 else 0
     
-    # Calculate sector diversification (mock)
-    sectors = ['Technology', 'Finance', 'Energy', 'FMCG', 'Healthcare']
-    sector_weights = [25, 30, 20, 15, 10]  # Mock weights
-    
     # Risk score based on concentration
     risk_score = "Low"
     if concentration_ratio > 40:
@@ -234,7 +375,7 @@ def get_risk_metrics(holdings_data: List[Dict]) -> Dict[str, Any]:
     return {
         'concentration_ratio': concentration_ratio,
         'max_holding_percent': concentration_ratio,
-        'sector_diversification': dict(zip(sectors, sector_weights)),
+        'sector_diversification': dict(sector_weights or {}),
         'risk_score': risk_score,
         'volatility': np.random.uniform(15, 25)  # Mock volatility
     }
@@ -0,0 +1,198 @@
+"""
+Watchlists - Persisted named watchlists and one de-duplicated quote pass across all of them
+"""
+
+import os
+import re
+import json
+import tempfile
+import threading
+from typing import Dict, List, Iterable, Optional
+
+from utils.kite_mcp_client import KiteMCPClient
+
+DEFAULT_WATCHLISTS_PATH = os.path.join(os.path.expanduser("~"), ".portfolio_manager", "watchlists.json")
+
+DEFAULT_WATCHLIST_NAME = "My Watchlist"
+DEFAULT_WATCHLIST = ['NSE:RELIANCE', 'NSE:TCS', 'NSE:INFY', 'NSE:HDFCBANK', 'NSE:ITC', 'NSE:SBIN']
+
+# Kite's cap on instruments per get_quotes call
+QUOTE_BATCH_LIMIT = 500
+
+# Serialises the reload-merge-write in save() between sessions of one process
+_save_lock = threading.Lock()
+
+def user_watchlists_path(user_id: Optional[str], path: Optional[str] = None) -> str:
+    """
+    The watchlist file for one user: watchlists.json becomes watchlists.<user_id>.json
+    next to it. Without a user id (demo mode) the shared file itself is used.
+    """
+    path = path or DEFAULT_WATCHLISTS_PATH
+    user_id = re.sub(r'[^A-Za-z0-9_-]', '_', str(user_id or '').strip())
+    if not user_id:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{user_id}{ext or '.json'}"
+
+def normalize_instrument(symbol: str, default_exchange: str = "NSE") -> str:
+    """EXCHANGE:SYMBOL in upper case; bare symbols get the default exchange"""
+    symbol = str(symbol).strip().upper()
+    if symbol and ':' not in symbol:
+        symbol = f"{default_exchange}:{symbol}"
+    return symbol
+
+def union_instruments(*groups: Iterable[str]) -> List[str]:
+    """Every instrument across groups once, in first-seen order"""
+    return list(dict.fromkeys(key for group in groups for key in group))
+
+class WatchlistStore:
+    """
+    Named, ordered watchlists persisted as one compact JSON file
+
+    Each instrument string is written once in a shared symbol table and the
+    lists hold indices into it, so thousands of symbols spread over many
+    overlapping lists stay small on disk.
+
+    Several sessions of the same user can hold a store for one file, so
+    save() re-reads the file and applies only this store's edits since it
+    was loaded (or last saved) on top of what is there.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.lists: Dict[str, List[str]] = {}
+        # Lists as last read from or written to disk; the base save() diffs against
+        self._saved: Dict[str, List[str]] = {}
+
+    def names(self) -> List[str]:
+        return list(self.lists)
+
+    def get(self, name: str) -> List[str]:
+        return list(self.lists.get(name, []))
+
+    def create(self, name: str, instruments: Iterable[str] = ()) -> List[str]:
+        name = name.strip()
+        if not name:
+            raise ValueError("Watchlist name is required")
+        if name in self.lists:
+            raise ValueError(f"Watchlist already exists: {name}")
+        self.lists[name] = []
+        return self.add(name, instruments)
+
+    def delete(self, name: str) -> bool:
+        return self.lists.pop(name, None) is not None
+
+    def rename(self, old: str, new: str):
+        new = new.strip()
+        if not new or new in self.lists:
+            raise ValueError(f"Invalid or duplicate watchlist name: {new}")
+        # Rebuild to keep the list in its place
+        self.lists = {new if name == old else name: keys for name, keys in self.lists.items()}
+
+    def add(self, name: str, instruments: Iterable[str]) -> List[str]:
+        """Append instruments not already in the list; returns the ones added"""
+        current = self.lists[name]
+        present = set(current)
+        added = []
+        for key in map(normalize_instrument, instruments):
+            if key and key not in present:
+                present.add(key)
+                added.append(key)
+        current.extend(added)
+        return added
+
+    def remove(self, name: str, instruments: Iterable[str]) -> int:
+        drop = {normalize_instrument(key) for key in instruments}
+        before = len(self.lists[name])
+        self.lists[name] = [key for key in self.lists[name] if key not in drop]
+        return before - len(self.lists[name])
+
+    def instruments(self, names: Optional[Iterable[str]] = None) -> List[str]:
+        """De-duplicated union of the given lists (all lists by default)"""
+        names = self.names() if names is None else names
+        return union_instruments(*(self.lists.get(name, []) for name in names))
+
+    def _merge(self, disk: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Apply this store's creates, deletes, additions and removals to the lists on disk"""
+        merged = {}
+        for name, keys in self.lists.items():
+            base = self._saved.get(name)
+            if base is None:
+                # Created here (or renamed); keep anything another session put under the same name
+                merged[name] = union_instruments(keys, disk.get(name, []))
+                continue
+            base = set(base)
+            removed = base - set(keys)
+            merged[name] = union_instruments(
+                [key for key in disk.get(name, keys) if key not in removed],
+                [key for key in keys if key not in base])
+        for name, keys in disk.items():
+            # Lists another session created; lists deleted here stay deleted
+            if name not in merged and name not in self._saved:
+                merged[name] = list(keys)
+        return merged
+
+    def save(self, path: Optional[str] = None):
+        """Merge into the file's current contents and write atomically as a symbol table plus per-list indices"""
+        path = path or self.path or DEFAULT_WATCHLISTS_PATH
+        with _save_lock:
+            disk = _read_lists(path)
+            if disk is not None:
+                self.lists = self._merge(disk)
+            self._write(path)
+            self._saved = {name: list(keys) for name, keys in self.lists.items()}
+
+    def _write(self, path: str):
+        symbols = self.instruments()
+        position = {key: i for i, key in enumerate(symbols)}
+        payload = {
+            'symbols': symbols,
+            'lists': [[name, [position[key] for key in keys]] for name, keys in self.lists.items()]
+        }
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(payload, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'WatchlistStore':
+        """Read lists saved by save(); a missing or unreadable file gives the default list"""
+        path = path or DEFAULT_WATCHLISTS_PATH
+        store = cls(path)
+        lists = _read_lists(path)
+        if lists is None:
+            lists = {DEFAULT_WATCHLIST_NAME: list(DEFAULT_WATCHLIST)}
+        store.lists = lists
+        store._saved = {name: list(keys) for name, keys in lists.items()}
+        return store
+
+def _read_lists(path: str) -> Optional[Dict[str, List[str]]]:
+    """Lists in a file written by WatchlistStore.save(); None when missing or unreadable"""
+    try:
+        with open(path) as f:
+            payload = json.load(f)
+        symbols = payload['symbols']
+        return {name: [symbols[i] for i in indices] for name, indices in payload['lists']}
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        return None
+
+def fetch_quotes(client: KiteMCPClient, instruments: List[str],
+                 batch_size: int = QUOTE_BATCH_LIMIT) -> Dict[str, Dict]:
+    """
+    Quotes for a de-duplicated instrument list in as few get_quotes calls as
+    Kite allows; instruments whose batch failed are simply absent
+    """
+    instruments = union_instruments(instruments)
+    quotes: Dict[str, Dict] = {}
+    for start in range(0, len(instruments), batch_size):
+        response = client.get_quotes(instruments[start:start + batch_size])
+        if response.success and isinstance(response.data, dict):
+            quotes.update({key: quote for key, quote in response.data.items() if isinstance(quote, dict)})
+    return quotes